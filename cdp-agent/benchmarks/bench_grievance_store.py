@@ -0,0 +1,101 @@
+"""
+Insert throughput and lookup latency for the grievance store backends.
+
+    python benchmarks/bench_grievance_store.py --rows 1000000 --backend sqlite
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from grievance_store import open_grievance_store  # noqa: E402
+
+CATEGORIES = [
+    "road pothole", "broken street light", "graffiti vandalism",
+    "fallen tree", "water leak", "garbage dumping", "broken sidewalk",
+    "missing street sign", "flooding", "damaged public property"
+]
+
+
+def make_record(i):
+    now = int(time.time())
+    return {
+        "trackingId": f"GRV-{i:08X}",
+        "title": f"Grievance {i}",
+        "description": "Benchmark record",
+        "location": "Benchmark street",
+        "category": CATEGORIES[i % len(CATEGORIES)],
+        "priorityLevel": ("high", "medium", "low")[i % 3],
+        "estimatedDays": 7,
+        "mediaCount": 1,
+        "aiJustification": "[]",
+        "status": "submitted",
+        "createdAt": now,
+        "updatedAt": now,
+        "submitter": "backend-local",
+        "resolved": False,
+        "blockchainStatus": "pending",
+        "tx_hash": None,
+        "blockchainError": None,
+    }
+
+
+def percentile(samples, p):
+    samples = sorted(samples)
+    return samples[min(len(samples) - 1, int(len(samples) * p))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--lookups", type=int, default=10_000)
+    parser.add_argument("--backend", choices=("sqlite", "memory"), default="sqlite")
+    parser.add_argument("--path", help="SQLite file (default: a temporary file)")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = args.path or os.path.join(tmp, "bench.db")
+        store = open_grievance_store(args.backend, path)
+
+        start = time.perf_counter()
+        for i in range(args.rows):
+            store.add(make_record(i))
+        if hasattr(store, "flush"):
+            store.flush()
+        elapsed = time.perf_counter() - start
+        print(f"backend={args.backend} rows={args.rows}")
+        print(f"insert: {args.rows / elapsed:,.0f} rows/s ({elapsed:.1f}s incl. final flush)")
+
+        if hasattr(store, "close"):
+            # Reopen so lookups measure the cold (warm-start) path, not the write cache
+            store.close()
+            start = time.perf_counter()
+            store = open_grievance_store(args.backend, path)
+            print(f"reopen: {(time.perf_counter() - start) * 1000:.1f} ms")
+
+        ids = [f"GRV-{random.randrange(args.rows):08X}" for _ in range(args.lookups)]
+        samples = []
+        for tracking_id in ids:
+            t0 = time.perf_counter()
+            assert store.get(tracking_id) is not None
+            samples.append((time.perf_counter() - t0) * 1e6)
+        print(
+            f"get: p50={percentile(samples, 0.5):.1f}us p99={percentile(samples, 0.99):.1f}us "
+            f"mean={statistics.mean(samples):.1f}us"
+        )
+
+        t0 = time.perf_counter()
+        hits = store.find(category="flooding", priorityLevel="high")
+        print(f"find(category, priorityLevel): {len(hits)} rows in {(time.perf_counter() - t0) * 1000:.1f} ms")
+
+        if hasattr(store, "close"):
+            store.close()
+
+
+if __name__ == "__main__":
+    main()
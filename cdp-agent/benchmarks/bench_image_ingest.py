@@ -0,0 +1,129 @@
+"""
+Per-image latency and peak memory of the upload -> inference-payload path.
+
+Compares the old path (read the whole upload, base64 it for the job,
+decode it again and re-encode it for the API request, at full
+resolution) with prepare_image (decode once in draft mode straight from
+the spooled upload, downscale to the model size). Each path runs in its
+own process so peak RSS is measured in isolation.
+
+    python benchmarks/bench_image_ingest.py --width 4032 --height 3024 --iterations 20
+"""
+import argparse
+import base64
+import io
+import json
+import multiprocessing
+import os
+import resource
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from PIL import Image  # noqa: E402
+
+from image_ingest import open_upload, prepare_image  # noqa: E402
+
+LABELS = ["road pothole", "broken street light", "flooding"]
+
+
+def old_path(f):
+    # submit_grievance -> process_grievance -> clip_grievance_categorize before the ingestion stage
+    image_base64 = base64.b64encode(f.read()).decode("utf-8")
+    image_data = base64.b64decode(image_base64)
+    return json.dumps({
+        "image": base64.b64encode(image_data).decode("utf-8"),
+        "parameters": {"candidate_labels": LABELS},
+    })
+
+
+def old_pil_path(f):
+    # main.py clip_image_analysis: full-size PIL decode and JPEG re-save
+    image_data = base64.b64decode(base64.b64encode(f.read()))
+    image = Image.open(io.BytesIO(image_data))
+    out = io.BytesIO()
+    image.save(out, format="JPEG")
+    return json.dumps({"image": base64.b64encode(out.getvalue()).decode("utf-8"), "parameters": {"candidate_labels": LABELS}})
+
+
+def new_path(f):
+    image_data = prepare_image(open_upload(f))
+    return json.dumps({
+        "image": base64.b64encode(image_data).decode("utf-8"),
+        "parameters": {"candidate_labels": LABELS},
+    })
+
+
+PATHS = {"old": old_path, "old-pil": old_pil_path, "new": new_path}
+
+
+def peak_rss_kb():
+    # VmHWM is per address space; ru_maxrss on Linux keeps the parent's peak across exec
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+def run(name, path, iterations, results):
+    fn = PATHS[name]
+    baseline = peak_rss_kb()
+    with open(path, "rb") as f:
+        fn(f)  # warm-up (codec init)
+    timings = []
+    for _ in range(iterations):
+        with open(path, "rb") as f:
+            start = time.perf_counter()
+            payload = fn(f)
+            timings.append(time.perf_counter() - start)
+        del payload
+    with open(path, "rb") as f:
+        payload_bytes = len(fn(f))
+    peak = peak_rss_kb()
+    results[name] = (timings, (peak - baseline) / 1024, payload_bytes)
+
+
+def make_photo(path, width, height):
+    # Noise over a gradient compresses about as badly as a real phone photo
+    base = Image.linear_gradient("L").resize((width, height)).convert("RGB")
+    noise = Image.effect_noise((width, height), 64).convert("RGB")
+    Image.blend(base, noise, 0.5).save(path, format="JPEG", quality=92)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--width", type=int, default=4032)
+    parser.add_argument("--height", type=int, default=3024)
+    parser.add_argument("--iterations", type=int, default=20)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "photo.jpg")
+        make_photo(path, args.width, args.height)
+        print(f"{args.width}x{args.height} JPEG, {os.path.getsize(path) / 1e6:.1f} MB upload")
+
+        ctx = multiprocessing.get_context("spawn")
+        results = ctx.Manager().dict()
+        for name in PATHS:
+            p = ctx.Process(target=run, args=(name, path, args.iterations, results))
+            p.start()
+            p.join()
+
+    for name in PATHS:
+        timings, peak_mb, payload_bytes = results[name]
+        p95 = statistics.quantiles(timings, n=20)[-1] if len(timings) > 1 else timings[0]
+        print(
+            f"{name:8s} p50 {statistics.median(timings) * 1000:7.1f} ms  p95 {p95 * 1000:7.1f} ms  "
+            f"peak +{peak_mb:6.1f} MB  request {payload_bytes / 1e3:9.1f} kB"
+        )
+
+
+if __name__ == "__main__":
+    main()
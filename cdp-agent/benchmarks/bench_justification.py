@@ -0,0 +1,120 @@
+"""
+Bytes and gas per submitGrievance for the old and new aiJustification formats.
+
+Deploys GrievanceRegistry to a local dev chain (see local_chain.py) and
+submits the same grievances twice: once with the full JSON list of
+label/score pairs the app used to send, once with ``encode_justification``.
+Reports the aiJustification size, calldata size, calldata gas (16 per
+non-zero byte, 4 per zero byte) and the mined gasUsed, which also covers
+storing the string.
+
+    python benchmarks/bench_justification.py --submissions 50
+"""
+import argparse
+import hashlib
+import json
+import os
+import statistics
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+sys.path.insert(0, os.path.dirname(__file__))
+
+from web3 import Web3  # noqa: E402
+
+from contract_reader import BulkGrievanceReader  # noqa: E402
+from contract_registry import ContractRegistry  # noqa: E402
+from grievances import GRIEVANCE_CATEGORIES, encode_justification  # noqa: E402
+from local_chain import BACKENDS, start_chain  # noqa: E402
+
+ABI_PATH = os.path.join(os.path.dirname(__file__), "..", "src", "abi", "GrievanceRegistry.json")
+
+
+def classifier_results(seed):
+    """Scores over every category, shaped like the inference API's answer (as fake_inference_server.py makes them)."""
+    digest = hashlib.sha256(str(seed).encode()).digest()
+    raw = [digest[i] + 1 for i in range(len(GRIEVANCE_CATEGORIES))]
+    total = sum(raw)
+    return sorted(
+        ({"label": label, "score": r / total} for label, r in zip(GRIEVANCE_CATEGORIES, raw)),
+        key=lambda r: r["score"], reverse=True,
+    )
+
+
+def submit_args(i, results, justification):
+    return (
+        f"Grievance {i}", "Reported by bench_justification", results[0]["label"], "Ward 12",
+        1, "medium", f"GRV-{i:08X}", 7, 0, "INR", justification,
+    )
+
+
+def calldata_gas(data):
+    zeros = data.count(0)
+    return zeros * 4 + (len(data) - zeros) * 16
+
+
+def send(web3, registry, args):
+    tx = registry.transaction("submitGrievance", *args, nonce=web3.eth.get_transaction_count(registry.account.address))
+    tx["gas"] = web3.eth.estimate_gas(tx)
+    tx["gasPrice"] = web3.eth.gas_price
+    tx.pop("from")
+    tx_hash = web3.eth.send_raw_transaction(registry.account.sign_transaction(tx).raw_transaction)
+    receipt = web3.eth.wait_for_transaction_receipt(tx_hash)
+    if receipt["status"] != 1:
+        raise RuntimeError(f"submitGrievance reverted for {args[6]}")
+    return tx["data"], receipt["gasUsed"]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--submissions", type=int, default=50, help="Grievances per format")
+    parser.add_argument("--chain", choices=("auto",) + BACKENDS, default="auto")
+    parser.add_argument("--chain-port", type=int, default=18545)
+    args = parser.parse_args()
+
+    chain = start_chain(args.chain_port, args.chain)
+    try:
+        with open(ABI_PATH) as f:
+            abi = json.load(f)
+        web3 = Web3(Web3.HTTPProvider(chain.url))
+        registry = ContractRegistry(web3, chain.contract_address, abi, chain.private_key)
+
+        formats = {
+            "old (full JSON)": lambda results: json.dumps(results),
+            "new (encode_justification)": encode_justification,
+        }
+        rows = {}
+        for n, (name, encode) in enumerate(formats.items()):
+            sizes, calldata, calldata_gases, gas_used = [], [], [], []
+            for i in range(args.submissions):
+                results = classifier_results(i)
+                justification = encode(results)
+                data, used = send(web3, registry, submit_args(n * args.submissions + i, results, justification))
+                sizes.append(len(justification.encode("utf-8")))
+                calldata.append(len(data))
+                calldata_gases.append(calldata_gas(data))
+                gas_used.append(used)
+            rows[name] = [statistics.mean(v) for v in (sizes, calldata, calldata_gases, gas_used)]
+
+        # Both formats read back through the API's reader decode to the same top labels
+        records = BulkGrievanceReader(web3, chain.contract_address).fetch_grievances(
+            [f"GRV-{i:08X}" for i in range(2 * args.submissions)]
+        )
+        for i in range(args.submissions):
+            old = json.loads(records[f"GRV-{i:08X}"]["aiJustification"])
+            new = json.loads(records[f"GRV-{args.submissions + i:08X}"]["aiJustification"])
+            assert [r["label"] for r in old[:len(new)]] == [r["label"] for r in new]
+    finally:
+        chain.stop()
+
+    print(f"{chain.backend} chain, {args.submissions} submissions per format (means)")
+    print(f"{'format':<28} {'justification B':>15} {'calldata B':>11} {'calldata gas':>13} {'gasUsed':>9}")
+    for name, (size, data, data_gas, used) in rows.items():
+        print(f"{name:<28} {size:>15,.0f} {data:>11,.0f} {data_gas:>13,.0f} {used:>9,.0f}")
+    (old, new) = rows.values()
+    print(f"saved per submission: {old[1] - new[1]:,.0f} calldata bytes, {old[3] - new[3]:,.0f} gas "
+          f"({1 - new[3] / old[3]:.0%})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""
+Per-transaction CPU time to build and sign a submitGrievance transaction.
+
+Compares the old per-call path (derive the key, build a web3 contract from
+the ABI, build_transaction) with the cached ContractRegistry path. No node
+is needed: every field web3 would otherwise fetch is supplied.
+
+    python benchmarks/bench_tx_build.py --iterations 2000
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from eth_account import Account  # noqa: E402
+from web3 import Web3  # noqa: E402
+
+from contract_registry import ContractRegistry  # noqa: E402
+
+ABI_PATH = os.path.join(os.path.dirname(__file__), "..", "src", "abi", "GrievanceRegistry.json")
+PRIVATE_KEY = "0x" + "11" * 32
+ADDRESS = "0x" + "22" * 20
+CHAIN_ID = 43113
+ARGS = (
+    "Pothole on 5th street", "Deep pothole near the bus stop", "road pothole", "5th street",
+    1, "medium", "GRV-0000ABCD", 7, 0, "INR", json.dumps([{"label": "road pothole", "score": 0.91}]),
+)
+FIELDS = {"nonce": 0, "gas": 300000, "gasPrice": 25 * 10**9, "chainId": CHAIN_ID}
+
+
+def old_path(web3, abi):
+    account = Account.from_key(PRIVATE_KEY)
+    contract = web3.eth.contract(address=Web3.to_checksum_address(ADDRESS), abi=abi)
+    tx = contract.functions.submitGrievance(*ARGS).build_transaction(dict(FIELDS, **{"from": account.address}))
+    return account.sign_transaction(tx)
+
+
+def new_path(registry):
+    tx = registry.transaction("submitGrievance", *ARGS, **FIELDS)
+    tx.pop("from")
+    return registry.account.sign_transaction(tx)
+
+
+def measure(fn, iterations):
+    fn()  # warm-up
+    start = time.process_time()
+    for _ in range(iterations):
+        fn()
+    return (time.process_time() - start) / iterations * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--iterations", type=int, default=2000)
+    args = parser.parse_args()
+
+    with open(ABI_PATH) as f:
+        abi = json.load(f)
+    web3 = Web3()
+    registry = ContractRegistry(web3, ADDRESS, abi, PRIVATE_KEY)
+    registry._chain_id = CHAIN_ID
+
+    assert old_path(web3, abi).raw_transaction == new_path(registry).raw_transaction
+
+    old_us = measure(lambda: old_path(web3, abi), args.iterations)
+    new_us = measure(lambda: new_path(registry), args.iterations)
+    print(f"old (per-call contract + key derivation): {old_us:,.0f} us/tx CPU")
+    print(f"new (ContractRegistry):                   {new_us:,.0f} us/tx CPU")
+    print(f"speedup: {old_us / new_us:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,376 @@
+"""
+End-to-end benchmark of the grievance service against local stand-ins.
+
+Starts a dev chain with GrievanceRegistry deployed (local_chain.py), the
+fake inference API (fake_inference_server.py, with ``--inference-latency``
+and ``--inference-fail-rate``) and the app (Flask or ASGI, started as in
+load_test.py). ``--seed`` grievances are submitted and mined first; then
+each profile in ``--profiles`` sends ``--requests`` requests from
+``--concurrency`` clients, mixing /submit_grievance, /get_grievance,
+/get_all_grievances and /mark_resolved by the weights in PROFILES.
+
+Reported per profile:
+
+- routes: requests, errors, throughput and p50/p95/p99 latency per route.
+- stages: for a ``--trace-rate`` sample of submissions and resolutions,
+  the p50/p95/p99 time spent in each pipeline stage: ``accept`` (the
+  upload request), ``classify`` (accepted until the classification is
+  stored), ``chain`` (classified until the submission is mined or
+  failed), ``total`` (upload until mined) and ``resolve`` (mark_resolved
+  answered until the grievance shows as resolved).
+
+Results are written as JSON with ``--output``. ``--baseline`` compares the
+run with an earlier results file and exits with status 1 when a route's
+or stage's p95/p99 grew, or a route's throughput fell, by more than
+``--tolerance`` (changes under ``--min-delta-ms``, and metrics with fewer
+than ``--min-samples`` samples, are ignored as noise).
+
+    python benchmarks/e2e_bench.py --profiles submit read mixed --output baseline.json
+    python benchmarks/e2e_bench.py --output current.json --baseline baseline.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+
+sys.path.insert(0, os.path.dirname(__file__))
+
+from fake_inference_server import serve  # noqa: E402
+from load_test import SERVERS, photos, start_server  # noqa: E402
+from local_chain import BACKENDS, start_chain  # noqa: E402
+
+# Route weights per load profile
+PROFILES = {
+    "submit": {"submit_grievance": 1.0},
+    "read": {"get_grievance": 0.8, "get_all_grievances": 0.2},
+    "mixed": {"submit_grievance": 0.3, "get_grievance": 0.45, "get_all_grievances": 0.15, "mark_resolved": 0.1},
+}
+STAGES = ("accept", "classify", "chain", "total", "resolve")
+
+
+def percentiles(samples):
+    """count/p50/p95/p99 in milliseconds of ``samples`` (seconds)."""
+    samples = sorted(samples)
+    if not samples:
+        return {"count": 0, "p50Ms": None, "p95Ms": None, "p99Ms": None}
+
+    def at(q):
+        return round(samples[int(q * (len(samples) - 1))] * 1000, 1)
+    return {"count": len(samples), "p50Ms": round(statistics.median(samples) * 1000, 1), "p95Ms": at(0.95),
+            "p99Ms": at(0.99)}
+
+
+class Run:
+    """
+    One profile's traffic against a running server.
+
+    ``known`` (every tracking id submitted so far) feeds /get_grievance;
+    ``resolvable`` (mined, not yet resolved) feeds /mark_resolved.
+    """
+
+    def __init__(self, client, images, known, resolvable, args, rng):
+        self.client = client
+        self.images = images
+        self.known = known
+        self.resolvable = resolvable
+        self.args = args
+        self.rng = rng
+        self.latencies = {}
+        self.errors = {}
+        self.stages = {stage: [] for stage in STAGES}
+        self.outcomes = {"mined": 0, "chainFailed": 0, "traceTimeout": 0}
+        self.traces = []
+
+    async def request(self, route):
+        started = time.perf_counter()
+        try:
+            await getattr(self, route)(started)
+        except Exception:
+            self.errors[route] = self.errors.get(route, 0) + 1
+            return
+        self.latencies.setdefault(route, []).append(time.perf_counter() - started)
+
+    async def submit_grievance(self, started):
+        i = len(self.known)
+        response = await self.client.post(
+            "/submit_grievance",
+            data={"title": f"E2E grievance {i}", "description": "Benchmark", "location": "Bench"},
+            files={"image": ("photo.jpg", self.images[self.rng.randrange(len(self.images))], "image/jpeg")},
+        )
+        response.raise_for_status()
+        tracking_id = response.json()["trackingId"]
+        self.known.append(tracking_id)
+        if self.rng.random() < self.args.trace_rate:
+            accepted = time.perf_counter()
+            self.stages["accept"].append(accepted - started)
+            self.traces.append(asyncio.ensure_future(self.trace_submission(tracking_id, started, accepted)))
+        return tracking_id
+
+    async def get_grievance(self, started):
+        response = await self.client.get(f"/get_grievance/{self.rng.choice(self.known)}")
+        response.raise_for_status()
+
+    async def get_all_grievances(self, started):
+        params = {"limit": self.args.page_size, "exclude": "aiJustification"}
+        if self.known:
+            # A random page of the list, as readers paging through it would ask for
+            params["cursor"] = self.rng.randrange(len(self.known))
+        response = await self.client.get("/get_all_grievances", params=params)
+        response.raise_for_status()
+
+    async def mark_resolved(self, started):
+        if not self.resolvable:
+            raise LookupError("no mined grievance left to resolve")
+        tracking_id = self.resolvable.pop(self.rng.randrange(len(self.resolvable)))
+        response = await self.client.post(f"/mark_resolved/{tracking_id}")
+        response.raise_for_status()
+        if not response.json().get("success"):
+            raise RuntimeError(response.json().get("error"))
+        if self.rng.random() < self.args.trace_rate:
+            self.traces.append(asyncio.ensure_future(self.trace_resolution(tracking_id)))
+
+    async def poll(self, tracking_id, done, deadline):
+        """Poll /get_grievance until ``done(record)``; returns the record, or None at the deadline."""
+        while time.perf_counter() < deadline:
+            response = await self.client.get(f"/get_grievance/{tracking_id}")
+            if response.status_code == 200:
+                record = response.json()["data"]
+                if done(record):
+                    return record
+            await asyncio.sleep(self.args.trace_interval)
+        return None
+
+    async def trace_submission(self, tracking_id, started, accepted):
+        deadline = time.perf_counter() + self.args.settle
+        # A failed classification leaves aiJustification empty: then it is done once the chain step starts
+        record = await self.poll(
+            tracking_id, lambda r: r["aiJustification"] != "[]" or r["blockchainStatus"] != "pending", deadline
+        )
+        if record is None:
+            self.outcomes["traceTimeout"] += 1
+            return
+        classified = time.perf_counter()
+        self.stages["classify"].append(classified - accepted)
+        while record["blockchainStatus"] == "pending" and time.perf_counter() < deadline:
+            response = await self.client.get(f"/grievance_status/{tracking_id}", params={"wait": 30})
+            record = response.json()
+        if record["blockchainStatus"] == "pending":
+            self.outcomes["traceTimeout"] += 1
+            return
+        now = time.perf_counter()
+        self.stages["chain"].append(now - classified)
+        self.stages["total"].append(now - started)
+        self.outcomes["mined" if record["blockchainStatus"] == "success" else "chainFailed"] += 1
+
+    async def trace_resolution(self, tracking_id):
+        started = time.perf_counter()
+        if await self.poll(tracking_id, lambda r: r.get("resolved"), started + self.args.settle):
+            self.stages["resolve"].append(time.perf_counter() - started)
+        else:
+            self.outcomes["traceTimeout"] += 1
+
+    async def run(self, weights, requests, concurrency):
+        routes, route_weights = zip(*weights.items())
+        plan = iter(self.rng.choices(routes, route_weights, k=requests))
+
+        async def client():
+            for route in plan:
+                await self.request(route)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(client() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+        # Traced grievances finish their way through the pipeline before stages are reported
+        await asyncio.gather(*self.traces)
+        return {
+            "elapsedSec": round(elapsed, 2),
+            "routes": {
+                route: dict(
+                    percentiles(self.latencies.get(route, [])),
+                    errors=self.errors.get(route, 0),
+                    reqPerSec=round(len(self.latencies.get(route, [])) / elapsed, 1),
+                )
+                for route in routes
+            },
+            "stages": {stage: percentiles(samples) for stage, samples in self.stages.items() if samples},
+            "pipeline": self.outcomes,
+        }
+
+
+async def seed(client, images, args, rng):
+    """Submit ``args.seed`` grievances and wait for them on-chain; returns (known ids, mined ids)."""
+    run = Run(client, images, [], [], argparse.Namespace(**dict(vars(args), trace_rate=0)), rng)
+    ids = await asyncio.gather(*(
+        run.submit_grievance(time.perf_counter()) for _ in range(args.seed)
+    ), return_exceptions=True)
+    known = [i for i in ids if isinstance(i, str)]
+
+    async def settled(tracking_id):
+        deadline = time.perf_counter() + args.settle
+        while time.perf_counter() < deadline:
+            response = await client.get(f"/grievance_status/{tracking_id}", params={"wait": 30})
+            status = response.json().get("blockchainStatus")
+            if status != "pending":
+                return status == "success"
+        return False
+
+    mined = await asyncio.gather(*(settled(i) for i in known))
+    return known, [i for i, ok in zip(known, mined) if ok]
+
+
+async def benchmark(url, images, args):
+    rng = random.Random(args.random_seed)
+    limits = httpx.Limits(max_connections=args.concurrency * 4 + 20)
+    async with httpx.AsyncClient(base_url=url, limits=limits, timeout=args.settle) as client:
+        known, resolvable = await seed(client, images, args, rng)
+        print(f"seeded {len(known)} grievances, {len(resolvable)} mined")
+        results = {}
+        for name in args.profiles:
+            run = Run(client, images, known, resolvable, args, rng)
+            results[name] = await run.run(PROFILES[name], args.requests, args.concurrency)
+            print_profile(name, results[name])
+        return results
+
+
+def print_profile(name, result):
+    print(f"\n{name} ({result['elapsedSec']} s)")
+    print(f"  {'route':22s} {'req/s':>8s} {'count':>6s} {'errors':>6s} {'p50 ms':>8s} {'p95 ms':>8s} {'p99 ms':>8s}")
+    for route, stats in result["routes"].items():
+        print(f"  {route:22s} {stats['reqPerSec']:8.1f} {stats['count']:6d} {stats['errors']:6d} "
+              f"{stats['p50Ms'] or 0:8.1f} {stats['p95Ms'] or 0:8.1f} {stats['p99Ms'] or 0:8.1f}")
+    for stage, stats in result["stages"].items():
+        print(f"  stage {stage:16s} {'':8s} {stats['count']:6d} {'':6s} "
+              f"{stats['p50Ms']:8.1f} {stats['p95Ms']:8.1f} {stats['p99Ms']:8.1f}")
+    print(f"  pipeline {result['pipeline']}")
+
+
+def compare(baseline, current, tolerance, min_delta_ms, min_samples):
+    """
+    Regressions of ``current`` against ``baseline`` (both results documents).
+
+    Percentiles are only compared when both runs have ``min_samples``
+    samples of them; below that the tail is noise.
+
+    Returns:
+        list: (profile, name, metric, baseline value, current value) per regression
+    """
+    regressions = []
+    for profile, result in current["profiles"].items():
+        before = baseline.get("profiles", {}).get(profile)
+        if not before:
+            continue
+        for section in ("routes", "stages"):
+            for name, stats in result[section].items():
+                old = before[section].get(name)
+                if not old or min(old["count"], stats["count"]) < min_samples:
+                    continue
+                for metric in ("p95Ms", "p99Ms"):
+                    if old[metric] is None or stats[metric] is None:
+                        continue
+                    if stats[metric] > old[metric] * (1 + tolerance) and stats[metric] - old[metric] >= min_delta_ms:
+                        regressions.append((profile, name, metric, old[metric], stats[metric]))
+                if section == "routes" and stats["reqPerSec"] < old["reqPerSec"] * (1 - tolerance):
+                    regressions.append((profile, name, "reqPerSec", old["reqPerSec"], stats["reqPerSec"]))
+    return regressions
+
+
+def git_revision():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--server", choices=sorted(SERVERS), default="flask")
+    parser.add_argument("--profiles", nargs="+", choices=sorted(PROFILES), default=["submit", "read", "mixed"])
+    parser.add_argument("--requests", type=int, default=500, help="requests per profile")
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=50, help="grievances submitted and mined before the profiles")
+    parser.add_argument("--trace-rate", type=float, default=0.2, help="share of submissions traced through the pipeline")
+    parser.add_argument("--trace-interval", type=float, default=0.05, help="seconds between trace polls")
+    parser.add_argument("--settle", type=float, default=120, help="max seconds a traced grievance may take")
+    parser.add_argument("--page-size", type=int, default=100)
+    parser.add_argument("--inference-latency", type=float, default=0.15)
+    parser.add_argument("--inference-fail-rate", type=float, default=0.0)
+    parser.add_argument("--chain", choices=("auto",) + BACKENDS, default="auto")
+    parser.add_argument("--port", type=int, default=8200)
+    parser.add_argument("--chain-port", type=int, default=8545)
+    parser.add_argument("--inference-port", type=int, default=8765)
+    parser.add_argument("--random-seed", type=int, default=1)
+    parser.add_argument("--output", help="write the results JSON here")
+    parser.add_argument("--baseline", help="results JSON of an earlier run to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed relative change before a regression")
+    parser.add_argument("--min-delta-ms", type=float, default=5.0)
+    parser.add_argument("--min-samples", type=int, default=20, help="fewer samples than this are not compared")
+    args = parser.parse_args()
+
+    chain = start_chain(args.chain_port, args.chain)
+    inference = serve(args.inference_port, latency=args.inference_latency, fail_rate=args.inference_fail_rate)
+    images = photos(64)
+    try:
+        with tempfile.TemporaryDirectory() as workdir:
+            process, url = start_server(
+                args.server, args.port, f"http://127.0.0.1:{args.inference_port}/", workdir,
+                AVAX_RPC_URL=chain.url,
+                PRIVATE_KEY=chain.private_key,
+                GRIEVANCE_CONTRACT_ADDRESS=chain.contract_address,
+                GRIEVANCE_STORE_BACKEND="sqlite",
+                GRIEVANCE_DB_PATH=os.path.join(workdir, "grievances.db"),
+                STATUS_MAX_WAIT="30",
+            )
+            try:
+                profiles = asyncio.run(benchmark(url, images, args))
+            finally:
+                process.terminate()
+                try:
+                    process.wait(10)
+                except subprocess.TimeoutExpired:
+                    process.kill()
+    finally:
+        inference.shutdown()
+        inference.server_close()
+        chain.stop()
+
+    results = {
+        "meta": {
+            "server": args.server,
+            "chain": chain.backend,
+            "revision": git_revision(),
+            "startedAt": int(time.time()),
+            "python": platform.python_version(),
+            "cpus": os.cpu_count(),
+            "settings": {k: v for k, v in vars(args).items() if k not in ("output", "baseline")},
+        },
+        "profiles": profiles,
+    }
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        for key in ("server", "chain", "cpus"):
+            if baseline["meta"].get(key) != results["meta"][key]:
+                print(f"[WARN] Baseline ran with {key}={baseline['meta'].get(key)}, this run with {results['meta'][key]}")
+        regressions = compare(baseline, results, args.tolerance, args.min_delta_ms, args.min_samples)
+        print(f"\nagainst {args.baseline}: {len(regressions)} regression(s)")
+        for profile, name, metric, before, after in regressions:
+            print(f"  [WARN] {profile} {name} {metric}: {before} -> {after}")
+        sys.exit(1 if regressions else 0)
+
+
+if __name__ == "__main__":
+    main()
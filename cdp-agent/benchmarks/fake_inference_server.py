@@ -0,0 +1,120 @@
+"""
+Local stand-in for the Hugging Face zero-shot image classification API.
+
+Answers POSTs shaped like the real endpoint ({"image", "parameters":
+{"candidate_labels"}}) with deterministic scores derived from the image
+hash, after ``--latency`` seconds. Outages can be simulated with
+``--fail-rate`` (answer ``--fail-status``), ``--down-after`` /
+``--down-for`` (a window of 503s), or ``--hang`` (never answer, to
+exercise read timeouts). Point the app at it with
+CLIP_API_URL=http://127.0.0.1:8765/.
+
+    python benchmarks/fake_inference_server.py --port 8765 --latency 0.15
+"""
+import argparse
+import base64
+import hashlib
+import json
+import random
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class FakeInferenceHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    config = None
+    started = time.time()
+    requests_served = 0
+    _lock = threading.Lock()
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, status, body):
+        payload = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        try:
+            self.wfile.write(payload)
+        except (BrokenPipeError, ConnectionResetError):
+            # The client gave up (read timeout) or was shut down meanwhile
+            pass
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        with self._lock:
+            type(self).requests_served += 1
+        config = self.config
+        if config.hang:
+            time.sleep(3600)
+        elapsed = time.time() - self.started
+        if config.down_after is not None and config.down_after <= elapsed < config.down_after + config.down_for:
+            return self._send(503, {"error": "Model is currently loading", "estimated_time": 20.0})
+        if random.random() < config.fail_rate:
+            return self._send(config.fail_status, {"error": "Simulated failure"})
+        time.sleep(config.latency)
+
+        request = json.loads(body)
+        images = request["image"] if isinstance(request["image"], list) else [request["image"]]
+        labels = request["parameters"]["candidate_labels"]
+        results = [self._scores(base64.b64decode(image), labels) for image in images]
+        self._send(200, results if isinstance(request["image"], list) else results[0])
+
+    @staticmethod
+    def _scores(image, labels):
+        seed = hashlib.sha256(image).digest()
+        raw = [seed[i % len(seed)] + 1 for i in range(len(labels))]
+        total = sum(raw)
+        return sorted(
+            ({"label": label, "score": r / total} for label, r in zip(labels, raw)),
+            key=lambda r: r["score"], reverse=True,
+        )
+
+
+class FakeInferenceServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def handle_error(self, request, client_address):
+        # The app under test dropping keep-alive connections on exit is not an error
+        if not isinstance(sys.exc_info()[1], ConnectionError):
+            super().handle_error(request, client_address)
+
+
+def serve(port=8765, latency=0.15, fail_rate=0.0, fail_status=503, down_after=None, down_for=0.0, hang=False):
+    """Start the fake server on a background thread; returns the ThreadingHTTPServer."""
+    config = argparse.Namespace(
+        latency=latency, fail_rate=fail_rate, fail_status=fail_status,
+        down_after=down_after, down_for=down_for, hang=hang,
+    )
+    handler = type("Handler", (FakeInferenceHandler,), {"config": config, "started": time.time()})
+    server = FakeInferenceServer(("127.0.0.1", port), handler)
+    threading.Thread(target=server.serve_forever, name="fake-inference", daemon=True).start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.15)
+    parser.add_argument("--fail-rate", type=float, default=0.0)
+    parser.add_argument("--fail-status", type=int, default=503)
+    parser.add_argument("--down-after", type=float, default=None)
+    parser.add_argument("--down-for", type=float, default=0.0)
+    parser.add_argument("--hang", action="store_true")
+    args = parser.parse_args()
+
+    server = serve(args.port, args.latency, args.fail_rate, args.fail_status, args.down_after, args.down_for, args.hang)
+    print(f"Fake inference server on http://127.0.0.1:{args.port}/")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
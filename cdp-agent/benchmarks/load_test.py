@@ -0,0 +1,203 @@
+"""
+Load test of the Flask app (app.py) against the ASGI app (asgi_app.py).
+
+Each server is started in its own process against the fake inference
+server, with an unreachable RPC so nothing leaves the machine. Two
+phases per server:
+
+- submit: ``--concurrency`` clients POST ``--requests`` grievance photos
+  to /submit_grievance; reports requests/sec and p50/p99 latency.
+- hold: ``--hold`` concurrent /grievance_status?wait= long-polls are kept
+  open on grievances still waiting for inference (the fake server answers
+  after ``--hold-seconds`` + 60 s); reports how many were held at once and
+  the server's RSS growth per in-flight request.
+
+Flask runs on Werkzeug's threaded server (one thread per request), the
+ASGI app on uvicorn (one process, one event loop).
+
+    python benchmarks/load_test.py --servers flask asgi --requests 2000 --concurrency 200 --hold 1000
+"""
+import argparse
+import asyncio
+import io
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+import httpx
+from PIL import Image
+
+sys.path.insert(0, os.path.dirname(__file__))
+
+from fake_inference_server import serve  # noqa: E402
+
+SRC = os.path.join(os.path.dirname(__file__), "..", "src")
+SERVERS = {
+    "flask": lambda port: [sys.executable, "-c", f"from app import app; app.run(port={port}, threaded=True)"],
+    "asgi": lambda port: [sys.executable, "-m", "uvicorn", "asgi_app:app", "--port", str(port),
+                          "--log-level", "warning", "--backlog", "4096"],
+}
+
+
+def rss_kb(pid):
+    with open(f"/proc/{pid}/status") as f:
+        for line in f:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1])
+    return 0
+
+
+def photos(count):
+    """Distinct small JPEGs, so classification-cache hits do not skew the run."""
+    images = []
+    for i in range(count):
+        buf = io.BytesIO()
+        Image.new("RGB", (640, 480), (i % 256, (i // 256) % 256, 90)).save(buf, "JPEG", quality=85)
+        images.append(buf.getvalue())
+    return images
+
+
+def start_server(name, port, inference_url, workdir, **settings):
+    """
+    Start the ``name`` server against the fake inference server.
+
+    Chain and store settings default to an unreachable RPC and the memory
+    store; ``settings`` overrides any environment variable.
+    """
+    env = dict(
+        os.environ,
+        HUGGINGFACE_API_KEY=os.getenv("HUGGINGFACE_API_KEY", "load-test"),
+        PRIVATE_KEY=os.getenv("PRIVATE_KEY", "0x" + "11" * 32),
+        GRIEVANCE_CONTRACT_ADDRESS=os.getenv("GRIEVANCE_CONTRACT_ADDRESS", "0x" + "22" * 20),
+        AVAX_RPC_URL="http://127.0.0.1:9",
+        CLIP_API_URL=inference_url,
+        GRIEVANCE_STORE_BACKEND="memory",
+        INDEX_CHAIN_EVENTS="0",
+        RECLASSIFY_DIR=os.path.join(workdir, "reclassify"),
+        JOB_SPOOL_DIR=os.path.join(workdir, "job_spool"),
+        CLASSIFICATION_CACHE_PATH="",
+        STATUS_MAX_WAIT="3600",
+        SHUTDOWN_GRACE="0",
+    )
+    env.update(settings)
+    process = subprocess.Popen(SERVERS[name](port), cwd=SRC, env=env,
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    url = f"http://127.0.0.1:{port}"
+    deadline = time.time() + 60
+    while time.time() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"{name} server exited with {process.returncode}")
+        try:
+            httpx.get(f"{url}/grievance_status/none", timeout=1)
+            return process, url
+        except httpx.TransportError:
+            time.sleep(0.2)
+    process.kill()
+    raise RuntimeError(f"{name} server did not start")
+
+
+async def submit_phase(client, images, requests, concurrency):
+    latencies, errors, tracking_ids = [], 0, []
+    queue = iter(range(requests))
+
+    async def worker():
+        nonlocal errors
+        for i in queue:
+            started = time.perf_counter()
+            try:
+                response = await client.post(
+                    "/submit_grievance",
+                    data={"title": f"Load test {i}", "location": "Bench"},
+                    files={"image": ("photo.jpg", images[i % len(images)], "image/jpeg")},
+                )
+                response.raise_for_status()
+                tracking_ids.append(response.json()["trackingId"])
+            except Exception:
+                errors += 1
+                continue
+            latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    latencies.sort()
+    return {
+        "requests": requests,
+        "errors": errors,
+        "reqPerSec": round(len(latencies) / elapsed, 1),
+        "p50Ms": round(statistics.median(latencies) * 1000, 1) if latencies else None,
+        "p99Ms": round(latencies[int(0.99 * (len(latencies) - 1))] * 1000, 1) if latencies else None,
+    }, tracking_ids
+
+
+async def hold_phase(client, pid, tracking_ids, hold, seconds):
+    baseline = rss_kb(pid)
+    peak = baseline
+    outcomes = {"held": 0, "early": 0, "errors": 0}
+
+    async def poll(tracking_id):
+        started = time.perf_counter()
+        try:
+            response = await client.get(f"/grievance_status/{tracking_id}", params={"wait": seconds})
+            response.raise_for_status()
+        except Exception:
+            outcomes["errors"] += 1
+            return
+        # Answered only when the wait expired: the server kept it open alongside the others
+        outcomes["held" if time.perf_counter() - started >= seconds * 0.9 else "early"] += 1
+
+    tasks = [asyncio.ensure_future(poll(tracking_ids[i % len(tracking_ids)])) for i in range(hold)]
+    while not all(t.done() for t in tasks):
+        peak = max(peak, rss_kb(pid))
+        await asyncio.sleep(0.1)
+    grown = peak - baseline
+    return dict(outcomes, hold=hold, rssBaselineMb=round(baseline / 1024, 1), rssPeakMb=round(peak / 1024, 1),
+                kbPerInFlight=round(grown / max(1, outcomes["held"]), 1))
+
+
+async def run(name, port, args, images, inference_url, workdir):
+    process, url = start_server(name, port, inference_url, workdir)
+    try:
+        limits = httpx.Limits(max_connections=max(args.concurrency, args.hold) + 10)
+        async with httpx.AsyncClient(base_url=url, limits=limits, timeout=args.hold_seconds + 60) as client:
+            submit, tracking_ids = await submit_phase(client, images, args.requests, args.concurrency)
+            print(f"{name:6s} submit  {submit}")
+            if not tracking_ids:
+                return
+            hold = await hold_phase(client, process.pid, tracking_ids, args.hold, args.hold_seconds)
+            print(f"{name:6s} hold    {hold}")
+    finally:
+        process.terminate()
+        try:
+            process.wait(10)
+        except subprocess.TimeoutExpired:
+            process.kill()
+
+
+def main():
+    import tempfile
+
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--servers", nargs="+", choices=sorted(SERVERS), default=["flask", "asgi"])
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=200)
+    parser.add_argument("--hold", type=int, default=1000)
+    parser.add_argument("--hold-seconds", type=float, default=10)
+    parser.add_argument("--port", type=int, default=8100)
+    parser.add_argument("--inference-port", type=int, default=8765)
+    args = parser.parse_args()
+
+    # Inference outlasts the submit and hold phases, so grievances stay pending throughout
+    inference = serve(args.inference_port, latency=args.hold_seconds + 60)
+    inference_url = f"http://127.0.0.1:{args.inference_port}/"
+    images = photos(256)
+    with tempfile.TemporaryDirectory() as workdir:
+        for i, name in enumerate(args.servers):
+            asyncio.run(run(name, args.port + i, args, images, inference_url, workdir))
+    inference.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,233 @@
+"""
+Local dev chain with GrievanceRegistry deployed, for the benchmarks.
+
+Uses anvil when it is on PATH, else ``npx hardhat node`` when the repo's
+node_modules are installed, else an in-process py-evm chain (eth-tester)
+behind a small JSON-RPC server. The py-evm chain mines every transaction
+as it arrives; so that concurrent senders see a real node's behaviour, a
+transaction whose nonce is ahead of the account's waits in a mempool
+until the gap is filled, and a stale nonce is refused with "nonce too
+low". The contract is deployed from the hardhat artifact with the
+well-known dev account of anvil/hardhat, which is funded first if needed.
+
+    python benchmarks/local_chain.py --port 8545
+"""
+import argparse
+import json
+import os
+import shutil
+import subprocess
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..")
+ARTIFACT = os.path.join(ROOT, "artifacts", "contracts", "GrievanceRegistry.sol", "GrievanceRegistry.json")
+# Account #0 of anvil and hardhat node (publicly known, dev chains only)
+DEV_PRIVATE_KEY = "0xac0974bec39a17e36ba4a6b4d238ff944bacb478cbed5efcae784d7bf4f2ff80"
+BACKENDS = ("anvil", "hardhat", "eth-tester")
+
+
+class EthTesterNode:
+    """JSON-RPC requests answered by an eth-tester chain, with a mempool for nonce gaps."""
+
+    def __init__(self):
+        from web3 import EthereumTesterProvider, Web3
+
+        self.web3 = Web3(EthereumTesterProvider())
+        self._lock = threading.Lock()
+        self._queued = {}  # (sender, nonce) -> raw transaction
+
+    def handle(self, request):
+        response = {"jsonrpc": "2.0", "id": request.get("id")}
+        try:
+            with self._lock:
+                if request["method"] == "eth_sendRawTransaction":
+                    result = self._send_raw(request["params"][0])
+                else:
+                    result = self.web3.manager.request_blocking(request["method"], request.get("params", []))
+            response["result"] = json.loads(self.web3.to_json(result))
+        except Exception as e:
+            response["error"] = {"code": -32000, "message": str(e)}
+        return response
+
+    def _send_raw(self, raw):
+        import rlp
+        from eth_account import Account
+        from web3 import Web3
+
+        raw = Web3.to_bytes(hexstr=raw)
+        sender = Account.recover_transaction(raw)
+        # Legacy transactions are an RLP list; typed ones are type byte + list with chainId first
+        fields = rlp.decode(raw) if raw[0] >= 0xC0 else rlp.decode(raw[1:])[1:]
+        nonce = int.from_bytes(fields[0], "big")
+        expected = self.web3.eth.get_transaction_count(sender)
+        if nonce < expected:
+            raise ValueError("nonce too low")
+        if nonce > expected:
+            self._queued[(sender, nonce)] = raw
+            return Web3.keccak(raw)
+        tx_hash = self.web3.eth.send_raw_transaction(raw)
+        # Anything that was waiting on this nonce can go in now
+        while (sender, nonce + 1) in self._queued:
+            nonce += 1
+            self.web3.eth.send_raw_transaction(self._queued.pop((sender, nonce)))
+        return tx_hash
+
+
+class _RPCHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    node = None
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+        if isinstance(body, list):
+            response = [self.node.handle(request) for request in body]
+        else:
+            response = self.node.handle(body)
+        payload = json.dumps(response).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        try:
+            self.wfile.write(payload)
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+
+class _RPCServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def handle_error(self, request, client_address):
+        # Clients (the app under test) dropping keep-alive connections on exit are not errors
+        if not isinstance(sys.exc_info()[1], ConnectionError):
+            super().handle_error(request, client_address)
+
+
+class LocalChain:
+    """A running dev chain: ``url``, ``contract_address``, ``private_key``; ``stop()`` shuts it down."""
+
+    def __init__(self, backend, url, process=None, server=None):
+        self.backend = backend
+        self.url = url
+        self.private_key = DEV_PRIVATE_KEY
+        self.contract_address = None
+        self._process = process
+        self._server = server
+
+    def stop(self):
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
+        if self._process and self._process.poll() is None:
+            self._process.terminate()
+            try:
+                self._process.wait(10)
+            except subprocess.TimeoutExpired:
+                self._process.kill()
+
+
+def pick_backend():
+    if shutil.which("anvil"):
+        return "anvil"
+    if os.path.exists(os.path.join(ROOT, "node_modules", ".bin", "hardhat")):
+        return "hardhat"
+    return "eth-tester"
+
+
+def start_chain(port=8545, backend="auto", artifact=ARTIFACT):
+    """
+    Start a dev chain on ``port`` and deploy GrievanceRegistry to it.
+
+    Returns:
+        LocalChain: with ``contract_address`` set
+    """
+    backend = pick_backend() if backend == "auto" else backend
+    url = f"http://127.0.0.1:{port}"
+    if backend == "eth-tester":
+        handler = type("Handler", (_RPCHandler,), {"node": EthTesterNode()})
+        server = _RPCServer(("127.0.0.1", port), handler)
+        threading.Thread(target=server.serve_forever, name="local-chain", daemon=True).start()
+        chain = LocalChain(backend, url, server=server)
+    else:
+        command = ["anvil", "--port", str(port), "--silent"] if backend == "anvil" else \
+            ["npx", "hardhat", "node", "--port", str(port)]
+        process = subprocess.Popen(command, cwd=ROOT, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        chain = LocalChain(backend, url, process=process)
+    try:
+        _wait_for_rpc(url, chain._process)
+        chain.contract_address = deploy(url, artifact, chain.private_key)
+    except Exception:
+        chain.stop()
+        raise
+    return chain
+
+
+def _wait_for_rpc(url, process, timeout=60):
+    from web3 import Web3
+
+    web3 = Web3(Web3.HTTPProvider(url, request_kwargs={"timeout": 2}))
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if process and process.poll() is not None:
+            raise RuntimeError(f"Dev chain exited with {process.returncode}")
+        try:
+            web3.eth.block_number
+            return
+        except Exception:
+            time.sleep(0.2)
+    raise RuntimeError(f"Dev chain at {url} did not start")
+
+
+def deploy(url, artifact, private_key):
+    """Deploy the hardhat ``artifact`` from ``private_key``'s account; returns the contract address."""
+    from eth_account import Account
+    from web3 import Web3
+
+    web3 = Web3(Web3.HTTPProvider(url))
+    account = Account.from_key(private_key)
+    if web3.eth.get_balance(account.address) == 0:
+        # eth-tester funds its own unlocked accounts, not the dev key
+        funder = web3.eth.accounts[0]
+        web3.eth.wait_for_transaction_receipt(
+            web3.eth.send_transaction({"from": funder, "to": account.address, "value": 10**23})
+        )
+    with open(artifact) as f:
+        compiled = json.load(f)
+    tx = web3.eth.contract(abi=compiled["abi"], bytecode=compiled["bytecode"]).constructor().build_transaction({
+        "from": account.address,
+        "nonce": web3.eth.get_transaction_count(account.address),
+        "chainId": web3.eth.chain_id,
+    })
+    tx_hash = web3.eth.send_raw_transaction(account.sign_transaction(tx).raw_transaction)
+    receipt = web3.eth.wait_for_transaction_receipt(tx_hash)
+    if receipt["status"] != 1:
+        raise RuntimeError("GrievanceRegistry deployment reverted")
+    return receipt["contractAddress"]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--port", type=int, default=8545)
+    parser.add_argument("--backend", choices=("auto",) + BACKENDS, default="auto")
+    parser.add_argument("--artifact", default=ARTIFACT)
+    args = parser.parse_args()
+
+    chain = start_chain(args.port, args.backend, args.artifact)
+    print(f"{chain.backend} chain on {chain.url}")
+    print(f"GRIEVANCE_CONTRACT_ADDRESS={chain.contract_address}")
+    print(f"PRIVATE_KEY={chain.private_key}")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        chain.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+"""
+Cold-start profile of the Vercel entry point (app.py).
+
+Imports app.py in fresh interpreters, the way a serverless cold start
+does, with placeholder settings and an unreachable RPC so nothing is
+contacted. Reports the median import time over ``--runs`` processes and,
+from one ``python -X importtime`` run, the import time per top-level
+package.
+
+Doubles as the cold-start regression check: it exits with status 1 if the
+median import time is over ``--budget`` seconds, or if a module that
+should only load on first use (web3, the agent stack, torch) is imported
+at startup.
+
+    python benchmarks/startup_profile.py
+    python benchmarks/startup_profile.py --budget 0.5 --runs 10
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+from collections import defaultdict
+
+SRC = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src")
+# Built lazily by app.py; importing any of them at startup is a regression
+DEFERRED_MODULES = (
+    "web3",
+    "eth_account",
+    "coinbase_agentkit",
+    "langchain_core",
+    "langchain_openai",
+    "langgraph",
+    "torch",
+    "transformers",
+)
+TIMED_IMPORT = (
+    "import sys, time; started = time.perf_counter(); import app; "
+    "print(time.perf_counter() - started); print(','.join(m for m in {modules!r} if m in sys.modules))"
+)
+
+
+def app_env(workdir):
+    env = dict(os.environ)
+    env.setdefault("HUGGINGFACE_API_KEY", "startup-profile")
+    env.setdefault("PRIVATE_KEY", "0x" + "11" * 32)
+    env.setdefault("GRIEVANCE_CONTRACT_ADDRESS", "0x" + "22" * 20)
+    env.setdefault("AVAX_RPC_URL", "http://127.0.0.1:9")
+    # Nothing written next to the sources
+    env.update(
+        GRIEVANCE_STORE_BACKEND="memory",
+        RECLASSIFY_DIR=os.path.join(workdir, "reclassify"),
+        JOB_SPOOL_DIR=os.path.join(workdir, "job_spool"),
+        CLASSIFICATION_CACHE_PATH="",
+    )
+    return env
+
+
+def timed_import(env):
+    """Seconds ``import app`` took in a new interpreter, and the deferred modules it loaded."""
+    output = subprocess.run(
+        [sys.executable, "-c", TIMED_IMPORT.format(modules=DEFERRED_MODULES)],
+        cwd=SRC, env=env, capture_output=True, text=True, check=True,
+    ).stdout.splitlines()
+    return float(output[0]), [m for m in output[1].split(",") if m]
+
+
+def import_times(env):
+    """
+    Self import time per top-level package, from ``python -X importtime``.
+
+    Returns:
+        dict: package name -> (self seconds, number of modules)
+    """
+    stderr = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import app"],
+        cwd=SRC, env=env, capture_output=True, text=True, check=True,
+    ).stderr
+    packages = defaultdict(lambda: [0, 0])
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, _, name = line[len("import time:"):].split("|")
+        package = packages[name.strip().split(".")[0]]
+        package[0] += int(self_us) / 1e6
+        package[1] += 1
+    return {name: tuple(value) for name, value in packages.items()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--budget", type=float, default=1.0, help="max median cold import time in seconds")
+    parser.add_argument("--top", type=int, default=20, help="packages to list")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        env = app_env(workdir)
+        runs = [timed_import(env) for _ in range(args.runs)]
+        packages = import_times(env)
+
+    median = statistics.median(seconds for seconds, _ in runs)
+    deferred = sorted({m for _, loaded in runs for m in loaded})
+    print(f"{'package':32s} {'self ms':>9s} {'modules':>8s}")
+    for name, (seconds, count) in sorted(packages.items(), key=lambda item: -item[1][0])[:args.top]:
+        print(f"{name:32s} {seconds * 1000:9.1f} {count:8d}")
+    print(f"\ncold import of app.py: median {median:.3f} s over {args.runs} runs (budget {args.budget:.3f} s)")
+
+    failed = False
+    if median > args.budget:
+        print(f"[ERROR] Cold import is over budget by {median - args.budget:.3f} s")
+        failed = True
+    if deferred:
+        print(f"[ERROR] Imported at startup, should load on first use: {', '.join(deferred)}")
+        failed = True
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
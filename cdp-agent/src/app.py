@@ -1,40 +1,68 @@
+import atexit
+import functools
+import logging
 import os
+import queue
+import shutil
 import uuid
 import time
-from flask import Flask, request, render_template, jsonify, send_from_directory
-import base64
-import requests
+from concurrent.futures import Future
+from flask import Flask, Response, g, request, render_template, jsonify, send_from_directory, stream_with_context
+from itertools import islice
 import json
-from web3 import Web3
-
-from coinbase_agentkit import (
-    AgentKit,
-    AgentKitConfig,
-    EthAccountWalletProvider,
-    EthAccountWalletProviderConfig,
-    erc20_action_provider,
-    pyth_action_provider,
-    wallet_action_provider,
-    weth_action_provider,
-)
+
 from dotenv import load_dotenv
-from eth_account import Account
-from langchain_core.messages import HumanMessage
-from langchain_openai import ChatOpenAI
-from langgraph.checkpoint.memory import MemorySaver
-from langgraph.prebuilt import create_react_agent
 from flask_cors import CORS
 
+from batching import MicroBatcher
+from bulk_import import ImageSource, ImportJobs, save_upload
+from chain_batcher import SubmissionBatcher
+from classifier import ClassifierError, open_classifier
+from classification_cache import ClassificationCache, classification_key
+from grievance_service import GrievanceService, status_body
+from grievance_store import open_grievance_store
+from grievances import (
+    CLASSIFIER_UNAVAILABLE,
+    GRIEVANCE_CATEGORIES,
+    batch_results,
+    categorize,
+    grievance_args,
+    parse_grievance_query,
+    project,
+    unclassified,
+)
+from image_ingest import DEFAULT_MAX_UPLOAD_BYTES
+from fee_oracle import FeeOracle, GasEstimateCache
+from idempotency import IdempotencyTable
+from jobs import JobQueue, JobSpool
+from lazy import Lazy
+from logs import configure_logging
+from metrics import CONTENT_TYPE, HTTP_SECONDS, STAGE_SECONDS, instrument_web3, render
+from reclassify_queue import ReclassifyQueue
+from signer import SignerClient, TransactionSender, signer_authkey
+from tx_scheduler import DEFAULT_FEE_MULTIPLIERS, TransactionScheduler, parse_multipliers
+
 # Load environment variables
 load_dotenv()
 
-# Load ABI from JSON file
+# Leveled JSON logs written from a background thread (LOG_LEVEL, LOG_SAMPLE_RATE, LOG_FORMAT)
+configure_logging()
+log = logging.getLogger(__name__)
+
+# Load ABI from JSON file (on first use, with the rest of the chain objects below)
 ABI_PATH = os.path.join(os.path.dirname(__file__), 'abi', 'GrievanceRegistry.json')
-with open(ABI_PATH, 'r') as f:
-    _abi_json = json.load(f)
-    GRIEVANCE_CONTRACT_ABI = _abi_json
+
+@functools.cache
+def contract_abi():
+    with open(ABI_PATH, 'r') as f:
+        return json.load(f)
+
+# Largest accepted image upload; bigger request bodies are refused before they are read
+MAX_UPLOAD_BYTES = int(os.getenv("MAX_UPLOAD_BYTES", str(DEFAULT_MAX_UPLOAD_BYTES)))
 
 app = Flask(__name__)
+# Leave room for the form fields next to the image
+app.config["MAX_CONTENT_LENGTH"] = MAX_UPLOAD_BYTES + 64 * 1024
 CORS(app)
 
 # Initialize global agent and wallet provider
@@ -58,254 +86,544 @@ assert GRIEVANCE_CONTRACT_ADDRESS, "You must set the GRIEVANCE_CONTRACT_ADDRESS
 # Set up AVAX RPC URL
 AVAX_RPC_URL = os.getenv("AVAX_RPC_URL")
 assert AVAX_RPC_URL, "You must set the AVAX_RPC_URL environment variable"
-web3 = Web3(Web3.HTTPProvider(AVAX_RPC_URL))
 
-# In-memory storage for grievances
-GRIEVANCE_STORE = []
+# web3 and everything built on it is created on first use (see lazy.py): importing
+# web3 alone takes over a second, and most requests never touch the chain
+def _web3():
+    from web3 import Web3
+    return instrument_web3(Web3(Web3.HTTPProvider(AVAX_RPC_URL)))
+
+def _contracts():
+    from contract_registry import ContractRegistry
+    return ContractRegistry(web3, GRIEVANCE_CONTRACT_ADDRESS, contract_abi(), PRIVATE_KEY)
+
+def _nonces():
+    from nonce_manager import NonceManager
+    nonces = NonceManager(web3, CONTRACTS.account.address)
+    nonces.on_replace = RECEIPTS.replace
+    return nonces
+
+def _receipts():
+    from receipt_tracker import ReceiptTracker
+    return ReceiptTracker(web3, poll_interval=float(os.getenv("RECEIPT_POLL_INTERVAL", "1")))
+
+def _submit_events():
+    from event_indexer import EventDecoder
+    return EventDecoder(contract_abi())
+
+def _sender():
+    if SIGNER_SOCKET:
+        return SignerClient(SIGNER_SOCKET, signer_authkey(PRIVATE_KEY))
+    return TransactionSender(CONTRACTS.account, NONCES, GAS_ESTIMATES, RECEIPTS)
+
+web3 = Lazy(_web3)
+
+# Signer, checksummed address, selectors and argument encoders, built once
+CONTRACTS = Lazy(_contracts)
+
+# Nonces for the PRIVATE_KEY account are handed out locally so concurrent sends never collide
+NONCES = Lazy(_nonces)
+# Fee fields refreshed once per block; gas estimates reused per function and calldata size
+FEES = FeeOracle(web3, ttl=float(os.getenv("FEE_CACHE_TTL", "3")))
+GAS_ESTIMATES = GasEstimateCache(web3)
+# Decodes GrievanceSubmitted logs in batch receipts
+SUBMIT_EVENTS = Lazy(_submit_events)
+# Fee multiplier per grievance priority tier, e.g. "high=1.5,medium=1.2,low=1" (tip for type-2 chains,
+# gas price otherwise); SUBMIT_FEE_MULTIPLIER still sets the medium tier
+SUBMIT_FEE_MULTIPLIER = float(os.getenv("SUBMIT_FEE_MULTIPLIER", "1.2"))
+TX_FEE_MULTIPLIERS = parse_multipliers(
+    os.getenv("TX_FEE_MULTIPLIERS", ""), dict(DEFAULT_FEE_MULTIPLIERS, medium=SUBMIT_FEE_MULTIPLIER)
+)
+
+# One block-driven tracker resolves receipts for every in-flight transaction
+RECEIPTS = Lazy(_receipts)
+
+# With several worker processes, set SIGNER_SOCKET: nonces, signing and sending then
+# happen in the one signer process (signer.py) instead of here
+SIGNER_SOCKET = os.getenv("SIGNER_SOCKET")
+SENDER = Lazy(_sender)
+
+# Grievance storage, indexed by trackingId (SQLite-backed unless GRIEVANCE_STORE_BACKEND=memory)
+GRIEVANCE_STORE = open_grievance_store()
+if hasattr(GRIEVANCE_STORE, "close"):
+    # Flushes the SQLite write buffer on shutdown (gunicorn workers exit through sys.exit, so this runs there too)
+    atexit.register(GRIEVANCE_STORE.close)
+
+# Repeated /submit_grievance requests -> the trackingId they first created; kept in the shared
+# SQLite file when several workers share the store, so a retry may land on any of them
+IDEMPOTENCY = IdempotencyTable(
+    max_entries=int(os.getenv("IDEMPOTENCY_MAX_ENTRIES", "100000")),
+    path=os.getenv("IDEMPOTENCY_DB_PATH") or (GRIEVANCE_STORE.path if getattr(GRIEVANCE_STORE, "shared", False) else None),
+)
+# Seconds an Idempotency-Key keeps answering with its first grievance
+IDEMPOTENCY_TTL = float(os.getenv("IDEMPOTENCY_TTL", str(24 * 3600)))
+# Seconds within which the same photo, title and location count as a retry (0 turns content dedup off)
+SUBMIT_DEDUP_WINDOW = float(os.getenv("SUBMIT_DEDUP_WINDOW", "0"))
+
+# Bulk imports (/bulk_import): the upload is saved under BULK_IMPORT_DIR until its manifest has been read
+BULK_IMPORT_DIR = os.getenv("BULK_IMPORT_DIR", "bulk_imports")
+BULK_IMPORT_MAX_ITEMS = int(os.getenv("BULK_IMPORT_MAX_ITEMS", "10000"))
+BULK_IMPORT_MAX_BYTES = int(os.getenv("BULK_IMPORT_MAX_BYTES", str(2 * 1024 ** 3)))
+# Imports read at once (a thread each), and imported images being classified at once across all imports
+BULK_IMPORT_WORKERS = int(os.getenv("BULK_IMPORT_WORKERS", "2"))
+BULK_IMPORT_CONCURRENCY = int(os.getenv("BULK_IMPORT_CONCURRENCY", "8"))
+# Per-item import progress; in the shared SQLite file when several workers share the store
+IMPORT_JOBS = ImportJobs(
+    path=os.getenv("IMPORT_JOBS_DB_PATH")
+    or (GRIEVANCE_STORE.path if getattr(GRIEVANCE_STORE, "shared", False) else ":memory:"),
+)
+
+# Intake, dedup, bulk import and result bookkeeping, shared with asgi_app.py
+SERVICE = GrievanceService(
+    GRIEVANCE_STORE,
+    IDEMPOTENCY,
+    IMPORT_JOBS,
+    max_upload_bytes=MAX_UPLOAD_BYTES,
+    key_ttl=IDEMPOTENCY_TTL,
+    dedup_window=SUBMIT_DEDUP_WINDOW,
+    max_import_items=BULK_IMPORT_MAX_ITEMS,
+)
+
+# Number of background workers doing classification + on-chain submission
+CHAIN_WORKERS = int(os.getenv("CHAIN_WORKERS", "4"))
+# submitGrievances batching: max grievances per tx, max seconds a grievance waits
+BATCH_SUBMIT_SIZE = int(os.getenv("BATCH_SUBMIT_SIZE", "20"))
+BATCH_SUBMIT_WAIT = float(os.getenv("BATCH_SUBMIT_WAIT", "2"))
+# Submission txs sent and not yet mined; meanwhile queued grievances are reordered by priorityLevel,
+# a waiting one overtaking the tier above after TX_PRIORITY_AGING seconds
+TX_MAX_IN_FLIGHT = int(os.getenv("TX_MAX_IN_FLIGHT", os.getenv("BATCH_SUBMIT_WORKERS", "2")))
+TX_PRIORITY_AGING = float(os.getenv("TX_PRIORITY_AGING", "60"))
+# mark_resolved has its own lane (cap and fee), so resolutions never queue behind submissions
+RESOLVE_MAX_IN_FLIGHT = int(os.getenv("RESOLVE_MAX_IN_FLIGHT", "4"))
+RESOLVE_FEE_MULTIPLIER = float(os.getenv("RESOLVE_FEE_MULTIPLIER", "1"))
+# Seconds /mark_resolved waits for its tx to be sent before answering 504 (the request stays queued)
+RESOLVE_TIMEOUT = float(os.getenv("RESOLVE_TIMEOUT", "60"))
+# Upper bound for the ?wait= long-poll on /grievance_status
+STATUS_MAX_WAIT = float(os.getenv("STATUS_MAX_WAIT", "30"))
+# Page size bounds for /get_all_grievances
+DEFAULT_PAGE_SIZE = int(os.getenv("DEFAULT_PAGE_SIZE", "100"))
+MAX_PAGE_SIZE = int(os.getenv("MAX_PAGE_SIZE", "1000"))
+
+# Remote Hugging Face CLIP by default; CLASSIFIER_BACKEND=local runs the CLIP_MODEL_PATH checkpoint in-process
+# (built on the first classification, so a local checkpoint is not loaded at import)
+CLASSIFIER = Lazy(lambda: open_classifier(api_key=HUGGINGFACE_API_KEY, label_sets=[GRIEVANCE_CATEGORIES]))
+
+# Most images waiting for or in a classification batch; more callers wait up to CLASSIFY_TIMEOUT for room
+CLASSIFY_QUEUE_SIZE = int(os.getenv("CLASSIFY_QUEUE_SIZE", "256"))
+# Seconds a classification may wait for room and then for its batch before it counts as unavailable
+CLASSIFY_TIMEOUT = float(os.getenv("CLASSIFY_TIMEOUT", "60"))
+
+# Concurrent classifications are gathered into one batched inference call
+CLASSIFY_BATCHER = MicroBatcher(
+    lambda images: CLASSIFIER.classify_batch(images, GRIEVANCE_CATEGORIES),
+    max_batch=int(os.getenv("CLASSIFY_BATCH_SIZE", "8")),
+    max_wait=float(os.getenv("CLASSIFY_BATCH_WAIT_MS", "20")) / 1000,
+    workers=int(os.getenv("CLASSIFY_BATCH_WORKERS", "2")),
+    name="classify-batcher",
+    max_pending=CLASSIFY_QUEUE_SIZE,
+)
+
+# CLIP results by image hash + label set; set CLASSIFICATION_CACHE_PATH to keep them across restarts
+CLASSIFICATION_CACHE = ClassificationCache(
+    max_entries=int(os.getenv("CLASSIFICATION_CACHE_SIZE", "1024")),
+    path=os.getenv("CLASSIFICATION_CACHE_PATH") or None,
+    ttl=float(os.getenv("CLASSIFICATION_CACHE_TTL", str(7 * 24 * 3600))),
+    max_disk_entries=int(os.getenv("CLASSIFICATION_CACHE_DISK_SIZE", "100000")),
+)
 
 # Custom helper functions
-def clip_grievance_categorize(image_base64):
-    API_URL = "https://api-inference.huggingface.co/models/openai/clip-vit-base-patch32"
-    headers = {"Authorization": f"Bearer {HUGGINGFACE_API_KEY}"}
-    
-    image_data = base64.b64decode(image_base64)
-    categories = [
-        "road pothole", "broken street light", "graffiti vandalism", 
-        "fallen tree", "water leak", "garbage dumping", "broken sidewalk", 
-        "missing street sign", "flooding", "damaged public property"
-    ]
-    
-    data = {
-        "image": base64.b64encode(image_data).decode('utf-8'),
-        "parameters": {
-            "candidate_labels": categories
-        }
-    }
+def classify_batched(image_data):
+    """
+    CLIP results for ``image_data`` through CLASSIFY_BATCHER.
+
+    Raises:
+        ClassifierError: 503 if the batcher stays full or the batch does not
+            finish within CLASSIFY_TIMEOUT, or the classifier's own error
+    """
     try:
-        response = requests.post(API_URL, headers=headers, json=data)
-        print('CLIP API response:', response.status_code, response.text)
-        if response.status_code == 503:
-            # Service unavailable, return fallback
-            return {
-                "category": "unclassified",
-                "priorityLevel": "medium",
-                "estimatedDays": 7,
-                "confidence": 0,
-                "error": "AI-based media analysis is temporarily unavailable. Your report has been received, but the AI justification will be added once the service is back online.",
-                "all_results": []
-            }
-        if response.status_code != 200:
-            return {
-                "category": "unclassified",
-                "priorityLevel": "medium",
-                "estimatedDays": 7,
-                "confidence": 0,
-                "error": f"CLIP API error: {response.status_code} - {response.text}",
-                "all_results": []
-            }
-        clip_results = response.json()
-        
-        if isinstance(clip_results, list) and len(clip_results) > 0:
-            highest_score = 0
-            category = "unclassified"
-            
-            for item in clip_results:
-                if item["score"] > highest_score:
-                    highest_score = item["score"]
-                    category = item["label"]
-            
-            high_priority = ["water leak", "flooding", "fallen tree", "broken street light"]
-            medium_priority = ["road pothole", "damaged public property", "missing street sign"]
-            low_priority = ["graffiti vandalism", "garbage dumping", "broken sidewalk"]
-            
-            if category in high_priority:
-                priority, days = "high", 3
-            elif category in medium_priority:
-                priority, days = "medium", 7
-            else:
-                priority, days = "low", 14
-                
-            return {
-                "category": category,
-                "priorityLevel": priority,
-                "estimatedDays": days,
-                "confidence": highest_score,
-                "all_results": clip_results
-            }
-        else:
-            return {
-                "category": "unclassified",
-                "priorityLevel": "medium",
-                "estimatedDays": 7,
-                "confidence": 0,
-                "error": "CLIP analysis failed",
-                "all_results": []
-            }
-    except Exception as e:
-        print('CLIP API Exception:', str(e))
-        return {
-            "category": "unclassified",
-            "priorityLevel": "medium",
-            "estimatedDays": 7,
-            "confidence": 0,
-            "error": "AI-based media analysis is temporarily unavailable. Your report has been received, but the AI justification will be added once the service is back online.",
-            "all_results": []
-        }
+        return CLASSIFY_BATCHER.submit(image_data, timeout=CLASSIFY_TIMEOUT).result(timeout=CLASSIFY_TIMEOUT)
+    except queue.Full:
+        raise ClassifierError("Classification queue is full", 503)
+    except TimeoutError:
+        raise ClassifierError(f"Classification took longer than {CLASSIFY_TIMEOUT:g}s", 503)
+
+def clip_grievance_categorize(image_data):
+    """
+    Classify a grievance photo into GRIEVANCE_CATEGORIES.
+
+    Args:
+        image_data (bytes): Image prepared by ``prepare_image`` (model-sized JPEG)
+    """
+    categories = GRIEVANCE_CATEGORIES
+
+    # Same photo + same labels + same model: reuse the earlier answer without classifying again
+    cache_key = classification_key(image_data, categories, model=CLASSIFIER.name)
+    cached = CLASSIFICATION_CACHE.get(cache_key)
+    if cached is not None:
+        return cached
 
-def wait_for_tx_receipt(web3, tx_hash, timeout=120, poll_interval=5):
-    start = time.time()
-    while True:
-        try:
-            receipt = web3.eth.get_transaction_receipt(tx_hash)
-            if receipt:
-                return receipt
-        except Exception:
-            pass
-        if time.time() - start > timeout:
-            print(f"[ERROR] Transaction {tx_hash.hex()} not mined within {timeout} seconds.")
-            return None
-        time.sleep(poll_interval)
-
-def get_pending_tx_gas_price(web3, address, nonce):
     try:
-        tx = web3.eth.get_transaction_by_nonce(address, nonce)
-        if tx and hasattr(tx, 'gasPrice'):
-            return int(tx.gasPrice)
-        elif tx and 'gasPrice' in tx:
-            return int(tx['gasPrice'])
-        return None
+        # Joins a micro-batch with other workers' images; one inference call per batch
+        clip_results = classify_batched(image_data)
+        # A malformed score list fails here; it gets the same fallback as a failed call
+        result = categorize(clip_results)
+    except ClassifierError as e:
+        log.warning("CLIP classification error: %s", e)
+        # Down, overloaded or circuit open: worth classifying again later
+        return unclassified(CLASSIFIER_UNAVAILABLE if e.unavailable else str(e), retry=e.unavailable)
     except Exception as e:
-        print(f"[DEBUG] Could not fetch pending tx gas price: {e}")
-        return None
+        log.exception("CLIP API exception")
+        return unclassified(CLASSIFIER_UNAVAILABLE)
+
+    # Only real classifications are cached, never the fallbacks
+    CLASSIFICATION_CACHE.put(cache_key, result)
+    return result
 
-def submit_grievance_to_blockchain(grievance_data):
+def submit_grievance_to_blockchain(grievance_data, fee_multiplier=SUBMIT_FEE_MULTIPLIER):
     try:
         import json
-        import traceback
         if "trackingId" not in grievance_data or not grievance_data["trackingId"]:
             grievance_data["trackingId"] = f"GRV-{uuid.uuid4().hex[:8].upper()}"
 
-        account = Account.from_key(PRIVATE_KEY)
         tracking_id = grievance_data["trackingId"]
 
-        contract = web3.eth.contract(
-            address=GRIEVANCE_CONTRACT_ADDRESS,
-            abi=GRIEVANCE_CONTRACT_ABI
-        )
-
         # Prepare the arguments for the contract function (11 separate args, not a tuple)
-        tx = contract.functions.submitGrievance(
-            grievance_data["title"],
-            grievance_data["description"],
-            grievance_data["category"],
-            grievance_data["location"],
-            int(grievance_data.get("mediaCount", 0)),
-            grievance_data["priorityLevel"],
-            grievance_data["trackingId"],
-            int(grievance_data.get("estimatedDays", 7)),
-            int(grievance_data.get("fundAmount", 0)),
-            grievance_data.get("currency", "INR"),
-            grievance_data["aiJustification"]
-        ).build_transaction({
-            'from': account.address,
-            'nonce': web3.eth.get_transaction_count(account.address, 'pending'),
-            'gasPrice': int(web3.eth.gas_price * (1.2 + 0 * 0.1))
-        })
-        
-        # Estimate gas and add a 20% buffer
-        estimated_gas = web3.eth.estimate_gas(tx)
-        tx['gas'] = int(estimated_gas * 1.2)
-        
-        signed_tx = account.sign_transaction(tx)
-        raw_tx = getattr(signed_tx, 'raw_transaction', None)
-        if raw_tx is None:
-            raise AttributeError("Could not extract raw transaction bytes from signed transaction object")
-        tx_hash = web3.eth.send_raw_transaction(raw_tx)
-        receipt = wait_for_tx_receipt(web3, tx_hash)
+        tx = CONTRACTS.transaction(
+            "submitGrievance",
+            *grievance_args(grievance_data),
+            **FEES.fees(fee_multiplier)
+        )
+        tx_hash, receipt = SENDER.send_and_wait(tx)
         if not receipt:
             return {"success": False, "error": "submitGrievance tx not mined"}
+        if receipt.get("status") == 0:
+            return {"success": False, "error": "submitGrievance tx reverted", "tx_hash": tx_hash.hex()}
         return {
             "success": True,
             "tracking_id": tracking_id,
             "tx_hash": tx_hash.hex()
         }
     except Exception as e:
-        import traceback
-        error_msg = str(e)
-        print(f"[FATAL] Exception in grievance submission: {error_msg}")
-        print(f"[DEBUG] Exception Traceback:\n{traceback.format_exc()}")
-        return {"success": False, "error": error_msg}
+        log.exception("Exception in grievance submission", extra={"trackingId": grievance_data.get("trackingId")})
+        return {"success": False, "error": str(e)}
+
+# Whether the deployed contract has submitGrievances; checked once against its bytecode
+_batch_submit_supported = None
+
+def batch_submit_supported():
+    global _batch_submit_supported
+    if _batch_submit_supported is None:
+        # Solidity's dispatcher embeds every external selector in the runtime code
+        code = bytes(web3.eth.get_code(CONTRACTS.address))
+        _batch_submit_supported = CONTRACTS.selectors["submitGrievances"] in code
+        if not _batch_submit_supported:
+            log.warning("Deployed GrievanceRegistry has no submitGrievances; submitting one by one")
+    return _batch_submit_supported
+
+def submit_each(batch, fee_multiplier):
+    return {g["trackingId"]: submit_grievance_to_blockchain(g, fee_multiplier) for g in batch}
+
+def submit_grievances_to_blockchain(batch, fee_multiplier=SUBMIT_FEE_MULTIPLIER):
+    """
+    Submit ``batch`` in one submitGrievances transaction.
+
+    Results are mapped back per grievance by ``batch_results``. If the
+    batch cannot be sent or reverts, the grievances are submitted one by
+    one so a single bad record does not fail the rest.
+
+    Returns:
+        dict: trackingId -> {"success", "tracking_id"/"error", "tx_hash"}
+    """
+    if len(batch) == 1 or not batch_submit_supported():
+        return submit_each(batch, fee_multiplier)
+    try:
+        tx = CONTRACTS.transaction(
+            "submitGrievances",
+            [grievance_args(g) for g in batch],
+            **FEES.fees(fee_multiplier)
+        )
+        tx_hash, receipt = SENDER.send_and_wait(tx)
+    except Exception as e:
+        log.warning("Batch of %s grievances failed to send, submitting one by one: %s", len(batch), e)
+        return submit_each(batch, fee_multiplier)
+    if not receipt:
+        # It may still be mined; re-sending the items could record them twice
+        return {g["trackingId"]: {"success": False, "error": "submitGrievances tx not mined", "tx_hash": tx_hash.hex()} for g in batch}
+    if receipt.get("status") == 0:
+        log.warning("Batch tx %s reverted, submitting one by one", tx_hash.hex())
+        return submit_each(batch, fee_multiplier)
+    return batch_results(batch, receipt, CONTRACTS.address, SUBMIT_EVENTS)
 
 # Flask routes
+@app.before_request
+def start_timer():
+    g.started = time.perf_counter()
+
+@app.after_request
+def record_request(response):
+    # Labelled by URL rule, not path, so tracking ids do not create a series each
+    route = request.url_rule.rule if request.url_rule else "unmatched"
+    HTTP_SECONDS.observe(time.perf_counter() - g.started, route=route, status=response.status_code)
+    return response
+
+@app.route("/metrics")
+def metrics():
+    """Prometheus metrics of this worker process (stage, RPC, inference and HTTP latencies)."""
+    return Response(render(), content_type=CONTENT_TYPE)
+
 @app.route("/")
 def home():
     return render_template("index.html")
 
+# Grievances classified as fallback during a classifier outage, retried in the background
+RECLASSIFY_QUEUE = ReclassifyQueue(
+    os.getenv("RECLASSIFY_DIR", "reclassify_queue"),
+    clip_grievance_categorize,
+    SERVICE.record_classification,
+    interval=float(os.getenv("RECLASSIFY_INTERVAL", "30")),
+)
+
+# Queued grievance jobs are kept here until their chain outcome is recorded, so a restart can finish them
+JOB_SPOOL = JobSpool(os.getenv("JOB_SPOOL_DIR", "job_spool"))
+
+def queue_grievance(tracking_id, image_data, jobs=None):
+    """Spool the job, then put it on ``jobs`` (GRIEVANCE_JOBS by default)."""
+    JOB_SPOOL.add(tracking_id, image_data)
+    try:
+        (jobs or GRIEVANCE_JOBS).submit({"trackingId": tracking_id, "image": image_data})
+    except Exception:
+        JOB_SPOOL.remove(tracking_id)
+        raise
+
+def record_chain_outcome(tracking_id, future):
+    if future.exception() is not None:
+        error = future.exception()
+        log.error("Chain submission of %s failed: %r", tracking_id, error)
+        result = {"success": False, "error": str(error) or type(error).__name__}
+    else:
+        result = future.result()
+    SERVICE.record_submission(tracking_id, result)
+    JOB_SPOOL.remove(tracking_id)
+
+def process_grievance(job):
+    """Background job: classify the image, then submit the grievance on-chain."""
+    tracking_id = job["trackingId"]
+
+    with STAGE_SECONDS.time(stage="classify"):
+        clip_results = clip_grievance_categorize(job["image"])
+    log.debug("Classified grievance", extra={"trackingId": tracking_id, "classification": clip_results})
+    SERVICE.record_classification(tracking_id, clip_results)
+    if clip_results.get("retry"):
+        # Submitted as unclassified now; the store is corrected once the classifier is back
+        RECLASSIFY_QUEUE.add(tracking_id, job["image"])
+
+    # Hand off to the batcher; the worker is free for the next job while the batch fills. From here
+    # on the grievance may be sent, so a restart must not classify and send it again
+    JOB_SPOOL.advance(tracking_id)
+    CHAIN_BATCHER.submit(GRIEVANCE_STORE.get(tracking_id)).add_done_callback(
+        functools.partial(record_chain_outcome, tracking_id)
+    )
+
+GRIEVANCE_JOBS = JobQueue("grievance-chain", process_grievance, workers=CHAIN_WORKERS)
+
+def resume_jobs():
+    """Re-queue the grievances an earlier run of this process left spooled (once, at startup)."""
+    return SERVICE.resume_interrupted(
+        JOB_SPOOL, lambda tracking_id, image_data: GRIEVANCE_JOBS.submit({"trackingId": tracking_id, "image": image_data})
+    )
+
+# Classified grievances are sent in submitGrievances batches, flushed by size or age, highest priority first
+CHAIN_BATCHER = SubmissionBatcher(
+    submit_grievances_to_blockchain,
+    fee_multipliers=TX_FEE_MULTIPLIERS,
+    max_batch=BATCH_SUBMIT_SIZE,
+    max_wait=BATCH_SUBMIT_WAIT,
+    max_in_flight=TX_MAX_IN_FLIGHT,
+    aging=TX_PRIORITY_AGING,
+)
+
+def resolve_grievances(requests, fee_multiplier):
+    """
+    Send markResolved for each (trackingId, sent) request and wait for it to be mined.
+
+    ``sent`` gets the tx hash (or the send error) as soon as it is known, so
+    the route can answer without waiting for the block; the lane slot is
+    held until the receipt so RESOLVE_MAX_IN_FLIGHT counts unmined txs.
+    """
+    results = []
+    for tracking_id, sent in requests:
+        try:
+            tx_hash = SENDER.send(CONTRACTS.transaction("markResolved", tracking_id, **FEES.fees(fee_multiplier)))
+        except Exception as e:
+            sent.set_exception(e)
+            results.append({"success": False, "error": str(e)})
+            continue
+        sent.set_result(tx_hash)
+        results.append(SERVICE.record_resolution(tracking_id, tx_hash, RECEIPTS.wait(tx_hash)))
+    return results
+
+RESOLVE_LANE = TransactionScheduler(
+    resolve_grievances,
+    "resolve",
+    tiers=("resolve",),
+    fee_multipliers={"resolve": RESOLVE_FEE_MULTIPLIER},
+    max_batch=1,
+    max_wait=0,
+    max_in_flight=RESOLVE_MAX_IN_FLIGHT,
+)
+
+def _contract_reader():
+    from contract_reader import BulkGrievanceReader
+    return BulkGrievanceReader(
+        web3,
+        CONTRACTS.address,
+        chunk_size=int(os.getenv("CONTRACT_READ_CHUNK_SIZE", "100")),
+        parallelism=int(os.getenv("CONTRACT_READ_PARALLELISM", "4")),
+        # Seconds a /get_grievance miss is remembered before the chain is asked again
+        missing_ttl=float(os.getenv("CONTRACT_READ_MISSING_TTL", "30")),
+    )
+
+def _event_indexer():
+    from event_indexer import EventIndexer, indexer_start_block
+    return EventIndexer(
+        web3,
+        CONTRACTS.contract,
+        GRIEVANCE_STORE,
+        checkpoint_path=os.getenv("INDEXER_CHECKPOINT_PATH", "indexer_checkpoint.json"),
+        start_block=indexer_start_block(),
+        confirmations=int(os.getenv("INDEXER_CONFIRMATIONS", "12")),
+        fetch=CONTRACT_READER.fetch_grievances,
+    )
+
+# Bulk getGrievanceBasic/getGrievanceDetails reads (Multicall3 or JSON-RPC batches)
+CONTRACT_READER = Lazy(_contract_reader)
+
+# Mirrors GrievanceRegistry events (including other clients' submissions) into the store
+EVENT_INDEXER = Lazy(_event_indexer)
+
+def import_item(index, fields, image, error):
+    # Blocks while BULK_IMPORT_CONCURRENCY images are classifying and the queue is full, so reading keeps pace
+    return SERVICE.import_item(
+        index, fields, image, error,
+        lambda tracking_id, image_data: queue_grievance(tracking_id, image_data, BULK_CLASSIFY),
+    )
+
+def run_import(job):
+    """Background job: read an import's manifest and images, queueing every item as it is read."""
+    SERVICE.run_import(job["jobId"], job["directory"], import_item)
+
+# One reader thread per running import; their items are classified by BULK_CLASSIFY, then batched on-chain
+BULK_IMPORTS = JobQueue("bulk-import", run_import, workers=BULK_IMPORT_WORKERS)
+BULK_CLASSIFY = JobQueue(
+    "bulk-classify", process_grievance, workers=BULK_IMPORT_CONCURRENCY, maxsize=BULK_IMPORT_CONCURRENCY * 4
+)
+
 @app.route("/submit_grievance", methods=["POST"])
 def submit_grievance():
+    """
+    Store a grievance and queue its classification and on-chain submission.
+
+    A repeat (same ``Idempotency-Key`` header, or with SUBMIT_DEDUP_WINDOW
+    the same photo, title and location) gets the first request's grievance
+    and status back, with an ``Idempotent-Replayed: true`` header, and
+    nothing is classified or sent again.
+    """
     try:
         title = request.form.get("title", "Untitled Grievance")
         description = request.form.get("description", "No description provided")
         location = request.form.get("location", "Unknown")
         image_file = request.files.get("image")
+        idempotency_key = request.headers.get("Idempotency-Key", "").strip()
         
         if not image_file:
             return jsonify({"success": False, "error": "No image provided"}), 400
-        
-        image_data = image_file.read()
-        image_base64 = base64.b64encode(image_data).decode("utf-8")
-        
-        clip_results = clip_grievance_categorize(image_base64)
-        print(clip_results)
-        tracking_id = f"GRV-{uuid.uuid4().hex[:8].upper()}"
-        grievance_data = {
-            "trackingId": tracking_id,
-            "title": title,
-            "description": description,
-            "location": location,
-            "category": clip_results.get("category", "Unclassified"),
-            "priorityLevel": clip_results.get("priorityLevel", "medium"),
-            "estimatedDays": int(clip_results.get("estimatedDays", 7)),
-            "mediaCount": 1,
-            "aiJustification": json.dumps(clip_results.get("all_results", [])),
-            "status": "submitted",
-            "createdAt": int(time.time()),
-            "updatedAt": int(time.time()),
-            "submitter": "backend-local",
-            "resolved": False,
-            "blockchainStatus": "pending",
-            "tx_hash": None,
-            "blockchainError": None
-        }
-        # Store the grievance regardless of blockchain result
-        GRIEVANCE_STORE.append(grievance_data)
-        # Attempt to submit to blockchain
-        blockchain_result = submit_grievance_to_blockchain(grievance_data)
-        print('[DEBUG] Blockchain result:', blockchain_result)
-        # Update the stored grievance with blockchain result
-        for g in GRIEVANCE_STORE:
-            if g["trackingId"] == tracking_id:
-                if blockchain_result.get("success"):
-                    g["blockchainStatus"] = "success"
-                    g["tx_hash"] = blockchain_result.get("tx_hash")
-                else:
-                    g["blockchainStatus"] = "failed"
-                    g["blockchainError"] = blockchain_result.get("error")
-                break
-        return jsonify({
-            "success": True,
-            "trackingId": tracking_id,
-            "grievance": grievance_data,
-            "blockchain": blockchain_result
-        })
+        status, body, headers = SERVICE.submit(
+            image_file.stream, title, description, location, idempotency_key,
+            queue_grievance,
+        )
+        return jsonify(body), status, headers
+    except Exception as e:
+        log.exception("Grievance submission failed")
+        return jsonify({"success": False, "error": str(e)}), 500
+
+@app.route("/bulk_import", methods=["POST"])
+def bulk_import():
+    """
+    Import many grievances: a ``manifest`` (NDJSON) plus an ``archive`` or image parts (see bulk_import.py).
+
+    Answers 202 with a ``jobId`` once the upload is saved. Items are then
+    read one at a time, classified BULK_IMPORT_CONCURRENCY at once and
+    submitted on-chain in batches; /bulk_import/<jobId> reports progress.
+    """
+    # Far larger than a single submission, and one part per image
+    request.max_content_length = BULK_IMPORT_MAX_BYTES
+    request.max_form_parts = BULK_IMPORT_MAX_ITEMS + 16
+    request.max_form_memory_size = BULK_IMPORT_MAX_BYTES
+    # Parsed outside the try so a body over the limits is answered with Flask's 413
+    manifest = request.files.get("manifest")
+    manifest = manifest.stream if manifest else request.form.get("manifest")
+    if not manifest:
+        return jsonify({"success": False, "error": "No manifest provided"}), 400
+    archive = request.files.get("archive")
+    images = [
+        (f.filename, f.stream) for name, f in request.files.items(multi=True) if name not in ("manifest", "archive")
+    ]
+    try:
+        job_id = IMPORT_JOBS.create()
+        directory = os.path.join(BULK_IMPORT_DIR, job_id)
+        os.makedirs(directory)
+        try:
+            save_upload(directory, manifest, archive.stream if archive else None, images)
+            ImageSource(directory).close()
+        except ValueError as e:
+            shutil.rmtree(directory, ignore_errors=True)
+            IMPORT_JOBS.finish(job_id, 0)
+            return jsonify({"success": False, "error": str(e)}), 400
+        BULK_IMPORTS.submit({"jobId": job_id, "directory": directory})
+        return jsonify({"success": True, "jobId": job_id, "statusUrl": f"/bulk_import/{job_id}"}), 202
+    except Exception as e:
+        log.exception("Bulk import failed")
+        return jsonify({"success": False, "error": str(e)}), 500
+
+@app.route("/bulk_import/<job_id>", methods=["GET"])
+def bulk_import_status(job_id):
+    """
+    Progress of a bulk import: its state (``reading``, ``processing`` or
+    ``done``), per-status counts and each item's status, trackingId and error.
+    """
+    try:
+        body = SERVICE.import_status(job_id)
+        if body is None:
+            return jsonify({"success": False, "error": "Import job not found"}), 404
+        return jsonify(body)
+    except Exception as e:
+        return jsonify({"success": False, "error": str(e)}), 500
+
+@app.route("/grievance_status/<tracking_id>", methods=["GET"])
+def grievance_status(tracking_id):
+    """
+    Report the blockchain status of a grievance.
+
+    With ``?wait=<seconds>`` the request is held open until the status leaves
+    ``pending`` or the wait expires (capped at STATUS_MAX_WAIT).
+    """
+    try:
+        wait = min(float(request.args.get("wait", 0)), STATUS_MAX_WAIT)
+        result = GRIEVANCE_STORE.wait_for(
+            tracking_id, lambda g: g["blockchainStatus"] != "pending", wait
+        )
+        if not result:
+            return jsonify({"success": False, "error": "Grievance not found"}), 404
+        return jsonify(status_body(result))
+    except ValueError:
+        return jsonify({"success": False, "error": "wait must be a number of seconds"}), 400
     except Exception as e:
-        print(e)
         return jsonify({"success": False, "error": str(e)}), 500
 
 @app.route("/get_grievance/<tracking_id>", methods=["GET"])
 def get_grievance(tracking_id):
     try:
-        result = next((g for g in GRIEVANCE_STORE if g["trackingId"] == tracking_id), None)
+        result = SERVICE.lookup(tracking_id, lambda tracking_id: CONTRACT_READER.fetch_grievance(tracking_id))
         if result:
             return jsonify({"success": True, "data": result})
         else:
@@ -313,35 +631,76 @@ def get_grievance(tracking_id):
     except Exception as e:
         return jsonify({"success": False, "error": str(e)}), 500
 
+@app.route("/classification_cache", methods=["GET"])
+def classification_cache_stats():
+    # Only the remote backend has an HTTP client (and a circuit breaker)
+    client = getattr(CLASSIFIER, "client", None)
+    return jsonify({
+        "success": True,
+        "stats": CLASSIFICATION_CACHE.stats(),
+        "breaker": client.breaker.state if client else None,
+        "reclassifyPending": len(RECLASSIFY_QUEUE.pending()),
+        "batching": dict(CLASSIFY_BATCHER.metrics.snapshot(), pending=CLASSIFY_BATCHER.pending()),
+    })
+
 @app.route("/get_all_grievances", methods=["GET"])
 def get_all_grievances():
+    """
+    List grievances in submission order, one page at a time.
+
+    Query parameters:
+        cursor: ``nextCursor`` from the previous page
+        limit: Page size (default DEFAULT_PAGE_SIZE, at most MAX_PAGE_SIZE)
+        status, category, priority, resolved: Equality filters
+        since, until: ``createdAt`` range in unix seconds
+        fields / exclude: Comma-separated fields to keep / drop (e.g. exclude=aiJustification)
+        format: ``ndjson`` streams one record per line instead of a JSON page
+    """
     try:
-        return jsonify({"success": True, "data": GRIEVANCE_STORE})
+        try:
+            query = parse_grievance_query(request.args)
+            limit = min(int(request.args.get("limit", DEFAULT_PAGE_SIZE)), MAX_PAGE_SIZE)
+        except ValueError:
+            return jsonify({"success": False, "error": "cursor, limit, since and until must be integers"}), 400
+        fields = {f for f in request.args.get("fields", "").split(",") if f}
+        exclude = {f for f in request.args.get("exclude", "").split(",") if f}
+
+        if request.args.get("format") == "ndjson" or request.accept_mimetypes.best == "application/x-ndjson":
+            # Streams the whole result set unless a limit was asked for explicitly
+            stream_limit = limit if "limit" in request.args else None
+
+            def generate():
+                for _, record in islice(GRIEVANCE_STORE.scan(**query), stream_limit):
+                    yield json.dumps(project(record, fields, exclude)) + "\n"
+            return Response(stream_with_context(generate()), mimetype="application/x-ndjson")
+
+        # Read one extra row to know whether another page exists
+        rows = list(islice(GRIEVANCE_STORE.scan(**query), limit + 1))
+        next_cursor = str(rows[limit - 1][0]) if len(rows) > limit else None
+        response = jsonify({
+            "success": True,
+            "data": [project(record, fields, exclude) for _, record in rows[:limit]],
+            "nextCursor": next_cursor
+        })
+        response.add_etag()
+        return response.make_conditional(request)
     except Exception as e:
         return jsonify({"success": False, "error": str(e)}), 500
 
 @app.route("/mark_resolved/<tracking_id>", methods=["POST"])
 def mark_resolved(tracking_id):
     try:
-        account = Account.from_key(PRIVATE_KEY)
-        contract_args = [tracking_id]
-        transaction = {
-            "to": GRIEVANCE_CONTRACT_ADDRESS,
-            "data": web3.eth.contract(address=GRIEVANCE_CONTRACT_ADDRESS, abi=GRIEVANCE_CONTRACT_ABI).functions.markResolved(*contract_args).build_transaction({
-                'from': account.address,
-                'nonce': web3.eth.get_transaction_count(account.address, 'pending'),
-                'gas': 200000,
-                'gasPrice': web3.eth.gas_price,
-            }),
-            "value": 0,
-        }
+        sent = Future()
+        RESOLVE_LANE.submit((tracking_id, sent))
+        # Answered once sent; the lane records the resolution when the tx is mined
+        try:
+            tx_hash = sent.result(timeout=RESOLVE_TIMEOUT)
+        except TimeoutError:
+            return jsonify({
+                "success": False,
+                "error": f"markResolved was not sent within {RESOLVE_TIMEOUT:g}s; it is still queued",
+            }), 504
 
-        signed_tx = account.sign_transaction(transaction)
-        raw_tx = getattr(signed_tx, 'raw_transaction', None)
-        if raw_tx is None:
-            raise AttributeError("Could not extract raw transaction bytes from signed transaction object")
-        tx_hash = web3.eth.send_raw_transaction(raw_tx)
-        
         return jsonify({
             "success": True,
             "transaction_hash": tx_hash.hex(),
@@ -352,7 +711,12 @@ def mark_resolved(tracking_id):
 
 def initialize_agent():
     global agent, wallet_provider
-    account = Account.from_key(PRIVATE_KEY)
+    # The agent stack is only needed here, not on any request path: import it on demand
+    from coinbase_agentkit import EthAccountWalletProvider, EthAccountWalletProviderConfig
+
+    # Monkey patch the wallet provider class
+    EthAccountWalletProvider.encode_contract_call = encode_contract_call
+    account = CONTRACTS.account
 # Initialize with proper chain ID (Base Sepolia)
     wallet_provider = EthAccountWalletProvider(
         config=EthAccountWalletProviderConfig(
@@ -364,25 +728,20 @@ def initialize_agent():
         
 def encode_contract_call(self, abi, function_name, args):
     """Proper contract function encoding for web3.py v6+"""
-    # Create contract instance with full ABI and address
-    contract = self.web3.eth.contract(
-        address=GRIEVANCE_CONTRACT_ADDRESS,
-        abi=abi
-    )
-    
     try:
-        # Get the function object with bound arguments
-        func = contract.get_function_by_name(function_name)(*args)
-        
-        # Encode the transaction data
-        return func._encode_transaction_data()
+        # Selectors and argument encoders are cached in the registry
+        return "0x" + CONTRACTS.encode(function_name, *args).hex()
         
     except ValueError as e:
         raise Exception(f"Function encoding failed: {str(e)}") from e
 
-# Monkey patch the wallet provider class
-EthAccountWalletProvider.encode_contract_call = encode_contract_call
-# Monkey patch the wallet provider class
 if __name__ == "__main__":
     initialize_agent()
+    if not SIGNER_SOCKET:
+        NONCES.sync()
+        NONCES.start_monitor(CONTRACTS.account)
+    RECLASSIFY_QUEUE.start()
+    resume_jobs()
+    if os.getenv("INDEX_CHAIN_EVENTS", "1") == "1":
+        EVENT_INDEXER.start()
     app.run(host="0.0.0.0", port=5000, debug=True)
\ No newline at end of file
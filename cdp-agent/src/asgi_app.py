@@ -0,0 +1,815 @@
+"""
+ASGI version of the grievance service (FastAPI).
+
+Serves the same routes and JSON as the Flask app in app.py, but request
+handling, inference calls (httpx) and chain sends and receipts (AsyncWeb3)
+are coroutines on one event loop, so an in-flight submission costs a task
+rather than a thread. Run with:
+
+    uvicorn asgi_app:app --host 0.0.0.0 --port 8000
+"""
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import queue
+import shutil
+import time
+from contextlib import asynccontextmanager
+from itertools import islice
+
+from dotenv import load_dotenv
+from fastapi import FastAPI, Request
+from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+
+from batching import AsyncMicroBatcher
+from bulk_import import ImageSource, ImportJobs, save_upload
+from classifier import ClassifierError, open_async_classifier
+from classification_cache import ClassificationCache, classification_key
+from fee_oracle import GasEstimateCache
+from grievance_service import GrievanceService, status_body
+from grievance_store import open_grievance_store
+from grievances import (
+    CLASSIFIER_UNAVAILABLE,
+    GRIEVANCE_CATEGORIES,
+    batch_results,
+    categorize,
+    grievance_args,
+    parse_grievance_query,
+    project,
+    unclassified,
+)
+from idempotency import IdempotencyTable
+from image_ingest import DEFAULT_MAX_UPLOAD_BYTES
+from jobs import JobQueue, JobSpool
+from lazy import Lazy
+from logs import configure_logging
+from metrics import CONTENT_TYPE, HTTP_SECONDS, STAGE_SECONDS, instrument_web3, render
+from reclassify_queue import ReclassifyQueue
+from signer import SignerClient, signer_authkey
+from tx_scheduler import DEFAULT_FEE_MULTIPLIERS, AsyncTransactionScheduler, parse_multipliers
+
+# Load environment variables
+load_dotenv()
+
+configure_logging()
+log = logging.getLogger(__name__)
+
+ABI_PATH = os.path.join(os.path.dirname(__file__), 'abi', 'GrievanceRegistry.json')
+with open(ABI_PATH, 'r') as f:
+    GRIEVANCE_CONTRACT_ABI = json.load(f)
+
+# Largest accepted image upload; bigger request bodies are refused before they are read
+MAX_UPLOAD_BYTES = int(os.getenv("MAX_UPLOAD_BYTES", str(DEFAULT_MAX_UPLOAD_BYTES)))
+# Leave room for the form fields next to the image
+MAX_CONTENT_LENGTH = MAX_UPLOAD_BYTES + 64 * 1024
+
+HUGGINGFACE_API_KEY = os.getenv('HUGGINGFACE_API_KEY')
+assert HUGGINGFACE_API_KEY, "You must set the HUGGINGFACE_API_KEY environment variable"
+
+PRIVATE_KEY = os.getenv("PRIVATE_KEY")
+assert PRIVATE_KEY, "You must set the PRIVATE_KEY environment variable"
+assert PRIVATE_KEY.startswith("0x"), "Private key must start with 0x hex prefix"
+
+GRIEVANCE_CONTRACT_ADDRESS = os.getenv("GRIEVANCE_CONTRACT_ADDRESS")
+assert GRIEVANCE_CONTRACT_ADDRESS, "You must set the GRIEVANCE_CONTRACT_ADDRESS environment variable"
+
+AVAX_RPC_URL = os.getenv("AVAX_RPC_URL")
+assert AVAX_RPC_URL, "You must set the AVAX_RPC_URL environment variable"
+
+# web3 and everything built on it is created on first use (see lazy.py), as in app.py:
+# importing web3 alone takes over a second, and a worker may never touch the chain
+def _async_web3():
+    from web3 import AsyncWeb3
+    return instrument_web3(AsyncWeb3(AsyncWeb3.AsyncHTTPProvider(AVAX_RPC_URL)))
+
+def _web3():
+    from web3 import Web3
+    return instrument_web3(Web3(Web3.HTTPProvider(AVAX_RPC_URL)))
+
+def _contracts():
+    from contract_registry import ContractRegistry
+    return ContractRegistry(web3, GRIEVANCE_CONTRACT_ADDRESS, GRIEVANCE_CONTRACT_ABI, PRIVATE_KEY)
+
+def _submit_events():
+    from event_indexer import EventDecoder
+    return EventDecoder(GRIEVANCE_CONTRACT_ABI)
+
+def _chain():
+    from async_chain import AsyncChain, AsyncReceiptTracker
+    return AsyncChain(
+        ASYNC_WEB3,
+        CONTRACTS,
+        GasEstimateCache(web3),
+        receipts=AsyncReceiptTracker(ASYNC_WEB3, poll_interval=float(os.getenv("RECEIPT_POLL_INTERVAL", "1"))),
+        fee_ttl=float(os.getenv("FEE_CACHE_TTL", "3")),
+    )
+
+# Sends and receipts go through AsyncWeb3; the bulk reader and event indexer keep their own threads on a sync client
+ASYNC_WEB3 = Lazy(_async_web3)
+web3 = Lazy(_web3)
+
+CONTRACTS = Lazy(_contracts)
+SUBMIT_EVENTS = Lazy(_submit_events)
+SUBMIT_FEE_MULTIPLIER = float(os.getenv("SUBMIT_FEE_MULTIPLIER", "1.2"))
+# Per priority tier, as in app.py
+TX_FEE_MULTIPLIERS = parse_multipliers(
+    os.getenv("TX_FEE_MULTIPLIERS", ""), dict(DEFAULT_FEE_MULTIPLIERS, medium=SUBMIT_FEE_MULTIPLIER)
+)
+
+# Local nonces, per-block fees, cached gas estimates and one block-following receipt task
+CHAIN = Lazy(_chain)
+
+# Set for `uvicorn --workers N`: sends then go through the one signer process (signer.py)
+SIGNER_SOCKET = os.getenv("SIGNER_SOCKET")
+SIGNER = SignerClient(SIGNER_SOCKET, signer_authkey(PRIVATE_KEY)) if SIGNER_SOCKET else None
+
+GRIEVANCE_STORE = open_grievance_store()
+
+# Repeated /submit_grievance requests -> the trackingId they first created; kept in the shared
+# SQLite file when several workers share the store, so a retry may land on any of them
+IDEMPOTENCY = IdempotencyTable(
+    max_entries=int(os.getenv("IDEMPOTENCY_MAX_ENTRIES", "100000")),
+    path=os.getenv("IDEMPOTENCY_DB_PATH") or (GRIEVANCE_STORE.path if getattr(GRIEVANCE_STORE, "shared", False) else None),
+)
+# Seconds an Idempotency-Key keeps answering with its first grievance
+IDEMPOTENCY_TTL = float(os.getenv("IDEMPOTENCY_TTL", str(24 * 3600)))
+# Seconds within which the same photo, title and location count as a retry (0 turns content dedup off)
+SUBMIT_DEDUP_WINDOW = float(os.getenv("SUBMIT_DEDUP_WINDOW", "0"))
+
+# Bulk imports (/bulk_import): the upload is saved under BULK_IMPORT_DIR until its manifest has been read
+BULK_IMPORT_DIR = os.getenv("BULK_IMPORT_DIR", "bulk_imports")
+BULK_IMPORT_MAX_ITEMS = int(os.getenv("BULK_IMPORT_MAX_ITEMS", "10000"))
+BULK_IMPORT_MAX_BYTES = int(os.getenv("BULK_IMPORT_MAX_BYTES", str(2 * 1024 ** 3)))
+# Imports read at once, and imported images being classified at once across all imports
+BULK_IMPORT_WORKERS = int(os.getenv("BULK_IMPORT_WORKERS", "2"))
+BULK_IMPORT_CONCURRENCY = int(os.getenv("BULK_IMPORT_CONCURRENCY", "8"))
+# Per-item import progress; in the shared SQLite file when several workers share the store
+IMPORT_JOBS = ImportJobs(
+    path=os.getenv("IMPORT_JOBS_DB_PATH")
+    or (GRIEVANCE_STORE.path if getattr(GRIEVANCE_STORE, "shared", False) else ":memory:"),
+)
+
+# Intake, dedup, bulk import and result bookkeeping, shared with app.py
+SERVICE = GrievanceService(
+    GRIEVANCE_STORE,
+    IDEMPOTENCY,
+    IMPORT_JOBS,
+    max_upload_bytes=MAX_UPLOAD_BYTES,
+    key_ttl=IDEMPOTENCY_TTL,
+    dedup_window=SUBMIT_DEDUP_WINDOW,
+    max_import_items=BULK_IMPORT_MAX_ITEMS,
+)
+
+# Submissions still being classified or sent on-chain; new ones get a 503 beyond this
+MAX_IN_FLIGHT = int(os.getenv("MAX_IN_FLIGHT", "10000"))
+BATCH_SUBMIT_SIZE = int(os.getenv("BATCH_SUBMIT_SIZE", "20"))
+BATCH_SUBMIT_WAIT = float(os.getenv("BATCH_SUBMIT_WAIT", "2"))
+TX_MAX_IN_FLIGHT = int(os.getenv("TX_MAX_IN_FLIGHT", os.getenv("BATCH_SUBMIT_WORKERS", "2")))
+TX_PRIORITY_AGING = float(os.getenv("TX_PRIORITY_AGING", "60"))
+RESOLVE_MAX_IN_FLIGHT = int(os.getenv("RESOLVE_MAX_IN_FLIGHT", "4"))
+RESOLVE_FEE_MULTIPLIER = float(os.getenv("RESOLVE_FEE_MULTIPLIER", "1"))
+RESOLVE_TIMEOUT = float(os.getenv("RESOLVE_TIMEOUT", "60"))
+STATUS_MAX_WAIT = float(os.getenv("STATUS_MAX_WAIT", "30"))
+DEFAULT_PAGE_SIZE = int(os.getenv("DEFAULT_PAGE_SIZE", "100"))
+MAX_PAGE_SIZE = int(os.getenv("MAX_PAGE_SIZE", "1000"))
+CLASSIFY_QUEUE_SIZE = int(os.getenv("CLASSIFY_QUEUE_SIZE", "256"))
+CLASSIFY_TIMEOUT = float(os.getenv("CLASSIFY_TIMEOUT", "60"))
+
+CLASSIFIER = Lazy(lambda: open_async_classifier(api_key=HUGGINGFACE_API_KEY, label_sets=[GRIEVANCE_CATEGORIES]))
+
+CLASSIFY_BATCHER = AsyncMicroBatcher(
+    lambda images: CLASSIFIER.classify_batch(images, GRIEVANCE_CATEGORIES),
+    max_batch=int(os.getenv("CLASSIFY_BATCH_SIZE", "8")),
+    max_wait=float(os.getenv("CLASSIFY_BATCH_WAIT_MS", "20")) / 1000,
+    concurrency=int(os.getenv("CLASSIFY_BATCH_WORKERS", "2")),
+    name="classify-batcher",
+    max_pending=CLASSIFY_QUEUE_SIZE,
+)
+
+CLASSIFICATION_CACHE = ClassificationCache(
+    max_entries=int(os.getenv("CLASSIFICATION_CACHE_SIZE", "1024")),
+    path=os.getenv("CLASSIFICATION_CACHE_PATH") or None,
+    ttl=float(os.getenv("CLASSIFICATION_CACHE_TTL", str(7 * 24 * 3600))),
+    max_disk_entries=int(os.getenv("CLASSIFICATION_CACHE_DISK_SIZE", "100000")),
+)
+
+def _contract_reader():
+    from contract_reader import BulkGrievanceReader
+    return BulkGrievanceReader(
+        web3,
+        CONTRACTS.address,
+        chunk_size=int(os.getenv("CONTRACT_READ_CHUNK_SIZE", "100")),
+        parallelism=int(os.getenv("CONTRACT_READ_PARALLELISM", "4")),
+        # Seconds a /get_grievance miss is remembered before the chain is asked again
+        missing_ttl=float(os.getenv("CONTRACT_READ_MISSING_TTL", "30")),
+    )
+
+def _event_indexer():
+    from event_indexer import EventIndexer, indexer_start_block
+    return EventIndexer(
+        web3,
+        CONTRACTS.contract,
+        GRIEVANCE_STORE,
+        checkpoint_path=os.getenv("INDEXER_CHECKPOINT_PATH", "indexer_checkpoint.json"),
+        start_block=indexer_start_block(),
+        confirmations=int(os.getenv("INDEXER_CONFIRMATIONS", "12")),
+        fetch=CONTRACT_READER.fetch_grievances,
+    )
+
+CONTRACT_READER = Lazy(_contract_reader)
+
+EVENT_INDEXER = Lazy(_event_indexer)
+
+# Background submission tasks; holding them here also keeps them from being garbage-collected
+IN_FLIGHT = set()
+# /mark_resolved tasks, kept apart so they do not count against MAX_IN_FLIGHT
+RESOLVING = set()
+# trackingId -> [Event set when the grievance leaves "pending", number of waiting /grievance_status long-polls];
+# an entry lives only while someone waits on it
+STATUS_EVENTS = {}
+# The serving event loop, for the reclassify, import and request threads to start work on
+LOOP = None
+# Imported images being classified at once across all imports; created in lifespan, on the serving loop
+BULK_CLASSIFY_SLOTS = None
+
+
+async def clip_grievance_categorize(image_data):
+    """
+    Classify a grievance photo into GRIEVANCE_CATEGORIES.
+
+    Args:
+        image_data (bytes): Image prepared by ``prepare_image`` (model-sized JPEG)
+    """
+    cache_key = classification_key(image_data, GRIEVANCE_CATEGORIES, model=CLASSIFIER.name)
+    # The cache's disk tier (CLASSIFICATION_CACHE_PATH) is a SQLite file; it is read and written off the loop
+    cached = await asyncio.to_thread(CLASSIFICATION_CACHE.get, cache_key)
+    if cached is not None:
+        return cached
+
+    try:
+        try:
+            clip_results = await CLASSIFY_BATCHER.submit(image_data, timeout=CLASSIFY_TIMEOUT)
+        except queue.Full:
+            raise ClassifierError("Classification queue is full", 503)
+        except TimeoutError:
+            raise ClassifierError(f"Classification took longer than {CLASSIFY_TIMEOUT:g}s", 503)
+        # A malformed score list fails here; it gets the same fallback as a failed call
+        result = categorize(clip_results)
+    except ClassifierError as e:
+        log.warning("CLIP classification error: %s", e)
+        return unclassified(CLASSIFIER_UNAVAILABLE if e.unavailable else str(e), retry=e.unavailable)
+    except Exception as e:
+        log.exception("CLIP API exception")
+        return unclassified(CLASSIFIER_UNAVAILABLE)
+
+    await asyncio.to_thread(CLASSIFICATION_CACHE.put, cache_key, result)
+    return result
+
+
+async def send_and_wait(tx):
+    if SIGNER:
+        return await asyncio.wrap_future(SIGNER.submit("send_and_wait", tx))
+    return await CHAIN.send_and_wait(tx)
+
+
+async def send(tx):
+    """Broadcast ``tx`` without waiting for it; returns the tx hash."""
+    if SIGNER:
+        return await asyncio.wrap_future(SIGNER.submit("send", tx))
+    return await CHAIN.send(tx)
+
+
+async def submit_grievance_to_blockchain(grievance_data, fee_multiplier=SUBMIT_FEE_MULTIPLIER):
+    tracking_id = grievance_data["trackingId"]
+    try:
+        tx = await CHAIN.transaction(
+            "submitGrievance", *grievance_args(grievance_data), fee_multiplier=fee_multiplier
+        )
+        tx_hash, receipt = await send_and_wait(tx)
+        if not receipt:
+            return {"success": False, "error": "submitGrievance tx not mined"}
+        if receipt.get("status") == 0:
+            return {"success": False, "error": "submitGrievance tx reverted", "tx_hash": tx_hash.hex()}
+        return {"success": True, "tracking_id": tracking_id, "tx_hash": tx_hash.hex()}
+    except Exception as e:
+        log.error("Grievance %s submission failed: %s", tracking_id, e)
+        return {"success": False, "error": str(e)}
+
+
+# Whether the deployed contract has submitGrievances; checked once against its bytecode
+_batch_submit_supported = None
+
+
+async def batch_submit_supported():
+    global _batch_submit_supported
+    if _batch_submit_supported is None:
+        _batch_submit_supported = await CHAIN.supports("submitGrievances")
+        if not _batch_submit_supported:
+            log.warning("Deployed GrievanceRegistry has no submitGrievances; submitting one by one")
+    return _batch_submit_supported
+
+
+async def submit_each(batch, fee_multiplier):
+    results = await asyncio.gather(*(submit_grievance_to_blockchain(g, fee_multiplier) for g in batch))
+    return {g["trackingId"]: r for g, r in zip(batch, results)}
+
+
+async def submit_grievances_to_blockchain(batch, fee_multiplier=SUBMIT_FEE_MULTIPLIER):
+    """
+    Submit ``batch`` in one submitGrievances transaction, as app.py does.
+
+    Returns:
+        dict: trackingId -> {"success", "tracking_id"/"error", "tx_hash"}
+    """
+    if len(batch) == 1 or not await batch_submit_supported():
+        return await submit_each(batch, fee_multiplier)
+    try:
+        tx = await CHAIN.transaction(
+            "submitGrievances", [grievance_args(g) for g in batch], fee_multiplier=fee_multiplier
+        )
+        tx_hash, receipt = await send_and_wait(tx)
+    except Exception as e:
+        log.warning("Batch of %s grievances failed to send, submitting one by one: %s", len(batch), e)
+        return await submit_each(batch, fee_multiplier)
+    if not receipt:
+        # It may still be mined; re-sending the items could record them twice
+        return {g["trackingId"]: {"success": False, "error": "submitGrievances tx not mined", "tx_hash": tx_hash.hex()} for g in batch}
+    if receipt.get("status") == 0:
+        log.warning("Batch tx %s reverted, submitting one by one", tx_hash.hex())
+        return await submit_each(batch, fee_multiplier)
+    return batch_results(batch, receipt, CONTRACTS.address, SUBMIT_EVENTS)
+
+
+async def submit_batch(batch, fee_multiplier):
+    try:
+        results = await submit_grievances_to_blockchain(batch, fee_multiplier)
+        error = "no result for grievance in batch"
+    except Exception as e:
+        log.error("grievance-batcher batch failed: %s", e)
+        results, error = {}, str(e)
+    return [results.get(g["trackingId"]) or {"success": False, "error": error} for g in batch]
+
+
+# Highest priorityLevel first, at most TX_MAX_IN_FLIGHT batches unmined
+CHAIN_BATCHER = AsyncTransactionScheduler(
+    submit_batch,
+    "submit",
+    fee_multipliers=TX_FEE_MULTIPLIERS,
+    max_batch=BATCH_SUBMIT_SIZE,
+    max_wait=BATCH_SUBMIT_WAIT,
+    max_in_flight=TX_MAX_IN_FLIGHT,
+    aging=TX_PRIORITY_AGING,
+)
+
+
+async def resolve_grievances(requests, fee_multiplier):
+    """Send markResolved for each (trackingId, sent) request, as app.py does; ``sent`` gets the tx hash."""
+    results = []
+    for tracking_id, sent in requests:
+        try:
+            tx_hash = await send(await CHAIN.transaction("markResolved", tracking_id, fee_multiplier=fee_multiplier))
+        except Exception as e:
+            sent.set_exception(e)
+            results.append({"success": False, "error": str(e)})
+            continue
+        sent.set_result(tx_hash)
+        receipt = await CHAIN.receipts.wait(tx_hash)
+        results.append(await asyncio.to_thread(SERVICE.record_resolution, tracking_id, tx_hash, receipt))
+    return results
+
+
+RESOLVE_LANE = AsyncTransactionScheduler(
+    resolve_grievances,
+    "resolve",
+    tiers=("resolve",),
+    fee_multipliers={"resolve": RESOLVE_FEE_MULTIPLIER},
+    max_batch=1,
+    max_wait=0,
+    max_in_flight=RESOLVE_MAX_IN_FLIGHT,
+)
+
+
+def reclassify(image_data):
+    # Called from the reclassify thread; the classification itself runs on the event loop
+    return asyncio.run_coroutine_threadsafe(clip_grievance_categorize(image_data), LOOP).result()
+
+
+RECLASSIFY_QUEUE = ReclassifyQueue(
+    os.getenv("RECLASSIFY_DIR", "reclassify_queue"),
+    reclassify,
+    SERVICE.record_classification,
+    interval=float(os.getenv("RECLASSIFY_INTERVAL", "30")),
+)
+
+
+# Queued grievance jobs are kept here until their chain outcome is recorded, as in app.py
+JOB_SPOOL = JobSpool(os.getenv("JOB_SPOOL_DIR", "job_spool"))
+
+
+async def process_grievance(tracking_id, image_data, classify_slot=None):
+    """
+    Background task: classify the image, then submit the grievance on-chain.
+
+    ``classify_slot``, a semaphore the caller acquired, is released as soon
+    as the image is classified, while the chain submission is still ahead.
+    """
+    try:
+        started = time.perf_counter()
+        clip_results = await clip_grievance_categorize(image_data)
+        STAGE_SECONDS.observe(time.perf_counter() - started, stage="classify")
+    finally:
+        if classify_slot is not None:
+            classify_slot.release()
+    log.debug("Classified grievance", extra={"trackingId": tracking_id, "classification": clip_results})
+    # The store may be a SQLite file, so its reads and writes run off the loop
+    await asyncio.to_thread(SERVICE.record_classification, tracking_id, clip_results)
+    if clip_results.get("retry"):
+        await asyncio.to_thread(RECLASSIFY_QUEUE.add, tracking_id, image_data)
+    grievance = await asyncio.to_thread(GRIEVANCE_STORE.get, tracking_id)
+    # From here on the grievance may be sent, so a restart must not classify and send it again
+    await asyncio.to_thread(JOB_SPOOL.advance, tracking_id)
+    try:
+        result = await CHAIN_BATCHER.submit(grievance, grievance["priorityLevel"])
+    except Exception as e:
+        log.error("Chain submission of %s failed: %r", tracking_id, e)
+        result = {"success": False, "error": str(e) or type(e).__name__}
+    await record_blockchain_result(tracking_id, result)
+    await asyncio.to_thread(JOB_SPOOL.remove, tracking_id)
+
+
+async def record_blockchain_result(tracking_id, blockchain_result):
+    await asyncio.to_thread(SERVICE.record_submission, tracking_id, blockchain_result)
+    entry = STATUS_EVENTS.pop(tracking_id, None)
+    if entry:
+        entry[0].set()
+
+
+async def wait_for_status(tracking_id, wait):
+    """
+    The grievance once it leaves "pending", or as it is after ``wait`` seconds.
+
+    A result recorded by this worker sets the grievance's event. With a
+    shared store the result may be recorded by another worker, so the
+    store is also re-read every ``poll_interval`` seconds.
+
+    Returns:
+        dict: The record, or None for an unknown trackingId
+    """
+    # Registered before the first read, so a result recorded in between still sets the event
+    entry = STATUS_EVENTS.get(tracking_id)
+    if entry is None:
+        entry = STATUS_EVENTS[tracking_id] = [asyncio.Event(), 0]
+    entry[1] += 1
+    poll_interval = GRIEVANCE_STORE.poll_interval if getattr(GRIEVANCE_STORE, "shared", False) else None
+    deadline = time.monotonic() + wait
+    try:
+        while True:
+            result = await asyncio.to_thread(GRIEVANCE_STORE.get, tracking_id)
+            remaining = deadline - time.monotonic()
+            if not result or result["blockchainStatus"] != "pending" or remaining <= 0 or entry[0].is_set():
+                return result
+            try:
+                await asyncio.wait_for(entry[0].wait(), min(remaining, poll_interval or remaining))
+            except asyncio.TimeoutError:
+                pass
+    finally:
+        entry[1] -= 1
+        if not entry[1] and STATUS_EVENTS.get(tracking_id) is entry:
+            del STATUS_EVENTS[tracking_id]
+
+
+def start_grievance(tracking_id, image_data, classify_slot=None):
+    """Start a spooled grievance's task on the serving loop; safe to call from any thread."""
+    LOOP.call_soon_threadsafe(
+        spawn, process_grievance(tracking_id, image_data, classify_slot), f"grievance-{tracking_id}"
+    )
+
+
+def spawn(coro, name, tasks=None):
+    """Run ``coro`` as a task held in ``tasks`` (IN_FLIGHT by default) until it finishes."""
+    tasks = IN_FLIGHT if tasks is None else tasks
+    task = asyncio.get_running_loop().create_task(coro, name=name)
+    tasks.add(task)
+
+    def done(task):
+        tasks.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            log.error("%s failed: %r", name, task.exception())
+
+    task.add_done_callback(done)
+    return task
+
+
+@asynccontextmanager
+async def lifespan(app):
+    global LOOP, BULK_CLASSIFY_SLOTS
+    LOOP = asyncio.get_running_loop()
+    BULK_CLASSIFY_SLOTS = asyncio.Semaphore(BULK_IMPORT_CONCURRENCY)
+    try:
+        await CHAIN.start()
+    except Exception as e:
+        # Retried by the first send
+        log.warning("Could not reach %s at startup: %s", AVAX_RPC_URL, e)
+    # With a signer process, its NonceManager repairs stuck nonces instead
+    nonce_monitor = None if SIGNER else CHAIN.start_monitor()
+    RECLASSIFY_QUEUE.start()
+    await asyncio.to_thread(SERVICE.resume_interrupted, JOB_SPOOL, start_grievance)
+    if os.getenv("INDEX_CHAIN_EVENTS", "1") == "1":
+        EVENT_INDEXER.start()
+    yield
+    if IN_FLIGHT or RESOLVING:
+        log.info("Waiting for %s in-flight submissions and %s resolutions", len(IN_FLIGHT), len(RESOLVING))
+        await asyncio.wait(IN_FLIGHT | RESOLVING, timeout=float(os.getenv("SHUTDOWN_GRACE", "30")))
+    if nonce_monitor:
+        nonce_monitor.cancel()
+    if CLASSIFIER.loaded:
+        await CLASSIFIER.aclose()
+    if hasattr(GRIEVANCE_STORE, "close"):
+        GRIEVANCE_STORE.close()
+
+
+app = FastAPI(lifespan=lifespan)
+app.add_middleware(CORSMiddleware, allow_origins=["*"], allow_methods=["*"], allow_headers=["*"])
+
+
+@app.middleware("http")
+async def record_request(request: Request, call_next):
+    started = time.perf_counter()
+    response = await call_next(request)
+    # Labelled by route template, not path, so tracking ids do not create a series each
+    route = request.scope.get("route")
+    HTTP_SECONDS.observe(
+        time.perf_counter() - started, route=route.path if route else "unmatched", status=response.status_code
+    )
+    return response
+
+
+def error(message, status_code):
+    return JSONResponse({"success": False, "error": message}, status_code=status_code)
+
+
+@app.get("/metrics")
+async def metrics():
+    """Prometheus metrics of this worker process (stage, RPC, inference and HTTP latencies)."""
+    return Response(render(), headers={"Content-Type": CONTENT_TYPE})
+
+
+def import_item(index, fields, image, error):
+    """Run on an import thread by ``SERVICE.run_import``; the item's classification starts as a task on the loop."""
+
+    def start(tracking_id, image_data):
+        # Waits while BULK_IMPORT_CONCURRENCY images are classifying, so reading keeps pace with classification
+        asyncio.run_coroutine_threadsafe(BULK_CLASSIFY_SLOTS.acquire(), LOOP).result()
+        try:
+            JOB_SPOOL.add(tracking_id, image_data)
+        except Exception:
+            LOOP.call_soon_threadsafe(BULK_CLASSIFY_SLOTS.release)
+            raise
+        start_grievance(tracking_id, image_data, BULK_CLASSIFY_SLOTS)
+
+    return SERVICE.import_item(index, fields, image, error, start)
+
+
+# One reader thread per running import, as in app.py; reading a manifest and its archive is blocking file work
+BULK_IMPORTS = JobQueue(
+    "bulk-import",
+    lambda job: SERVICE.run_import(job["jobId"], job["directory"], import_item),
+    workers=BULK_IMPORT_WORKERS,
+)
+
+
+@app.post("/submit_grievance")
+async def submit_grievance(request: Request):
+    """
+    Store a grievance and start its classification and on-chain submission.
+
+    A repeat (same ``Idempotency-Key`` header, or with SUBMIT_DEDUP_WINDOW
+    the same photo, title and location) gets the first request's grievance
+    and status back, with an ``Idempotent-Replayed: true`` header, and
+    nothing is classified or sent again.
+    """
+    try:
+        if int(request.headers.get("content-length") or 0) > MAX_CONTENT_LENGTH:
+            return error("Request body too large", 413)
+        idempotency_key = request.headers.get("idempotency-key", "").strip()
+        if len(IN_FLIGHT) >= MAX_IN_FLIGHT:
+            return error("Too many submissions in progress, retry shortly", 503)
+        form = await request.form()
+        title = form.get("title", "Untitled Grievance")
+        description = form.get("description", "No description provided")
+        location = form.get("location", "Unknown")
+        image_file = form.get("image")
+
+        if not image_file or isinstance(image_file, str):
+            return error("No image provided", 400)
+        def start(tracking_id, image_data):
+            JOB_SPOOL.add(tracking_id, image_data)
+            start_grievance(tracking_id, image_data)
+
+        try:
+            # Hashing, decoding and resizing are CPU work and the store and key table may be SQLite files;
+            # all of it runs off the event loop
+            status, body, headers = await asyncio.to_thread(
+                SERVICE.submit, image_file.file, title, description, location, idempotency_key, start
+            )
+        finally:
+            await form.close()
+        return JSONResponse(body, status_code=status, headers=headers)
+    except Exception as e:
+        log.exception("Grievance submission failed")
+        return error(str(e), 500)
+
+
+@app.post("/bulk_import")
+async def bulk_import(request: Request):
+    """
+    Import many grievances: a ``manifest`` (NDJSON) plus an ``archive`` or image parts (see bulk_import.py).
+
+    Answers 202 with a ``jobId`` once the upload is saved. Items are then
+    read one at a time, classified BULK_IMPORT_CONCURRENCY at once and
+    submitted on-chain in batches; /bulk_import/{jobId} reports progress.
+    """
+    try:
+        if int(request.headers.get("content-length") or 0) > BULK_IMPORT_MAX_BYTES:
+            return error("Request body too large", 413)
+        # One part per image, and the manifest may come as a plain form field
+        form = await request.form(max_files=BULK_IMPORT_MAX_ITEMS + 16, max_part_size=BULK_IMPORT_MAX_BYTES)
+        try:
+            manifest = form.get("manifest")
+            if not manifest:
+                return error("No manifest provided", 400)
+            archive = form.get("archive")
+            images = [
+                (part.filename, part.file) for name, part in form.multi_items()
+                if name not in ("manifest", "archive") and not isinstance(part, str)
+            ]
+            job_id = await asyncio.to_thread(IMPORT_JOBS.create)
+            directory = os.path.join(BULK_IMPORT_DIR, job_id)
+
+            def save():
+                os.makedirs(directory)
+                save_upload(
+                    directory,
+                    manifest if isinstance(manifest, str) else manifest.file,
+                    None if archive is None or isinstance(archive, str) else archive.file,
+                    images,
+                )
+                ImageSource(directory).close()
+
+            try:
+                await asyncio.to_thread(save)
+            except ValueError as e:
+                await asyncio.to_thread(shutil.rmtree, directory, True)
+                await asyncio.to_thread(IMPORT_JOBS.finish, job_id, 0)
+                return error(str(e), 400)
+        finally:
+            await form.close()
+        BULK_IMPORTS.submit({"jobId": job_id, "directory": directory})
+        return JSONResponse(
+            {"success": True, "jobId": job_id, "statusUrl": f"/bulk_import/{job_id}"}, status_code=202
+        )
+    except Exception as e:
+        log.exception("Bulk import failed")
+        return error(str(e), 500)
+
+
+@app.get("/bulk_import/{job_id}")
+async def bulk_import_status(job_id: str):
+    """
+    Progress of a bulk import: its state (``reading``, ``processing`` or
+    ``done``), per-status counts and each item's status, trackingId and error.
+    """
+    try:
+        body = await asyncio.to_thread(SERVICE.import_status, job_id)
+        if body is None:
+            return error("Import job not found", 404)
+        return JSONResponse(body)
+    except Exception as e:
+        return error(str(e), 500)
+
+
+@app.get("/grievance_status/{tracking_id}")
+async def grievance_status(tracking_id: str, request: Request):
+    """
+    Report the blockchain status of a grievance.
+
+    With ``?wait=<seconds>`` the request is held open until the status leaves
+    ``pending`` or the wait expires (capped at STATUS_MAX_WAIT).
+    """
+    try:
+        wait = min(float(request.query_params.get("wait", 0)), STATUS_MAX_WAIT)
+    except ValueError:
+        return error("wait must be a number of seconds", 400)
+    if wait > 0:
+        result = await wait_for_status(tracking_id, wait)
+    else:
+        result = await asyncio.to_thread(GRIEVANCE_STORE.get, tracking_id)
+    if not result:
+        return error("Grievance not found", 404)
+    return JSONResponse(status_body(result))
+
+
+@app.get("/get_grievance/{tracking_id}")
+async def get_grievance(tracking_id: str):
+    try:
+        # The reader (and web3) is built on the first lookup that misses the store
+        result = await asyncio.to_thread(
+            SERVICE.lookup, tracking_id, lambda tracking_id: CONTRACT_READER.fetch_grievance(tracking_id)
+        )
+        if result:
+            return JSONResponse({"success": True, "data": result})
+        return error("Grievance not found", 404)
+    except Exception as e:
+        return error(str(e), 500)
+
+
+@app.get("/classification_cache")
+async def classification_cache_stats():
+    client = getattr(CLASSIFIER, "client", None)
+    # Lists the reclassify directory
+    reclassify_pending = await asyncio.to_thread(RECLASSIFY_QUEUE.pending)
+    return JSONResponse({
+        "success": True,
+        "stats": CLASSIFICATION_CACHE.stats(),
+        "breaker": client.breaker.state if client else None,
+        "reclassifyPending": len(reclassify_pending),
+        "batching": dict(CLASSIFY_BATCHER.metrics.snapshot(), pending=CLASSIFY_BATCHER.pending()),
+        "inFlight": len(IN_FLIGHT),
+    })
+
+
+def etag_matches(if_none_match, etag):
+    """
+    Whether an If-None-Match header matches ``etag``, as Flask's ``make_conditional`` decides.
+
+    The header is a comma-separated list of entity tags (or ``*``); a weak
+    ``W/`` tag matches its strong form, since If-None-Match compares weakly.
+    """
+    tags = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+    return "*" in tags or etag in tags
+
+
+@app.get("/get_all_grievances")
+async def get_all_grievances(request: Request):
+    """
+    List grievances in submission order, one page at a time.
+
+    Takes the same query parameters as the Flask route (cursor, limit,
+    status, category, priority, resolved, since, until, fields, exclude,
+    format=ndjson).
+    """
+    args = request.query_params
+    try:
+        try:
+            query = parse_grievance_query(args)
+            limit = min(int(args.get("limit", DEFAULT_PAGE_SIZE)), MAX_PAGE_SIZE)
+        except ValueError:
+            return error("cursor, limit, since and until must be integers", 400)
+        fields = {f for f in args.get("fields", "").split(",") if f}
+        exclude = {f for f in args.get("exclude", "").split(",") if f}
+
+        if args.get("format") == "ndjson" or "application/x-ndjson" in request.headers.get("accept", ""):
+            stream_limit = limit if "limit" in args else None
+
+            # A sync generator: Starlette pulls it from a worker thread, so store reads never block the loop
+            def generate():
+                for _, record in islice(GRIEVANCE_STORE.scan(**query), stream_limit):
+                    yield json.dumps(project(record, fields, exclude)) + "\n"
+            return StreamingResponse(generate(), media_type="application/x-ndjson")
+
+        rows = await asyncio.to_thread(lambda: list(islice(GRIEVANCE_STORE.scan(**query), limit + 1)))
+        next_cursor = str(rows[limit - 1][0]) if len(rows) > limit else None
+        body = json.dumps({
+            "success": True,
+            "data": [project(record, fields, exclude) for _, record in rows[:limit]],
+            "nextCursor": next_cursor
+        }).encode("utf-8")
+        etag = f'"{hashlib.sha1(body).hexdigest()}"'
+        if etag_matches(request.headers.get("if-none-match", ""), etag):
+            return Response(status_code=304, headers={"ETag": etag})
+        return Response(body, media_type="application/json", headers={"ETag": etag})
+    except Exception as e:
+        return error(str(e), 500)
+
+
+@app.post("/mark_resolved/{tracking_id}")
+async def mark_resolved(tracking_id: str):
+    try:
+        sent = asyncio.get_running_loop().create_future()
+        spawn(RESOLVE_LANE.submit((tracking_id, sent)), f"mark-resolved-{tracking_id}", RESOLVING)
+        # Answered once sent; the lane records the resolution when the tx is mined. Shielded: on a
+        # timeout the lane still sends and settles ``sent``
+        try:
+            tx_hash = await asyncio.wait_for(asyncio.shield(sent), RESOLVE_TIMEOUT)
+        except TimeoutError:
+            return error(f"markResolved was not sent within {RESOLVE_TIMEOUT:g}s; it is still queued", 504)
+        return JSONResponse({
+            "success": True,
+            "transaction_hash": tx_hash.hex(),
+            "explorer_link": f"https://base-sepolia.blockscout.com/tx/{tx_hash.hex()}"
+        })
+    except Exception as e:
+        return error(str(e), 500)
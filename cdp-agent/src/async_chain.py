@@ -0,0 +1,448 @@
+import asyncio
+import logging
+import time
+
+from web3 import Web3
+from web3.exceptions import TransactionNotFound
+
+from fee_oracle import DEFAULT_PRIORITY_FEE, fee_fields, gas_call, is_out_of_gas
+from metrics import STAGE_SECONDS
+from nonce_manager import ALREADY_KNOWN_ERRORS, NONCE_TOO_LOW_ERRORS, REPLACEMENT_BUMP, _error_matches
+
+log = logging.getLogger(__name__)
+
+
+class _Watch:
+    def __init__(self, future, deadline):
+        self.future = future
+        self.deadline = deadline
+        self.hashes = set()
+        self.started = time.perf_counter()
+
+
+class AsyncReceiptTracker:
+    """
+    ``ReceiptTracker`` for AsyncWeb3: one task resolves every outstanding tx hash.
+
+    The task follows new block heads and fetches receipts only for the
+    watched hashes each block includes (concurrently), so thousands of
+    waiting submissions cost one ``eth_blockNumber`` per poll instead of
+    one receipt poll each. It exits while nothing is watched and is
+    restarted by the next ``watch``.
+    """
+
+    def __init__(self, w3, poll_interval=1.0, default_timeout=120):
+        self.w3 = w3
+        self.poll_interval = poll_interval
+        self.default_timeout = default_timeout
+        # tx hash (0x-hex) -> _Watch
+        self._watches = {}
+        # Checked directly once in case they were mined before the block cursor
+        self._new = []
+        self._cursor = None
+        self._task = None
+
+    @staticmethod
+    def _key(tx_hash):
+        return Web3.to_hex(tx_hash).lower()
+
+    def watch(self, tx_hash, timeout=None):
+        """
+        Start tracking ``tx_hash``.
+
+        Returns:
+            asyncio.Future: resolves to the receipt, or raises TimeoutError if
+            the transaction is not mined within ``timeout`` seconds
+        """
+        key = self._key(tx_hash)
+        existing = self._watches.get(key)
+        if existing:
+            return existing.future
+        loop = asyncio.get_running_loop()
+        watch = _Watch(loop.create_future(), time.time() + (timeout or self.default_timeout))
+        watch.hashes.add(key)
+        self._watches[key] = watch
+        self._new.append(key)
+        if self._task is None or self._task.done():
+            self._task = loop.create_task(self._run())
+        return self._watches[key].future
+
+    async def wait(self, tx_hash, timeout=None):
+        """Wait until ``tx_hash`` is mined; returns the receipt or None on timeout."""
+        try:
+            return await self.watch(tx_hash, timeout)
+        except TimeoutError:
+            log.error("Transaction %s not mined within %s seconds", self._key(tx_hash), timeout or self.default_timeout)
+            return None
+
+    def replace(self, old_hash, new_hash):
+        """Resolve an existing watch by whichever of the two hashes is mined first (fee-bump replacement)."""
+        old_key, new_key = self._key(old_hash), self._key(new_hash)
+        watch = self._watches.get(old_key)
+        if watch and new_key not in self._watches:
+            watch.hashes.add(new_key)
+            self._watches[new_key] = watch
+
+    def pending(self):
+        return len({id(w) for w in self._watches.values()})
+
+    async def _run(self):
+        while self._watches:
+            await asyncio.sleep(self.poll_interval)
+            try:
+                await self._poll()
+            except Exception as e:
+                log.warning("Receipt tracker poll failed: %s", e)
+            await self._expire()
+        # Re-scan from the head next time someone starts watching
+        self._cursor = None
+
+    async def _poll(self):
+        new, self._new = [k for k in self._new if k in self._watches], []
+        head = await self.w3.eth.block_number
+        await self._resolve_mined(new)
+        if self._cursor is None:
+            self._cursor = head
+        while self._cursor < head:
+            block_number = self._cursor + 1
+            block = await self.w3.eth.get_block(block_number)
+            await self._resolve_mined([
+                k for k in map(self._key, block["transactions"]) if k in self._watches
+            ])
+            self._cursor = block_number
+
+    async def _resolve_mined(self, keys):
+        receipts = await asyncio.gather(*(self._get_receipt(k) for k in keys))
+        for key, receipt in zip(keys, receipts):
+            if receipt:
+                self._resolve(key, receipt=receipt)
+
+    async def _get_receipt(self, key):
+        try:
+            return await self.w3.eth.get_transaction_receipt(key)
+        except TransactionNotFound:
+            return None
+
+    async def _expire(self):
+        now = time.time()
+        expired = {id(w): (k, w) for k, w in self._watches.items() if w.deadline <= now}
+        for key, watch in expired.values():
+            # Last direct check in case the inclusion block was skipped
+            receipt = None
+            for h in list(watch.hashes):
+                try:
+                    receipt = await self._get_receipt(h)
+                except Exception:
+                    receipt = None
+                if receipt:
+                    break
+            if receipt:
+                self._resolve(key, receipt=receipt)
+            else:
+                self._resolve(key, error=TimeoutError(f"{key} not mined before deadline"))
+
+    def _resolve(self, key, receipt=None, error=None):
+        watch = self._watches.get(key)
+        if not watch:
+            return
+        for h in watch.hashes:
+            self._watches.pop(h, None)
+        if watch.future.done():
+            return
+        if error is not None:
+            watch.future.set_exception(error)
+        else:
+            STAGE_SECONDS.observe(time.perf_counter() - watch.started, stage="receipt_wait")
+            watch.future.set_result(receipt)
+
+
+class AsyncChain:
+    """
+    Sends GrievanceRegistry transactions from the event loop over AsyncWeb3.
+
+    Async counterpart of the NonceManager + FeeOracle + ReceiptTracker trio
+    the Flask app uses: nonces are handed out locally (failed sends are
+    reused first, "nonce too low" resyncs from the node), fee parameters are
+    fetched at most once per ``fee_ttl`` seconds however many sends share
+    them, gas comes from the shared ``GasEstimateCache``, and receipts from
+    one ``AsyncReceiptTracker``. Signing happens locally with
+    ``contracts.account``. ``repair``, run periodically by ``start_monitor``,
+    unblocks the account's queue as ``NonceManager.repair`` does, and fee-bump
+    replacements are handed to the receipt tracker.
+    """
+
+    def __init__(self, w3, contracts, gas_estimates, receipts=None, fee_ttl=3.0, max_retries=2,
+                 default_priority_fee=DEFAULT_PRIORITY_FEE, stuck_after=90):
+        self.w3 = w3
+        self.contracts = contracts
+        self.account = contracts.account
+        self.gas_estimates = gas_estimates
+        self.receipts = receipts or AsyncReceiptTracker(w3)
+        self.fee_ttl = fee_ttl
+        self.max_retries = max_retries
+        self.default_priority_fee = default_priority_fee
+        self.stuck_after = stuck_after
+        self._ready = False
+        self._fee_params = None
+        self._fees_updated = 0
+        self._next = None
+        self._free = set()
+        # nonce -> {"tx": tx dict, "tx_hash": hash, "sent_at": timestamp}
+        self._in_flight = {}
+        self._monitor = None
+        # Created on first use so they bind to the serving event loop
+        self._fee_lock = None
+        self._nonce_lock = None
+
+    async def start(self):
+        """Look up the chain id and the account's nonce; done lazily by the first ``transaction``."""
+        self.contracts.chain_id = await self.w3.eth.chain_id
+        await self.sync()
+        self._ready = True
+
+    async def transaction(self, function_name, *args, fee_multiplier=1.0):
+        """``contracts.transaction`` with current fees, without blocking on a chain id lookup."""
+        if not self._ready:
+            await self.start()
+        return self.contracts.transaction(function_name, *args, **await self.fees(fee_multiplier))
+
+    async def fees(self, multiplier=1.0):
+        """Fee fields for a new transaction, see ``fee_oracle.fee_fields``."""
+        started = time.perf_counter()
+        if time.time() - self._fees_updated > self.fee_ttl:
+            self._fee_lock = self._fee_lock or asyncio.Lock()
+            async with self._fee_lock:
+                # Whoever waited on the lock reuses the refresh that just finished
+                if time.time() - self._fees_updated > self.fee_ttl:
+                    await self._refresh_fees()
+        STAGE_SECONDS.observe(time.perf_counter() - started, stage="fees")
+        return fee_fields(*self._fee_params, multiplier)
+
+    async def _refresh_fees(self):
+        block = await self.w3.eth.get_block("latest")
+        base_fee = block.get("baseFeePerGas")
+        if base_fee is not None:
+            try:
+                priority_fee = int(await self.w3.eth.max_priority_fee)
+            except Exception:
+                priority_fee = self.default_priority_fee
+            self._fee_params = (base_fee, priority_fee, None)
+        else:
+            self._fee_params = (None, None, int(await self.w3.eth.gas_price))
+        self._fees_updated = time.time()
+
+    async def sync(self):
+        """Re-read the pending nonce from the node."""
+        self._nonce_lock = self._nonce_lock or asyncio.Lock()
+        async with self._nonce_lock:
+            pending = await self.w3.eth.get_transaction_count(self.account.address, "pending")
+            mined = await self.w3.eth.get_transaction_count(self.account.address, "latest")
+            # Never move backwards: nonces handed out but not yet broadcast are invisible to the node
+            self._next = max(pending, self._next or 0)
+            self._free = {n for n in self._free if mined <= n < self._next}
+            for n in [n for n in self._in_flight if n < mined]:
+                del self._in_flight[n]
+        return self._next
+
+    async def allocate(self):
+        if self._next is None:
+            await self.sync()
+        if self._free:
+            nonce = min(self._free)
+            self._free.discard(nonce)
+            return nonce
+        nonce = self._next
+        self._next += 1
+        return nonce
+
+    def release(self, nonce):
+        """Return a nonce whose transaction was never broadcast."""
+        self._in_flight.pop(nonce, None)
+        if self._next is not None and nonce < self._next:
+            self._free.add(nonce)
+
+    def mark_sent(self, nonce, tx_hash, tx):
+        self._in_flight[nonce] = {"tx": dict(tx), "tx_hash": tx_hash, "sent_at": time.time()}
+
+    def confirm(self, nonce):
+        self._in_flight.pop(nonce, None)
+
+    async def sign_and_send(self, tx):
+        """
+        Assign a local nonce to ``tx``, sign it and broadcast it.
+
+        Returns:
+            tuple: (tx_hash, nonce)
+        """
+        last_error = None
+        for _ in range(self.max_retries + 1):
+            nonce = await self.allocate()
+            tx["nonce"] = nonce
+            try:
+                with STAGE_SECONDS.time(stage="sign"):
+                    signed_tx = self.account.sign_transaction(tx)
+                try:
+                    with STAGE_SECONDS.time(stage="send"):
+                        tx_hash = await self.w3.eth.send_raw_transaction(signed_tx.raw_transaction)
+                except Exception as e:
+                    if not _error_matches(e, ALREADY_KNOWN_ERRORS):
+                        raise
+                    tx_hash = signed_tx.hash
+            except Exception as e:
+                last_error = e
+                if _error_matches(e, NONCE_TOO_LOW_ERRORS):
+                    log.warning("Nonce %s rejected (%s); resyncing from node", nonce, e)
+                    await self.sync()
+                    continue
+                self.release(nonce)
+                raise
+            self.mark_sent(nonce, tx_hash, tx)
+            return tx_hash, nonce
+        raise last_error
+
+    async def repair(self):
+        """
+        Unblock the account's transaction queue, like ``NonceManager.repair``.
+
+        Fills released nonces that were never reused with a no-op self-transfer,
+        and re-broadcasts the lowest in-flight transaction with bumped fees once
+        it has been pending for longer than ``stuck_after`` seconds.
+        """
+        mined = await self.w3.eth.get_transaction_count(self.account.address, "latest")
+        now = time.time()
+        for n in [n for n in self._in_flight if n < mined]:
+            del self._in_flight[n]
+        gaps = sorted(n for n in self._free if n >= mined)
+        self._free.difference_update(gaps)
+        stuck = self._in_flight.get(mined)
+        if stuck and now - stuck["sent_at"] < self.stuck_after:
+            stuck = None
+
+        for nonce in gaps:
+            noop = {
+                "to": self.account.address,
+                "value": 0,
+                "gas": 21000,
+                "gasPrice": await self.w3.eth.gas_price,
+                "chainId": await self.w3.eth.chain_id,
+            }
+            await self._rebroadcast(nonce, noop)
+
+        if stuck:
+            await self._rebroadcast(mined, dict(stuck["tx"]))
+
+    async def _rebroadcast(self, nonce, tx):
+        gas_price = await self.w3.eth.gas_price
+        if "maxFeePerGas" in tx:
+            # Type 2: both the tip and the fee cap must rise for the node to accept a replacement
+            tx["maxPriorityFeePerGas"] = int(tx["maxPriorityFeePerGas"] * REPLACEMENT_BUMP) + 1
+            tx["maxFeePerGas"] = max(int(tx["maxFeePerGas"] * REPLACEMENT_BUMP) + 1,
+                                     2 * gas_price + tx["maxPriorityFeePerGas"])
+        else:
+            tx["gasPrice"] = max(int(int(tx.get("gasPrice", 0)) * REPLACEMENT_BUMP) + 1, gas_price)
+        tx["nonce"] = nonce
+        previous = self._in_flight.get(nonce)
+        try:
+            signed_tx = self.account.sign_transaction(tx)
+            tx_hash = await self.w3.eth.send_raw_transaction(signed_tx.raw_transaction)
+            self.mark_sent(nonce, tx_hash, tx)
+            if previous:
+                self.receipts.replace(previous["tx_hash"], tx_hash)
+            log.info("Re-broadcast nonce %s with bumped fees: %s", nonce, Web3.to_hex(tx_hash))
+        except Exception as e:
+            if _error_matches(e, ("nonce too low", "already been used")):
+                # The original (or someone else's) transaction was mined meanwhile
+                self.confirm(nonce)
+                return
+            log.warning("Could not re-broadcast nonce %s: %s", nonce, e)
+            if nonce not in self._in_flight:
+                self._free.add(nonce)
+
+    def start_monitor(self, interval=30):
+        """Run ``repair`` every ``interval`` seconds in a task on the running loop; returns the task."""
+        if self._monitor is None or self._monitor.done():
+            self._monitor = asyncio.get_running_loop().create_task(self._repair_loop(interval))
+        return self._monitor
+
+    async def _repair_loop(self, interval):
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await self.repair()
+            except Exception as e:
+                log.warning("Nonce repair failed: %s", e)
+
+    async def estimate_gas(self, tx, live=False):
+        """
+        Returns:
+            tuple: (gas limit with buffer, True if served from the cache)
+        """
+        with STAGE_SECONDS.time(stage="gas_estimate"):
+            cached = None if live else self.gas_estimates.cached(tx)
+            if cached is not None:
+                return cached, True
+            return self.gas_estimates.record(tx, await self.w3.eth.estimate_gas(gas_call(tx))), False
+
+    async def send(self, tx):
+        """
+        Sign and broadcast ``tx`` without waiting for it, like ``TransactionSender.send``.
+
+        A send rejected for a too-low cached gas limit is retried once with a
+        live estimate. A cached limit that later runs out of gas on-chain is
+        dropped from the cache once the receipt is in, and the nonce is
+        confirmed then.
+
+        Returns:
+            HexBytes: transaction hash
+        """
+        tx["gas"], cached_gas = await self.estimate_gas(tx)
+        try:
+            tx_hash, nonce = await self.sign_and_send(tx)
+        except Exception as e:
+            if not (cached_gas and is_out_of_gas(error=e)):
+                raise
+            self.gas_estimates.invalidate(tx)
+            tx["gas"], cached_gas = await self.estimate_gas(tx, live=True)
+            tx_hash, nonce = await self.sign_and_send(tx)
+        gas_limit = tx["gas"]
+
+        def mined(future):
+            if future.cancelled() or future.exception() is not None:
+                return
+            self.confirm(nonce)
+            if cached_gas and is_out_of_gas(receipt=future.result(), gas_limit=gas_limit):
+                self.gas_estimates.invalidate(tx)
+
+        self.receipts.watch(tx_hash).add_done_callback(mined)
+        return tx_hash
+
+    async def send_and_wait(self, tx):
+        """
+        Sign and send ``tx`` and wait for its receipt, like ``TransactionSender.send_and_wait``.
+
+        Returns:
+            tuple: (tx_hash, receipt), receipt is None if the tx was not mined in time
+        """
+        for attempt in range(2):
+            tx["gas"], cached_gas = await self.estimate_gas(tx, live=attempt > 0)
+            try:
+                tx_hash, nonce = await self.sign_and_send(tx)
+            except Exception as e:
+                if cached_gas and is_out_of_gas(error=e):
+                    self.gas_estimates.invalidate(tx)
+                    continue
+                raise
+            receipt = await self.receipts.wait(tx_hash)
+            if not receipt:
+                return tx_hash, None
+            self.confirm(nonce)
+            if cached_gas and is_out_of_gas(receipt=receipt, gas_limit=tx["gas"]):
+                self.gas_estimates.invalidate(tx)
+                continue
+            break
+        return tx_hash, receipt
+
+    async def supports(self, function_name):
+        """Whether the deployed contract's runtime code contains ``function_name``'s selector."""
+        code = bytes(await self.w3.eth.get_code(self.contracts.address))
+        return self.contracts.selectors[function_name] in code
@@ -0,0 +1,271 @@
+import asyncio
+import logging
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+
+from jobs import JobQueue
+
+log = logging.getLogger(__name__)
+
+
+class BatchMetrics:
+    """Rolling batch-size and queueing-delay figures over the last ``window`` batches."""
+
+    def __init__(self, window=1000):
+        self._lock = threading.Lock()
+        self._sizes = deque(maxlen=window)
+        self._delays = deque(maxlen=window * 8)
+        self.batches = 0
+        self.items = 0
+
+    def record(self, size, delays):
+        with self._lock:
+            self.batches += 1
+            self.items += size
+            self._sizes.append(size)
+            self._delays.extend(delays)
+
+    def snapshot(self):
+        with self._lock:
+            sizes = list(self._sizes)
+            delays = sorted(self._delays)
+
+        def pct(q):
+            return round(delays[min(len(delays) - 1, int(q * len(delays)))] * 1000, 2) if delays else None
+
+        return {
+            "batches": self.batches,
+            "items": self.items,
+            "meanBatchSize": round(sum(sizes) / len(sizes), 2) if sizes else None,
+            "maxBatchSize": max(sizes) if sizes else None,
+            "queueDelayP50Ms": pct(0.50),
+            "queueDelayP99Ms": pct(0.99),
+        }
+
+
+class MicroBatcher:
+    """
+    Collects items from concurrent callers and processes them in batches.
+
+    ``submit`` queues an item and returns a Future. A flusher thread takes a
+    batch once ``max_batch`` items are waiting or the oldest has waited
+    ``max_wait`` seconds, and runs ``process(items)`` on one of ``workers``
+    sender threads. ``process`` returns one result per item, in order; an
+    Exception in that list fails only its own item's Future, and an
+    exception raised by ``process`` fails the whole batch. Batch sizes and
+    queueing delays are kept in ``metrics``. Threads start on the first
+    ``submit``. With ``max_pending`` set, at most that many items are
+    queued or being processed; ``submit`` waits for room.
+    """
+
+    def __init__(self, process, max_batch=8, max_wait=0.02, workers=2, name="micro-batcher", max_pending=0):
+        self.process = process
+        self.max_batch = max(1, int(max_batch))
+        self.max_wait = max_wait
+        self.name = name
+        self.max_pending = max_pending
+        self.metrics = BatchMetrics()
+        self._senders = JobQueue(f"{name}-send", self._process, workers=workers)
+        # One permit per item from submit until its Future is resolved
+        self._room = threading.BoundedSemaphore(max_pending) if max_pending > 0 else None
+        self._pending = []
+        self._cond = threading.Condition()
+        self._thread = None
+        self._stopping = False
+
+    def submit(self, item, timeout=None):
+        """
+        Queue ``item`` for the next batch.
+
+        Args:
+            timeout (float, optional): Max seconds to wait for room when ``max_pending`` is reached
+
+        Returns:
+            Future: Resolved with the item's result
+
+        Raises:
+            queue.Full: If the batcher stays full for ``timeout`` seconds
+        """
+        if self._room is not None and not self._room.acquire(timeout=timeout):
+            raise queue.Full(f"{self.name} already has {self.max_pending} items queued or in progress")
+        future = Future()
+        with self._cond:
+            self._ensure_running()
+            self._pending.append((item, future, time.time()))
+            self._cond.notify()
+        return future
+
+    def pending(self):
+        with self._cond:
+            return len(self._pending)
+
+    def flush(self):
+        """Process everything queued right now, on the calling thread."""
+        with self._cond:
+            batch, self._pending = self._pending, []
+        self._process(batch)
+
+    def stop(self, wait=True):
+        with self._cond:
+            self._stopping = True
+            self._cond.notify()
+        if wait and self._thread:
+            self._thread.join()
+        self._thread = None
+        self._senders.stop(wait=wait)
+
+    def _ensure_running(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._stopping = False
+        self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+        self._thread.start()
+
+    def _take(self):
+        """Block until a batch is due, then remove and return it (empty when stopping)."""
+        with self._cond:
+            while True:
+                if self._pending:
+                    due = self._pending[0][2] + self.max_wait
+                    if self._stopping or len(self._pending) >= self.max_batch or time.time() >= due:
+                        batch = self._pending[:self.max_batch]
+                        self._pending = self._pending[self.max_batch:]
+                        return batch
+                    self._cond.wait(due - time.time())
+                elif self._stopping:
+                    return []
+                else:
+                    self._cond.wait()
+
+    def _run(self):
+        while True:
+            batch = self._take()
+            if not batch:
+                return
+            self._senders.submit(batch)
+
+    def _process(self, batch):
+        if not batch:
+            return
+        started = time.time()
+        self.metrics.record(len(batch), [started - queued for _, _, queued in batch])
+        try:
+            results = self.process([item for item, _, _ in batch])
+        except Exception as e:
+            log.exception("%s batch failed", self.name)
+            results = [e] * len(batch)
+        for (_, future, _), result in zip(batch, results):
+            if isinstance(result, Exception):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
+            if self._room is not None:
+                self._room.release()
+
+
+class AsyncMicroBatcher:
+    """
+    ``MicroBatcher`` for asyncio code: ``await submit(item)`` returns the item's result.
+
+    ``process`` is a coroutine function taking a list of items and returning
+    one result per item (an Exception fails only its own item). A batch is
+    started once ``max_batch`` items are waiting or the oldest has waited
+    ``max_wait`` seconds; at most ``concurrency`` batches run at once and the
+    rest wait their turn. Everything runs on the event loop that first
+    calls ``submit``; no threads are involved. ``max_pending`` bounds the
+    items queued or being processed, as in ``MicroBatcher``.
+    """
+
+    def __init__(self, process, max_batch=8, max_wait=0.02, concurrency=2, name="micro-batcher", max_pending=0):
+        self.process = process
+        self.max_batch = max(1, int(max_batch))
+        self.max_wait = max_wait
+        self.concurrency = max(1, int(concurrency))
+        self.name = name
+        self.max_pending = max_pending
+        self.metrics = BatchMetrics()
+        self._pending = []
+        self._timer = None
+        self._slots = None
+        self._room = None
+        self._tasks = set()
+
+    async def submit(self, item, timeout=None):
+        """
+        Queue ``item`` and wait for its result.
+
+        Args:
+            timeout (float, optional): Max seconds to wait for room, and then for the result
+
+        Raises:
+            queue.Full: If the batcher stays full for ``timeout`` seconds
+            TimeoutError: If the result takes longer than ``timeout`` seconds
+        """
+        if self.max_pending > 0:
+            if self._room is None:
+                self._room = asyncio.Semaphore(self.max_pending)
+            try:
+                await asyncio.wait_for(self._room.acquire(), timeout)
+            except TimeoutError:
+                raise queue.Full(f"{self.name} already has {self.max_pending} items queued or in progress") from None
+        future = asyncio.get_running_loop().create_future()
+        self._pending.append((item, future, time.time()))
+        if len(self._pending) >= self.max_batch:
+            self._dispatch()
+        elif self._timer is None:
+            self._timer = asyncio.get_running_loop().call_later(self.max_wait, self._dispatch)
+        try:
+            return await asyncio.wait_for(asyncio.shield(future), timeout)
+        except TimeoutError:
+            # The item stays in its batch, which still resolves it (and frees its room) for nobody to read
+            future.add_done_callback(lambda f: f.cancelled() or f.exception())
+            raise
+
+    def pending(self):
+        return len(self._pending)
+
+    async def flush(self):
+        """Process everything queued right now and wait for it."""
+        while self._pending:
+            batch, self._pending = self._pending[:self.max_batch], self._pending[self.max_batch:]
+            await self._process(batch)
+
+    def _dispatch(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        while len(self._pending) >= self.max_batch or (self._pending and self._due()):
+            batch, self._pending = self._pending[:self.max_batch], self._pending[self.max_batch:]
+            task = asyncio.get_running_loop().create_task(self._process(batch))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+        if self._pending:
+            delay = self._pending[0][2] + self.max_wait - time.time()
+            self._timer = asyncio.get_running_loop().call_later(max(0.0, delay), self._dispatch)
+
+    def _due(self):
+        return time.time() >= self._pending[0][2] + self.max_wait
+
+    async def _process(self, batch):
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.concurrency)
+        async with self._slots:
+            started = time.time()
+            self.metrics.record(len(batch), [started - queued for _, _, queued in batch])
+            try:
+                results = await self.process([item for item, _, _ in batch])
+            except Exception as e:
+                log.exception("%s batch failed", self.name)
+                results = [e] * len(batch)
+        for (_, future, _), result in zip(batch, results):
+            if self._room is not None:
+                self._room.release()
+            if future.done():
+                continue
+            if isinstance(result, Exception):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
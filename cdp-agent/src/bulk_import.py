@@ -0,0 +1,287 @@
+"""
+Bulk grievance import: an NDJSON manifest plus the images it names.
+
+A POST to /bulk_import carries a ``manifest`` part with one JSON object per
+line (``title``, ``description``, ``location``, ``image`` and optionally
+``idempotencyKey``). The images come as one ``archive`` part (zip or tar)
+whose member names the ``image`` values refer to, or as separate file
+parts whose filenames they refer to. ``save_upload`` copies the parts out
+of the request so the import can outlive it. ``iter_items`` then reads the
+manifest line by line and opens each image only when its line comes up.
+``ImportJobs`` tracks every item of an import under a job id.
+"""
+import json
+import os
+import shutil
+import sqlite3
+import tarfile
+import threading
+import time
+import uuid
+import zipfile
+
+from image_ingest import ImageRejected
+
+MANIFEST_NAME = "manifest.ndjson"
+ARCHIVE_NAME = "images.archive"
+IMAGES_DIR = "images"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS import_jobs (
+    job_id TEXT PRIMARY KEY,
+    created_at REAL NOT NULL,
+    finished_at REAL,
+    total INTEGER
+);
+CREATE INDEX IF NOT EXISTS idx_import_jobs_created_at ON import_jobs (created_at);
+CREATE TABLE IF NOT EXISTS import_items (
+    job_id TEXT NOT NULL,
+    idx INTEGER NOT NULL,
+    tracking_id TEXT,
+    status TEXT NOT NULL,
+    error TEXT,
+    PRIMARY KEY (job_id, idx)
+);
+"""
+
+
+def save_upload(directory, manifest, archive=None, images=()):
+    """
+    Copy the parts of a bulk import request into ``directory``.
+
+    Args:
+        directory (str): Empty directory owned by the import
+        manifest: NDJSON text (str / bytes) or a binary file object
+        archive: Binary file object of a zip or tar with the images, or None
+        images (iterable): (filename, binary file object) per image part;
+            only the last path component of a filename is kept
+    """
+    with open(os.path.join(directory, MANIFEST_NAME), "wb") as f:
+        if isinstance(manifest, (str, bytes)):
+            f.write(manifest.encode("utf-8") if isinstance(manifest, str) else manifest)
+        else:
+            shutil.copyfileobj(manifest, f)
+    if archive is not None:
+        with open(os.path.join(directory, ARCHIVE_NAME), "wb") as f:
+            shutil.copyfileobj(archive, f)
+    images_dir = os.path.join(directory, IMAGES_DIR)
+    os.makedirs(images_dir, exist_ok=True)
+    for filename, fileobj in images:
+        name = os.path.basename((filename or "").replace("\\", "/"))
+        if name:
+            with open(os.path.join(images_dir, name), "wb") as f:
+                shutil.copyfileobj(fileobj, f)
+
+
+class ImageSource:
+    """Images of a saved import by manifest name: archive members if an archive was sent, else the image parts."""
+
+    def __init__(self, directory):
+        self._zip = self._tar = None
+        self._images_dir = os.path.join(directory, IMAGES_DIR)
+        archive = os.path.join(directory, ARCHIVE_NAME)
+        if os.path.exists(archive):
+            if zipfile.is_zipfile(archive):
+                self._zip = zipfile.ZipFile(archive)
+            elif tarfile.is_tarfile(archive):
+                self._tar = tarfile.open(archive, "r:*")
+            else:
+                raise ValueError("archive is neither a zip nor a tar file")
+
+    def read(self, name, max_bytes):
+        """
+        Bytes of image ``name``.
+
+        Raises:
+            ImageRejected: Missing (404) or larger than ``max_bytes`` (413)
+        """
+        try:
+            if self._zip is not None:
+                info = self._zip.getinfo(name)
+                size, open_member = info.file_size, lambda: self._zip.open(info)
+            elif self._tar is not None:
+                member = self._tar.getmember(name)
+                if not member.isfile():
+                    raise KeyError(name)
+                size, open_member = member.size, lambda: self._tar.extractfile(member)
+            else:
+                path = os.path.join(self._images_dir, os.path.basename(name))
+                size, open_member = os.path.getsize(path), lambda: open(path, "rb")
+        except (KeyError, OSError):
+            raise ImageRejected(f"Image {name!r} is not in the upload", 404)
+        if size > max_bytes:
+            raise ImageRejected(f"Image {name!r} is larger than {max_bytes} bytes", 413)
+        with open_member() as f:
+            # Sizes in an archive header can lie; never read more than the limit
+            data = f.read(max_bytes + 1)
+        if len(data) > max_bytes:
+            raise ImageRejected(f"Image {name!r} is larger than {max_bytes} bytes", 413)
+        return data
+
+    def close(self):
+        for archive in (self._zip, self._tar):
+            if archive is not None:
+                archive.close()
+
+
+def iter_items(directory, max_bytes, max_items):
+    """
+    Stream the items of a saved import.
+
+    Yields:
+        tuple: (index, fields, image bytes, error), with ``error`` set (and
+        ``image`` None) for a line that cannot be imported
+    """
+    images = ImageSource(directory)
+    try:
+        with open(os.path.join(directory, MANIFEST_NAME), encoding="utf-8", errors="replace") as manifest:
+            index = 0
+            for line in manifest:
+                if not line.strip():
+                    continue
+                if index >= max_items:
+                    yield index, {}, None, f"imports are limited to {max_items} items"
+                    index += 1
+                    continue
+                try:
+                    fields = json.loads(line)
+                    if not isinstance(fields, dict) or not isinstance(fields.get("image"), str):
+                        raise ValueError("expected an object with an image name")
+                    image = images.read(fields["image"], max_bytes)
+                except ImageRejected as e:
+                    yield index, fields, None, str(e)
+                except ValueError as e:
+                    yield index, {}, None, f"invalid manifest line: {e}"
+                else:
+                    yield index, fields, image, None
+                index += 1
+    finally:
+        images.close()
+
+
+def item_fields(fields):
+    """(title, description, location, idempotencyKey) of a manifest item, with /submit_grievance's defaults."""
+    return (
+        str(fields.get("title") or "Untitled Grievance"),
+        str(fields.get("description") or "No description provided"),
+        str(fields.get("location") or "Unknown"),
+        str(fields.get("idempotencyKey") or "").strip(),
+    )
+
+
+class ImportJobs:
+    """
+    Per-item progress of bulk imports, by job id.
+
+    Items are recorded as the import reaches them: ``rejected`` with an
+    error, ``duplicate`` with the trackingId of an earlier submission, or
+    ``queued`` with the trackingId of the new grievance (whose live status
+    is in the grievance store). Only the newest ``max_jobs`` jobs are kept,
+    each for at most ``ttl`` seconds. ``path`` is a SQLite file, so worker
+    processes sharing it can report on each other's imports; the default
+    keeps everything in memory.
+    """
+
+    def __init__(self, path=":memory:", max_jobs=1000, ttl=7 * 24 * 3600):
+        self.max_jobs = max_jobs
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        if path != ":memory:":
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute("PRAGMA synchronous=NORMAL")
+            self._db.execute("PRAGMA busy_timeout=5000")
+        self._db.executescript(_SCHEMA)
+
+    def create(self):
+        """Start a job; returns its id."""
+        job_id = f"IMP-{uuid.uuid4().hex[:12].upper()}"
+        now = time.time()
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            self._db.execute("INSERT INTO import_jobs (job_id, created_at) VALUES (?, ?)", (job_id, now))
+            # Expired jobs, then the oldest beyond max_jobs, with their items
+            self._db.execute(
+                "DELETE FROM import_jobs WHERE created_at < ? OR job_id IN "
+                "(SELECT job_id FROM import_jobs ORDER BY created_at DESC LIMIT -1 OFFSET ?)",
+                (now - self.ttl, self.max_jobs),
+            )
+            self._db.execute("DELETE FROM import_items WHERE job_id NOT IN (SELECT job_id FROM import_jobs)")
+            self._db.execute("COMMIT")
+        return job_id
+
+    def record(self, job_id, items):
+        """Record [(index, status, trackingId, error), ...] for ``job_id``."""
+        with self._lock:
+            self._db.executemany(
+                "INSERT OR REPLACE INTO import_items (job_id, idx, status, tracking_id, error) VALUES (?, ?, ?, ?, ?)",
+                [(job_id, index, status, tracking_id, error) for index, status, tracking_id, error in items],
+            )
+
+    def finish(self, job_id, total):
+        """Mark the manifest of ``job_id`` as fully read, with ``total`` items."""
+        with self._lock:
+            self._db.execute(
+                "UPDATE import_jobs SET finished_at = ?, total = ? WHERE job_id = ?", (time.time(), total, job_id)
+            )
+
+    def get(self, job_id):
+        """
+        Returns:
+            dict: jobId, createdAt, finishedAt (None while the manifest is
+            being read), total and items ([{index, status, trackingId, error}]),
+            or None for an unknown job
+        """
+        with self._lock:
+            job = self._db.execute(
+                "SELECT created_at, finished_at, total FROM import_jobs WHERE job_id = ?", (job_id,)
+            ).fetchone()
+            if job is None:
+                return None
+            rows = self._db.execute(
+                "SELECT idx, status, tracking_id, error FROM import_items WHERE job_id = ? ORDER BY idx", (job_id,)
+            ).fetchall()
+        return {
+            "jobId": job_id,
+            "createdAt": job[0],
+            "finishedAt": job[1],
+            "total": job[2],
+            "items": [{"index": i, "status": s, "trackingId": t, "error": e} for i, s, t, e in rows],
+        }
+
+    def close(self):
+        self._db.close()
+
+
+def item_progress(item, record):
+    """
+    Live status of an imported item, from its grievance record when it has one.
+
+    ``classifying`` until the grievance has a category, then ``submitting``
+    until the chain submission ends in ``success`` or ``failed``;
+    ``rejected`` items keep their error.
+    """
+    if record is None:
+        return dict(item)
+    status = record["blockchainStatus"]
+    if status == "pending":
+        status = "classifying" if record["category"] == "unclassified" else "submitting"
+    return dict(item, status=status, duplicate=item["status"] == "duplicate", category=record["category"],
+                tx_hash=record.get("tx_hash"), error=record.get("blockchainError") or item["error"])
+
+
+def summarize(job, items):
+    """The /bulk_import/<jobId> body: the job, per-status counts and ``items`` (already through ``item_progress``)."""
+    counts = {}
+    for item in items:
+        counts[item["status"]] = counts.get(item["status"], 0) + 1
+    open_items = sum(counts.get(s, 0) for s in ("queued", "classifying", "submitting"))
+    return {
+        "jobId": job["jobId"],
+        "state": "reading" if job["finishedAt"] is None else "processing" if open_items else "done",
+        "total": job["total"],
+        "read": len(items),
+        "counts": counts,
+        "createdAt": job["createdAt"],
+        "items": items,
+    }
@@ -0,0 +1,39 @@
+import logging
+
+from tx_scheduler import TransactionScheduler
+
+log = logging.getLogger(__name__)
+
+
+class SubmissionBatcher(TransactionScheduler):
+    """
+    Groups grievance submissions into batch transactions, most urgent first.
+
+    ``submit(grievance)`` returns a Future for the grievance's result dict
+    (``success``, ``tx_hash``, ``error``). Grievances queue by their
+    ``priorityLevel`` and are handed to ``submit_batch(grievances,
+    fee_multiplier)`` one tier at a time, once ``max_batch`` are waiting or
+    the oldest has waited ``max_wait`` seconds; ``submit_batch`` returns a
+    dict trackingId -> result, and grievances missing from it get a failed
+    result. Up to ``max_in_flight`` batches are in flight at once.
+    """
+
+    def __init__(self, submit_batch, fee_multipliers=None, max_batch=20, max_wait=2.0, max_in_flight=2,
+                 aging=60.0, lane="submit"):
+        super().__init__(
+            self._submit_batch, lane, fee_multipliers=fee_multipliers, max_batch=max_batch, max_wait=max_wait,
+            max_in_flight=max_in_flight, aging=aging,
+        )
+        self.submit_batch = submit_batch
+
+    def submit(self, grievance):
+        return super().submit(grievance, grievance.get("priorityLevel"))
+
+    def _submit_batch(self, grievances, fee_multiplier):
+        try:
+            results = self.submit_batch(grievances, fee_multiplier)
+            error = "no result for grievance in batch"
+        except Exception as e:
+            log.error("%s batch failed: %s", self.lane, e)
+            results, error = {}, str(e)
+        return [results.get(g["trackingId"]) or {"success": False, "error": error} for g in grievances]
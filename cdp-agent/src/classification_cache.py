@@ -0,0 +1,121 @@
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS classifications (
+    key TEXT PRIMARY KEY,
+    result TEXT NOT NULL,
+    created_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_classifications_created_at ON classifications (created_at);
+"""
+
+
+def classification_key(image_bytes, labels, model=""):
+    """Content address of a classification: sha256 over the image, the sorted label set and the model."""
+    digest = hashlib.sha256(image_bytes)
+    digest.update(b"\0".join(label.encode("utf-8") for label in sorted(set(labels))))
+    digest.update(b"\0" + model.encode("utf-8"))
+    return digest.hexdigest()
+
+
+class ClassificationCache:
+    """
+    Two-tier cache of classification results keyed by ``classification_key``.
+
+    The first tier is an in-memory LRU of ``max_entries`` results. When
+    ``path`` is set, results are also written to a SQLite table and served
+    from it for ``ttl`` seconds, so they survive restarts; the table is
+    trimmed to its ``max_disk_entries`` newest rows whenever it grows past
+    that. ``stats()`` reports hits per tier and misses.
+    """
+
+    def __init__(self, max_entries=1024, path=None, ttl=7 * 24 * 3600, max_disk_entries=100000):
+        self.max_entries = max_entries
+        self.path = path
+        self.ttl = ttl
+        self.max_disk_entries = max_disk_entries
+        self._lock = threading.Lock()
+        self._memory = OrderedDict()
+        self._hits = 0
+        self._disk_hits = 0
+        self._misses = 0
+        self._db = None
+        self._disk_rows = 0
+        if path:
+            self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute("PRAGMA synchronous=NORMAL")
+            self._db.executescript(_SCHEMA)
+            self._db.execute("DELETE FROM classifications WHERE created_at < ?", (time.time() - ttl,))
+            self._disk_rows = self._db.execute("SELECT COUNT(*) FROM classifications").fetchone()[0]
+
+    def get(self, key):
+        """Return a copy of the cached result for ``key``, or None."""
+        with self._lock:
+            result = self._memory.get(key)
+            if result is not None:
+                self._memory.move_to_end(key)
+                self._hits += 1
+                return dict(result)
+            if self._db is not None:
+                row = self._db.execute(
+                    "SELECT result FROM classifications WHERE key = ? AND created_at >= ?",
+                    (key, time.time() - self.ttl),
+                ).fetchone()
+                if row is not None:
+                    result = json.loads(row[0])
+                    self._remember(key, result)
+                    self._disk_hits += 1
+                    return dict(result)
+            self._misses += 1
+            return None
+
+    def put(self, key, result):
+        with self._lock:
+            self._remember(key, dict(result))
+            if self._db is None:
+                return
+            self._db.execute(
+                "INSERT OR REPLACE INTO classifications (key, result, created_at) VALUES (?, ?, ?)",
+                (key, json.dumps(result, separators=(",", ":")), time.time()),
+            )
+            self._disk_rows += 1
+            if self._disk_rows > self.max_disk_entries * 1.1:
+                self._evict()
+
+    def _remember(self, key, result):
+        self._memory[key] = result
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def _evict(self):
+        # Expired rows first, then the oldest until max_disk_entries remain
+        self._db.execute("DELETE FROM classifications WHERE created_at < ?", (time.time() - self.ttl,))
+        self._db.execute(
+            "DELETE FROM classifications WHERE key IN "
+            "(SELECT key FROM classifications ORDER BY created_at DESC LIMIT -1 OFFSET ?)",
+            (self.max_disk_entries,),
+        )
+        self._disk_rows = self._db.execute("SELECT COUNT(*) FROM classifications").fetchone()[0]
+
+    def stats(self):
+        with self._lock:
+            lookups = self._hits + self._disk_hits + self._misses
+            return {
+                "hits": self._hits,
+                "diskHits": self._disk_hits,
+                "misses": self._misses,
+                "hitRate": (self._hits + self._disk_hits) / lookups if lookups else 0.0,
+                "entries": len(self._memory),
+                "diskEntries": self._disk_rows if self._db is not None else None,
+            }
+
+    def close(self):
+        if self._db is not None:
+            self._db.close()
@@ -0,0 +1,376 @@
+import asyncio
+import base64
+import io
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import httpx
+import requests
+
+from http_client import RETRY_STATUSES, AsyncResilientClient, CircuitBreaker, CircuitOpenError, ResilientClient
+from metrics import INFERENCE_SECONDS
+
+HF_CLIP_URL = "https://api-inference.huggingface.co/models/openai/clip-vit-base-patch32"
+
+
+class ClassifierError(Exception):
+    """Classification failed; ``status_code`` is set for HTTP errors (503 = model not available)."""
+
+    def __init__(self, message, status_code=None):
+        super().__init__(message)
+        self.status_code = status_code
+
+    @property
+    def unavailable(self):
+        """True if the service was down or overloaded, so the same image may classify later."""
+        return self.status_code in RETRY_STATUSES
+
+
+class Classifier:
+    """
+    Zero-shot image classification against a list of text labels.
+
+    ``classify`` returns ``[{"label", "score"}, ...]`` ordered by score, the
+    same shape the Hugging Face inference API answers with.
+    ``classify_batch`` returns one entry per image: its results, or the
+    ClassifierError that image failed with. Backends implement either.
+    """
+
+    name = "classifier"
+
+    def prepare(self, labels):
+        """Do any per-label-set work up front (a no-op unless the backend needs it)."""
+
+    def classify(self, image_bytes, labels):
+        result = self.classify_batch([image_bytes], labels)[0]
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+    def classify_batch(self, images, labels):
+        results = []
+        for image_bytes in images:
+            try:
+                results.append(self.classify(image_bytes, labels))
+            except ClassifierError as e:
+                results.append(e)
+        return results
+
+
+class RemoteClipClassifier(Classifier):
+    """
+    CLIP zero-shot classification through the Hugging Face inference API, one request per image.
+
+    Requests go through a ``ResilientClient`` (pooled connections, timeouts,
+    retries, circuit breaker). Timeouts, connection errors and an open
+    breaker surface as ``ClassifierError`` with status 503.
+
+    The hosted endpoint takes one image per request, so a batch is sent as
+    ``parallelism`` concurrent requests over the pooled connections. With
+    ``batch_payloads`` (endpoints that accept a list under ``image``, such
+    as a self-hosted server) a batch is a single request.
+    """
+
+    name = "hf-clip-vit-base-patch32"
+
+    def __init__(self, api_key, url=HF_CLIP_URL, client=None, parallelism=8, batch_payloads=False):
+        self.url = url
+        self.client = client or ResilientClient()
+        self.headers = {"Authorization": f"Bearer {api_key}"}
+        self.parallelism = parallelism
+        self.batch_payloads = batch_payloads
+        # Threads are only spawned when a batch is first sent
+        self._pool = ThreadPoolExecutor(max_workers=parallelism, thread_name_prefix="clip-request")
+
+    def classify_batch(self, images, labels):
+        if len(images) == 1:
+            return [self._classify_or_error(images[0], labels)]
+        if self.batch_payloads:
+            try:
+                return self._post([base64.b64encode(b).decode("utf-8") for b in images], labels)
+            except ClassifierError as e:
+                return [e] * len(images)
+        return list(self._pool.map(lambda b: self._classify_or_error(b, labels), images))
+
+    def _classify_or_error(self, image_bytes, labels):
+        try:
+            return self.classify(image_bytes, labels)
+        except ClassifierError as e:
+            return e
+
+    def classify(self, image_bytes, labels):
+        return self._post(base64.b64encode(image_bytes).decode("utf-8"), labels)
+
+    def _post(self, image, labels):
+        started = time.perf_counter()
+        try:
+            response = self.client.post(self.url, headers=self.headers, json=_payload(image, labels))
+        except CircuitOpenError as e:
+            INFERENCE_SECONDS.observe(time.perf_counter() - started, status="circuit_open")
+            raise ClassifierError(str(e), 503) from e
+        except requests.RequestException as e:
+            INFERENCE_SECONDS.observe(time.perf_counter() - started, status="unreachable")
+            raise ClassifierError(f"CLIP API unreachable: {e}", 503) from e
+        INFERENCE_SECONDS.observe(time.perf_counter() - started, status=response.status_code)
+        return _parse_response(response, batched=isinstance(image, list))
+
+
+class AsyncRemoteClipClassifier:
+    """
+    ``RemoteClipClassifier`` for asyncio code, over an ``AsyncResilientClient``.
+
+    ``classify`` and ``classify_batch`` are coroutines with the same results
+    and errors. A batch without ``batch_payloads`` is sent as concurrent
+    requests, bounded only by the client's connection pool.
+    """
+
+    name = RemoteClipClassifier.name
+
+    def __init__(self, api_key, url=HF_CLIP_URL, client=None, batch_payloads=False):
+        self.url = url
+        self.client = client or AsyncResilientClient()
+        self.headers = {"Authorization": f"Bearer {api_key}"}
+        self.batch_payloads = batch_payloads
+
+    async def classify_batch(self, images, labels):
+        if self.batch_payloads and len(images) > 1:
+            try:
+                return await self._post([base64.b64encode(b).decode("utf-8") for b in images], labels)
+            except ClassifierError as e:
+                return [e] * len(images)
+        return await asyncio.gather(*(self._classify_or_error(b, labels) for b in images))
+
+    async def _classify_or_error(self, image_bytes, labels):
+        try:
+            return await self.classify(image_bytes, labels)
+        except ClassifierError as e:
+            return e
+
+    async def classify(self, image_bytes, labels):
+        return await self._post(base64.b64encode(image_bytes).decode("utf-8"), labels)
+
+    async def _post(self, image, labels):
+        started = time.perf_counter()
+        try:
+            response = await self.client.post(self.url, headers=self.headers, json=_payload(image, labels))
+        except CircuitOpenError as e:
+            INFERENCE_SECONDS.observe(time.perf_counter() - started, status="circuit_open")
+            raise ClassifierError(str(e), 503) from e
+        except httpx.TransportError as e:
+            INFERENCE_SECONDS.observe(time.perf_counter() - started, status="unreachable")
+            raise ClassifierError(f"CLIP API unreachable: {e}", 503) from e
+        INFERENCE_SECONDS.observe(time.perf_counter() - started, status=response.status_code)
+        return _parse_response(response, batched=isinstance(image, list))
+
+    async def aclose(self):
+        await self.client.aclose()
+
+
+class ThreadedClassifier:
+    """
+    Runs a synchronous ``Classifier`` (e.g. the local CPU backend) off the
+    event loop, with the ``AsyncRemoteClipClassifier`` coroutine interface.
+    """
+
+    def __init__(self, classifier):
+        self.classifier = classifier
+        self.name = classifier.name
+
+    async def classify_batch(self, images, labels):
+        return await asyncio.to_thread(self.classifier.classify_batch, images, labels)
+
+    async def classify(self, image_bytes, labels):
+        return await asyncio.to_thread(self.classifier.classify, image_bytes, labels)
+
+    async def aclose(self):
+        pass
+
+
+def _payload(image, labels):
+    return {
+        "image": image,
+        "parameters": {"candidate_labels": list(labels)},
+    }
+
+
+def _parse_response(response, batched=False):
+    """Scores from an inference API response (requests or httpx), each list ordered by score."""
+    if response.status_code != 200:
+        raise ClassifierError(f"CLIP API error: {response.status_code} - {response.text}", response.status_code)
+    results = response.json()
+    if not isinstance(results, list) or not results:
+        raise ClassifierError("CLIP analysis failed")
+    if batched:
+        # One score list per image; an empty or malformed entry would surface later as an IndexError
+        if not all(isinstance(r, list) and r for r in results):
+            raise ClassifierError("CLIP analysis failed")
+        return [sorted(r, key=lambda x: x["score"], reverse=True) for r in results]
+    return sorted(results, key=lambda r: r["score"], reverse=True)
+
+
+class LocalClipClassifier(Classifier):
+    """
+    In-process zero-shot classification on CPU.
+
+    ``encoder`` turns images and texts into embeddings: it needs
+    ``encode_images(pil_images)`` and ``encode_texts(texts)`` returning 2-D
+    arrays, plus a ``logit_scale`` float. ``ClipEncoder`` wraps a CLIP
+    checkpoint; any object with that interface (e.g. a tiny random
+    projection) can stand in for it. Text embeddings of the ``prepare``d
+    label sets are computed once and kept as normalized matrices, so
+    classifying a batch is one image forward pass and one matrix product.
+    Any other label list (e.g. an ad-hoc query next to a prepared set) is
+    assembled per call from the prepared labels' rows, encoding only the
+    labels never prepared; nothing is kept for it, so arbitrary queries
+    cannot grow the cache.
+    """
+
+    def __init__(self, encoder, label_sets=()):
+        import numpy as np
+
+        self._np = np
+        self.encoder = encoder
+        self.name = f"local:{getattr(encoder, 'name', type(encoder).__name__)}"
+        self._label_matrices = {}
+        # label -> its row in a prepared matrix
+        self._label_rows = {}
+        for labels in label_sets:
+            self.prepare(labels)
+
+    def _normalize(self, matrix):
+        matrix = self._np.asarray(matrix, dtype=self._np.float32)
+        return matrix / self._np.linalg.norm(matrix, axis=-1, keepdims=True).clip(min=1e-12)
+
+    def prepare(self, labels):
+        labels = tuple(labels)
+        if labels not in self._label_matrices:
+            matrix = self._normalize(self.encoder.encode_texts(list(labels)))
+            self._label_matrices[labels] = matrix
+            self._label_rows.update(zip(labels, matrix))
+        return self._label_matrices[labels]
+
+    def _text_matrix(self, labels):
+        """Normalized text embeddings of ``labels``, one row per label."""
+        matrix = self._label_matrices.get(labels)
+        if matrix is not None:
+            return matrix
+        new = [label for label in dict.fromkeys(labels) if label not in self._label_rows]
+        rows = dict(zip(new, self._normalize(self.encoder.encode_texts(new)))) if new else {}
+        return self._np.stack([self._label_rows.get(label, rows.get(label)) for label in labels])
+
+    def classify_batch(self, images, labels):
+        from PIL import Image
+
+        np = self._np
+        labels = tuple(labels)
+        text = self._text_matrix(labels)
+        results, pil_images = [], []
+        for b in images:
+            try:
+                pil_images.append(Image.open(io.BytesIO(b)).convert("RGB"))
+                results.append(None)
+            except Exception as e:
+                results.append(ClassifierError(f"Could not decode image: {e}"))
+        if not pil_images:
+            return results
+        # One forward pass for every decodable image in the batch
+        image = self._normalize(self.encoder.encode_images(pil_images))
+
+        # Cosine similarity scaled like CLIP's logits, softmaxed over the labels
+        logits = self.encoder.logit_scale * image @ text.T
+        logits -= logits.max(axis=1, keepdims=True)
+        probs = np.exp(logits)
+        probs /= probs.sum(axis=1, keepdims=True)
+
+        rows = iter(probs)
+        for i, result in enumerate(results):
+            if result is None:
+                row = next(rows)
+                results[i] = [{"label": labels[j], "score": float(row[j])} for j in np.argsort(-row)]
+        return results
+
+
+class ClipEncoder:
+    """Image/text encoder backed by a CLIP checkpoint on local disk (transformers + torch)."""
+
+    def __init__(self, model_path, device="cpu"):
+        import torch
+        from transformers import CLIPModel, CLIPProcessor
+
+        self._torch = torch
+        self.name = os.path.basename(os.path.normpath(model_path))
+        self.device = device
+        self.model = CLIPModel.from_pretrained(model_path, local_files_only=True).to(device).eval()
+        self.processor = CLIPProcessor.from_pretrained(model_path, local_files_only=True)
+        self.logit_scale = float(self.model.logit_scale.exp())
+
+    def encode_images(self, images):
+        inputs = self.processor(images=images, return_tensors="pt").to(self.device)
+        with self._torch.inference_mode():
+            return self.model.get_image_features(**inputs).cpu().numpy()
+
+    def encode_texts(self, texts):
+        inputs = self.processor(text=texts, return_tensors="pt", padding=True).to(self.device)
+        with self._torch.inference_mode():
+            return self.model.get_text_features(**inputs).cpu().numpy()
+
+
+def open_classifier(backend=None, api_key=None, model_path=None, label_sets=()):
+    """
+    Build the classifier selected by CLASSIFIER_BACKEND.
+
+    ``remote`` (the default) calls the Hugging Face inference API (or
+    CLIP_API_URL) with ``api_key``, through a ResilientClient tuned by the
+    CLIP_* timeout/retry/breaker variables; ``local`` loads the CLIP
+    checkpoint at CLIP_MODEL_PATH and precomputes the text embeddings of
+    every label set in ``label_sets``.
+    """
+    backend = backend or os.getenv("CLASSIFIER_BACKEND", "remote")
+    if backend == "remote":
+        client = ResilientClient(**_client_settings())
+        return RemoteClipClassifier(
+            api_key,
+            url=os.getenv("CLIP_API_URL", HF_CLIP_URL),
+            client=client,
+            parallelism=int(os.getenv("CLIP_POOL_SIZE", "10")),
+            batch_payloads=os.getenv("CLIP_API_BATCH", "0") == "1",
+        )
+    if backend == "local":
+        model_path = model_path or os.getenv("CLIP_MODEL_PATH")
+        if not model_path:
+            raise ValueError("CLASSIFIER_BACKEND=local needs CLIP_MODEL_PATH")
+        return LocalClipClassifier(ClipEncoder(model_path), label_sets=label_sets)
+    raise ValueError(f"Unknown classifier backend: {backend}")
+
+
+def open_async_classifier(backend=None, api_key=None, model_path=None, label_sets=()):
+    """
+    Coroutine-based counterpart of ``open_classifier`` for the ASGI app.
+
+    ``remote`` talks to the API through an ``AsyncResilientClient`` (same
+    CLIP_* settings); ``local`` wraps the in-process classifier in a
+    ``ThreadedClassifier``.
+    """
+    backend = backend or os.getenv("CLASSIFIER_BACKEND", "remote")
+    if backend == "remote":
+        return AsyncRemoteClipClassifier(
+            api_key,
+            url=os.getenv("CLIP_API_URL", HF_CLIP_URL),
+            client=AsyncResilientClient(**_client_settings()),
+            batch_payloads=os.getenv("CLIP_API_BATCH", "0") == "1",
+        )
+    return ThreadedClassifier(open_classifier(backend, api_key, model_path, label_sets))
+
+
+def _client_settings():
+    return {
+        "pool_size": int(os.getenv("CLIP_POOL_SIZE", "10")),
+        "connect_timeout": float(os.getenv("CLIP_CONNECT_TIMEOUT", "3.05")),
+        "read_timeout": float(os.getenv("CLIP_READ_TIMEOUT", "30")),
+        "retries": int(os.getenv("CLIP_RETRIES", "2")),
+        "breaker": CircuitBreaker(
+            failure_threshold=int(os.getenv("CLIP_BREAKER_THRESHOLD", "5")),
+            reset_timeout=float(os.getenv("CLIP_BREAKER_RESET", "30")),
+        ),
+    }
@@ -0,0 +1,314 @@
+import logging
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from eth_abi import decode as abi_decode
+from eth_abi import encode as abi_encode
+from web3 import Web3
+
+from grievances import readable_justification
+
+log = logging.getLogger(__name__)
+
+# Multicall3 is deployed at the same address on every major EVM chain, including Avalanche
+MULTICALL3_ADDRESS = "0xcA11bde05977b3631167028862bE2a173976CA11"
+AGGREGATE3_SELECTOR = Web3.keccak(text="aggregate3((address,bool,bytes)[])")[:4]
+
+BASIC_TYPES = ["string", "string", "string", "string", "uint256", "string", "uint256", "address", "bool"]
+DETAILS_TYPES = ["uint256", "uint256", "string", "string"]
+
+
+def _selector(signature):
+    return Web3.keccak(text=signature)[:4]
+
+
+GET_BASIC_SELECTOR = _selector("getGrievanceBasic(string)")
+GET_DETAILS_SELECTOR = _selector("getGrievanceDetails(string)")
+GET_ALL_IDS_SELECTOR = _selector("getAllTrackingIds()")
+
+# GrievanceRegistry storage layout (contracts/GrievanceRegistry.sol): ``grievances`` is the first state
+# variable, so slot 0 holds its length and element i starts at keccak256(0) + i * GRIEVANCE_SLOTS;
+# trackingId is the struct's seventh slot
+GRIEVANCES_SLOT = 0
+GRIEVANCE_SLOTS = 13
+TRACKING_ID_OFFSET = 6
+
+
+def chain_record(tracking_id, basic, details):
+    """Map getGrievanceBasic/getGrievanceDetails outputs onto the stored grievance shape."""
+    (title, description, category, location, media_count,
+     priority_level, timestamp, submitter, resolved) = basic
+    estimated_days, fund_amount, currency, ai_justification = details
+    return {
+        "trackingId": tracking_id,
+        "title": title,
+        "description": description,
+        "location": location,
+        "category": category,
+        "priorityLevel": priority_level,
+        "estimatedDays": int(estimated_days),
+        "mediaCount": int(media_count),
+        "fundAmount": int(fund_amount),
+        "currency": currency,
+        "aiJustification": readable_justification(ai_justification),
+        "status": "resolved" if resolved else "submitted",
+        "createdAt": int(timestamp),
+        "updatedAt": int(time.time()),
+        "submitter": Web3.to_checksum_address(submitter),
+        "resolved": bool(resolved),
+        "blockchainStatus": "success",
+        "tx_hash": None,
+        "blockchainError": None,
+    }
+
+
+class BulkGrievanceReader:
+    """
+    Reads many grievances from GrievanceRegistry in a few round-trips.
+
+    Every id needs a ``getGrievanceBasic`` and a ``getGrievanceDetails``
+    call. Calldata is built from precomputed selectors and those calls are
+    packed ``chunk_size`` at a time into one Multicall3 ``aggregate3`` call
+    (``mode="multicall"``) or one JSON-RPC batch of ``eth_call``s
+    (``mode="batch"``); chunks run ``parallelism`` at a time. ``mode="auto"``
+    uses Multicall3 when it is deployed on the chain, else batches, else one
+    call per request. Ids the contract rejects are left out of the result.
+
+    ``fetch_grievance`` remembers ids it found missing for ``missing_ttl``
+    seconds (at most ``max_missing`` of them), so repeated lookups of an
+    unknown id do not go back to the chain.
+    """
+
+    def __init__(self, web3, contract_address, chunk_size=100, parallelism=4, mode="auto",
+                 multicall_address=MULTICALL3_ADDRESS, missing_ttl=30.0, max_missing=10000):
+        self.web3 = web3
+        self.address = Web3.to_checksum_address(contract_address)
+        self.chunk_size = chunk_size
+        self.parallelism = parallelism
+        self.multicall_address = Web3.to_checksum_address(multicall_address)
+        self.mode = mode
+        self.missing_ttl = missing_ttl
+        self.max_missing = max_missing
+        self._first = None
+        # trackingId -> expiry of a negative fetch_grievance answer, oldest first
+        self._missing = OrderedDict()
+        self._missing_lock = threading.Lock()
+
+    def _resolve_mode(self):
+        if self.mode != "auto":
+            return self.mode
+        try:
+            if len(self.web3.eth.get_code(self.multicall_address)) > 0:
+                self.mode = "multicall"
+                return self.mode
+        except Exception:
+            pass
+        self.mode = "batch" if getattr(self.web3, "batch_requests", None) else "serial"
+        return self.mode
+
+    def fetch_all_tracking_ids(self):
+        data = self.web3.eth.call({"to": self.address, "data": GET_ALL_IDS_SELECTOR})
+        return list(abi_decode(["string[]"], bytes(data))[0])
+
+    def _storage(self, slot):
+        return bytes(self.web3.eth.get_storage_at(self.address, slot))
+
+    def fetch_first_tracking_id(self):
+        """
+        The trackingId at index 0, read from contract storage.
+
+        ``getAllTrackingIds`` would return every id to learn this one, so the
+        array length and the id are read with ``eth_getStorageAt`` instead.
+
+        Returns:
+            str: The id, or None while the registry is empty
+        """
+        if not int.from_bytes(self._storage(GRIEVANCES_SLOT), "big"):
+            return None
+        base = int.from_bytes(Web3.solidity_keccak(["uint256"], [GRIEVANCES_SLOT]), "big")
+        slot = base + TRACKING_ID_OFFSET
+        word = self._storage(slot)
+        if not word[-1] & 1:
+            # Under 32 bytes: stored in the slot itself, with twice the length in the last byte
+            return word[:word[-1] // 2].decode("utf-8")
+        length = (int.from_bytes(word, "big") - 1) // 2
+        data_slot = int.from_bytes(Web3.solidity_keccak(["uint256"], [slot]), "big")
+        data = b"".join(self._storage(data_slot + i) for i in range((length + 31) // 32))
+        return data[:length].decode("utf-8")
+
+    def fetch_grievance(self, tracking_id):
+        """
+        One grievance by id, with negative answers cached.
+
+        Returns:
+            dict: The record, or None if ``tracking_id`` does not exist on-chain
+        """
+        now = time.time()
+        with self._missing_lock:
+            expires_at = self._missing.get(tracking_id)
+            if expires_at is not None:
+                if expires_at > now:
+                    return None
+                del self._missing[tracking_id]
+        record = self.fetch_grievances([tracking_id]).get(tracking_id)
+        if record is None and self.missing_ttl > 0:
+            with self._missing_lock:
+                self._missing[tracking_id] = now + self.missing_ttl
+                self._missing.move_to_end(tracking_id)
+                while len(self._missing) > self.max_missing:
+                    self._missing.popitem(last=False)
+        return record
+
+    def fetch_grievances(self, tracking_ids):
+        """
+        Returns:
+            dict: trackingId -> record, for every id that exists on-chain
+        """
+        tracking_ids = list(dict.fromkeys(tracking_ids))
+        if not tracking_ids:
+            return {}
+        # Two calls per id, so a chunk of calls covers chunk_size // 2 ids
+        per_chunk = max(1, self.chunk_size // 2)
+        chunks = [tracking_ids[i:i + per_chunk] for i in range(0, len(tracking_ids), per_chunk)]
+        fetch = {
+            "multicall": self._fetch_multicall,
+            "batch": self._fetch_batch,
+            "serial": self._fetch_serial,
+        }[self._resolve_mode()]
+
+        records = {}
+        if len(chunks) == 1 or self.parallelism <= 1:
+            results = map(fetch, chunks)
+        else:
+            with ThreadPoolExecutor(max_workers=self.parallelism) as pool:
+                results = list(pool.map(fetch, chunks))
+        for chunk_records in results:
+            records.update(chunk_records)
+        return self._drop_phantoms(records)
+
+    def _drop_phantoms(self, records):
+        """
+        Remove records for ids that do not exist on-chain.
+
+        GrievanceRegistry maps unknown ids to index 0, so the getters return
+        the first grievance instead of reverting. Any record identical to
+        that one under a different id is a phantom.
+        """
+        if not records:
+            return records
+        if self._first is None:
+            # Index 0 never changes once written, so this lookup is done once; while the
+            # registry is empty it costs one storage read per call
+            first_id = self.fetch_first_tracking_id()
+            if first_id is None:
+                return {}
+            first = records.get(first_id) or self._fetch_serial([first_id]).get(first_id)
+            if first is None:
+                # Index 0 could not be read, so phantoms cannot be told apart; report nothing
+                return {}
+            self._first = (first_id, self._fingerprint(first))
+        first_id, fingerprint = self._first
+        return {
+            tid: r for tid, r in records.items()
+            if tid == first_id or self._fingerprint(r) != fingerprint
+        }
+
+    @staticmethod
+    def _fingerprint(record):
+        return (record["title"], record["description"], record["createdAt"], record["submitter"])
+
+    @staticmethod
+    def _calls(tracking_ids):
+        calls = []
+        for tracking_id in tracking_ids:
+            arg = abi_encode(["string"], [tracking_id])
+            calls.append(GET_BASIC_SELECTOR + arg)
+            calls.append(GET_DETAILS_SELECTOR + arg)
+        return calls
+
+    @staticmethod
+    def _decode(tracking_ids, results):
+        """``results`` holds (success, returndata) pairs, basic then details per id."""
+        records = {}
+        for i, tracking_id in enumerate(tracking_ids):
+            (ok_basic, basic), (ok_details, details) = results[2 * i], results[2 * i + 1]
+            if not (ok_basic and ok_details):
+                continue
+            records[tracking_id] = chain_record(
+                tracking_id,
+                abi_decode(BASIC_TYPES, bytes(basic)),
+                abi_decode(DETAILS_TYPES, bytes(details)),
+            )
+        return records
+
+    def _fetch_multicall(self, tracking_ids):
+        calls = [(self.address, True, data) for data in self._calls(tracking_ids)]
+        payload = AGGREGATE3_SELECTOR + abi_encode(["(address,bool,bytes)[]"], [calls])
+        raw = self.web3.eth.call({"to": self.multicall_address, "data": payload})
+        results = abi_decode(["(bool,bytes)[]"], bytes(raw))[0]
+        return self._decode(tracking_ids, results)
+
+    def _fetch_batch(self, tracking_ids):
+        calls = self._calls(tracking_ids)
+        try:
+            with self.web3.batch_requests() as batch:
+                for data in calls:
+                    batch.add(self.web3.eth.call({"to": self.address, "data": data}))
+                responses = batch.execute()
+        except Exception as e:
+            # A reverted call can fail the whole batch on some providers
+            log.debug("Batch eth_call failed, falling back to single calls: %s", e)
+            return self._fetch_serial(tracking_ids)
+        results = [
+            (not isinstance(r, Exception) and r is not None and len(r) > 0, r)
+            for r in responses
+        ]
+        return self._decode(tracking_ids, results)
+
+    def _fetch_serial(self, tracking_ids):
+        results = []
+        for data in self._calls(tracking_ids):
+            try:
+                results.append((True, self.web3.eth.call({"to": self.address, "data": data})))
+            except Exception:
+                results.append((False, b""))
+        return self._decode(tracking_ids, results)
+
+
+def backfill(reader, store):
+    """Load every on-chain grievance the store does not have yet."""
+    tracking_ids = reader.fetch_all_tracking_ids()
+    missing = [tid for tid in tracking_ids if tid not in store]
+    for record in reader.fetch_grievances(missing).values():
+        store.add(record)
+    return len(missing)
+
+
+if __name__ == "__main__":
+    import argparse
+    import os
+
+    from dotenv import load_dotenv
+
+    from grievance_store import open_grievance_store
+
+    load_dotenv()
+    parser = argparse.ArgumentParser(description="Backfill the grievance store from GrievanceRegistry")
+    parser.add_argument("--chunk-size", type=int, default=100)
+    parser.add_argument("--parallelism", type=int, default=4)
+    parser.add_argument("--mode", choices=("auto", "multicall", "batch", "serial"), default="auto")
+    args = parser.parse_args()
+
+    web3 = Web3(Web3.HTTPProvider(os.getenv("AVAX_RPC_URL")))
+    reader = BulkGrievanceReader(
+        web3, os.getenv("GRIEVANCE_CONTRACT_ADDRESS"),
+        chunk_size=args.chunk_size, parallelism=args.parallelism, mode=args.mode,
+    )
+    store = open_grievance_store()
+    start = time.time()
+    count = backfill(reader, store)
+    if hasattr(store, "close"):
+        store.close()
+    print(f"Backfilled {count} grievances in {time.time() - start:.1f}s ({reader.mode})")
@@ -0,0 +1,83 @@
+from eth_abi.registry import registry as abi_registry
+from eth_account import Account
+from web3 import Web3
+
+from metrics import STAGE_SECONDS
+
+# Functions the backend sends transactions to; their encoders are prepared up front
+TRANSACT_FUNCTIONS = ("submitGrievance", "submitGrievances", "markResolved")
+
+
+def canonical_type(param):
+    """ABI type string with tuples expanded, e.g. ``(string,uint256)[]`` for a ``tuple[]``."""
+    if param["type"].startswith("tuple"):
+        inner = ",".join(canonical_type(c) for c in param["components"])
+        return f"({inner}){param['type'][len('tuple'):]}"
+    return param["type"]
+
+
+class ContractRegistry:
+    """
+    Everything needed to build GrievanceRegistry transactions, built once.
+
+    Holds the signer account (the key is derived once), the checksummed
+    contract address, a web3 contract object for the read paths, and per
+    function the 4-byte selector plus a cached eth_abi tuple encoder, so
+    building calldata skips ABI lookup and contract construction.
+    """
+
+    def __init__(self, web3, address, abi, private_key):
+        self.web3 = web3
+        self.address = Web3.to_checksum_address(address)
+        self.abi = abi
+        self.account = Account.from_key(private_key)
+        self.contract = web3.eth.contract(address=self.address, abi=abi)
+        self.selectors = {}
+        self._encoders = {}
+        for item in abi:
+            if item.get("type") != "function":
+                continue
+            types = [canonical_type(i) for i in item["inputs"]]
+            self.selectors[item["name"]] = Web3.keccak(text=f"{item['name']}({','.join(types)})")[:4]
+            if item["name"] in TRANSACT_FUNCTIONS:
+                self._encoders[item["name"]] = abi_registry.get_encoder(f"({','.join(types)})")
+        self._chain_id = None
+
+    @property
+    def chain_id(self):
+        if self._chain_id is None:
+            self._chain_id = self.web3.eth.chain_id
+        return self._chain_id
+
+    @chain_id.setter
+    def chain_id(self, value):
+        # Lets async callers supply it instead of a blocking lookup on first use
+        self._chain_id = int(value)
+
+    def encode(self, function_name, *args):
+        """Return calldata (selector + encoded args) for ``function_name``."""
+        encoder = self._encoders.get(function_name)
+        if encoder is None:
+            # Not a prepared function: go through web3's generic (slower) path
+            return bytes.fromhex(
+                self.contract.get_function_by_name(function_name)(*args)._encode_transaction_data()[2:]
+            )
+        return self.selectors[function_name] + encoder(args)
+
+    def transaction(self, function_name, *args, **fields):
+        """
+        Build an unsigned transaction calling ``function_name``.
+
+        Extra keyword arguments (gas, gasPrice, nonce, ...) are copied into the
+        transaction as-is.
+        """
+        with STAGE_SECONDS.time(stage="tx_build"):
+            tx = {
+                "from": self.account.address,
+                "to": self.address,
+                "value": 0,
+                "data": self.encode(function_name, *args),
+                "chainId": self.chain_id,
+            }
+        tx.update(fields)
+        return tx
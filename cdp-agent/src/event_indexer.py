@@ -0,0 +1,230 @@
+import json
+import logging
+import os
+import threading
+
+from eth_abi import decode as abi_decode
+from web3 import Web3
+
+from contract_reader import BulkGrievanceReader
+
+log = logging.getLogger(__name__)
+
+# Provider errors that mean "ask for a smaller block range"
+RANGE_ERRORS = ("range", "too many", "limit", "exceed", "timeout", "timed out", "response size")
+
+
+def indexer_start_block():
+    """
+    INDEXER_START_BLOCK: the block GrievanceRegistry was deployed in.
+
+    There is no default. From block 0 a fresh indexer would page through
+    the chain's whole history before reaching the contract, one
+    eth_getLogs per chunk.
+
+    Raises:
+        ValueError: If INDEXER_START_BLOCK is unset or not a block number
+    """
+    value = os.getenv("INDEXER_START_BLOCK", "").strip()
+    if not value.isdigit():
+        raise ValueError(
+            "Set INDEXER_START_BLOCK to the block GrievanceRegistry was deployed in, "
+            "or INDEX_CHAIN_EVENTS=0 to run without the event indexer"
+        )
+    return int(value)
+
+
+class EventDecoder:
+    """
+    Decodes GrievanceRegistry logs without going through web3 contract events.
+
+    The topic hash and the data/indexed type lists of every event are worked
+    out once from the ABI, so decoding a log is a dict lookup plus one
+    ``eth_abi.decode`` call.
+    """
+
+    def __init__(self, abi):
+        self._events = {}
+        for item in abi:
+            if item.get("type") != "event":
+                continue
+            inputs = item["inputs"]
+            signature = f"{item['name']}({','.join(i['type'] for i in inputs)})"
+            topic = Web3.to_hex(Web3.keccak(text=signature))
+            self._events[topic] = (
+                item["name"],
+                [i["name"] for i in inputs if not i.get("indexed")],
+                [i["type"] for i in inputs if not i.get("indexed")],
+                [(i["name"], i["type"]) for i in inputs if i.get("indexed")],
+            )
+
+    @property
+    def topics(self):
+        return list(self._events)
+
+    def decode(self, log):
+        """
+        Returns:
+            tuple: (event name, args dict), or None for logs of unknown events
+        """
+        topics = log["topics"]
+        spec = self._events.get(Web3.to_hex(topics[0])) if topics else None
+        if spec is None:
+            return None
+        name, data_names, data_types, indexed = spec
+        args = dict(zip(data_names, abi_decode(data_types, bytes(log["data"]))))
+        for (arg_name, arg_type), topic in zip(indexed, topics[1:]):
+            args[arg_name] = _decode_topic(arg_type, topic)
+        return name, args
+
+
+def _decode_topic(arg_type, topic):
+    # Indexed dynamic values (string, bytes, arrays) are only logged as their keccak hash
+    if arg_type in ("string", "bytes") or arg_type.endswith("]"):
+        return Web3.to_hex(topic)
+    return abi_decode([arg_type], bytes(topic))[0]
+
+
+class EventIndexer:
+    """
+    Incrementally mirrors GrievanceRegistry events into the grievance store.
+
+    Logs are fetched in block ranges that shrink when the provider rejects a
+    range and grow again while ranges succeed. Only blocks at least
+    ``confirmations`` deep are indexed, and the hash of the last indexed
+    block is checkpointed; if that hash changes (a deeper reorg than the
+    confirmation depth), indexing rewinds by another ``confirmations``
+    blocks and re-applies the events, which are idempotent upserts.
+    """
+
+    def __init__(self, web3, contract, store, checkpoint_path, start_block=0,
+                 confirmations=12, min_chunk=10, max_chunk=5000, poll_interval=10,
+                 fetch=None):
+        self.web3 = web3
+        self.contract = contract
+        self.store = store
+        self.checkpoint_path = checkpoint_path
+        self.start_block = start_block
+        self.confirmations = confirmations
+        self.min_chunk = min_chunk
+        self.max_chunk = max_chunk
+        self.chunk = max_chunk
+        self.poll_interval = poll_interval
+        self.fetch = fetch or BulkGrievanceReader(web3, contract.address).fetch_grievances
+        self.decoder = EventDecoder(contract.abi)
+        self._thread = None
+        self._stopping = threading.Event()
+
+    def load_checkpoint(self):
+        try:
+            with open(self.checkpoint_path, "r") as f:
+                checkpoint = json.load(f)
+        except (OSError, ValueError):
+            return self.start_block - 1, None
+        return checkpoint["block"], checkpoint.get("hash")
+
+    def save_checkpoint(self, block_number, block_hash):
+        tmp = f"{self.checkpoint_path}.tmp"
+        with open(tmp, "w") as f:
+            json.dump({"block": block_number, "hash": block_hash}, f)
+        os.replace(tmp, self.checkpoint_path)
+
+    def _block_hash(self, block_number):
+        return Web3.to_hex(self.web3.eth.get_block(block_number)["hash"])
+
+    def _resume_point(self):
+        last, last_hash = self.load_checkpoint()
+        if last_hash and last >= 0 and self._block_hash(last) != last_hash:
+            rewound = max(self.start_block - 1, last - self.confirmations)
+            log.warning("Reorg detected at block %s; re-indexing from %s", last, rewound + 1)
+            return rewound
+        return last
+
+    def sync_once(self):
+        """
+        Index every confirmed block not yet processed.
+
+        Returns:
+            int: Number of events applied
+        """
+        safe_head = self.web3.eth.block_number - self.confirmations
+        last = self._resume_point()
+        applied = 0
+        while last < safe_head:
+            to_block = min(last + self.chunk, safe_head)
+            try:
+                logs = self.web3.eth.get_logs({
+                    "address": self.contract.address,
+                    "fromBlock": last + 1,
+                    "toBlock": to_block,
+                    "topics": [self.decoder.topics],
+                })
+            except Exception as e:
+                if self.chunk > self.min_chunk and any(s in str(e).lower() for s in RANGE_ERRORS):
+                    self.chunk = max(self.min_chunk, self.chunk // 2)
+                    continue
+                raise
+            applied += self.apply(logs)
+            self.save_checkpoint(to_block, self._block_hash(to_block))
+            last = to_block
+            self.chunk = min(self.max_chunk, self.chunk * 2)
+        return applied
+
+    def apply(self, logs):
+        """Upsert the effects of ``logs`` (in chain order) into the store."""
+        submitted, resolved, refresh = {}, set(), set()
+        for log in logs:
+            decoded = self.decoder.decode(log)
+            if decoded is None:
+                continue
+            name, args = decoded
+            tracking_id = args["trackingId"]
+            if name == "GrievanceSubmitted":
+                submitted[tracking_id] = Web3.to_hex(log["transactionHash"])
+            elif name == "GrievanceResolved":
+                resolved.add(tracking_id)
+                if tracking_id not in self.store and tracking_id not in submitted:
+                    # Submitted before the indexed range; the fetch returns it already resolved
+                    refresh.add(tracking_id)
+            else:
+                # GrievanceMetaAdded / GrievanceDetailsAdded: fields changed on-chain
+                refresh.add(tracking_id)
+
+        for tracking_id, tx_hash in submitted.items():
+            if tracking_id in self.store:
+                # Our own submission: the event is the confirmation
+                self.store.update(tracking_id, blockchainStatus="success", tx_hash=tx_hash, blockchainError=None)
+            else:
+                refresh.add(tracking_id)
+
+        if refresh:
+            for tracking_id, record in self.fetch(sorted(refresh)).items():
+                existing = self.store.get(tracking_id)
+                if existing:
+                    # Keep backend-only fields (e.g. blockchainError history)
+                    record = dict(existing, **{k: v for k, v in record.items() if k != "tx_hash" or v})
+                record["tx_hash"] = record.get("tx_hash") or submitted.get(tracking_id)
+                self.store.add(record)
+
+        for tracking_id in resolved:
+            self.store.update(tracking_id, resolved=True, status="resolved")
+
+        return len(logs)
+
+    def start(self):
+        if self._thread:
+            return
+
+        def _loop():
+            while not self._stopping.is_set():
+                try:
+                    self.sync_once()
+                except Exception as e:
+                    log.warning("Event indexer sync failed: %s", e)
+                self._stopping.wait(self.poll_interval)
+
+        self._thread = threading.Thread(target=_loop, name="event-indexer", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stopping.set()
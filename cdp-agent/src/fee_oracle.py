@@ -0,0 +1,190 @@
+import logging
+import threading
+import time
+
+from metrics import STAGE_SECONDS
+
+log = logging.getLogger(__name__)
+
+# Used when the node does not implement eth_maxPriorityFeePerGas
+DEFAULT_PRIORITY_FEE = 1_500_000_000
+OUT_OF_GAS_ERRORS = ("out of gas", "intrinsic gas too low", "gas required exceeds")
+
+
+def fee_fields(base_fee, priority_fee, gas_price, multiplier=1.0):
+    """
+    Fee fields for a new transaction from the chain's current fee parameters.
+
+    Args:
+        base_fee (int): Latest block's ``baseFeePerGas``, None on legacy chains
+        priority_fee (int): Tip to scale (type 2)
+        gas_price (int): Gas price to scale (legacy)
+        multiplier (float): Scales the tip (type 2) or gas price (legacy)
+
+    Returns:
+        dict: ``type``/``maxFeePerGas``/``maxPriorityFeePerGas`` or ``gasPrice``
+    """
+    if base_fee is None:
+        return {"gasPrice": int(gas_price * multiplier)}
+    priority_fee = int(priority_fee * multiplier)
+    # Headroom for the base fee to double before inclusion
+    return {
+        "type": 2,
+        "maxPriorityFeePerGas": priority_fee,
+        "maxFeePerGas": 2 * base_fee + priority_fee,
+    }
+
+
+class FeeOracle:
+    """
+    Caches the chain's fee parameters so sends do not query them per transaction.
+
+    A background thread polls the head and refreshes the base fee and
+    priority fee once per new block; ``fees()`` serves the cached values and
+    only refreshes inline when they are older than ``ttl`` seconds (e.g.
+    before the thread has run). Chains whose blocks carry ``baseFeePerGas``
+    get EIP-1559 (type 2) fee fields, others a legacy ``gasPrice``.
+    """
+
+    def __init__(self, web3, ttl=3.0, poll_interval=1.0, default_priority_fee=DEFAULT_PRIORITY_FEE):
+        self.web3 = web3
+        self.ttl = ttl
+        self.poll_interval = poll_interval
+        self.default_priority_fee = default_priority_fee
+        self._lock = threading.Lock()
+        self._block = None
+        self._base_fee = None
+        self._priority_fee = None
+        self._gas_price = None
+        self._updated = 0
+        self._thread = None
+
+    def refresh(self, block=None):
+        block = block or self.web3.eth.get_block("latest")
+        base_fee = block.get("baseFeePerGas")
+        if base_fee is not None:
+            try:
+                priority_fee = int(self.web3.eth.max_priority_fee)
+            except Exception:
+                priority_fee = self.default_priority_fee
+            gas_price = None
+        else:
+            priority_fee = None
+            gas_price = int(self.web3.eth.gas_price)
+        with self._lock:
+            self._block = block["number"]
+            self._base_fee = base_fee
+            self._priority_fee = priority_fee
+            self._gas_price = gas_price
+            self._updated = time.time()
+
+    def _ensure_fresh(self):
+        self._ensure_running()
+        if time.time() - self._updated > self.ttl:
+            self.refresh()
+
+    def fees(self, multiplier=1.0):
+        """
+        Fee fields for a new transaction, see ``fee_fields``.
+
+        Args:
+            multiplier (float): Scales the tip (type 2) or gas price (legacy)
+        """
+        with STAGE_SECONDS.time(stage="fees"):
+            self._ensure_fresh()
+            with self._lock:
+                return fee_fields(self._base_fee, self._priority_fee, self._gas_price, multiplier)
+
+    def _ensure_running(self):
+        if self._thread and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread and self._thread.is_alive():
+                return
+            self._thread = threading.Thread(target=self._run, name="fee-oracle", daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            time.sleep(self.poll_interval)
+            try:
+                head = self.web3.eth.block_number
+                if head != self._block:
+                    self.refresh(self.web3.eth.get_block(head))
+            except Exception as e:
+                log.warning("Fee oracle refresh failed: %s", e)
+
+
+class GasEstimateCache:
+    """
+    Reuses gas estimates for calls of the same function and similar calldata size.
+
+    Estimates are keyed by selector and calldata length rounded up to
+    ``bucket_bytes`` (one storage slot by default, since stored strings
+    dominate this contract's gas). The largest estimate seen for a key is
+    served with ``buffer`` headroom. ``invalidate`` drops a key after a send
+    proves the cached figure too low, so the next call estimates live.
+    """
+
+    def __init__(self, web3, buffer=1.2, bucket_bytes=32):
+        self.web3 = web3
+        self.buffer = buffer
+        self.bucket_bytes = bucket_bytes
+        self._lock = threading.Lock()
+        self._estimates = {}
+
+    def _key(self, tx):
+        data = tx.get("data") or b""
+        if isinstance(data, str):
+            data = bytes.fromhex(data[2:] if data.startswith("0x") else data)
+        size = len(data)
+        return bytes(data[:4]), -(-size // self.bucket_bytes)
+
+    def estimate(self, tx):
+        """
+        Returns:
+            tuple: (gas limit with buffer, True if served from the cache)
+        """
+        with STAGE_SECONDS.time(stage="gas_estimate"):
+            cached = self.cached(tx)
+            if cached is not None:
+                return cached, True
+            return self._estimate_live(tx), False
+
+    def cached(self, tx):
+        """Buffered gas limit from the cache, or None if ``tx``'s key has no estimate yet."""
+        with self._lock:
+            cached = self._estimates.get(self._key(tx))
+        return int(cached * self.buffer) if cached is not None else None
+
+    def record(self, tx, estimated):
+        """Remember a live ``estimate_gas`` result for ``tx``; returns the buffered gas limit."""
+        key = self._key(tx)
+        with self._lock:
+            self._estimates[key] = max(int(estimated), self._estimates.get(key, 0))
+        return int(estimated * self.buffer)
+
+    def estimate_live(self, tx):
+        with STAGE_SECONDS.time(stage="gas_estimate"):
+            return self._estimate_live(tx)
+
+    def _estimate_live(self, tx):
+        return self.record(tx, self.web3.eth.estimate_gas(gas_call(tx)))
+
+    def invalidate(self, tx):
+        with self._lock:
+            self._estimates.pop(self._key(tx), None)
+
+
+def gas_call(tx):
+    """``tx`` without the fields ``estimate_gas`` must not see."""
+    return {k: v for k, v in tx.items() if k not in ("nonce", "gas")}
+
+
+def is_out_of_gas(error=None, receipt=None, gas_limit=None):
+    """True if a send error or a failed receipt points at an insufficient gas limit."""
+    if error is not None:
+        return any(s in str(error).lower() for s in OUT_OF_GAS_ERRORS)
+    if receipt is not None and gas_limit:
+        return receipt.get("status") == 0 and receipt.get("gasUsed", 0) >= gas_limit
+    return False
@@ -0,0 +1,337 @@
+"""
+The grievance pipeline shared by the Flask (app.py) and ASGI (asgi_app.py) apps.
+
+``GrievanceService`` does everything between a parsed request and its JSON
+answer: reading and deduplicating uploads, storing new grievances, reading
+bulk imports and recording classification, chain and resolution outcomes.
+The apps keep only the transport (parsing requests, building responses)
+and the scheduling (worker threads in app.py, tasks in asgi_app.py), which
+they pass in as ``start`` callbacks. Every method blocks on SQLite or image
+decoding, so async callers run them on a worker thread.
+"""
+import io
+import logging
+import shutil
+import time
+import uuid
+
+from bulk_import import item_fields, item_progress, iter_items, summarize
+from grievances import classification_fields, new_grievance
+from idempotency import MAX_KEY_LENGTH, request_fingerprint, submission_keys
+from image_ingest import ImageRejected, open_upload, prepare_image
+from metrics import STAGE_SECONDS, SUBMISSIONS, SUBMIT_REPLAYS
+
+log = logging.getLogger(__name__)
+
+# Bulk import progress is written every this many items, or this often
+PROGRESS_BATCH = 100
+PROGRESS_INTERVAL = 0.5
+
+# blockchainError of grievances a restart interrupted (see ``resume_interrupted``)
+INTERRUPTED_CHAIN = "Interrupted by a restart during chain submission; it may still have been mined"
+INTERRUPTED_QUEUE = "Interrupted by a restart before it was queued"
+
+
+def new_tracking_id():
+    return f"GRV-{uuid.uuid4().hex[:8].upper()}"
+
+
+def status_body(record):
+    """The /grievance_status answer for ``record``."""
+    return {
+        "success": True,
+        "trackingId": record["trackingId"],
+        "blockchainStatus": record["blockchainStatus"],
+        "tx_hash": record["tx_hash"],
+        "blockchainError": record["blockchainError"],
+        "updatedAt": record["updatedAt"],
+    }
+
+
+class GrievanceService:
+    """
+    Submission, import and bookkeeping steps of the grievance pipeline.
+
+    Args:
+        store: ``GrievanceStore`` or ``SQLiteGrievanceStore``
+        idempotency (IdempotencyTable): Repeat detection for submissions
+        import_jobs (ImportJobs): Per-item progress of bulk imports
+        max_upload_bytes (int): Largest accepted image
+        key_ttl (float): Seconds an Idempotency-Key keeps answering with its first grievance
+        dedup_window (float): Seconds the same photo, title and location count as a retry (0: off)
+        max_import_items (int): Most items read from one bulk import manifest
+    """
+
+    def __init__(self, store, idempotency, import_jobs, max_upload_bytes, key_ttl, dedup_window,
+                 max_import_items):
+        self.store = store
+        self.idempotency = idempotency
+        self.import_jobs = import_jobs
+        self.max_upload_bytes = max_upload_bytes
+        self.key_ttl = key_ttl
+        self.dedup_window = dedup_window
+        self.max_import_items = max_import_items
+
+    def dedup_keys(self, idempotency_key, upload, title, location):
+        """The ``IdempotencyTable`` keys and fingerprint of a submission; ([], "") when nothing is deduplicated."""
+        if not idempotency_key and self.dedup_window <= 0:
+            return [], ""
+        fingerprint = request_fingerprint(upload, title, location)
+        return submission_keys(idempotency_key, fingerprint, self.key_ttl, self.dedup_window), fingerprint
+
+    def submit(self, stream, title, description, location, idempotency_key, start):
+        """
+        Store a new grievance and hand it to ``start``, or answer a repeat.
+
+        A repeat (same Idempotency-Key, or within ``dedup_window`` the same
+        photo, title and location) gets the first request's grievance back
+        and nothing is started.
+
+        Args:
+            stream: Binary file object of the uploaded image
+            idempotency_key (str): Idempotency-Key header, "" if none was sent
+            start (callable): ``start(trackingId, image_data)`` queues the
+                classification and chain submission; if it raises, the
+                grievance's keys are released so a retry runs again
+
+        Returns:
+            tuple: (status code, JSON body, extra headers)
+        """
+        if len(idempotency_key) > MAX_KEY_LENGTH:
+            return 400, {"success": False, "error": f"Idempotency-Key is longer than {MAX_KEY_LENGTH} characters"}, {}
+        started = time.perf_counter()
+        try:
+            upload = open_upload(stream, self.max_upload_bytes)
+            keys, fingerprint = self.dedup_keys(idempotency_key, upload, title, location)
+        except ImageRejected as e:
+            return e.status_code, {"success": False, "error": str(e)}, {}
+        STAGE_SECONDS.observe(time.perf_counter() - started, stage="upload_read")
+        tracking_id = new_tracking_id()
+        # Claimed before decoding: a repeat is answered from the upload's hash and never decoded
+        original = self.idempotency.claim(keys, tracking_id, fingerprint) if keys else None
+        if original:
+            return self.replay(original, fingerprint)
+        grievance_data = new_grievance(tracking_id, title, description, location)
+        try:
+            # Decoded once, straight from the spooled upload, down to model resolution
+            started = time.perf_counter()
+            image_data = prepare_image(upload)
+            STAGE_SECONDS.observe(time.perf_counter() - started, stage="decode")
+            # Store the grievance first; classification and the chain round-trip run in the background
+            self.store.add(grievance_data)
+            start(tracking_id, image_data)
+        except ImageRejected as e:
+            # Not a grievance after all; a corrected retry with the same key should run
+            self.idempotency.release(keys, tracking_id)
+            return e.status_code, {"success": False, "error": str(e)}, {}
+        except Exception:
+            # Nothing was queued, so a retry should run instead of being answered with this id
+            self.idempotency.release(keys, tracking_id)
+            raise
+        return 202, {
+            "success": True,
+            "trackingId": tracking_id,
+            "blockchainStatus": "pending",
+            "grievance": grievance_data,
+        }, {}
+
+    def replay(self, original, fingerprint):
+        """
+        Answer a repeated submission with the grievance its first request created.
+
+        Args:
+            original (tuple): (key, trackingId, fingerprint) returned by ``IdempotencyTable.claim``
+            fingerprint (str): ``request_fingerprint`` of the repeat
+
+        Returns:
+            tuple: (status code, JSON body, extra headers)
+        """
+        key, tracking_id, original_fingerprint = original
+        reason = key.partition(":")[0]
+        if reason == "key" and original_fingerprint != fingerprint:
+            return 422, {"success": False, "error": "Idempotency-Key was already used for a different grievance"}, {}
+        record = self.store.get(tracking_id)
+        if record is None:
+            # The first request holds the key but has not stored its grievance yet
+            return 409, {
+                "success": False,
+                "error": "The original request is still in progress, retry shortly",
+                "trackingId": tracking_id,
+            }, {}
+        SUBMIT_REPLAYS.inc(reason=reason)
+        return 202 if record["blockchainStatus"] == "pending" else 200, {
+            "success": True,
+            "trackingId": tracking_id,
+            "blockchainStatus": record["blockchainStatus"],
+            "tx_hash": record.get("tx_hash"),
+            "grievance": record,
+            "replayed": True,
+        }, {"Idempotent-Replayed": "true"}
+
+    def import_item(self, index, fields, image, error, start):
+        """
+        Store one manifest item and hand it to ``start``, like a single ``submit``.
+
+        Returns:
+            tuple: (index, status, trackingId, error) for ``ImportJobs.record``
+        """
+        if error:
+            return index, "rejected", None, error
+        title, description, location, idempotency_key = item_fields(fields)
+        if len(idempotency_key) > MAX_KEY_LENGTH:
+            return index, "rejected", None, f"idempotencyKey is longer than {MAX_KEY_LENGTH} characters"
+        upload = io.BytesIO(image)
+        keys, fingerprint = self.dedup_keys(idempotency_key, upload, title, location)
+        tracking_id = new_tracking_id()
+        # As in ``submit``, only items that are not repeats are decoded
+        original = self.idempotency.claim(keys, tracking_id, fingerprint) if keys else None
+        if original:
+            key, original_id, original_fingerprint = original
+            reason = key.partition(":")[0]
+            if reason == "key" and original_fingerprint != fingerprint:
+                return index, "rejected", None, "idempotencyKey was already used for a different grievance"
+            SUBMIT_REPLAYS.inc(reason=reason)
+            return index, "duplicate", original_id, None
+        try:
+            image_data = prepare_image(upload)
+        except ImageRejected as e:
+            self.idempotency.release(keys, tracking_id)
+            return index, "rejected", None, str(e)
+        try:
+            self.store.add(new_grievance(tracking_id, title, description, location))
+            start(tracking_id, image_data)
+        except Exception:
+            # As in ``submit``: the item was never queued, so re-importing it should run
+            self.idempotency.release(keys, tracking_id)
+            raise
+        return index, "queued", tracking_id, None
+
+    def run_import(self, job_id, directory, import_item):
+        """
+        Read a saved import item by item, passing each to ``import_item``, then delete its directory.
+
+        Args:
+            import_item (callable): ``import_item(index, fields, image, error)``
+                returning the item's ``ImportJobs.record`` tuple
+        """
+        recorded, total, flushed = [], 0, time.time()
+        try:
+            for index, fields, image, error in iter_items(directory, self.max_upload_bytes, self.max_import_items):
+                try:
+                    recorded.append(import_item(index, fields, image, error))
+                except Exception as e:
+                    log.exception("Bulk import %s: item %s failed", job_id, index)
+                    recorded.append((index, "rejected", None, str(e)))
+                total = index + 1
+                # Progress is written in small batches rather than once per item
+                if len(recorded) >= PROGRESS_BATCH or time.time() - flushed >= PROGRESS_INTERVAL:
+                    self.import_jobs.record(job_id, recorded)
+                    recorded, flushed = [], time.time()
+        except Exception as e:
+            log.exception("Bulk import %s stopped", job_id)
+            recorded.append((total, "rejected", None, f"import stopped: {e}"))
+            total += 1
+        finally:
+            self.import_jobs.record(job_id, recorded)
+            self.import_jobs.finish(job_id, total)
+            shutil.rmtree(directory, ignore_errors=True)
+
+    def import_status(self, job_id):
+        """The /bulk_import/<jobId> body, or None for an unknown job."""
+        job = self.import_jobs.get(job_id)
+        if job is None:
+            return None
+        items = [
+            item_progress(item, self.store.get(item["trackingId"]) if item["trackingId"] else None)
+            for item in job["items"]
+        ]
+        return {"success": True, **summarize(job, items)}
+
+    def resume_interrupted(self, spool, start, grace=60):
+        """
+        Finish the grievances an earlier process left pending.
+
+        A job still waiting for classification is started again from its
+        spooled image. One that had reached the chain batcher may already
+        have been sent, and the contract does not reject a repeated
+        trackingId, so it is marked failed instead of being sent twice; the
+        event indexer marks it ``success`` if its transaction was mined.
+        A pending grievance with no spooled job at all, older than ``grace``
+        seconds, was never queued and is marked failed too.
+
+        Args:
+            spool (JobSpool): Where the apps keep queued jobs
+            start (callable): ``start(trackingId, image_data)`` queues a job
+                that is already spooled under this process
+
+        Returns:
+            tuple: (resumed, failed) counts
+        """
+        resumed = failed = 0
+        for tracking_id, pid, stage in spool.orphans():
+            image_data = spool.claim(tracking_id, pid, stage)
+            if image_data is None:
+                continue
+            record = self.store.get(tracking_id)
+            if not record or record["blockchainStatus"] != "pending":
+                spool.remove(tracking_id)
+            elif stage == "queued":
+                start(tracking_id, image_data)
+                resumed += 1
+            else:
+                self.record_submission(tracking_id, {"success": False, "error": INTERRUPTED_CHAIN})
+                spool.remove(tracking_id)
+                failed += 1
+        spooled, cutoff = spool.tracked(), time.time() - grace
+        for record in self.store.find(blockchainStatus="pending"):
+            if record["trackingId"] not in spooled and record["createdAt"] < cutoff:
+                self.record_submission(record["trackingId"], {"success": False, "error": INTERRUPTED_QUEUE})
+                failed += 1
+        if resumed or failed:
+            log.warning("Resumed %s interrupted grievances, failed %s", resumed, failed)
+        return resumed, failed
+
+    def record_classification(self, tracking_id, clip_results):
+        self.store.update(tracking_id, **classification_fields(clip_results))
+
+    def record_submission(self, tracking_id, blockchain_result):
+        """Store the outcome of a grievance's chain submission."""
+        log.debug("Blockchain result", extra={"trackingId": tracking_id, "result": blockchain_result})
+        SUBMISSIONS.inc(result="success" if blockchain_result.get("success") else "failed")
+        if blockchain_result.get("success"):
+            self.store.update(tracking_id, blockchainStatus="success", tx_hash=blockchain_result.get("tx_hash"))
+        else:
+            self.store.update(tracking_id, blockchainStatus="failed", blockchainError=blockchain_result.get("error"))
+
+    def record_resolution(self, tracking_id, tx_hash, receipt):
+        """
+        Store the outcome of a markResolved transaction.
+
+        Only a successful receipt (status 1) resolves the grievance; a
+        reverted or missing one is kept as ``resolveError``.
+
+        Returns:
+            dict: {"success", "tx_hash", "error"} for the resolve lane
+        """
+        if receipt and receipt.get("status") == 1:
+            self.store.update(tracking_id, resolved=True, status="resolved", resolveError=None)
+            return {"success": True, "tx_hash": tx_hash.hex()}
+        error = "markResolved tx reverted" if receipt else "markResolved tx not mined"
+        log.error("%s for %s (%s)", error, tracking_id, tx_hash.hex())
+        self.store.update(tracking_id, resolveError=error)
+        return {"success": False, "error": error, "tx_hash": tx_hash.hex()}
+
+    def lookup(self, tracking_id, fetch):
+        """
+        A grievance from the store, else from ``fetch(trackingId)`` (the contract), remembering the answer.
+
+        Returns:
+            dict: The record, or None if neither knows ``tracking_id``
+        """
+        record = self.store.get(tracking_id)
+        if not record:
+            # Not seen locally (yet): fall back to the contract and remember the answer
+            record = fetch(tracking_id)
+            if record:
+                self.store.add(record)
+        return record
@@ -0,0 +1,185 @@
+import os
+import threading
+import time
+from collections import defaultdict
+
+# Fields with a secondary index, maintained on every write
+INDEXED_FIELDS = ("blockchainStatus", "category", "priorityLevel", "resolved")
+
+
+class GrievanceStore:
+    """
+    Thread-safe grievance store keyed by ``trackingId``.
+
+    Lookups by id are a dict access; ``find`` answers equality filters on the
+    indexed fields by intersecting the per-value id sets instead of scanning.
+    Records are returned as copies so callers never mutate shared state
+    outside the lock.
+    """
+
+    def __init__(self):
+        self._records = {}
+        # trackingId -> insertion sequence; _ids[seq] is the id inserted at that position
+        self._seq = {}
+        self._ids = []
+        self._indexes = {field: defaultdict(set) for field in INDEXED_FIELDS}
+        # Notified on every write; lets callers block until a record changes
+        self.changed = threading.Condition(threading.RLock())
+
+    def __len__(self):
+        with self.changed:
+            return len(self._records)
+
+    def __contains__(self, tracking_id):
+        with self.changed:
+            return tracking_id in self._records
+
+    def _index(self, tracking_id, record):
+        for field in INDEXED_FIELDS:
+            self._indexes[field][record.get(field)].add(tracking_id)
+
+    def _unindex(self, tracking_id, record):
+        for field in INDEXED_FIELDS:
+            ids = self._indexes[field].get(record.get(field))
+            if ids is not None:
+                ids.discard(tracking_id)
+                if not ids:
+                    del self._indexes[field][record.get(field)]
+
+    def add(self, record):
+        tracking_id = record["trackingId"]
+        with self.changed:
+            existing = self._records.get(tracking_id)
+            if existing is not None:
+                self._unindex(tracking_id, existing)
+            else:
+                self._seq[tracking_id] = len(self._ids)
+                self._ids.append(tracking_id)
+            self._records[tracking_id] = dict(record)
+            self._index(tracking_id, record)
+            self.changed.notify_all()
+
+    def get(self, tracking_id):
+        with self.changed:
+            record = self._records.get(tracking_id)
+            return dict(record) if record is not None else None
+
+    def update(self, tracking_id, **fields):
+        """
+        Apply ``fields`` to a stored grievance and bump ``updatedAt``.
+
+        Returns:
+            dict: Copy of the updated record, or None if the id is unknown
+        """
+        with self.changed:
+            record = self._records.get(tracking_id)
+            if record is None:
+                return None
+            self._unindex(tracking_id, record)
+            record.update(fields)
+            record["updatedAt"] = int(time.time())
+            self._index(tracking_id, record)
+            self.changed.notify_all()
+            return dict(record)
+
+    def find(self, **filters):
+        """
+        Return grievances matching every ``field=value`` filter, in insertion order.
+
+        Indexed fields are resolved through their index; any other field is
+        checked against the narrowed candidate set.
+        """
+        with self.changed:
+            indexed = {k: v for k, v in filters.items() if k in self._indexes}
+            others = {k: v for k, v in filters.items() if k not in self._indexes}
+            if indexed:
+                sets = sorted(
+                    (self._indexes[k].get(v, set()) for k, v in indexed.items()),
+                    key=len,
+                )
+                ids = set(sets[0]).intersection(*sets[1:])
+                candidates = (self._records[tid] for tid in sorted(ids, key=self._seq.__getitem__))
+            else:
+                candidates = self._records.values()
+            return [
+                dict(r) for r in candidates
+                if all(r.get(k) == v for k, v in others.items())
+            ]
+
+    def all(self):
+        with self.changed:
+            return [dict(r) for r in self._records.values()]
+
+    def scan(self, after=None, since=None, until=None, **filters):
+        """
+        Yield ``(cursor, record)`` in insertion order, resuming after ``after``.
+
+        ``since``/``until`` bound ``createdAt`` (inclusive). The lock is only
+        held per record, so a slow consumer (e.g. a streaming response) never
+        blocks writers.
+        """
+        start = -1 if after is None else int(after)
+        with self.changed:
+            indexed = {k: v for k, v in filters.items() if k in self._indexes}
+            if indexed:
+                sets = sorted(
+                    (self._indexes[k].get(v, set()) for k, v in indexed.items()),
+                    key=len,
+                )
+                ids = set(sets[0]).intersection(*sets[1:])
+                positions = sorted(p for p in map(self._seq.__getitem__, ids) if p > start)
+            else:
+                positions = range(start + 1, len(self._ids))
+        others = {k: v for k, v in filters.items() if k not in self._indexes}
+        for pos in positions:
+            with self.changed:
+                if pos >= len(self._ids):
+                    return
+                record = dict(self._records[self._ids[pos]])
+            created = record.get("createdAt") or 0
+            if since is not None and created < since:
+                continue
+            if until is not None and created > until:
+                continue
+            if all(record.get(k) == v for k, v in others.items()):
+                yield pos, record
+
+    def wait_for(self, tracking_id, predicate, timeout):
+        """
+        Block until ``predicate(record)`` holds or ``timeout`` seconds pass.
+
+        Returns:
+            dict: Latest copy of the record, or None if the id is unknown
+        """
+        deadline = time.time() + timeout
+        with self.changed:
+            while True:
+                record = self._records.get(tracking_id)
+                if record is None:
+                    return None
+                remaining = deadline - time.time()
+                if predicate(record) or remaining <= 0:
+                    return dict(record)
+                self.changed.wait(remaining)
+
+
+def open_grievance_store(backend=None, path=None, shared=None):
+    """
+    Build the grievance store selected by GRIEVANCE_STORE_BACKEND.
+
+    ``sqlite`` (the default) persists to GRIEVANCE_DB_PATH; ``memory`` keeps
+    everything in-process and loses it on restart. ``shared`` (default:
+    GRIEVANCE_STORE_SHARED=1) opens the SQLite file for use by several
+    worker processes at once.
+    """
+    backend = backend or os.getenv("GRIEVANCE_STORE_BACKEND", "sqlite")
+    if shared is None:
+        shared = os.getenv("GRIEVANCE_STORE_SHARED", "0") == "1"
+    if backend == "memory":
+        if shared:
+            raise ValueError("GRIEVANCE_STORE_SHARED needs GRIEVANCE_STORE_BACKEND=sqlite")
+        return GrievanceStore()
+    if backend == "sqlite":
+        from sqlite_store import SQLiteGrievanceStore
+        return SQLiteGrievanceStore(path or os.getenv("GRIEVANCE_DB_PATH", "grievances.db"), shared=shared)
+    raise ValueError(f"Unknown grievance store backend: {backend}")
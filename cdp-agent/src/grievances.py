@@ -0,0 +1,228 @@
+import json
+import time
+
+# Candidate labels for grievance photos
+GRIEVANCE_CATEGORIES = [
+    "road pothole", "broken street light", "graffiti vandalism",
+    "fallen tree", "water leak", "garbage dumping", "broken sidewalk",
+    "missing street sign", "flooding", "damaged public property"
+]
+HIGH_PRIORITY = ["water leak", "flooding", "fallen tree", "broken street light"]
+MEDIUM_PRIORITY = ["road pothole", "damaged public property", "missing street sign"]
+
+# On-chain aiJustification: "<version>;<label index>:<score in thousandths>,..." for the top
+# JUSTIFICATION_TOP_K labels, instead of the full JSON list of label/score pairs (~20 bytes instead of
+# ~500 of calldata and storage). Indices point into JUSTIFICATION_LABELS[version]; a published table is
+# never reordered or extended, a changed label set gets a new version.
+JUSTIFICATION_VERSION = 1
+JUSTIFICATION_LABELS = {
+    1: (
+        "road pothole", "broken street light", "graffiti vandalism",
+        "fallen tree", "water leak", "garbage dumping", "broken sidewalk",
+        "missing street sign", "flooding", "damaged public property",
+    ),
+}
+JUSTIFICATION_TOP_K = 3
+
+CLASSIFIER_UNAVAILABLE = "AI-based media analysis is temporarily unavailable. Your report has been received, but the AI justification will be added once the service is back online."
+
+
+def new_grievance(tracking_id, title, description, location):
+    """A freshly uploaded grievance, before classification and chain submission."""
+    now = int(time.time())
+    return {
+        "trackingId": tracking_id,
+        "title": title,
+        "description": description,
+        "location": location,
+        "category": "unclassified",
+        "priorityLevel": "medium",
+        "estimatedDays": 7,
+        "mediaCount": 1,
+        "aiJustification": json.dumps([]),
+        "status": "submitted",
+        "createdAt": now,
+        "updatedAt": now,
+        "submitter": "backend-local",
+        "resolved": False,
+        "blockchainStatus": "pending",
+        "tx_hash": None,
+        "blockchainError": None
+    }
+
+
+def categorize(clip_results):
+    """
+    Turn classifier scores into the grievance's category, priority and SLA.
+
+    Args:
+        clip_results (list): ``[{"label", "score"}, ...]`` ordered by score
+
+    Returns:
+        dict: category, priorityLevel, estimatedDays, confidence, all_results
+    """
+    category, highest_score = clip_results[0]["label"], clip_results[0]["score"]
+    if category in HIGH_PRIORITY:
+        priority, days = "high", 3
+    elif category in MEDIUM_PRIORITY:
+        priority, days = "medium", 7
+    else:
+        priority, days = "low", 14
+    return {
+        "category": category,
+        "priorityLevel": priority,
+        "estimatedDays": days,
+        "confidence": highest_score,
+        "all_results": clip_results
+    }
+
+
+def unclassified(error, retry=False):
+    """Fallback classification; ``retry`` marks it for re-classification once the classifier is back."""
+    result = {
+        "category": "unclassified",
+        "priorityLevel": "medium",
+        "estimatedDays": 7,
+        "confidence": 0,
+        "error": error,
+        "all_results": []
+    }
+    if retry:
+        result["retry"] = True
+    return result
+
+
+def classification_fields(clip_results):
+    """Store fields set from a classification result."""
+    return {
+        "category": clip_results.get("category", "Unclassified"),
+        "priorityLevel": clip_results.get("priorityLevel", "medium"),
+        "estimatedDays": int(clip_results.get("estimatedDays", 7)),
+        "aiJustification": json.dumps(clip_results.get("all_results", [])),
+    }
+
+
+def encode_justification(all_results, top_k=JUSTIFICATION_TOP_K):
+    """
+    Compact on-chain form of a classification's ``all_results``.
+
+    Args:
+        all_results (list): ``[{"label", "score"}, ...]`` as returned by the classifier
+        top_k (int): Number of highest-scoring labels kept
+
+    Returns:
+        str: e.g. ``1;8:562,4:171,3:161``; the plain JSON list if a kept label is not in the current table
+    """
+    labels = JUSTIFICATION_LABELS[JUSTIFICATION_VERSION]
+    top = sorted(all_results, key=lambda r: r["score"], reverse=True)[:top_k]
+    if any(r["label"] not in labels for r in top):
+        return json.dumps(top)
+    entries = ",".join(f"{labels.index(r['label'])}:{round(r['score'] * 1000)}" for r in top)
+    return f"{JUSTIFICATION_VERSION};{entries}"
+
+
+def decode_justification(text):
+    """
+    ``[{"label", "score"}, ...]`` from an on-chain aiJustification, compact or the older JSON list.
+
+    Raises:
+        ValueError: If ``text`` is in neither format (e.g. free text written by another client)
+    """
+    if not text:
+        return []
+    if text.startswith("["):
+        return json.loads(text)
+    version, separator, entries = text.partition(";")
+    labels = JUSTIFICATION_LABELS.get(int(version)) if version.isdigit() else None
+    if labels is None or not separator:
+        raise ValueError(f"Unknown aiJustification encoding: {text[:32]!r}")
+    results = []
+    for entry in filter(None, entries.split(",")):
+        index, _, score = entry.partition(":")
+        results.append({"label": labels[int(index)], "score": int(score) / 1000})
+    return results
+
+
+def readable_justification(text):
+    """An on-chain aiJustification as the API serves it (a JSON list); text in no known format is kept as is."""
+    try:
+        return json.dumps(decode_justification(text))
+    except (ValueError, IndexError):
+        return text
+
+
+def grievance_args(grievance_data):
+    """
+    The 11 submitGrievance arguments (also one GrievanceInput tuple for submitGrievances).
+
+    aiJustification goes on-chain in the compact ``encode_justification`` form;
+    the store keeps the full JSON.
+    """
+    return (
+        grievance_data["title"],
+        grievance_data["description"],
+        grievance_data["category"],
+        grievance_data["location"],
+        int(grievance_data.get("mediaCount", 0)),
+        grievance_data["priorityLevel"],
+        grievance_data["trackingId"],
+        int(grievance_data.get("estimatedDays", 7)),
+        int(grievance_data.get("fundAmount", 0)),
+        grievance_data.get("currency", "INR"),
+        encode_justification(json.loads(grievance_data["aiJustification"])),
+    )
+
+
+def batch_results(batch, receipt, contract_address, decoder):
+    """
+    Map a mined submitGrievances receipt back to each grievance in ``batch``.
+
+    A grievance counts as submitted only if the receipt carries its
+    GrievanceSubmitted event.
+
+    Returns:
+        dict: trackingId -> {"success", "tracking_id"/"error", "tx_hash"}
+    """
+    tx_hash = receipt["transactionHash"].hex()
+    recorded = set()
+    for log in receipt["logs"]:
+        if log["address"] != contract_address:
+            continue
+        decoded = decoder.decode(log)
+        if decoded and decoded[0] == "GrievanceSubmitted":
+            recorded.add(decoded[1]["trackingId"])
+    results = {}
+    for g in batch:
+        tracking_id = g["trackingId"]
+        if tracking_id in recorded:
+            results[tracking_id] = {"success": True, "tracking_id": tracking_id, "tx_hash": tx_hash}
+        else:
+            results[tracking_id] = {"success": False, "error": "No GrievanceSubmitted event in batch tx", "tx_hash": tx_hash}
+    return results
+
+
+def parse_grievance_query(args):
+    """Translate /get_all_grievances query parameters into GRIEVANCE_STORE.scan() filters."""
+    filters = {}
+    if args.get("status"):
+        filters["blockchainStatus"] = args["status"]
+    if args.get("category"):
+        filters["category"] = args["category"]
+    if args.get("priority"):
+        filters["priorityLevel"] = args["priority"]
+    if args.get("resolved") is not None:
+        filters["resolved"] = args["resolved"].lower() in ("1", "true", "yes")
+    for bound in ("since", "until"):
+        if args.get(bound):
+            filters[bound] = int(args[bound])
+    if args.get("cursor"):
+        filters["after"] = int(args["cursor"])
+    return filters
+
+
+def project(record, fields, exclude):
+    if fields:
+        record = {k: v for k, v in record.items() if k in fields}
+    for k in exclude:
+        record.pop(k, None)
+    return record
@@ -0,0 +1,58 @@
+"""
+Multi-process deployment of app.py: HTTP workers on every core, one signer.
+
+    gunicorn -c gunicorn.conf.py app:app
+
+The workers share the SQLite grievance store (GRIEVANCE_STORE_SHARED=1)
+and send every transaction through the signer process (signer.py) on
+SIGNER_SOCKET, which this config starts before the first worker and stops
+on shutdown. Each worker resumes the grievance jobs that earlier workers
+left in the job spool (JOB_SPOOL_DIR). The ASGI app scales the same way with
+``uvicorn asgi_app:app --workers N`` once signer.py is running.
+"""
+import multiprocessing
+import os
+import subprocess
+import sys
+import time
+
+bind = os.getenv("BIND", "0.0.0.0:5000")
+workers = int(os.getenv("WEB_CONCURRENCY", str(multiprocessing.cpu_count())))
+# Threads per worker for blocking routes (e.g. /grievance_status?wait=)
+threads = int(os.getenv("WORKER_THREADS", "8"))
+worker_class = "gthread"
+timeout = 120
+
+# Inherited by the signer and every worker
+os.environ.setdefault("GRIEVANCE_STORE_SHARED", "1")
+os.environ.setdefault("SIGNER_SOCKET", os.path.join(os.getcwd(), "grievance-signer.sock"))
+
+_signer = None
+
+
+def on_starting(server):
+    global _signer
+    socket_path = os.environ["SIGNER_SOCKET"]
+    if os.path.exists(socket_path):
+        os.unlink(socket_path)
+    _signer = subprocess.Popen([sys.executable, os.path.join(os.path.dirname(os.path.abspath(__file__)), "signer.py")])
+    # Workers connect lazily, but fail their first sends if the socket is not up yet
+    deadline = time.time() + 30
+    while not os.path.exists(socket_path):
+        if _signer.poll() is not None or time.time() > deadline:
+            raise RuntimeError("Signer process failed to start")
+        time.sleep(0.1)
+
+
+def on_exit(server):
+    if _signer and _signer.poll() is None:
+        _signer.terminate()
+        _signer.wait(10)
+    if os.path.exists(os.environ["SIGNER_SOCKET"]):
+        os.unlink(os.environ["SIGNER_SOCKET"])
+
+
+def post_worker_init(worker):
+    # Jobs left spooled by a worker that exited (or by the last run) are picked up by the next one to start
+    import app
+    app.resume_jobs()
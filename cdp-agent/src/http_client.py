@@ -0,0 +1,202 @@
+import asyncio
+import logging
+import random
+import threading
+import time
+
+import httpx
+import requests
+from requests.adapters import HTTPAdapter
+
+log = logging.getLogger(__name__)
+
+# Statuses worth retrying: rate limited, or the hosted model is loading / overloaded
+RETRY_STATUSES = (429, 502, 503, 504)
+
+
+def backoff_delay(attempt, backoff, max_backoff, response=None):
+    """Full-jitter exponential backoff; a ``Retry-After`` header on ``response`` wins when present."""
+    retry_after = response.headers.get("Retry-After") if response is not None else None
+    if retry_after:
+        try:
+            return min(float(retry_after), max_backoff)
+        except ValueError:
+            pass
+    return random.uniform(0, min(max_backoff, backoff * 2 ** attempt))
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of sending a request while the circuit breaker is open."""
+
+
+class CircuitBreaker:
+    """
+    Fails fast while a service keeps failing.
+
+    After ``failure_threshold`` consecutive failures the breaker opens and
+    ``allow()`` returns False for ``reset_timeout`` seconds. Then a single
+    probe request is let through (half-open): success closes the breaker,
+    failure opens it again.
+    """
+
+    def __init__(self, failure_threshold=5, reset_timeout=30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._lock = threading.Lock()
+        self._failures = 0
+        self._opened_at = None
+        self._probing = False
+
+    @property
+    def state(self):
+        with self._lock:
+            if self._opened_at is None:
+                return "closed"
+            if self._probing or time.time() - self._opened_at >= self.reset_timeout:
+                return "half-open"
+            return "open"
+
+    def allow(self):
+        with self._lock:
+            if self._opened_at is None:
+                return True
+            if self._probing or time.time() - self._opened_at < self.reset_timeout:
+                return False
+            self._probing = True
+            return True
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._probing = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self._probing or self._failures >= self.failure_threshold:
+                if self._opened_at is None or self._probing:
+                    log.warning("Circuit opened after %s consecutive failures", self._failures)
+                self._opened_at = time.time()
+                self._probing = False
+
+
+class ResilientClient:
+    """
+    Shared HTTP client for an upstream API: pooled keep-alive connections,
+    timeouts, jittered retries and a circuit breaker.
+
+    Connections are reused through one ``requests.Session`` with a pool of
+    ``pool_size`` connections per host. Every request has a
+    ``(connect_timeout, read_timeout)``. Responses with a status in
+    RETRY_STATUSES and connection errors/timeouts are retried up to
+    ``retries`` times with full-jitter exponential backoff (a ``Retry-After``
+    header wins when present). A request that still fails counts against the
+    breaker; while it is open, ``post`` raises CircuitOpenError without
+    touching the network.
+    """
+
+    def __init__(self, pool_size=10, connect_timeout=3.05, read_timeout=30.0, retries=2,
+                 backoff=0.5, max_backoff=8.0, breaker=None):
+        self.timeout = (connect_timeout, read_timeout)
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.breaker = breaker or CircuitBreaker()
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+    def _delay(self, attempt, response=None):
+        return backoff_delay(attempt, self.backoff, self.max_backoff, response)
+
+    def post(self, url, **kwargs):
+        """
+        POST with retries; returns the final response (which may still be an error status).
+
+        Raises:
+            CircuitOpenError: If the breaker is open
+            requests.RequestException: If the last attempt failed to connect or timed out
+        """
+        if not self.breaker.allow():
+            raise CircuitOpenError(f"{url} is unavailable (circuit open)")
+        kwargs.setdefault("timeout", self.timeout)
+        for attempt in range(self.retries + 1):
+            last = attempt == self.retries
+            try:
+                response = self.session.post(url, **kwargs)
+            except (requests.ConnectionError, requests.Timeout):
+                if last:
+                    self.breaker.record_failure()
+                    raise
+                time.sleep(self._delay(attempt))
+                continue
+            except Exception:
+                self.breaker.record_failure()
+                raise
+            if response.status_code not in RETRY_STATUSES:
+                # 2xx and client errors mean the service itself is up
+                self.breaker.record_success()
+                return response
+            if last:
+                self.breaker.record_failure()
+                return response
+            time.sleep(self._delay(attempt, response))
+
+
+class AsyncResilientClient:
+    """
+    ``ResilientClient`` for asyncio code, on one ``httpx.AsyncClient``.
+
+    Same pooling, timeouts, retry policy and breaker semantics; waiting on
+    the network or a backoff never blocks the event loop, so one process
+    can keep thousands of requests in flight over ``pool_size``
+    connections (requests beyond that queue for a free connection).
+    """
+
+    def __init__(self, pool_size=10, connect_timeout=3.05, read_timeout=30.0, retries=2,
+                 backoff=0.5, max_backoff=8.0, breaker=None):
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.breaker = breaker or CircuitBreaker()
+        self.client = httpx.AsyncClient(
+            limits=httpx.Limits(max_connections=pool_size, max_keepalive_connections=pool_size),
+            # The pool timeout covers the wait for a free connection, which is unbounded by design
+            timeout=httpx.Timeout(read_timeout, connect=connect_timeout, pool=None),
+        )
+
+    async def post(self, url, **kwargs):
+        """
+        POST with retries; returns the final response (which may still be an error status).
+
+        Raises:
+            CircuitOpenError: If the breaker is open
+            httpx.TransportError: If the last attempt failed to connect or timed out
+        """
+        if not self.breaker.allow():
+            raise CircuitOpenError(f"{url} is unavailable (circuit open)")
+        for attempt in range(self.retries + 1):
+            last = attempt == self.retries
+            try:
+                response = await self.client.post(url, **kwargs)
+            except httpx.TransportError:
+                if last:
+                    self.breaker.record_failure()
+                    raise
+                await asyncio.sleep(backoff_delay(attempt, self.backoff, self.max_backoff))
+                continue
+            except Exception:
+                self.breaker.record_failure()
+                raise
+            if response.status_code not in RETRY_STATUSES:
+                self.breaker.record_success()
+                return response
+            if last:
+                self.breaker.record_failure()
+                return response
+            await asyncio.sleep(backoff_delay(attempt, self.backoff, self.max_backoff, response))
+
+    async def aclose(self):
+        await self.client.aclose()
@@ -0,0 +1,197 @@
+"""
+Repeat detection for /submit_grievance.
+
+A client that retries a submission (say after a timeout) sends the same
+``Idempotency-Key`` header, or, with SUBMIT_DEDUP_WINDOW set, the same
+photo, title and location. ``IdempotencyTable`` maps those keys to the
+trackingId of the first request for a while, so the retry is answered with
+that grievance instead of being classified and sent on-chain again.
+"""
+import hashlib
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+CHUNK_SIZE = 1024 * 1024
+# Longest Idempotency-Key header accepted
+MAX_KEY_LENGTH = 255
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS idempotency_keys (
+    key TEXT PRIMARY KEY,
+    tracking_id TEXT NOT NULL,
+    fingerprint TEXT NOT NULL,
+    expires_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_idempotency_keys_expires_at ON idempotency_keys (expires_at);
+"""
+
+
+def request_fingerprint(upload, title, location):
+    """
+    sha256 over the raw image bytes, the title and the location.
+
+    Args:
+        upload: Seekable file object from ``open_upload``; read from its
+            current position and left there
+
+    Returns:
+        str: Hex digest
+    """
+    start = upload.tell()
+    digest = hashlib.sha256()
+    for chunk in iter(lambda: upload.read(CHUNK_SIZE), b""):
+        digest.update(chunk)
+    upload.seek(start)
+    for field in (title, location):
+        digest.update(b"\0" + field.encode("utf-8"))
+    return digest.hexdigest()
+
+
+def submission_keys(idempotency_key, fingerprint, key_ttl, dedup_window):
+    """
+    The table keys (with their lifetimes) a submission is looked up and recorded under.
+
+    Args:
+        idempotency_key (str): Idempotency-Key header, or "" if none was sent
+        fingerprint (str): ``request_fingerprint`` of the submission
+        key_ttl (float): Seconds an Idempotency-Key is remembered
+        dedup_window (float): Seconds the same content counts as a repeat; 0 turns content dedup off
+
+    Returns:
+        list: [(key, ttl), ...], empty when there is nothing to dedup on
+    """
+    keys = []
+    if idempotency_key:
+        keys.append((f"key:{idempotency_key}", key_ttl))
+    if dedup_window > 0:
+        keys.append((f"content:{fingerprint}", dedup_window))
+    return keys
+
+
+class IdempotencyTable:
+    """
+    Bounded, expiring map of request keys to the trackingId they created.
+
+    ``claim`` is atomic: of several concurrent requests with a shared key,
+    exactly one records its trackingId and the rest get that one back.
+    Entries expire after their own ttl, and beyond ``max_entries`` the
+    oldest are dropped. In memory by default; with ``path`` the table is a
+    SQLite file, so worker processes sharing it see each other's keys.
+    """
+
+    def __init__(self, max_entries=100000, path=None):
+        self.max_entries = max_entries
+        self.path = path
+        self._lock = threading.Lock()
+        # key -> (tracking_id, fingerprint, expires_at), oldest first
+        self._memory = OrderedDict()
+        self._db = None
+        self._rows = 0
+        if path:
+            self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute("PRAGMA synchronous=NORMAL")
+            self._db.execute("PRAGMA busy_timeout=5000")
+            self._db.executescript(_SCHEMA)
+            self._db.execute("DELETE FROM idempotency_keys WHERE expires_at < ?", (time.time(),))
+            self._rows = self._db.execute("SELECT COUNT(*) FROM idempotency_keys").fetchone()[0]
+
+    def claim(self, keys, tracking_id, fingerprint):
+        """
+        Record ``tracking_id`` under every key, unless one of them is already taken.
+
+        Args:
+            keys (list): [(key, ttl), ...] from ``submission_keys``
+            tracking_id (str): Id the new grievance will get
+            fingerprint (str): ``request_fingerprint``, to tell a retry from a reused key
+
+        Returns:
+            tuple: (key, tracking_id, fingerprint) of the earlier request holding
+            the first taken key, or None if this request now holds them all
+        """
+        now = time.time()
+        with self._lock:
+            if self._db is not None:
+                return self._claim_db(keys, tracking_id, fingerprint, now)
+            for key, _ in keys:
+                entry = self._memory.get(key)
+                if entry is not None and entry[2] > now:
+                    return key, entry[0], entry[1]
+            for key, ttl in keys:
+                self._memory.pop(key, None)
+                self._memory[key] = (tracking_id, fingerprint, now + ttl)
+            self._trim(now)
+            return None
+
+    def _trim(self, now):
+        # Oldest first: over the bound, or expired (an older entry with a longer ttl can stop the sweep early;
+        # the bound still holds and expired entries are never returned)
+        while self._memory:
+            _, _, expires_at = next(iter(self._memory.values()))
+            if len(self._memory) <= self.max_entries and expires_at > now:
+                return
+            self._memory.popitem(last=False)
+
+    def _claim_db(self, keys, tracking_id, fingerprint, now):
+        # IMMEDIATE takes the write lock up front, so the check and the insert see no other writer in between
+        self._db.execute("BEGIN IMMEDIATE")
+        try:
+            for key, _ in keys:
+                row = self._db.execute(
+                    "SELECT tracking_id, fingerprint FROM idempotency_keys WHERE key = ? AND expires_at > ?",
+                    (key, now),
+                ).fetchone()
+                if row is not None:
+                    self._db.execute("COMMIT")
+                    return key, row[0], row[1]
+            self._db.executemany(
+                "INSERT OR REPLACE INTO idempotency_keys (key, tracking_id, fingerprint, expires_at) "
+                "VALUES (?, ?, ?, ?)",
+                [(key, tracking_id, fingerprint, now + ttl) for key, ttl in keys],
+            )
+            self._rows += len(keys)
+            if self._rows > self.max_entries * 1.1:
+                self._evict(now)
+            self._db.execute("COMMIT")
+        except BaseException:
+            self._db.execute("ROLLBACK")
+            raise
+        return None
+
+    def _evict(self, now):
+        # Expired rows first, then the soonest to expire until max_entries remain
+        self._db.execute("DELETE FROM idempotency_keys WHERE expires_at <= ?", (now,))
+        self._db.execute(
+            "DELETE FROM idempotency_keys WHERE key IN "
+            "(SELECT key FROM idempotency_keys ORDER BY expires_at DESC LIMIT -1 OFFSET ?)",
+            (self.max_entries,),
+        )
+        self._rows = self._db.execute("SELECT COUNT(*) FROM idempotency_keys").fetchone()[0]
+
+    def release(self, keys, tracking_id):
+        """Forget ``keys`` if they still point at ``tracking_id`` (its request failed, so a retry should run)."""
+        with self._lock:
+            if self._db is not None:
+                self._db.executemany(
+                    "DELETE FROM idempotency_keys WHERE key = ? AND tracking_id = ?",
+                    [(key, tracking_id) for key, _ in keys],
+                )
+                return
+            for key, _ in keys:
+                entry = self._memory.get(key)
+                if entry is not None and entry[0] == tracking_id:
+                    del self._memory[key]
+
+    def __len__(self):
+        with self._lock:
+            if self._db is not None:
+                return self._db.execute(
+                    "SELECT COUNT(*) FROM idempotency_keys WHERE expires_at > ?", (time.time(),)
+                ).fetchone()[0]
+            return len(self._memory)
+
+    def close(self):
+        if self._db is not None:
+            self._db.close()
@@ -0,0 +1,99 @@
+import io
+import os
+
+# CLIP ViT-B/32 looks at a 224x224 center crop
+MODEL_INPUT_SIZE = 224
+DEFAULT_MAX_UPLOAD_BYTES = 10 * 1024 * 1024
+CHUNK_SIZE = 64 * 1024
+
+_EXIF_ORIENTATION = 0x0112
+# EXIF orientation value -> PIL transpose method (same table as ImageOps.exif_transpose)
+_EXIF_TRANSPOSE = {2: 0, 3: 3, 4: 1, 5: 5, 6: 4, 7: 6, 8: 2}
+
+
+class ImageRejected(ValueError):
+    """The upload is too large or not a readable image; ``status_code`` is the HTTP status to answer with."""
+
+    def __init__(self, message, status_code=400):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+def open_upload(stream, max_bytes=DEFAULT_MAX_UPLOAD_BYTES):
+    """
+    Return a seekable file object for an uploaded image, at most ``max_bytes`` long.
+
+    Werkzeug spools uploads to a seekable (temporary) file, so the size is
+    checked by seeking and the image is later decoded straight from it
+    without reading it into a Python buffer. Other streams are read in
+    chunks and rejected as soon as they pass the limit.
+    """
+    try:
+        seekable = stream.seekable()
+    except (AttributeError, ValueError):
+        seekable = False
+    if seekable:
+        start = stream.tell()
+        size = stream.seek(0, os.SEEK_END) - start
+        stream.seek(start)
+        if size > max_bytes:
+            raise ImageRejected(f"Image is larger than {max_bytes} bytes", 413)
+        return stream
+
+    chunks, size = [], 0
+    while True:
+        chunk = stream.read(CHUNK_SIZE)
+        if not chunk:
+            break
+        size += len(chunk)
+        if size > max_bytes:
+            raise ImageRejected(f"Image is larger than {max_bytes} bytes", 413)
+        chunks.append(chunk)
+    return io.BytesIO(b"".join(chunks))
+
+
+def prepare_image(fileobj, size=MODEL_INPUT_SIZE, quality=90):
+    """
+    Decode an image once at reduced resolution and return it as a small JPEG.
+
+    JPEGs are decoded in draft mode, which lets libjpeg scale by 1/2, 1/4
+    or 1/8 during decoding instead of producing the full-size bitmap. The
+    result is then shrunk so its short side is ``size`` (the model's input
+    resolution) and EXIF rotation is applied.
+
+    Args:
+        fileobj: Binary file object (or bytes / memoryview) holding the upload
+        size (int): Target length of the short side in pixels
+        quality (int): JPEG quality of the returned image
+
+    Returns:
+        bytes: JPEG-encoded RGB image
+
+    Raises:
+        ImageRejected: If the data is not a decodable image or is too many pixels
+    """
+    from PIL import Image
+
+    if isinstance(fileobj, (bytes, bytearray, memoryview)):
+        fileobj = io.BytesIO(fileobj)
+    try:
+        with Image.open(fileobj) as img:
+            img.draft("RGB", (size, size))
+            small = img.convert("RGB")
+            scale = size / min(small.size)
+            if scale < 1:
+                target = (max(size, round(small.width * scale)), max(size, round(small.height * scale)))
+                # reducing_gap shrinks by whole factors first, which is much faster than one resample
+                small = small.resize(target, Image.Resampling.BICUBIC, reducing_gap=2.0)
+            # Phone photos are often stored sideways with an EXIF orientation tag
+            transpose = _EXIF_TRANSPOSE.get(img.getexif().get(_EXIF_ORIENTATION))
+            if transpose is not None:
+                small = small.transpose(transpose)
+    except Image.DecompressionBombError as e:
+        raise ImageRejected(str(e), 413) from e
+    except Exception as e:
+        raise ImageRejected(f"Unsupported or corrupt image: {e}") from e
+
+    out = io.BytesIO()
+    small.save(out, format="JPEG", quality=quality)
+    return out.getvalue()
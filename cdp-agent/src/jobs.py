@@ -0,0 +1,173 @@
+import logging
+import os
+import queue
+import threading
+
+log = logging.getLogger(__name__)
+
+
+class JobQueue:
+    """
+    Long-lived in-process job queue served by a fixed pool of worker threads.
+
+    Every job put on the queue is passed to ``handler`` as its only argument.
+    Workers are started lazily on the first ``submit`` so that importing the
+    module never spawns threads.
+    """
+
+    def __init__(self, name, handler, workers=2, maxsize=0):
+        self.name = name
+        self.handler = handler
+        self.workers = max(1, int(workers))
+        self._queue = queue.Queue(maxsize=maxsize)
+        self._threads = []
+        self._lock = threading.Lock()
+        self._stopping = threading.Event()
+
+    def start(self):
+        with self._lock:
+            if self._threads:
+                return
+            self._stopping.clear()
+            for i in range(self.workers):
+                t = threading.Thread(
+                    target=self._run,
+                    name=f"{self.name}-worker-{i}",
+                    daemon=True,
+                )
+                t.start()
+                self._threads.append(t)
+
+    def submit(self, job, block=True, timeout=None):
+        """
+        Enqueue a job for the worker pool.
+
+        Args:
+            job: Payload handed to the handler as its only argument
+            block (bool): Wait for a free slot when the queue is bounded
+            timeout (float, optional): Max seconds to wait for a free slot
+
+        Raises:
+            queue.Full: If the queue is bounded and stays full
+        """
+        self.start()
+        self._queue.put(job, block=block, timeout=timeout)
+
+    def pending(self):
+        return self._queue.qsize()
+
+    def stop(self, wait=True):
+        self._stopping.set()
+        for _ in self._threads:
+            self._queue.put(None)
+        if wait:
+            for t in self._threads:
+                t.join()
+        self._threads = []
+
+    def _run(self):
+        while not self._stopping.is_set():
+            job = self._queue.get()
+            try:
+                if job is None:
+                    return
+                self.handler(job)
+            except Exception:
+                log.exception("%s job failed", self.name)
+            finally:
+                self._queue.task_done()
+
+
+class JobSpool:
+    """
+    Grievance jobs kept on disk until their chain outcome is recorded.
+
+    A queued job is ``<trackingId>.<pid>.queued`` in ``directory``, holding
+    its prepared image; once handed to the chain batcher it becomes an empty
+    ``<trackingId>.<pid>.chain`` marker. ``pid`` is the process that owns the
+    job, so after a crash or restart ``orphans`` finds the jobs nobody is
+    working on any more and ``claim`` takes them over.
+    """
+
+    STAGES = ("queued", "chain")
+
+    def __init__(self, directory):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, tracking_id, stage, pid=None):
+        return os.path.join(self.directory, f"{tracking_id}.{pid or os.getpid()}.{stage}")
+
+    def add(self, tracking_id, image_bytes):
+        path = self._path(tracking_id, "queued")
+        tmp = f"{path}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(image_bytes)
+        os.replace(tmp, path)
+
+    def advance(self, tracking_id):
+        """The job reached the chain batcher: its image is no longer needed, only the marker."""
+        open(self._path(tracking_id, "chain"), "wb").close()
+        self._unlink(self._path(tracking_id, "queued"))
+
+    def remove(self, tracking_id):
+        for stage in self.STAGES:
+            self._unlink(self._path(tracking_id, stage))
+
+    @staticmethod
+    def _unlink(path):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+    def entries(self):
+        """(trackingId, pid, stage) of every spooled job."""
+        entries = []
+        for name in os.listdir(self.directory):
+            tracking_id, _, rest = name.partition(".")
+            pid, _, stage = rest.partition(".")
+            if pid.isdigit() and stage in self.STAGES:
+                entries.append((tracking_id, int(pid), stage))
+        return entries
+
+    def orphans(self):
+        """
+        Spooled jobs whose process has exited.
+
+        Call it when the process starts, before it queues anything: jobs
+        under its own pid then belong to an earlier process that had the
+        same pid, as happens across container restarts.
+        """
+        return [entry for entry in self.entries() if entry[1] == os.getpid() or not _alive(entry[1])]
+
+    def claim(self, tracking_id, pid, stage):
+        """
+        Move an orphaned job over to this process.
+
+        Returns:
+            bytes: The job's image (empty for a ``chain`` marker), or None if
+            another process claimed it first
+        """
+        path = self._path(tracking_id, stage)
+        try:
+            if pid != os.getpid():
+                os.rename(self._path(tracking_id, stage, pid), path)
+            with open(path, "rb") as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+
+    def tracked(self):
+        """Tracking ids of every spooled job, whichever process owns it."""
+        return {tracking_id for tracking_id, _, _ in self.entries()}
+
+
+def _alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
@@ -0,0 +1,36 @@
+import threading
+
+
+class Lazy:
+    """
+    Module-level singleton that is built on first use.
+
+    ``Lazy(factory)`` stands in for ``factory()``: the first attribute access
+    (from any thread) calls the factory once and every access after that is
+    forwarded to the object it returned. app.py wraps web3 and everything
+    built on it this way, so a cold start (e.g. a serverless invocation)
+    only pays for the web3 import when a request actually touches the chain.
+    """
+
+    def __init__(self, factory):
+        self._factory = factory
+        self._value = None
+        self._lock = threading.Lock()
+
+    def __getattr__(self, name):
+        return getattr(self._get(), name)
+
+    def _get(self):
+        if self._value is None:
+            with self._lock:
+                if self._value is None:
+                    self._value = self._factory()
+        return self._value
+
+    @property
+    def loaded(self):
+        """Whether the object has been built yet; does not build it."""
+        return self._value is not None
+
+    def __repr__(self):
+        return f"<Lazy {self._value!r}>" if self.loaded else f"<Lazy {self._factory!r} (not built)>"
@@ -0,0 +1,116 @@
+"""
+Leveled, sampled, structured logging that does not block the caller.
+
+``configure_logging()`` routes every logger to a bounded in-memory queue
+that one background thread drains to stderr, as JSON lines (LOG_FORMAT=json,
+the default) or plain text. The calling thread only builds the record and
+enqueues it: message formatting and I/O happen on the writer thread, and
+when the queue is full the record is dropped and counted instead of
+waiting. Records below WARNING are kept with probability LOG_SAMPLE_RATE,
+so per-request detail can stay on under load; warnings and errors are
+always kept.
+
+Modules log through ``logging.getLogger(__name__)``; fields passed as
+``extra={...}`` become keys of the JSON line.
+"""
+import atexit
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import random
+
+from metrics import Counter
+
+LOG_RECORDS_DROPPED = Counter("grievance_log_records_dropped_total", "Log records dropped because the log queue was full.")
+
+# Attributes every LogRecord has; anything else on a record came from ``extra``
+_RECORD_ATTRS = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime", "taskName"}
+
+# Libraries that log every request at DEBUG/INFO; LOG_LEVEL only applies to this service's modules
+QUIET_LOGGERS = ("web3", "urllib3", "httpx", "httpcore", "asyncio")
+
+_listener = None
+
+
+class SampleFilter(logging.Filter):
+    """Keeps records below WARNING with probability ``rate``; everything else passes."""
+
+    def __init__(self, rate):
+        super().__init__()
+        self.rate = rate
+
+    def filter(self, record):
+        return record.levelno >= logging.WARNING or self.rate >= 1 or random.random() < self.rate
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record):
+        entry = {
+            "ts": round(record.created, 3),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        entry.update((k, v) for k, v in vars(record).items() if k not in _RECORD_ATTRS)
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+class TextFormatter(logging.Formatter):
+    def __init__(self):
+        super().__init__("%(asctime)s %(levelname)s %(name)s: %(message)s")
+
+    def format(self, record):
+        line = super().format(record)
+        extra = " ".join(f"{k}={v}" for k, v in vars(record).items() if k not in _RECORD_ATTRS)
+        return f"{line} {extra}" if extra else line
+
+
+class _NonBlockingQueueHandler(logging.handlers.QueueHandler):
+    def prepare(self, record):
+        # Same process: hand the record over as is, the writer thread formats it
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            LOG_RECORDS_DROPPED.inc()
+
+
+def configure_logging(level=None, sample_rate=None, fmt=None, queue_size=None):
+    """
+    Install the queued handler on the root logger (once per process).
+
+    Args:
+        level (str): Minimum level, default LOG_LEVEL or INFO
+        sample_rate (float): Share of DEBUG/INFO records kept, default LOG_SAMPLE_RATE or 1
+        fmt (str): ``json`` or ``text``, default LOG_FORMAT or json
+        queue_size (int): Records buffered before new ones are dropped, default LOG_QUEUE_SIZE or 10000
+    """
+    global _listener
+    if _listener is not None:
+        return
+    level = level or os.getenv("LOG_LEVEL", "INFO")
+    sample_rate = float(os.getenv("LOG_SAMPLE_RATE", "1") if sample_rate is None else sample_rate)
+    fmt = fmt or os.getenv("LOG_FORMAT", "json")
+    queue_size = queue_size or int(os.getenv("LOG_QUEUE_SIZE", "10000"))
+
+    output = logging.StreamHandler()
+    output.setFormatter(JsonFormatter() if fmt == "json" else TextFormatter())
+    records = queue.Queue(queue_size)
+    handler = _NonBlockingQueueHandler(records)
+    handler.addFilter(SampleFilter(sample_rate))
+
+    root = logging.getLogger()
+    root.handlers[:] = [handler]
+    root.setLevel(level.upper())
+    for name in QUIET_LOGGERS:
+        logging.getLogger(name).setLevel(max(root.level, logging.WARNING))
+    _listener = logging.handlers.QueueListener(records, output, respect_handler_level=False)
+    _listener.start()
+    # Write out what is still queued on a normal exit
+    atexit.register(_listener.stop)
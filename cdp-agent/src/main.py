@@ -4,10 +4,7 @@ import time
 import uuid
 from flask import Flask, request, render_template, jsonify, send_from_directory
 import base64
-import requests
-import io
 import json
-from PIL import Image
 
 from coinbase_agentkit import (
     AgentKit,
@@ -27,6 +24,10 @@ from langchain_openai import ChatOpenAI
 from langgraph.checkpoint.memory import MemorySaver
 from langgraph.prebuilt import create_react_agent
 
+from classifier import ClassifierError, open_classifier
+from grievances import GRIEVANCE_CATEGORIES
+from image_ingest import ImageRejected, prepare_image
+
 # Load environment variables
 load_dotenv()
 
@@ -39,6 +40,24 @@ wallet_data_file = "wallet_data.txt"
 HUGGINGFACE_API_KEY = os.getenv("HUGGINGFACE_API_KEY")
 assert HUGGINGFACE_API_KEY, "You must set the HUGGINGFACE_API_KEY environment variable"
 
+# Label sets for the CLIP tools, next to GRIEVANCE_CATEGORIES from grievances.py
+ANALYSIS_CATEGORIES = [
+    "infrastructure damage", "environmental issue", "public safety hazard",
+    "community concern", "service disruption", "vandalism", "accessibility issue",
+    "noise complaint", "sanitation problem", "traffic issue"
+]
+LOCATION_TYPES = [
+    "urban street", "residential neighborhood", "public park",
+    "highway", "business district", "school zone", "government building",
+    "shopping center", "industrial area", "rural road"
+]
+
+# Remote Hugging Face CLIP by default; CLASSIFIER_BACKEND=local embeds every label set once at startup
+CLASSIFIER = open_classifier(
+    api_key=HUGGINGFACE_API_KEY,
+    label_sets=[ANALYSIS_CATEGORIES, GRIEVANCE_CATEGORIES, LOCATION_TYPES],
+)
+
 # Ensure CDP Private Key is set
 PRIVATE_KEY = os.getenv("PRIVATE_KEY")
 assert PRIVATE_KEY, "You must set the PRIVATE_KEY environment variable"
@@ -138,56 +157,29 @@ def initialize_agent():
     # Get CDP tools from AgentKit
     cdp_tools = get_langchain_tools(agentkit)
     
-    # Define custom tools for grievance analysis with HF CLIP
+    def model_input(image_base64):
+        # Decode once, downscaled to the model's input size
+        return prepare_image(base64.b64decode(image_base64))
+
+    # Define custom tools for grievance analysis with CLIP (remote or local, see CLASSIFIER)
     def clip_image_analysis(image_base64, query=None):
         """
-        Analyze image using CLIP model from Hugging Face.
+        Analyze image using CLIP.
         
         Args:
             image_base64 (str): Base64 encoded image
             query (str, optional): Text to compare with image
         
         Returns:
-            dict: Analysis results from CLIP
+            list: [{"label", "score"}, ...] ordered by score
         """
-        API_URL = "https://api-inference.huggingface.co/models/openai/clip-vit-base-patch32"
-        headers = {"Authorization": f"Bearer {HUGGINGFACE_API_KEY}"}
-        
-        # Decode the base64 image
-        image_data = base64.b64decode(image_base64)
-        image = Image.open(io.BytesIO(image_data))
-        
-        # Convert image to bytes for API request
-        img_byte_arr = io.BytesIO()
-        image.save(img_byte_arr, format='JPEG')
-        img_byte_arr = img_byte_arr.getvalue()
-        
-        # Prepare data for the API
+        image_data = model_input(image_base64)
+        # Without a query, score against the general grievance categories. A query is scored
+        # alongside them: softmax over a single label would always give it 1.0
+        labels = ANALYSIS_CATEGORIES
         if query:
-            # If query is provided, use it for text-image similarity analysis
-            data = {
-                "inputs": {
-                    "image": base64.b64encode(img_byte_arr).decode('utf-8'),
-                    "text": query
-                }
-            }
-        else:
-            # Use general categories for grievance analysis
-            categories = [
-                "infrastructure damage", "environmental issue", "public safety hazard",
-                "community concern", "service disruption", "vandalism", "accessibility issue",
-                "noise complaint", "sanitation problem", "traffic issue"
-            ]
-            data = {
-                "inputs": {
-                    "image": base64.b64encode(img_byte_arr).decode('utf-8'),
-                    "text": categories
-                }
-            }
-        
-        # Make API request
-        response = requests.post(API_URL, headers=headers, json=data)
-        return response.json()
+            labels = [query] + [label for label in ANALYSIS_CATEGORIES if label != query]
+        return CLASSIFIER.classify(image_data, labels)
     
     def clip_grievance_categorize(image_base64):
         """
@@ -199,65 +191,9 @@ def initialize_agent():
         Returns:
             dict: Categorization results with confidence scores
         """
-        API_URL = "https://api-inference.huggingface.co/models/openai/clip-vit-base-patch32"
-        headers = {"Authorization": f"Bearer {HUGGINGFACE_API_KEY}"}
-        
-        # Decode the base64 image
-        image_data = base64.b64decode(image_base64)
-        
-        # Define grievance categories to test against
-        categories = [
-            "road pothole", "broken street light", "graffiti vandalism", 
-            "fallen tree", "water leak", "garbage dumping", "broken sidewalk", 
-            "missing street sign", "flooding", "damaged public property"
-        ]
-        
-        # Prepare data for zero-shot classification
-        data = {
-            "inputs": {
-                "image": base64.b64encode(image_data).decode('utf-8'),
-                "text": categories
-            }
-        }
-        
-        # Make API request
-        response = requests.post(API_URL, headers=headers, json=data)
-        clip_results = response.json()
-        
-        # Process the CLIP results to determine category and priority
-        if isinstance(clip_results, list) and len(clip_results) > 0:
-            # Find the highest scoring category
-            highest_score = 0
-            category = "unclassified"
-            
-            for item in clip_results:
-                if item["score"] > highest_score:
-                    highest_score = item["score"]
-                    category = item["label"]
-            
-            # Map categories to priorities
-            high_priority = ["water leak", "flooding", "fallen tree", "broken street light"]
-            medium_priority = ["road pothole", "damaged public property", "missing street sign"]
-            low_priority = ["graffiti vandalism", "garbage dumping", "broken sidewalk"]
-            
-            if category in high_priority:
-                priority = "high"
-                days = 3
-            elif category in medium_priority:
-                priority = "medium"
-                days = 7
-            else:
-                priority = "low"
-                days = 14
-                
-            return {
-                "category": category,
-                "priorityLevel": priority,
-                "estimatedDays": days,
-                "confidence": highest_score,
-                "all_results": clip_results
-            }
-        else:
+        try:
+            clip_results = CLASSIFIER.classify(model_input(image_base64), GRIEVANCE_CATEGORIES)
+        except (ClassifierError, ImageRejected):
             # Default response if CLIP analysis fails
             return {
                 "category": "unclassified",
@@ -266,6 +202,32 @@ def initialize_agent():
                 "confidence": 0,
                 "error": "Could not analyze image with CLIP"
             }
+
+        # Results come back ordered by score
+        category, highest_score = clip_results[0]["label"], clip_results[0]["score"]
+        
+        # Map categories to priorities
+        high_priority = ["water leak", "flooding", "fallen tree", "broken street light"]
+        medium_priority = ["road pothole", "damaged public property", "missing street sign"]
+        low_priority = ["graffiti vandalism", "garbage dumping", "broken sidewalk"]
+        
+        if category in high_priority:
+            priority = "high"
+            days = 3
+        elif category in medium_priority:
+            priority = "medium"
+            days = 7
+        else:
+            priority = "low"
+            days = 14
+            
+        return {
+            "category": category,
+            "priorityLevel": priority,
+            "estimatedDays": days,
+            "confidence": highest_score,
+            "all_results": clip_results
+        }
     
     def clip_location_detection(image_base64):
         """
@@ -275,32 +237,9 @@ def initialize_agent():
             image_base64 (str): Base64 encoded image
         
         Returns:
-            dict: Location type detection results
+            list: [{"label", "score"}, ...] ordered by score
         """
-        API_URL = "https://api-inference.huggingface.co/models/openai/clip-vit-base-patch32"
-        headers = {"Authorization": f"Bearer {HUGGINGFACE_API_KEY}"}
-        
-        # Decode the base64 image
-        image_data = base64.b64decode(image_base64)
-        
-        # Define location types
-        locations = [
-            "urban street", "residential neighborhood", "public park", 
-            "highway", "business district", "school zone", "government building",
-            "shopping center", "industrial area", "rural road"
-        ]
-        
-        # Prepare data for location classification
-        data = {
-            "inputs": {
-                "image": base64.b64encode(image_data).decode('utf-8'),
-                "text": locations
-            }
-        }
-        
-        # Make API request
-        response = requests.post(API_URL, headers=headers, json=data)
-        return response.json()
+        return CLASSIFIER.classify(model_input(image_base64), LOCATION_TYPES)
         
     def submit_grievance_to_blockchain(grievance_data):
         """
@@ -0,0 +1,292 @@
+"""
+Process-wide counters and latency histograms, rendered in the Prometheus text format.
+
+Recording is a dict update under a lock, cheap enough for every request
+and RPC call. Both apps serve ``render()`` on /metrics; the signer process
+serves its own on SIGNER_METRICS_PORT. With several worker processes each
+keeps its own numbers, like any Prometheus client without a shared store.
+"""
+import bisect
+import functools
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+# Seconds; spans a cached lookup to a slow block confirmation
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+
+_registry = []
+_registry_lock = threading.Lock()
+
+
+def _label_text(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ""
+    escaped = (str(v).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"') for _, v in pairs)
+    return "{" + ",".join(f'{k}="{v}"' for (k, _), v in zip(pairs, escaped)) + "}"
+
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name, help, labels=()):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self._lock = threading.Lock()
+        self._values = {}
+        with _registry_lock:
+            _registry.append(self)
+
+    def _key(self, labels):
+        if set(labels) != set(self.labels):
+            raise ValueError(f"{self.name} takes labels {self.labels}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labels)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        with self._lock:
+            items = sorted(self._values.items())
+        for key, value in items:
+            lines.extend(self._samples(key, value))
+        return lines
+
+
+class Counter(_Metric):
+    """Monotonic count, e.g. ``RPC_ERRORS.inc(method="eth_call")``."""
+
+    kind = "counter"
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels):
+        with self._lock:
+            return self._values.get(self._key(labels), 0)
+
+    def _samples(self, key, value):
+        return [f"{self.name}{_label_text(self.labels, key)} {value}"]
+
+
+class Gauge(_Metric):
+    """Value that goes up and down, e.g. ``TX_QUEUE_DEPTH.set(12, lane="submit", tier="low")``."""
+
+    kind = "gauge"
+
+    def set(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount=1, **labels):
+        self.inc(-amount, **labels)
+
+    def value(self, **labels):
+        with self._lock:
+            return self._values.get(self._key(labels), 0)
+
+    def _samples(self, key, value):
+        return [f"{self.name}{_label_text(self.labels, key)} {value}"]
+
+
+class Histogram(_Metric):
+    """
+    Distribution of durations (seconds) in cumulative buckets, plus their sum and count.
+
+    ``observe(seconds, **labels)`` records one value; ``time(**labels)`` is a
+    context manager that records how long its block took.
+    """
+
+    kind = "histogram"
+
+    def __init__(self, name, help, labels=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, help, labels)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                # Per-bucket counts (last slot: above every bound), sum
+                state = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0]
+            state[0][index] += 1
+            state[1] += value
+
+    @contextmanager
+    def time(self, **labels):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def count(self, **labels):
+        with self._lock:
+            state = self._values.get(self._key(labels))
+            return sum(state[0]) if state else 0
+
+    def _samples(self, key, value):
+        counts, total = value
+        lines, cumulative = [], 0
+        for bound, count in zip(self.buckets + (float("inf"),), counts):
+            cumulative += count
+            le = "+Inf" if bound == float("inf") else repr(float(bound))
+            lines.append(f"{self.name}_bucket{_label_text(self.labels, key, [('le', le)])} {cumulative}")
+        lines.append(f"{self.name}_sum{_label_text(self.labels, key)} {total}")
+        lines.append(f"{self.name}_count{_label_text(self.labels, key)} {cumulative}")
+        return lines
+
+
+def render():
+    """All metrics of this process in the Prometheus text exposition format."""
+    with _registry_lock:
+        metrics = list(_registry)
+    return "\n".join(line for metric in metrics for line in metric.render()) + "\n"
+
+
+def serve(port, host="0.0.0.0"):
+    """Serve ``render()`` at http://host:port/metrics from a daemon thread (for processes without a web app)."""
+
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, format, *args):
+            pass
+
+        def do_GET(self):
+            if self.path.split("?")[0] != "/metrics":
+                self.send_error(404)
+                return
+            body = render().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", CONTENT_TYPE)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="metrics-server", daemon=True).start()
+    return server
+
+
+def instrument_web3(w3):
+    """
+    Record every JSON-RPC call ``w3`` (Web3 or AsyncWeb3) makes in RPC_SECONDS / RPC_ERRORS.
+
+    A JSON-RPC batch is recorded once, as method ``batch``.
+
+    Returns:
+        The same ``w3``
+    """
+    w3.middleware_onion.add(_rpc_middleware(), "rpc_metrics")
+    return w3
+
+
+@functools.cache
+def _rpc_middleware():
+    # Built on first use so importing this module does not import web3
+    from web3.middleware import Web3Middleware
+
+    def failed(response):
+        responses = response if isinstance(response, list) else [response]
+        return any(isinstance(r, dict) and r.get("error") for r in responses)
+
+    def record(method, started, response=None, error=False):
+        RPC_SECONDS.observe(time.perf_counter() - started, method=method)
+        if error or failed(response):
+            RPC_ERRORS.inc(method=method)
+
+    class RPCMetricsMiddleware(Web3Middleware):
+        def wrap_make_request(self, make_request):
+            def middleware(method, params):
+                started = time.perf_counter()
+                try:
+                    response = make_request(method, params)
+                except Exception:
+                    record(method, started, error=True)
+                    raise
+                record(method, started, response)
+                return response
+
+            return middleware
+
+        def wrap_make_batch_request(self, make_batch_request):
+            def middleware(requests_info):
+                started = time.perf_counter()
+                try:
+                    response = make_batch_request(requests_info)
+                except Exception:
+                    record("batch", started, error=True)
+                    raise
+                record("batch", started, response)
+                return response
+
+            return middleware
+
+        async def async_wrap_make_request(self, make_request):
+            async def middleware(method, params):
+                started = time.perf_counter()
+                try:
+                    response = await make_request(method, params)
+                except Exception:
+                    record(method, started, error=True)
+                    raise
+                record(method, started, response)
+                return response
+
+            return middleware
+
+        async def async_wrap_make_batch_request(self, make_batch_request):
+            async def middleware(requests_info):
+                started = time.perf_counter()
+                try:
+                    response = await make_batch_request(requests_info)
+                except Exception:
+                    record("batch", started, error=True)
+                    raise
+                record("batch", started, response)
+                return response
+
+            return middleware
+
+    return RPCMetricsMiddleware
+
+
+# Submission pipeline: upload_read, decode, classify, fees, tx_build, gas_estimate, sign, send, receipt_wait
+STAGE_SECONDS = Histogram(
+    "grievance_stage_seconds", "Time spent in each stage of the grievance submission pipeline.", ["stage"]
+)
+RPC_SECONDS = Histogram("grievance_rpc_request_seconds", "JSON-RPC calls to the chain node by method.", ["method"])
+RPC_ERRORS = Counter("grievance_rpc_errors_total", "JSON-RPC calls that raised or returned an error.", ["method"])
+INFERENCE_SECONDS = Histogram(
+    "grievance_inference_request_seconds",
+    "Inference API calls by outcome (HTTP status, 'unreachable' or 'circuit_open').",
+    ["status"],
+)
+SUBMISSIONS = Counter(
+    "grievance_chain_submissions_total", "Grievances whose on-chain submission finished, by result.", ["result"]
+)
+SUBMIT_REPLAYS = Counter(
+    "grievance_submit_replays_total",
+    "Submissions answered with an earlier grievance, by what matched ('key' or 'content').",
+    ["reason"],
+)
+HTTP_SECONDS = Histogram("grievance_http_request_seconds", "HTTP requests served, by route and status.",
+                         ["route", "status"])
+# Outgoing transaction scheduler (tx_scheduler.py), per lane and priority tier
+TX_QUEUE_DEPTH = Gauge("grievance_tx_queue_depth", "Transactions waiting for a send slot.", ["lane", "tier"])
+TX_QUEUE_WAIT_SECONDS = Histogram(
+    "grievance_tx_queue_wait_seconds", "Time from queueing to a send slot picking the item up.", ["lane", "tier"]
+)
+TX_IN_FLIGHT = Gauge("grievance_tx_in_flight", "Batches being sent or waiting to be mined.", ["lane"])
@@ -0,0 +1,216 @@
+import logging
+import threading
+import time
+
+from metrics import STAGE_SECONDS
+
+log = logging.getLogger(__name__)
+
+# Minimum bump nodes accept for a same-nonce replacement (geth: 10%)
+REPLACEMENT_BUMP = 1.125
+
+NONCE_TOO_LOW_ERRORS = ("nonce too low", "already been used", "replacement transaction underpriced")
+ALREADY_KNOWN_ERRORS = ("already known", "known transaction")
+
+
+def get_pending_tx_gas_price(web3, address, nonce):
+    try:
+        tx = web3.eth.get_transaction_by_nonce(address, nonce)
+        if tx and hasattr(tx, 'gasPrice'):
+            return int(tx.gasPrice)
+        elif tx and 'gasPrice' in tx:
+            return int(tx['gasPrice'])
+        return None
+    except Exception as e:
+        log.debug("Could not fetch pending tx gas price: %s", e)
+        return None
+
+
+def _error_matches(exc, needles):
+    msg = str(exc).lower()
+    return any(n in msg for n in needles)
+
+
+class NonceManager:
+    """
+    Thread-safe local nonce allocator for a single signer address.
+
+    The next nonce is read from the node once and then handed out locally, so
+    concurrent senders never share a nonce and no RPC is spent per send.
+    Nonces whose send failed are reused before new ones are issued; if nothing
+    reuses them, ``repair`` fills the gap with a no-op self-transfer so later
+    transactions are not stuck behind it.
+    """
+
+    def __init__(self, web3, address, stuck_after=90, max_retries=2):
+        self.web3 = web3
+        self.address = address
+        self.stuck_after = stuck_after
+        self.max_retries = max_retries
+        self._lock = threading.Lock()
+        self._next = None
+        self._free = set()
+        # nonce -> {"tx": tx dict, "tx_hash": hash, "sent_at": timestamp}
+        self._in_flight = {}
+        self._monitor = None
+        # Called with (old_hash, new_hash) when a stuck transaction is re-broadcast
+        self.on_replace = None
+
+    def sync(self):
+        """Re-read the pending nonce from the node and drop anything it has already mined."""
+        pending = self.web3.eth.get_transaction_count(self.address, 'pending')
+        mined = self.web3.eth.get_transaction_count(self.address, 'latest')
+        with self._lock:
+            # Never move backwards: nonces handed out but not yet broadcast are invisible to the node
+            self._next = max(pending, self._next or 0)
+            self._free = {n for n in self._free if mined <= n < self._next}
+            for n in [n for n in self._in_flight if n < mined]:
+                del self._in_flight[n]
+        return self._next
+
+    def allocate(self):
+        if self._next is None:
+            self.sync()
+        with self._lock:
+            if self._free:
+                nonce = min(self._free)
+                self._free.discard(nonce)
+                return nonce
+            nonce = self._next
+            self._next += 1
+            return nonce
+
+    def release(self, nonce):
+        """Return a nonce whose transaction was never broadcast."""
+        with self._lock:
+            self._in_flight.pop(nonce, None)
+            if self._next is not None and nonce < self._next:
+                self._free.add(nonce)
+
+    def mark_sent(self, nonce, tx_hash, tx):
+        with self._lock:
+            self._in_flight[nonce] = {"tx": dict(tx), "tx_hash": tx_hash, "sent_at": time.time()}
+
+    def confirm(self, nonce):
+        with self._lock:
+            self._in_flight.pop(nonce, None)
+
+    def sign_and_send(self, account, tx):
+        """
+        Assign a local nonce to ``tx``, sign it and broadcast it.
+
+        On "nonce too low" the allocator resyncs from the node and retries with
+        a fresh nonce; any other send failure returns the nonce to the pool.
+
+        Args:
+            account: eth_account LocalAccount used to sign
+            tx (dict): Transaction fields without a nonce
+
+        Returns:
+            tuple: (tx_hash, nonce)
+        """
+        last_error = None
+        for _ in range(self.max_retries + 1):
+            nonce = self.allocate()
+            tx["nonce"] = nonce
+            try:
+                with STAGE_SECONDS.time(stage="sign"):
+                    signed_tx = account.sign_transaction(tx)
+                raw_tx = getattr(signed_tx, 'raw_transaction', None)
+                if raw_tx is None:
+                    raise AttributeError("Could not extract raw transaction bytes from signed transaction object")
+                try:
+                    with STAGE_SECONDS.time(stage="send"):
+                        tx_hash = self.web3.eth.send_raw_transaction(raw_tx)
+                except Exception as e:
+                    if not _error_matches(e, ALREADY_KNOWN_ERRORS):
+                        raise
+                    tx_hash = signed_tx.hash
+            except Exception as e:
+                last_error = e
+                if _error_matches(e, NONCE_TOO_LOW_ERRORS):
+                    log.warning("Nonce %s rejected (%s); resyncing from node", nonce, e)
+                    self.sync()
+                    continue
+                self.release(nonce)
+                raise
+            self.mark_sent(nonce, tx_hash, tx)
+            return tx_hash, nonce
+        raise last_error
+
+    def repair(self, account):
+        """
+        Unblock the account's transaction queue.
+
+        Fills released nonces that were never reused with a no-op self-transfer,
+        and re-broadcasts the lowest in-flight transaction with a bumped gas
+        price once it has been pending for longer than ``stuck_after`` seconds.
+        """
+        mined = self.web3.eth.get_transaction_count(self.address, 'latest')
+        now = time.time()
+        with self._lock:
+            for n in [n for n in self._in_flight if n < mined]:
+                del self._in_flight[n]
+            gaps = sorted(n for n in self._free if n >= mined)
+            self._free.difference_update(gaps)
+            stuck = self._in_flight.get(mined)
+            if stuck and now - stuck["sent_at"] < self.stuck_after:
+                stuck = None
+
+        for nonce in gaps:
+            noop = {
+                "to": self.address,
+                "value": 0,
+                "gas": 21000,
+                "gasPrice": self.web3.eth.gas_price,
+                "chainId": self.web3.eth.chain_id,
+            }
+            self._rebroadcast(account, nonce, noop)
+
+        if stuck:
+            self._rebroadcast(account, mined, dict(stuck["tx"]))
+
+    def _rebroadcast(self, account, nonce, tx):
+        if "maxFeePerGas" in tx:
+            # Type 2: both the tip and the fee cap must rise for the node to accept a replacement
+            tx["maxPriorityFeePerGas"] = int(tx["maxPriorityFeePerGas"] * REPLACEMENT_BUMP) + 1
+            tx["maxFeePerGas"] = max(int(tx["maxFeePerGas"] * REPLACEMENT_BUMP) + 1,
+                                     2 * self.web3.eth.gas_price + tx["maxPriorityFeePerGas"])
+        else:
+            old_price = get_pending_tx_gas_price(self.web3, self.address, nonce) or int(tx.get("gasPrice", 0))
+            tx["gasPrice"] = max(int(old_price * REPLACEMENT_BUMP) + 1, self.web3.eth.gas_price)
+        tx["nonce"] = nonce
+        with self._lock:
+            previous = self._in_flight.get(nonce)
+        try:
+            signed_tx = account.sign_transaction(tx)
+            tx_hash = self.web3.eth.send_raw_transaction(signed_tx.raw_transaction)
+            self.mark_sent(nonce, tx_hash, tx)
+            if previous and self.on_replace:
+                self.on_replace(previous["tx_hash"], tx_hash)
+            log.info("Re-broadcast nonce %s with bumped fees: %s", nonce, tx_hash.hex())
+        except Exception as e:
+            if _error_matches(e, ("nonce too low", "already been used")):
+                # The original (or someone else's) transaction was mined meanwhile
+                self.confirm(nonce)
+                return
+            log.warning("Could not re-broadcast nonce %s: %s", nonce, e)
+            with self._lock:
+                if nonce not in self._in_flight:
+                    self._free.add(nonce)
+
+    def start_monitor(self, account, interval=30):
+        """Run ``repair`` periodically in a daemon thread."""
+        if self._monitor:
+            return
+
+        def _loop():
+            while True:
+                time.sleep(interval)
+                try:
+                    self.repair(account)
+                except Exception as e:
+                    log.warning("Nonce repair failed: %s", e)
+
+        self._monitor = threading.Thread(target=_loop, name="nonce-monitor", daemon=True)
+        self._monitor.start()
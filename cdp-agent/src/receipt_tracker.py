@@ -0,0 +1,188 @@
+import logging
+import threading
+import time
+from concurrent.futures import Future
+
+from web3 import Web3
+from web3.exceptions import TransactionNotFound
+
+from metrics import STAGE_SECONDS
+
+log = logging.getLogger(__name__)
+
+
+class _Watch:
+    def __init__(self, deadline):
+        self.future = Future()
+        self.deadline = deadline
+        self.hashes = set()
+        self.started = time.perf_counter()
+
+
+class ReceiptTracker:
+    """
+    Resolves transaction receipts for every outstanding tx hash from one thread.
+
+    Instead of each sender polling ``get_transaction_receipt`` on its own, the
+    tracker follows new block heads and, per block, checks which outstanding
+    hashes the block includes. Only those receipts are fetched, in a single
+    JSON-RPC batch where the provider supports it. The thread idles while
+    nothing is being watched.
+    """
+
+    def __init__(self, web3, poll_interval=1.0, default_timeout=120):
+        self.web3 = web3
+        self.poll_interval = poll_interval
+        self.default_timeout = default_timeout
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        # tx hash (0x-hex) -> _Watch
+        self._watches = {}
+        # Hashes registered since the last poll; checked directly once in case
+        # they were mined before the tracker's block cursor
+        self._new = []
+        self._cursor = None
+        self._thread = None
+
+    @staticmethod
+    def _key(tx_hash):
+        return Web3.to_hex(tx_hash).lower()
+
+    def watch(self, tx_hash, timeout=None):
+        """
+        Start tracking ``tx_hash``.
+
+        Returns:
+            Future: resolves to the receipt, or raises TimeoutError if the
+            transaction is not mined within ``timeout`` seconds
+        """
+        watch = _Watch(time.time() + (timeout or self.default_timeout))
+        key = self._key(tx_hash)
+        with self._lock:
+            existing = self._watches.get(key)
+            if existing:
+                return existing.future
+            watch.hashes.add(key)
+            self._watches[key] = watch
+            self._new.append(key)
+        self._ensure_running()
+        self._wakeup.set()
+        return watch.future
+
+    def wait(self, tx_hash, timeout=None):
+        """Block until ``tx_hash`` is mined; returns the receipt or None on timeout."""
+        future = self.watch(tx_hash, timeout)
+        try:
+            return future.result()
+        except TimeoutError:
+            log.error("Transaction %s not mined within %s seconds", self._key(tx_hash), timeout or self.default_timeout)
+            return None
+
+    def replace(self, old_hash, new_hash):
+        """Resolve an existing watch by whichever of the two hashes is mined first (fee-bump replacement)."""
+        old_key, new_key = self._key(old_hash), self._key(new_hash)
+        with self._lock:
+            watch = self._watches.get(old_key)
+            if watch and new_key not in self._watches:
+                watch.hashes.add(new_key)
+                self._watches[new_key] = watch
+
+    def pending(self):
+        with self._lock:
+            return len({id(w) for w in self._watches.values()})
+
+    def _ensure_running(self):
+        with self._lock:
+            if self._thread and self._thread.is_alive():
+                return
+            self._thread = threading.Thread(target=self._run, name="receipt-tracker", daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            self._wakeup.wait(self.poll_interval)
+            self._wakeup.clear()
+            with self._lock:
+                if not self._watches:
+                    # Re-scan from the head next time someone starts watching
+                    self._cursor = None
+                    continue
+            try:
+                self._poll()
+            except Exception as e:
+                log.warning("Receipt tracker poll failed: %s", e)
+            self._expire()
+
+    def _poll(self):
+        with self._lock:
+            new, self._new = [k for k in self._new if k in self._watches], []
+        head = self.web3.eth.block_number
+        if new:
+            for key, receipt in zip(new, self._fetch_receipts(new)):
+                if receipt:
+                    self._resolve(key, receipt=receipt)
+        if self._cursor is None:
+            self._cursor = head
+        while self._cursor < head:
+            block_number = self._cursor + 1
+            block = self.web3.eth.get_block(block_number)
+            with self._lock:
+                included = [
+                    self._key(h) for h in block["transactions"]
+                    if self._key(h) in self._watches
+                ]
+            if included:
+                for key, receipt in zip(included, self._fetch_receipts(included)):
+                    if receipt:
+                        self._resolve(key, receipt=receipt)
+            self._cursor = block_number
+
+    def _fetch_receipts(self, keys):
+        batch_requests = getattr(self.web3, "batch_requests", None)
+        if batch_requests and len(keys) > 1:
+            try:
+                with batch_requests() as batch:
+                    for key in keys:
+                        batch.add(self.web3.eth.get_transaction_receipt(key))
+                    return batch.execute()
+            except Exception as e:
+                log.debug("Batch receipt request failed, falling back to single calls: %s", e)
+        return [self._get_receipt(key) for key in keys]
+
+    def _get_receipt(self, key):
+        try:
+            return self.web3.eth.get_transaction_receipt(key)
+        except TransactionNotFound:
+            return None
+
+    def _expire(self):
+        now = time.time()
+        with self._lock:
+            expired = {id(w): (k, w) for k, w in self._watches.items() if w.deadline <= now}
+        for key, watch in expired.values():
+            # Last direct check in case the inclusion block was skipped
+            receipt = None
+            for h in list(watch.hashes):
+                try:
+                    receipt = self._get_receipt(h)
+                except Exception:
+                    receipt = None
+                if receipt:
+                    break
+            if receipt:
+                self._resolve(key, receipt=receipt)
+            else:
+                self._resolve(key, error=TimeoutError(f"{key} not mined before deadline"))
+
+    def _resolve(self, key, receipt=None, error=None):
+        with self._lock:
+            watch = self._watches.get(key)
+            if not watch:
+                return
+            for h in watch.hashes:
+                self._watches.pop(h, None)
+        if error is not None:
+            watch.future.set_exception(error)
+        else:
+            STAGE_SECONDS.observe(time.perf_counter() - watch.started, stage="receipt_wait")
+            watch.future.set_result(receipt)
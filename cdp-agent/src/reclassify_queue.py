@@ -0,0 +1,93 @@
+import logging
+import os
+import threading
+import time
+
+log = logging.getLogger(__name__)
+
+
+class ReclassifyQueue:
+    """
+    Grievances whose classification fell back because the classifier was down.
+
+    The prepared image of each grievance is kept as ``<trackingId>.jpg`` in
+    ``directory``, so the queue survives restarts. A background thread
+    retries the oldest entries every ``interval`` seconds: ``classify(image)``
+    returns a result dict (with ``retry`` set while the service is still
+    unavailable), and finished results go to ``apply(tracking_id, result)``.
+    A pass stops at the first entry that still cannot be classified, so an
+    outage costs one request per interval.
+    """
+
+    def __init__(self, directory, classify, apply, interval=30.0):
+        self.directory = directory
+        self.classify = classify
+        self.apply = apply
+        self.interval = interval
+        self._lock = threading.Lock()
+        self._thread = None
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, tracking_id):
+        return os.path.join(self.directory, f"{tracking_id}.jpg")
+
+    def add(self, tracking_id, image_bytes):
+        tmp = f"{self._path(tracking_id)}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(image_bytes)
+        os.replace(tmp, self._path(tracking_id))
+        self.start()
+
+    def pending(self):
+        """Queued tracking ids, oldest first."""
+        entries = []
+        for name in os.listdir(self.directory):
+            if name.endswith(".jpg"):
+                path = os.path.join(self.directory, name)
+                try:
+                    entries.append((os.path.getmtime(path), name[:-len(".jpg")]))
+                except OSError:
+                    continue
+        return [tracking_id for _, tracking_id in sorted(entries)]
+
+    def run_once(self):
+        """
+        Retry every queued grievance until one still cannot be classified.
+
+        Returns:
+            int: Number of grievances re-classified
+        """
+        done = 0
+        with self._lock:
+            for tracking_id in self.pending():
+                path = self._path(tracking_id)
+                try:
+                    with open(path, "rb") as f:
+                        image = f.read()
+                except OSError:
+                    continue
+                result = self.classify(image)
+                if result.get("retry"):
+                    break
+                if not result.get("error"):
+                    self.apply(tracking_id, result)
+                    done += 1
+                else:
+                    log.warning("Re-classification of %s failed for good: %s", tracking_id, result["error"])
+                os.remove(path)
+        return done
+
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._thread = threading.Thread(target=self._run, name="reclassify", daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while True:
+            time.sleep(self.interval)
+            try:
+                if self.run_once():
+                    log.info("Re-classified grievances; %s still queued", len(self.pending()))
+            except Exception as e:
+                log.warning("Re-classification pass failed: %s", e)
@@ -0,0 +1,314 @@
+"""
+Single signer/sender for multi-process deployments.
+
+Every HTTP worker builds its transactions (calldata, fees) itself and hands
+them to this process over a Unix socket; only this process assigns nonces,
+signs and broadcasts, so any number of workers share one account without
+nonce collisions. It also waits for receipts and, with INDEX_CHAIN_EVENTS=1,
+runs the event indexer once for the whole deployment. With
+SIGNER_METRICS_PORT set it serves its own /metrics (sign, send, receipt
+and RPC timings) on that port.
+
+    SIGNER_SOCKET=/tmp/grievance-signer.sock python signer.py
+
+Workers find it through the same SIGNER_SOCKET variable (gunicorn.conf.py
+starts it automatically).
+"""
+import hashlib
+import logging
+import os
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from multiprocessing.connection import Client, Listener
+
+from fee_oracle import is_out_of_gas
+
+log = logging.getLogger(__name__)
+
+
+class SignerError(Exception):
+    """A send failed in the signer process; carries the original error's message."""
+
+
+def signer_authkey(private_key):
+    """Connection key both sides derive from PRIVATE_KEY, so only holders of the key can ask for signatures."""
+    return hashlib.sha256(b"grievance-signer:" + private_key.encode("utf-8")).digest()
+
+
+class TransactionSender:
+    """
+    Gas, nonce, signing, broadcast and receipt handling for one account.
+
+    What app.py used to do inline around ``NonceManager``: the gas limit
+    comes from ``GasEstimateCache`` (a cached estimate that proves too low
+    is dropped and the transaction re-sent once with a live one), the nonce
+    from ``NonceManager``, and the nonce is confirmed once the receipt is in.
+    """
+
+    def __init__(self, account, nonces, gas_estimates, receipts):
+        self.account = account
+        self.nonces = nonces
+        self.gas_estimates = gas_estimates
+        self.receipts = receipts
+
+    def send(self, tx):
+        """
+        Sign and broadcast ``tx`` without waiting for it to be mined.
+
+        A send rejected for a too-low cached gas limit is retried once with a
+        live estimate, as in ``send_and_wait``. The receipt comes later, so a
+        cached limit that runs out of gas on-chain cannot be retried here; it
+        is dropped from the cache so the next send estimates afresh.
+
+        Returns:
+            HexBytes: transaction hash
+        """
+        tx["gas"], cached_gas = self.gas_estimates.estimate(tx)
+        try:
+            tx_hash, nonce = self.nonces.sign_and_send(self.account, tx)
+        except Exception as e:
+            if not (cached_gas and is_out_of_gas(error=e)):
+                raise
+            self.gas_estimates.invalidate(tx)
+            tx["gas"], cached_gas = self.gas_estimates.estimate_live(tx), False
+            tx_hash, nonce = self.nonces.sign_and_send(self.account, tx)
+        gas_limit = tx["gas"]
+
+        def mined(future):
+            if future.exception() is not None:
+                return
+            self.nonces.confirm(nonce)
+            if cached_gas and is_out_of_gas(receipt=future.result(), gas_limit=gas_limit):
+                self.gas_estimates.invalidate(tx)
+
+        self.receipts.watch(tx_hash).add_done_callback(mined)
+        return tx_hash
+
+    def send_and_wait(self, tx):
+        """
+        Sign and send ``tx`` and wait for its receipt.
+
+        Returns:
+            tuple: (tx_hash, receipt), receipt is None if the tx was not mined in time
+        """
+        for attempt in range(2):
+            # Cached estimate for this calldata size when we have one, live estimate otherwise
+            tx["gas"], cached_gas = (
+                self.gas_estimates.estimate(tx) if attempt == 0 else (self.gas_estimates.estimate_live(tx), False)
+            )
+            try:
+                tx_hash, nonce = self.nonces.sign_and_send(self.account, tx)
+            except Exception as e:
+                if cached_gas and is_out_of_gas(error=e):
+                    self.gas_estimates.invalidate(tx)
+                    continue
+                raise
+            receipt = self.receipts.wait(tx_hash)
+            if not receipt:
+                return tx_hash, None
+            self.nonces.confirm(nonce)
+            if cached_gas and is_out_of_gas(receipt=receipt, gas_limit=tx["gas"]):
+                self.gas_estimates.invalidate(tx)
+                continue
+            break
+        return tx_hash, receipt
+
+
+class SignerServer:
+    """
+    Serves a ``TransactionSender`` over a Unix socket.
+
+    Each worker keeps one connection open and may have many requests in
+    flight on it: requests are ``(request_id, method, tx)`` tuples, run on
+    a pool of ``threads`` (``send_and_wait`` blocks until the receipt), and
+    answered as ``(request_id, result, error_message)`` in completion order.
+    """
+
+    METHODS = ("send", "send_and_wait")
+
+    def __init__(self, sender, address, authkey, threads=32):
+        self.sender = sender
+        self.address = address
+        self.authkey = authkey
+        self._pool = ThreadPoolExecutor(max_workers=threads, thread_name_prefix="signer")
+
+    def serve_forever(self):
+        if os.path.exists(self.address):
+            os.unlink(self.address)
+        listener = Listener(self.address, family="AF_UNIX", authkey=self.authkey)
+        os.chmod(self.address, 0o600)
+        log.info("Signer for %s listening on %s", self.sender.account.address, self.address)
+        try:
+            while True:
+                try:
+                    conn = listener.accept()
+                except Exception as e:
+                    # Typically a client with the wrong key; keep serving the others
+                    log.warning("Rejected signer connection: %s", e)
+                    continue
+                threading.Thread(target=self._serve, args=(conn,), name="signer-conn", daemon=True).start()
+        finally:
+            listener.close()
+
+    def _serve(self, conn):
+        write_lock = threading.Lock()
+
+        def reply(request_id, result=None, error=None):
+            with write_lock:
+                try:
+                    conn.send((request_id, result, error))
+                except (OSError, EOFError):
+                    pass
+
+        def run(request_id, method, tx):
+            try:
+                reply(request_id, getattr(self.sender, method)(tx))
+            except Exception as e:
+                log.exception("Signer %s failed", method)
+                # Plain message: not every web3 exception survives pickling
+                reply(request_id, error=str(e) or type(e).__name__)
+
+        while True:
+            try:
+                request_id, method, tx = conn.recv()
+            except (OSError, EOFError):
+                return
+            if method not in self.METHODS:
+                reply(request_id, error=f"Unknown signer method: {method}")
+                continue
+            self._pool.submit(run, request_id, method, tx)
+
+
+class SignerClient:
+    """
+    Worker-side stand-in for ``TransactionSender`` that forwards to the signer process.
+
+    ``send`` and ``send_and_wait`` block and return what the signer's
+    sender returned, or raise SignerError with its error message;
+    ``submit`` returns a Future instead. All threads of a worker share one
+    connection, opened on first use and reopened after the signer restarts.
+    """
+
+    def __init__(self, address, authkey):
+        self.address = address
+        self.authkey = authkey
+        self._lock = threading.Lock()
+        self._conn = None
+        self._futures = {}
+        self._next_id = 0
+
+    def send(self, tx):
+        return self.submit("send", tx).result()
+
+    def send_and_wait(self, tx):
+        return self.submit("send_and_wait", tx).result()
+
+    def submit(self, method, tx):
+        future = Future()
+        with self._lock:
+            conn = self._connect()
+            self._next_id += 1
+            request_id = self._next_id
+            self._futures[request_id] = future
+            try:
+                conn.send((request_id, method, dict(tx)))
+            except (OSError, EOFError) as e:
+                del self._futures[request_id]
+                self._conn = None
+                raise ConnectionError(f"Signer at {self.address} is unavailable: {e}") from e
+        return future
+
+    def _connect(self):
+        if self._conn is None:
+            try:
+                self._conn = Client(self.address, family="AF_UNIX", authkey=self.authkey)
+            except OSError as e:
+                raise ConnectionError(f"Signer at {self.address} is unavailable: {e}") from e
+            threading.Thread(target=self._read, args=(self._conn,), name="signer-client", daemon=True).start()
+        return self._conn
+
+    def _read(self, conn):
+        while True:
+            try:
+                request_id, result, error = conn.recv()
+            except (OSError, EOFError):
+                break
+            with self._lock:
+                future = self._futures.pop(request_id, None)
+            if future is None:
+                continue
+            if error is not None:
+                future.set_exception(SignerError(error))
+            else:
+                future.set_result(result)
+        # Signer went away: fail whatever was waiting on this connection
+        with self._lock:
+            if self._conn is conn:
+                self._conn = None
+            pending, self._futures = self._futures, {}
+        for future in pending.values():
+            future.set_exception(ConnectionError(f"Signer at {self.address} closed the connection"))
+
+
+def main():
+    import json
+
+    from dotenv import load_dotenv
+    from web3 import Web3
+
+    from contract_reader import BulkGrievanceReader
+    from contract_registry import ContractRegistry
+    from event_indexer import EventIndexer, indexer_start_block
+    from fee_oracle import GasEstimateCache
+    from grievance_store import open_grievance_store
+    from logs import configure_logging
+    from metrics import instrument_web3, serve
+    from nonce_manager import NonceManager
+    from receipt_tracker import ReceiptTracker
+
+    load_dotenv()
+    configure_logging()
+    private_key = os.getenv("PRIVATE_KEY")
+    assert private_key, "You must set the PRIVATE_KEY environment variable"
+    address = os.getenv("SIGNER_SOCKET")
+    assert address, "You must set the SIGNER_SOCKET environment variable"
+
+    with open(os.path.join(os.path.dirname(__file__), "abi", "GrievanceRegistry.json")) as f:
+        abi = json.load(f)
+    web3 = instrument_web3(Web3(Web3.HTTPProvider(os.getenv("AVAX_RPC_URL"))))
+    if os.getenv("SIGNER_METRICS_PORT"):
+        # The workers' /metrics only cover their own process
+        serve(int(os.getenv("SIGNER_METRICS_PORT")))
+    contracts = ContractRegistry(web3, os.getenv("GRIEVANCE_CONTRACT_ADDRESS"), abi, private_key)
+    nonces = NonceManager(web3, contracts.account.address)
+    receipts = ReceiptTracker(web3, poll_interval=float(os.getenv("RECEIPT_POLL_INTERVAL", "1")))
+    nonces.on_replace = receipts.replace
+    nonces.sync()
+    nonces.start_monitor(contracts.account)
+
+    if os.getenv("INDEX_CHAIN_EVENTS", "1") == "1":
+        # One indexer for the deployment, writing into the workers' shared store
+        reader = BulkGrievanceReader(
+            web3,
+            contracts.address,
+            chunk_size=int(os.getenv("CONTRACT_READ_CHUNK_SIZE", "100")),
+            parallelism=int(os.getenv("CONTRACT_READ_PARALLELISM", "4")),
+        )
+        EventIndexer(
+            web3,
+            contracts.contract,
+            open_grievance_store(shared=True),
+            checkpoint_path=os.getenv("INDEXER_CHECKPOINT_PATH", "indexer_checkpoint.json"),
+            start_block=indexer_start_block(),
+            confirmations=int(os.getenv("INDEXER_CONFIRMATIONS", "12")),
+            fetch=reader.fetch_grievances,
+        ).start()
+
+    sender = TransactionSender(contracts.account, nonces, GasEstimateCache(web3), receipts)
+    SignerServer(
+        sender, address, signer_authkey(private_key), threads=int(os.getenv("SIGNER_THREADS", "32"))
+    ).serve_forever()
+
+
+if __name__ == "__main__":
+    main()
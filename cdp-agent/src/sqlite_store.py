@@ -0,0 +1,401 @@
+import json
+import logging
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+from grievance_store import INDEXED_FIELDS
+
+log = logging.getLogger(__name__)
+
+# Indexed fields are mirrored into real columns so filters hit SQLite indexes
+_COLUMNS = {
+    "blockchainStatus": "blockchain_status",
+    "category": "category",
+    "priorityLevel": "priority_level",
+    "resolved": "resolved",
+}
+assert set(_COLUMNS) == set(INDEXED_FIELDS)
+
+# seq is the insertion position, the scan cursor (0, 1, 2, ... like GrievanceStore's);
+# unlike the implicit rowid it is a declared column, so VACUUM keeps it
+_TABLE = """
+CREATE TABLE IF NOT EXISTS grievances (
+    seq INTEGER PRIMARY KEY,
+    tracking_id TEXT NOT NULL UNIQUE,
+    blockchain_status TEXT,
+    category TEXT,
+    priority_level TEXT,
+    resolved INTEGER,
+    created_at INTEGER,
+    updated_at INTEGER,
+    data TEXT NOT NULL
+);
+"""
+
+_INDEXES = """
+CREATE INDEX IF NOT EXISTS idx_grievances_blockchain_status ON grievances (blockchain_status);
+CREATE INDEX IF NOT EXISTS idx_grievances_category ON grievances (category);
+CREATE INDEX IF NOT EXISTS idx_grievances_priority_level ON grievances (priority_level);
+CREATE INDEX IF NOT EXISTS idx_grievances_resolved ON grievances (resolved);
+CREATE INDEX IF NOT EXISTS idx_grievances_created_at ON grievances (created_at);
+"""
+
+# A NULL seq takes the next position; an existing row keeps its own
+_UPSERT = """
+INSERT INTO grievances
+    (seq, tracking_id, blockchain_status, category, priority_level, resolved, created_at, updated_at, data)
+VALUES (COALESCE(?, (SELECT COALESCE(MAX(seq), -1) + 1 FROM grievances)), ?, ?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT (tracking_id) DO UPDATE SET
+    blockchain_status = excluded.blockchain_status,
+    category = excluded.category,
+    priority_level = excluded.priority_level,
+    resolved = excluded.resolved,
+    created_at = excluded.created_at,
+    updated_at = excluded.updated_at,
+    data = excluded.data
+"""
+
+_SELECT_ONE = "SELECT seq, data FROM grievances WHERE tracking_id = ?"
+
+
+def _columns(record):
+    """Values of the filterable columns for ``record``, by column name."""
+    return {
+        "blockchain_status": record.get("blockchainStatus"),
+        "category": record.get("category"),
+        "priority_level": record.get("priorityLevel"),
+        "resolved": None if record.get("resolved") is None else int(bool(record.get("resolved"))),
+        "created_at": record.get("createdAt"),
+    }
+
+
+def _row(record, seq=None):
+    columns = _columns(record)
+    return (
+        seq,
+        record["trackingId"],
+        columns["blockchain_status"],
+        columns["category"],
+        columns["priority_level"],
+        columns["resolved"],
+        columns["created_at"],
+        record.get("updatedAt"),
+        json.dumps(record, separators=(",", ":")),
+    )
+
+
+class SQLiteGrievanceStore:
+    """
+    Durable grievance store backed by SQLite in WAL mode.
+
+    Same interface as ``GrievanceStore``. Writes land in an in-memory dirty
+    buffer and are committed by a background thread in batches (every
+    ``flush_interval`` seconds or once ``batch_size`` writes are buffered),
+    so request threads never wait on an fsync. Reads check the dirty buffer
+    and a bounded LRU cache before touching the database; ``scan`` and
+    ``len`` merge the buffer with the table rather than flushing it. Opening an existing
+    file loads nothing up front.
+
+    With ``shared=True`` several processes can use the same file: every
+    write is committed before it returns (updates read and write the row in
+    one IMMEDIATE transaction, so concurrent workers never lose each other's
+    fields), reads always go to the database, and ``wait_for`` re-reads the
+    record every ``poll_interval`` seconds since writes from other processes
+    do not notify this one.
+    """
+
+    def __init__(self, path, batch_size=500, flush_interval=0.2, cache_size=10000, shared=False,
+                 poll_interval=0.1):
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.shared = shared
+        self.poll_interval = poll_interval
+        # Another process may change any row, so nothing is cached in shared mode
+        self.cache_size = 0 if shared else cache_size
+        # Guards the dirty buffer and cache; notified on every write
+        self.changed = threading.Condition(threading.RLock())
+        # trackingId -> (seq, record) in the dirty buffer, flushing batch and cache
+        self._dirty = OrderedDict()
+        # Batch currently being committed; still readable until the commit lands
+        self._flushing = {}
+        self._cache = OrderedDict()
+        self._local = threading.local()
+        self._write_lock = threading.Lock()
+        self._flush_needed = threading.Event()
+
+        self._writer = self._connect()
+        self._create_schema()
+        # Next insertion position; only this process writes a non-shared file
+        self._next_seq = self._writer.execute("SELECT COALESCE(MAX(seq), -1) + 1 FROM grievances").fetchone()[0]
+
+        self._closed = False
+        self._flusher = None
+        if not shared:
+            self._flusher = threading.Thread(target=self._flush_loop, name="grievance-store-flush", daemon=True)
+            self._flusher.start()
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        # WAL + NORMAL is durable against process crashes, fsyncs only at checkpoints
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("PRAGMA busy_timeout=5000")
+        conn.execute("PRAGMA temp_store=MEMORY")
+        return conn
+
+    def _create_schema(self):
+        columns = [row[1] for row in self._writer.execute("PRAGMA table_info(grievances)")]
+        if columns and "seq" not in columns:
+            self._migrate_rowid_cursor()
+        self._writer.executescript(_TABLE + _INDEXES)
+
+    def _migrate_rowid_cursor(self):
+        # Files from before the seq column: copy the rows over in rowid (insertion) order
+        log.info("Adding the seq column to %s", self.path)
+        self._writer.execute("BEGIN IMMEDIATE")
+        try:
+            self._writer.execute("ALTER TABLE grievances RENAME TO grievances_rowid")
+            for name in ("blockchain_status", "category", "priority_level", "resolved", "created_at"):
+                self._writer.execute(f"DROP INDEX IF EXISTS idx_grievances_{name}")
+            self._writer.execute(_TABLE)
+            self._writer.execute(
+                "INSERT INTO grievances SELECT ROW_NUMBER() OVER (ORDER BY rowid) - 1, tracking_id, "
+                "blockchain_status, category, priority_level, resolved, created_at, updated_at, data "
+                "FROM grievances_rowid"
+            )
+            self._writer.execute("DROP TABLE grievances_rowid")
+            self._writer.execute("COMMIT")
+        except Exception:
+            self._writer.execute("ROLLBACK")
+            raise
+
+    def _reader(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._connect()
+            conn.execute("PRAGMA query_only=1")
+            self._local.conn = conn
+        return conn
+
+    def _remember(self, seq, record):
+        self._cache[record["trackingId"]] = (seq, record)
+        self._cache.move_to_end(record["trackingId"])
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+
+    def _write(self, seq, record):
+        self._dirty[record["trackingId"]] = (seq, record)
+        self._dirty.move_to_end(record["trackingId"])
+        self._remember(seq, record)
+        self.changed.notify_all()
+        if len(self._dirty) >= self.batch_size:
+            self._flush_needed.set()
+
+    def _load(self, tracking_id):
+        """(seq, record) of ``tracking_id``, or None."""
+        entry = self._dirty.get(tracking_id) or self._flushing.get(tracking_id) or self._cache.get(tracking_id)
+        if entry is not None:
+            return entry
+        row = self._reader().execute(_SELECT_ONE, (tracking_id,)).fetchone()
+        if row is None:
+            return None
+        entry = (row[0], json.loads(row[1]))
+        self._remember(*entry)
+        return entry
+
+    def _pending(self):
+        """Unflushed writes, newest version of each: {trackingId: (seq, record)}."""
+        with self.changed:
+            return {**self._flushing, **self._dirty}
+
+    def __len__(self):
+        pending = self._pending()
+        count, last_seq = self._reader().execute("SELECT COUNT(*), MAX(seq) FROM grievances").fetchone()
+        # New records get a seq past every committed row; other pending writes update counted rows
+        return count + sum(1 for seq, _ in pending.values() if last_seq is None or seq > last_seq)
+
+    def __contains__(self, tracking_id):
+        with self.changed:
+            return self._load(tracking_id) is not None
+
+    def add(self, record):
+        if self.shared:
+            with self._write_lock:
+                self._writer.execute(_UPSERT, _row(record))
+            with self.changed:
+                self.changed.notify_all()
+            return
+        with self.changed:
+            existing = self._load(record["trackingId"])
+            if existing is not None:
+                seq = existing[0]
+            else:
+                seq = self._next_seq
+                self._next_seq += 1
+            self._write(seq, dict(record))
+
+    def get(self, tracking_id):
+        with self.changed:
+            entry = self._load(tracking_id)
+            return dict(entry[1]) if entry is not None else None
+
+    def update(self, tracking_id, **fields):
+        if self.shared:
+            return self._update_shared(tracking_id, fields)
+        with self.changed:
+            entry = self._load(tracking_id)
+            if entry is None:
+                return None
+            seq, record = entry
+            record = dict(record, **fields)
+            record["updatedAt"] = int(time.time())
+            self._write(seq, record)
+            return dict(record)
+
+    def _update_shared(self, tracking_id, fields):
+        with self._write_lock:
+            self._writer.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._writer.execute(_SELECT_ONE, (tracking_id,)).fetchone()
+                if row is None:
+                    self._writer.execute("ROLLBACK")
+                    return None
+                record = dict(json.loads(row[1]), **fields)
+                record["updatedAt"] = int(time.time())
+                self._writer.execute(_UPSERT, _row(record, row[0]))
+                self._writer.execute("COMMIT")
+            except Exception:
+                self._writer.execute("ROLLBACK")
+                raise
+        with self.changed:
+            self.changed.notify_all()
+        return record
+
+    def find(self, **filters):
+        """Return grievances matching every ``field=value`` filter, in insertion order."""
+        return [record for _, record in self.scan(**filters)]
+
+    def all(self):
+        return self.find()
+
+    def scan(self, after=None, since=None, until=None, chunk_size=500, **filters):
+        """
+        Yield ``(cursor, record)`` in insertion order, resuming after ``after``.
+
+        The cursor is the record's insertion position (``seq``), as in
+        ``GrievanceStore``. Rows are read in ``chunk_size`` keyset pages
+        (``seq > cursor``) so a streaming consumer never holds a read
+        transaction open for long. Writes still in the buffer are merged in
+        by seq, taking the place of their (older) committed rows.
+        """
+        conditions = {}
+        for field, value in filters.items():
+            column = _COLUMNS.get(field)
+            if column is None:
+                continue
+            if field == "resolved" and value is not None:
+                value = int(bool(value))
+            conditions[column] = value
+        clauses = ["seq > ?"] + [f"{column} IS ?" for column in conditions]
+        params = list(conditions.values())
+        if since is not None:
+            clauses.append("created_at >= ?")
+            params.append(since)
+        if until is not None:
+            clauses.append("created_at <= ?")
+            params.append(until)
+        sql = f"SELECT seq, tracking_id, data FROM grievances WHERE {' AND '.join(clauses)} ORDER BY seq LIMIT ?"
+        others = {k: v for k, v in filters.items() if k not in _COLUMNS}
+        cursor = -1 if after is None else int(after)
+
+        def matches(record):
+            columns = _columns(record)
+            created = columns["created_at"]
+            return (
+                all(columns[column] == value for column, value in conditions.items())
+                and (since is None or (created is not None and created >= since))
+                and (until is None or (created is not None and created <= until))
+                and all(record.get(k) == v for k, v in others.items())
+            )
+
+        pending = self._pending()
+        buffered = iter(sorted(
+            (entry for entry in pending.values() if entry[0] > cursor and matches(entry[1])),
+            key=lambda entry: entry[0],
+        ))
+        next_buffered = next(buffered, None)
+        while True:
+            rows = self._reader().execute(sql, [cursor, *params, chunk_size]).fetchall()
+            for seq, tracking_id, data in rows:
+                cursor = seq
+                if tracking_id in pending:
+                    continue
+                while next_buffered is not None and next_buffered[0] < seq:
+                    yield next_buffered[0], dict(next_buffered[1])
+                    next_buffered = next(buffered, None)
+                record = json.loads(data)
+                if all(record.get(k) == v for k, v in others.items()):
+                    yield seq, record
+            if len(rows) < chunk_size:
+                break
+        while next_buffered is not None:
+            yield next_buffered[0], dict(next_buffered[1])
+            next_buffered = next(buffered, None)
+
+    def wait_for(self, tracking_id, predicate, timeout):
+        deadline = time.time() + timeout
+        with self.changed:
+            while True:
+                entry = self._load(tracking_id)
+                if entry is None:
+                    return None
+                record = entry[1]
+                remaining = deadline - time.time()
+                if predicate(record) or remaining <= 0:
+                    return dict(record)
+                self.changed.wait(min(remaining, self.poll_interval) if self.shared else remaining)
+
+    def flush(self):
+        """Commit every buffered write in one transaction."""
+        with self._write_lock:
+            with self.changed:
+                if not self._dirty:
+                    return 0
+                self._flushing = self._dirty
+                self._dirty = OrderedDict()
+                batch = list(self._flushing.items())
+            try:
+                self._writer.execute("BEGIN")
+                self._writer.executemany(_UPSERT, [_row(record, seq) for _, (seq, record) in batch])
+                self._writer.execute("COMMIT")
+            except Exception:
+                self._writer.execute("ROLLBACK")
+                with self.changed:
+                    # Put the batch back without clobbering newer writes
+                    for tracking_id, entry in batch:
+                        self._dirty.setdefault(tracking_id, entry)
+                raise
+            finally:
+                with self.changed:
+                    self._flushing = {}
+            return len(batch)
+
+    def _flush_loop(self):
+        while not self._closed:
+            self._flush_needed.wait(self.flush_interval)
+            self._flush_needed.clear()
+            try:
+                self.flush()
+            except Exception as e:
+                log.error("Grievance store flush failed: %s", e)
+
+    def close(self):
+        self._closed = True
+        self._flush_needed.set()
+        if self._flusher:
+            self._flusher.join()
+        self.flush()
+        self._writer.close()
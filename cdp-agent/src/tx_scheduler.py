@@ -0,0 +1,281 @@
+"""
+Outgoing transactions sent in grievance-priority order.
+
+Grievances wait in a queue per ``priorityLevel`` tier and go out most
+urgent first, each tier with its own fee multiplier. A fixed number of
+sender slots per lane caps how many transactions are unconfirmed at once;
+whatever arrives while the slots are busy is reordered by priority instead
+of being sent in arrival order. A lane is one scheduler: submissions and
+mark_resolved each get their own, so resolutions never wait behind a
+submission backlog.
+
+Nonces are assigned when a slot sends, so send order is also the order the
+chain mines them. The tier fee decides how quickly a transaction beats
+other accounts' traffic into a block; it cannot lift it past an earlier,
+cheaper nonce of the same account, so the lowest multiplier should still be
+one that reliably gets included.
+"""
+import asyncio
+import logging
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+
+from metrics import TX_IN_FLIGHT, TX_QUEUE_DEPTH, TX_QUEUE_WAIT_SECONDS
+
+log = logging.getLogger(__name__)
+
+# Most urgent first; the priorityLevel values ``grievances.categorize`` assigns
+TIERS = ("high", "medium", "low")
+DEFAULT_FEE_MULTIPLIERS = {"high": 1.5, "medium": 1.2, "low": 1.0}
+
+
+def parse_multipliers(text, defaults=DEFAULT_FEE_MULTIPLIERS):
+    """
+    Per-tier fee multipliers from a setting such as ``high=2,low=1``.
+
+    Args:
+        text (str): Comma-separated ``tier=multiplier`` pairs; tiers not listed keep their default
+        defaults (dict): tier -> multiplier
+
+    Returns:
+        dict: tier -> multiplier
+    """
+    multipliers = dict(defaults)
+    for pair in filter(None, (p.strip() for p in text.split(","))):
+        tier, _, value = pair.partition("=")
+        multipliers[tier.strip()] = float(value)
+    return multipliers
+
+
+class TierQueue:
+    """
+    Pending items per priority tier, handed out as batches, most urgent first.
+
+    Items are FIFO within a tier. Of the tiers with a batch due, the one
+    whose oldest item has the lowest ``rank * aging + queued_at`` goes next
+    (``rank`` is the tier's position in ``tiers``): a higher tier wins, but
+    an item that has waited ``aging`` seconds longer than the head of the
+    tier above goes first, so a stream of urgent work cannot starve the
+    rest. ``clock`` returns the current time in seconds (``time.time`` by
+    default). Not thread-safe; the schedulers below serialize access.
+    """
+
+    def __init__(self, lane, tiers=TIERS, aging=60.0, clock=time.time):
+        self.lane = lane
+        self.tiers = tuple(tiers)
+        self.aging = aging
+        self.clock = clock
+        self._pending = {tier: deque() for tier in self.tiers}
+
+    def __len__(self):
+        return sum(len(queue) for queue in self._pending.values())
+
+    def depth(self):
+        return {tier: len(queue) for tier, queue in self._pending.items()}
+
+    def push(self, tier, item, future):
+        self._pending[tier].append((item, future, self.clock()))
+        TX_QUEUE_DEPTH.set(len(self._pending[tier]), lane=self.lane, tier=tier)
+
+    def take(self, max_batch, max_wait, force=False):
+        """
+        Remove the most urgent due batch: ``max_batch`` items of one tier, or fewer once the oldest waited ``max_wait``.
+
+        Args:
+            force (bool): Treat every non-empty tier as due (draining on stop)
+
+        Returns:
+            tuple: (tier, [(item, future, queued_at), ...]), or None if no batch is due
+        """
+        now = self.clock()
+        due = [
+            (rank * self.aging + queue[0][2], rank, tier)
+            for rank, (tier, queue) in enumerate(self._pending.items())
+            if queue and (force or len(queue) >= max_batch or now >= queue[0][2] + max_wait)
+        ]
+        if not due:
+            return None
+        tier = min(due)[2]
+        queue = self._pending[tier]
+        batch = [queue.popleft() for _ in range(min(max_batch, len(queue)))]
+        TX_QUEUE_DEPTH.set(len(queue), lane=self.lane, tier=tier)
+        for _, _, queued in batch:
+            TX_QUEUE_WAIT_SECONDS.observe(now - queued, lane=self.lane, tier=tier)
+        return tier, batch
+
+    def wait_time(self, max_wait):
+        """Seconds until the next batch is due by age, or None when nothing is queued."""
+        heads = [queue[0][2] for queue in self._pending.values() if queue]
+        return max(0.0, min(heads) + max_wait - self.clock()) if heads else None
+
+
+def _settle(batch, results):
+    for (_, future, _), result in zip(batch, results):
+        if future.done():
+            continue
+        if isinstance(result, Exception):
+            future.set_exception(result)
+        else:
+            future.set_result(result)
+
+
+class TransactionScheduler:
+    """
+    Sends queued items most urgent first, with at most ``max_in_flight`` batches unconfirmed.
+
+    ``submit(item, tier)`` queues an item and returns a Future (unknown tiers
+    are queued as ``default_tier``, the middle one by default).
+    ``max_in_flight`` sender threads each take the next batch from a
+    ``TierQueue`` (up to ``max_batch`` items of one tier, due when full or
+    once the oldest has waited ``max_wait`` seconds) and run
+    ``process(items, fee_multiplier)`` with the tier's multiplier from
+    ``fee_multipliers``. ``process`` returns one result per item, in order
+    (an Exception fails only its own item), and should return once its
+    transactions are mined so the cap counts unconfirmed transactions.
+    Threads start on the first ``submit``.
+    """
+
+    def __init__(self, process, lane, tiers=TIERS, fee_multipliers=None, default_tier=None,
+                 max_batch=20, max_wait=2.0, max_in_flight=2, aging=60.0):
+        self.process = process
+        self.lane = lane
+        self.fee_multipliers = dict(fee_multipliers or DEFAULT_FEE_MULTIPLIERS)
+        self.default_tier = default_tier or tiers[len(tiers) // 2]
+        self.max_batch = max(1, int(max_batch))
+        self.max_wait = max_wait
+        self.max_in_flight = max(1, int(max_in_flight))
+        self._queue = TierQueue(lane, tiers, aging)
+        self._cond = threading.Condition()
+        self._threads = []
+        self._stopping = False
+
+    def submit(self, item, tier=None):
+        future = Future()
+        with self._cond:
+            self._ensure_running()
+            self._queue.push(tier if tier in self._queue.tiers else self.default_tier, item, future)
+            self._cond.notify()
+        return future
+
+    def pending(self):
+        """Queued items per tier."""
+        with self._cond:
+            return self._queue.depth()
+
+    def stop(self, wait=True):
+        """Send everything still queued, then stop the sender threads."""
+        with self._cond:
+            self._stopping = True
+            self._cond.notify_all()
+        if wait:
+            for thread in self._threads:
+                thread.join()
+        self._threads = []
+
+    def _ensure_running(self):
+        if any(thread.is_alive() for thread in self._threads):
+            return
+        self._stopping = False
+        self._threads = [
+            threading.Thread(target=self._run, name=f"{self.lane}-sender-{i}", daemon=True)
+            for i in range(self.max_in_flight)
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    def _take(self):
+        """Block until a batch is due, then remove and return it (None when stopping with nothing left)."""
+        with self._cond:
+            while True:
+                taken = self._queue.take(self.max_batch, self.max_wait, force=self._stopping)
+                if taken:
+                    if len(self._queue):
+                        # Another batch may be due too; let an idle sender look
+                        self._cond.notify()
+                    return taken
+                if self._stopping:
+                    return None
+                self._cond.wait(self._queue.wait_time(self.max_wait))
+
+    def _run(self):
+        while True:
+            taken = self._take()
+            if taken is None:
+                return
+            tier, batch = taken
+            TX_IN_FLIGHT.inc(lane=self.lane)
+            try:
+                results = self.process([item for item, _, _ in batch], self.fee_multipliers.get(tier, 1.0))
+            except Exception as e:
+                log.exception("%s batch (%s priority) failed", self.lane, tier)
+                results = [e] * len(batch)
+            finally:
+                TX_IN_FLIGHT.dec(lane=self.lane)
+            _settle(batch, results)
+
+
+class AsyncTransactionScheduler:
+    """
+    ``TransactionScheduler`` for asyncio code: ``await submit(item, tier)`` returns the item's result.
+
+    ``process`` is a coroutine function with the same contract;
+    ``max_in_flight`` sender tasks take batches from the ``TierQueue``.
+    Everything runs on the event loop that first calls ``submit``.
+    """
+
+    def __init__(self, process, lane, tiers=TIERS, fee_multipliers=None, default_tier=None,
+                 max_batch=20, max_wait=2.0, max_in_flight=2, aging=60.0):
+        self.process = process
+        self.lane = lane
+        self.fee_multipliers = dict(fee_multipliers or DEFAULT_FEE_MULTIPLIERS)
+        self.default_tier = default_tier or tiers[len(tiers) // 2]
+        self.max_batch = max(1, int(max_batch))
+        self.max_wait = max_wait
+        self.max_in_flight = max(1, int(max_in_flight))
+        self._queue = TierQueue(lane, tiers, aging)
+        # Created on first use so they bind to the serving event loop
+        self._wakeup = None
+        self._tasks = []
+
+    async def submit(self, item, tier=None):
+        future = asyncio.get_running_loop().create_future()
+        self._ensure_running()
+        self._queue.push(tier if tier in self._queue.tiers else self.default_tier, item, future)
+        self._wakeup.set()
+        return await future
+
+    def pending(self):
+        """Queued items per tier."""
+        return self._queue.depth()
+
+    def _ensure_running(self):
+        if any(not task.done() for task in self._tasks):
+            return
+        loop = asyncio.get_running_loop()
+        self._wakeup = asyncio.Event()
+        self._tasks = [
+            loop.create_task(self._run(), name=f"{self.lane}-sender-{i}") for i in range(self.max_in_flight)
+        ]
+
+    async def _run(self):
+        while True:
+            taken = self._queue.take(self.max_batch, self.max_wait)
+            if taken is None:
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), self._queue.wait_time(self.max_wait))
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            tier, batch = taken
+            TX_IN_FLIGHT.inc(lane=self.lane)
+            try:
+                results = await self.process([item for item, _, _ in batch], self.fee_multipliers.get(tier, 1.0))
+            except Exception as e:
+                log.exception("%s batch (%s priority) failed", self.lane, tier)
+                results = [e] * len(batch)
+            finally:
+                TX_IN_FLIGHT.dec(lane=self.lane)
+            _settle(batch, results)
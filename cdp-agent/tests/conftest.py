@@ -0,0 +1,65 @@
+import json
+import os
+
+import pytest
+
+from grievances import grievance_args, new_grievance
+
+ARTIFACT = os.path.join(
+    os.path.dirname(__file__), "..", "..", "artifacts", "contracts", "GrievanceRegistry.sol", "GrievanceRegistry.json"
+)
+
+
+class Registry:
+    """GrievanceRegistry deployed on an in-process eth-tester chain, sent to from an unlocked account."""
+
+    def __init__(self, web3, contract):
+        self.web3 = web3
+        self.contract = contract
+        self.account = web3.eth.accounts[0]
+        self.tester = web3.provider.ethereum_tester
+
+    def submit(self, tracking_id, **fields):
+        grievance = dict(new_grievance(tracking_id, "Pothole", "Deep pothole", "Main St"), **fields)
+        return self.contract.functions.submitGrievance(*grievance_args(grievance)).transact({"from": self.account})
+
+    def resolve(self, tracking_id):
+        return self.contract.functions.markResolved(tracking_id).transact({"from": self.account})
+
+
+@pytest.fixture
+def registry():
+    pytest.importorskip("eth_tester")
+    from web3 import EthereumTesterProvider, Web3
+
+    with open(ARTIFACT) as f:
+        compiled = json.load(f)
+    web3 = Web3(EthereumTesterProvider())
+    deployer = web3.eth.contract(abi=compiled["abi"], bytecode=compiled["bytecode"])
+    receipt = web3.eth.wait_for_transaction_receipt(
+        deployer.constructor().transact({"from": web3.eth.accounts[0]})
+    )
+    return Registry(web3, web3.eth.contract(address=receipt["contractAddress"], abi=compiled["abi"]))
+
+
+@pytest.fixture(scope="session")
+def app_env(tmp_path_factory):
+    """Settings app.py and asgi_app.py are imported with: an unreachable chain, the memory store, temp dirs."""
+    workdir = tmp_path_factory.mktemp("app")
+    with pytest.MonkeyPatch.context() as patch:
+        for name, value in {
+            "HUGGINGFACE_API_KEY": "test",
+            "PRIVATE_KEY": "0x" + "11" * 32,
+            "GRIEVANCE_CONTRACT_ADDRESS": "0x" + "22" * 20,
+            "AVAX_RPC_URL": "http://127.0.0.1:9",
+            "GRIEVANCE_STORE_BACKEND": "memory",
+            "INDEX_CHAIN_EVENTS": "0",
+            "CLASSIFICATION_CACHE_PATH": "",
+            "RECLASSIFY_DIR": str(workdir / "reclassify"),
+            "JOB_SPOOL_DIR": str(workdir / "job_spool"),
+            "BULK_IMPORT_DIR": str(workdir / "bulk_imports"),
+            "INDEXER_CHECKPOINT_PATH": str(workdir / "indexer_checkpoint.json"),
+        }.items():
+            patch.setenv(name, value)
+        patch.delenv("SIGNER_SOCKET", raising=False)
+        yield workdir
@@ -0,0 +1,159 @@
+import asyncio
+import io
+import time
+from concurrent.futures import Future
+from types import SimpleNamespace
+
+import pytest
+from PIL import Image
+
+from chain_batcher import SubmissionBatcher
+from grievance_store import GrievanceStore
+from jobs import JobSpool
+
+
+def png():
+    buffer = io.BytesIO()
+    Image.new("RGB", (64, 48), (200, 40, 40)).save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+class NeverSent:
+    """A chain batcher whose submissions never finish."""
+
+    def submit(self, grievance):
+        return Future()
+
+
+class FailingBatcher:
+    def submit(self, grievance):
+        future = Future()
+        future.set_exception(ConnectionError("signer went away"))
+        return future
+
+
+@pytest.fixture
+def flask_app(app_env, tmp_path, monkeypatch):
+    import app
+
+    store = GrievanceStore()
+    monkeypatch.setattr(app, "GRIEVANCE_STORE", store)
+    monkeypatch.setattr(app.SERVICE, "store", store)
+    monkeypatch.setattr(app, "JOB_SPOOL", JobSpool(str(tmp_path / "spool")))
+    monkeypatch.setattr(app, "clip_grievance_categorize", lambda image: {"category": "pothole", "priorityLevel": "high"})
+    return app
+
+
+def wait_until(predicate, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        assert time.monotonic() < deadline
+        time.sleep(0.01)
+
+
+def use_batcher(app, monkeypatch):
+    batcher = SubmissionBatcher(
+        lambda batch, fee: {g["trackingId"]: {"success": True, "tx_hash": "0xabc"} for g in batch},
+        max_batch=1, max_wait=0,
+    )
+    monkeypatch.setattr(app, "CHAIN_BATCHER", batcher)
+    return batcher
+
+
+def submit(client):
+    return client.post(
+        "/submit_grievance",
+        data={"title": "Pothole", "description": "Deep", "location": "Main St", "image": (io.BytesIO(png()), "a.png")},
+    )
+
+
+def test_submission_answers_202_and_the_long_poll_sees_the_result(flask_app, monkeypatch):
+    batcher = use_batcher(flask_app, monkeypatch)
+    client = flask_app.app.test_client()
+    try:
+        response = submit(client)
+        assert response.status_code == 202
+        body = response.get_json()
+        assert body["blockchainStatus"] == "pending"
+        tracking_id = body["trackingId"]
+
+        status = client.get(f"/grievance_status/{tracking_id}?wait=5").get_json()
+    finally:
+        batcher.stop()
+    assert status["blockchainStatus"] == "success"
+    assert status["tx_hash"] == "0xabc"
+    assert flask_app.GRIEVANCE_STORE.get(tracking_id)["category"] == "pothole"
+    # The job leaves the spool right after its outcome is recorded
+    wait_until(lambda: flask_app.JOB_SPOOL.entries() == [])
+
+
+def test_long_poll_answers_pending_once_the_wait_expires(flask_app, monkeypatch):
+    monkeypatch.setattr(flask_app, "CHAIN_BATCHER", NeverSent())
+    client = flask_app.app.test_client()
+    tracking_id = submit(client).get_json()["trackingId"]
+
+    started = time.monotonic()
+    status = client.get(f"/grievance_status/{tracking_id}?wait=0.3")
+    assert time.monotonic() - started >= 0.3
+    assert status.status_code == 200
+    assert status.get_json()["blockchainStatus"] == "pending"
+    assert client.get("/grievance_status/GRV-NONE?wait=0.1").status_code == 404
+    assert client.get(f"/grievance_status/{tracking_id}?wait=soon").status_code == 400
+
+
+def test_a_failed_chain_handoff_is_recorded(flask_app, monkeypatch):
+    monkeypatch.setattr(flask_app, "CHAIN_BATCHER", FailingBatcher())
+    client = flask_app.app.test_client()
+    tracking_id = submit(client).get_json()["trackingId"]
+
+    status = client.get(f"/grievance_status/{tracking_id}?wait=5").get_json()
+    assert status["blockchainStatus"] == "failed"
+    assert status["blockchainError"] == "signer went away"
+    # The job leaves the spool right after its outcome is recorded
+    wait_until(lambda: flask_app.JOB_SPOOL.entries() == [])
+
+
+class MalformedScores:
+    """A classify batcher answering with an empty score list, as a misbehaving endpoint might."""
+
+    def submit(self, image_data, timeout=None):
+        future = Future()
+        future.set_result([])
+        return future
+
+
+class AsyncMalformedScores:
+    async def submit(self, image_data, timeout=None):
+        return []
+
+
+@pytest.mark.parametrize("app_name", ["app", "asgi_app"])
+def test_malformed_scores_fall_back_to_unclassified(app_env, monkeypatch, app_name):
+    import importlib
+
+    module = importlib.import_module(app_name)
+    monkeypatch.setattr(module, "CLASSIFIER", SimpleNamespace(name="fake"))
+    monkeypatch.setattr(module, "CLASSIFY_BATCHER", MalformedScores() if app_name == "app" else AsyncMalformedScores())
+    cache = SimpleNamespace(get=lambda key: None, put=lambda key, result: pytest.fail("a fallback was cached"))
+    monkeypatch.setattr(module, "CLASSIFICATION_CACHE", cache)
+
+    result = module.clip_grievance_categorize(png())
+    if asyncio.iscoroutine(result):
+        result = asyncio.run(result)
+    assert result["category"] == "unclassified"
+    assert not result.get("retry")
+
+
+def test_mark_resolved_answers_504_when_the_tx_is_not_sent_in_time(flask_app, monkeypatch):
+    # A lane that never gets to send
+    monkeypatch.setattr(flask_app, "RESOLVE_LANE", SimpleNamespace(submit=lambda request: Future()))
+    monkeypatch.setattr(flask_app, "RESOLVE_TIMEOUT", 0.1)
+    client = flask_app.app.test_client()
+
+    response = client.post("/mark_resolved/GRV-A")
+    assert response.status_code == 504
+    assert "still queued" in response.get_json()["error"]
+
+    # Sent in time
+    monkeypatch.setattr(flask_app, "RESOLVE_LANE", SimpleNamespace(submit=lambda request: request[1].set_result(b"\xab")))
+    assert client.post("/mark_resolved/GRV-A").get_json()["transaction_hash"] == "ab"
@@ -0,0 +1,171 @@
+import asyncio
+import threading
+
+import pytest
+
+from grievance_store import GrievanceStore
+from jobs import JobSpool
+from .test_app import png
+
+
+class ClosingStore(GrievanceStore):
+    closed = False
+
+    def close(self):
+        self.closed = True
+
+
+class OfflineChain:
+    """Stands in for AsyncChain in the lifespan: nothing to reach, and a repair monitor that only sleeps."""
+
+    def __init__(self):
+        self.monitor = None
+
+    async def start(self):
+        pass
+
+    def start_monitor(self, interval=30):
+        self.monitor = asyncio.get_running_loop().create_task(asyncio.sleep(3600))
+        return self.monitor
+
+
+class GatedBatcher:
+    """A chain batcher whose submissions succeed once ``gate`` is set."""
+
+    def __init__(self):
+        self.gate = threading.Event()
+
+    async def submit(self, grievance, tier=None):
+        await asyncio.to_thread(self.gate.wait, 10)
+        return {"success": True, "tx_hash": "0xabc"}
+
+
+async def classify(image_data):
+    return {"category": "pothole", "priorityLevel": "high"}
+
+
+@pytest.fixture
+def asgi(app_env, tmp_path, monkeypatch):
+    import asgi_app
+
+    store = ClosingStore()
+    monkeypatch.setattr(asgi_app, "GRIEVANCE_STORE", store)
+    monkeypatch.setattr(asgi_app.SERVICE, "store", store)
+    monkeypatch.setattr(asgi_app, "JOB_SPOOL", JobSpool(str(tmp_path / "spool")))
+    monkeypatch.setattr(asgi_app, "CHAIN", OfflineChain())
+    monkeypatch.setattr(asgi_app, "CHAIN_BATCHER", GatedBatcher())
+    monkeypatch.setattr(asgi_app, "clip_grievance_categorize", classify)
+    return asgi_app
+
+
+def client(asgi):
+    from starlette.testclient import TestClient
+
+    return TestClient(asgi.app)
+
+
+def submit(http):
+    return http.post(
+        "/submit_grievance",
+        data={"title": "Pothole", "description": "Deep", "location": "Main St"},
+        files={"image": ("a.png", png(), "image/png")},
+    )
+
+
+def test_submission_answers_202_and_the_long_poll_sees_the_result(asgi):
+    asgi.CHAIN_BATCHER.gate.set()
+    with client(asgi) as http:
+        response = submit(http)
+        assert response.status_code == 202
+        tracking_id = response.json()["trackingId"]
+
+        status = http.get(f"/grievance_status/{tracking_id}?wait=5").json()
+        assert status["blockchainStatus"] == "success"
+        assert status["tx_hash"] == "0xabc"
+        assert http.get("/grievance_status/GRV-NONE").status_code == 404
+        assert http.get(f"/grievance_status/{tracking_id}?wait=soon").status_code == 400
+    assert asgi.GRIEVANCE_STORE.get(tracking_id)["category"] == "pothole"
+
+
+def test_submissions_beyond_max_in_flight_are_refused(asgi, monkeypatch):
+    monkeypatch.setattr(asgi, "MAX_IN_FLIGHT", 1)
+    with client(asgi) as http:
+        assert submit(http).status_code == 202
+        refused = submit(http)
+        assert refused.status_code == 503
+        assert "retry" in refused.json()["error"]
+        assert len(asgi.GRIEVANCE_STORE.all()) == 1
+
+        asgi.CHAIN_BATCHER.gate.set()
+        tracking_id = asgi.GRIEVANCE_STORE.all()[0]["trackingId"]
+        assert http.get(f"/grievance_status/{tracking_id}?wait=5").json()["blockchainStatus"] == "success"
+        assert submit(http).status_code == 202
+
+
+def test_shutdown_drains_in_flight_submissions_and_closes_the_store(asgi):
+    with client(asgi) as http:
+        tracking_id = submit(http).json()["trackingId"]
+        assert http.get(f"/grievance_status/{tracking_id}").json()["blockchainStatus"] == "pending"
+        monitor = asgi.CHAIN.monitor
+        # Released only once shutdown has started waiting
+        threading.Timer(0.2, asgi.CHAIN_BATCHER.gate.set).start()
+
+    assert asgi.GRIEVANCE_STORE.get(tracking_id)["blockchainStatus"] == "success"
+    assert not asgi.IN_FLIGHT
+    assert asgi.JOB_SPOOL.entries() == []
+    assert asgi.GRIEVANCE_STORE.closed
+    assert monitor.cancelled()
+
+
+def test_a_failed_chain_handoff_is_recorded(asgi, monkeypatch):
+    class FailingBatcher:
+        async def submit(self, grievance, tier=None):
+            raise ConnectionError("signer went away")
+
+    monkeypatch.setattr(asgi, "CHAIN_BATCHER", FailingBatcher())
+    with client(asgi) as http:
+        tracking_id = submit(http).json()["trackingId"]
+        status = http.get(f"/grievance_status/{tracking_id}?wait=5").json()
+    assert status["blockchainStatus"] == "failed"
+    assert status["blockchainError"] == "signer went away"
+
+
+class GatedResolveLane:
+    """A resolve lane that sends (settles ``sent``) once ``gate`` is set."""
+
+    def __init__(self):
+        self.gate = threading.Event()
+        self.resolved = []
+
+    async def submit(self, request):
+        tracking_id, sent = request
+        await asyncio.to_thread(self.gate.wait, 10)
+        sent.set_result(b"\xab")
+        self.resolved.append(tracking_id)
+
+
+def test_resolutions_have_their_own_task_set_and_are_drained_at_shutdown(asgi, monkeypatch):
+    lane = GatedResolveLane()
+    monkeypatch.setattr(asgi, "RESOLVE_LANE", lane)
+    monkeypatch.setattr(asgi, "RESOLVE_TIMEOUT", 0.1)
+    monkeypatch.setattr(asgi, "MAX_IN_FLIGHT", 1)
+    asgi.CHAIN_BATCHER.gate.set()
+    with client(asgi) as http:
+        response = http.post("/mark_resolved/GRV-A")
+        assert response.status_code == 504
+        assert "still queued" in response.json()["error"]
+        assert len(asgi.RESOLVING) == 1
+        # A pending resolution does not take a submission's place
+        assert submit(http).status_code == 202
+        threading.Timer(0.2, lane.gate.set).start()
+
+    assert lane.resolved == ["GRV-A"]
+    assert not asgi.RESOLVING
+
+
+def test_mark_resolved_answers_with_the_tx_hash(asgi, monkeypatch):
+    lane = GatedResolveLane()
+    lane.gate.set()
+    monkeypatch.setattr(asgi, "RESOLVE_LANE", lane)
+    with client(asgi) as http:
+        assert http.post("/mark_resolved/GRV-A").json()["transaction_hash"] == "ab"
@@ -0,0 +1,219 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+from eth_account import Account
+
+from async_chain import AsyncChain, AsyncReceiptTracker
+from fee_oracle import GasEstimateCache
+from nonce_manager import REPLACEMENT_BUMP
+
+GAS_PRICE = 10 ** 9
+SUBMIT = "0x" + "aa" * 4
+
+
+async def value(result):
+    return result
+
+
+class FakeEth:
+    """The parts of AsyncWeb3's ``eth`` AsyncChain uses, over a node whose counts and blocks the test sets."""
+
+    def __init__(self, mined=0):
+        self.mined = self.pending = mined
+        self.gas = 100_000
+        self.sent = []
+        self.errors = []
+        self.estimates = 0
+        self.blocks = [[]]
+        self.receipts = {}
+
+    @property
+    def gas_price(self):
+        return value(GAS_PRICE)
+
+    @property
+    def chain_id(self):
+        return value(1337)
+
+    @property
+    def block_number(self):
+        return value(len(self.blocks) - 1)
+
+    async def get_block(self, number):
+        return {"transactions": self.blocks[number]}
+
+    async def get_transaction_receipt(self, tx_hash):
+        from web3.exceptions import TransactionNotFound
+
+        if tx_hash not in self.receipts:
+            raise TransactionNotFound(tx_hash)
+        return self.receipts[tx_hash]
+
+    async def get_transaction_count(self, address, block):
+        return self.pending if block == "pending" else self.mined
+
+    async def send_raw_transaction(self, raw):
+        if self.errors:
+            raise self.errors.pop(0)
+        self.sent.append(raw)
+        return bytes.fromhex(f"{len(self.sent):064x}")
+
+    async def estimate_gas(self, tx):
+        self.estimates += 1
+        return self.gas
+
+    def mine(self, tx_hash, **receipt):
+        key = "0x" + tx_hash.hex()
+        self.receipts[key] = dict({"status": 1, "gasUsed": 50_000, "transactionHash": tx_hash}, **receipt)
+        self.blocks.append([tx_hash])
+
+
+@pytest.fixture
+def chain():
+    account = Account.create()
+    eth = FakeEth()
+    w3 = SimpleNamespace(eth=eth)
+    chain = AsyncChain(
+        w3,
+        SimpleNamespace(account=account),
+        GasEstimateCache(SimpleNamespace(eth=eth), buffer=1.0),
+        receipts=AsyncReceiptTracker(w3, poll_interval=0.01),
+        stuck_after=0,
+    )
+    return chain, eth
+
+
+def transfer(chain):
+    return {"to": chain.account.address, "value": 0, "gas": 21000, "gasPrice": GAS_PRICE, "chainId": 1337}
+
+
+def call(size=100):
+    return {"to": "0x" + "22" * 20, "data": SUBMIT + "00" * (size - 4), "gasPrice": GAS_PRICE, "chainId": 1337}
+
+
+def test_send_retries_a_cached_gas_limit_with_a_live_estimate(chain):
+    chain, eth = chain
+    chain.gas_estimates.record(call(), 60_000)
+    eth.errors.append(ValueError("intrinsic gas too low"))
+
+    async def run():
+        tx = call()
+        tx_hash = await chain.send(tx)
+        assert tx["gas"] == 100_000 and eth.estimates == 1
+        assert chain._in_flight[0]["tx_hash"] == tx_hash
+        eth.mine(tx_hash)
+        await chain.receipts.watch(tx_hash)
+        await asyncio.sleep(0)
+
+    asyncio.run(run())
+    # Confirmed once the receipt is in
+    assert chain._in_flight == {}
+    assert chain.gas_estimates.cached(call()) == 100_000
+
+
+def test_send_drops_a_cached_limit_that_ran_out_of_gas_on_chain(chain):
+    chain, eth = chain
+    chain.gas_estimates.record(call(), 60_000)
+
+    async def run():
+        tx_hash = await chain.send(call())
+        eth.mine(tx_hash, status=0, gasUsed=60_000)
+        await chain.receipts.watch(tx_hash)
+        await asyncio.sleep(0)
+
+    asyncio.run(run())
+    assert chain.gas_estimates.cached(call()) is None
+    assert eth.estimates == 0
+
+
+def test_send_and_wait_confirms_the_nonce(chain):
+    chain, eth = chain
+
+    async def run():
+        task = asyncio.create_task(chain.send_and_wait(call()))
+        while not eth.sent:
+            await asyncio.sleep(0.01)
+        eth.mine(bytes.fromhex(f"{1:064x}"))
+        return await task
+
+    tx_hash, receipt = asyncio.run(run())
+    assert receipt["status"] == 1
+    assert chain._in_flight == {}
+
+
+def test_repair_fills_gaps_with_a_noop_transfer(chain):
+    chain, eth = chain
+
+    async def run():
+        for _ in range(3):
+            await chain.allocate()
+        chain.release(1)
+        await chain.repair()
+
+    asyncio.run(run())
+    assert len(eth.sent) == 1
+    assert Account.recover_transaction(eth.sent[0]) == chain.account.address
+    assert chain._in_flight[1]["tx"]["to"] == chain.account.address
+    assert 1 not in chain._free
+
+
+def test_repair_rebroadcasts_a_stuck_transaction_and_follows_the_replacement(chain):
+    chain, eth = chain
+
+    async def run():
+        old_hash, nonce = await chain.sign_and_send(transfer(chain))
+        watched = chain.receipts.watch(old_hash)
+        # Let the tracker take its block cursor before anything is mined
+        await asyncio.sleep(0.05)
+        await chain.repair()
+        new_hash = chain._in_flight[nonce]["tx_hash"]
+        assert chain._in_flight[nonce]["tx"]["gasPrice"] == int(GAS_PRICE * REPLACEMENT_BUMP) + 1
+        # Only the replacement is mined; the original's watch resolves with it
+        eth.mine(new_hash)
+        receipt = await asyncio.wait_for(watched, 5)
+        assert receipt["transactionHash"] == new_hash
+        assert chain.receipts.pending() == 0
+
+    asyncio.run(run())
+
+
+def test_repair_leaves_recent_transactions_alone(chain):
+    chain, eth = chain
+    chain.stuck_after = 90
+
+    async def run():
+        await chain.sign_and_send(transfer(chain))
+        await chain.repair()
+
+    asyncio.run(run())
+    assert len(eth.sent) == 1
+
+
+def test_repair_confirms_when_the_original_was_mined_meanwhile(chain):
+    chain, eth = chain
+
+    async def run():
+        await chain.sign_and_send(transfer(chain))
+        eth.errors.append(ValueError("nonce too low"))
+        await chain.repair()
+
+    asyncio.run(run())
+    assert chain._in_flight == {}
+
+
+def test_the_monitor_runs_repair_until_cancelled(chain):
+    chain, eth = chain
+
+    async def run():
+        await chain.allocate()
+        await chain.allocate()
+        chain.release(0)
+        monitor = chain.start_monitor(interval=0.01)
+        assert chain.start_monitor(interval=0.01) is monitor
+        while not eth.sent:
+            await asyncio.sleep(0.01)
+        monitor.cancel()
+
+    asyncio.run(run())
+    assert 0 in chain._in_flight
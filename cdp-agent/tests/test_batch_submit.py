@@ -0,0 +1,106 @@
+import json
+import os
+
+import pytest
+from eth_account import Account
+from web3 import Web3
+
+from chain_batcher import SubmissionBatcher
+from contract_registry import ContractRegistry
+from event_indexer import EventDecoder
+from grievances import batch_results, grievance_args, new_grievance
+
+ROOT = os.path.join(os.path.dirname(__file__), "..")
+BACKEND_ABI = os.path.join(ROOT, "src", "abi", "GrievanceRegistry.json")
+ARTIFACT = os.path.join(ROOT, "..", "artifacts", "contracts", "GrievanceRegistry.sol", "GrievanceRegistry.json")
+
+
+def load_abi(path):
+    with open(path) as f:
+        compiled = json.load(f)
+    return compiled["abi"] if isinstance(compiled, dict) else compiled
+
+
+def functions(abi):
+    return {item["name"] for item in abi if item.get("type") == "function"}
+
+
+# The backend ABI copy must come from a compile; an artifact from before submitGrievances cannot check it
+needs_batch_artifact = pytest.mark.skipif(
+    "submitGrievances" not in functions(load_abi(ARTIFACT)),
+    reason="artifacts/ predates submitGrievances; run `npx hardhat compile`",
+)
+
+
+def grievance(tracking_id):
+    return new_grievance(tracking_id, "Pothole", "Deep pothole", "Main St")
+
+
+def receipt_of(registry, tx_hash):
+    return registry.web3.eth.wait_for_transaction_receipt(tx_hash)
+
+
+def test_batch_calldata_matches_web3_encoding():
+    abi = load_abi(BACKEND_ABI)
+    contracts = ContractRegistry(Web3(), "0x" + "11" * 20, abi, Account.create().key)
+    args = [grievance_args(grievance(tracking_id)) for tracking_id in ("GRV-A", "GRV-B")]
+    expected = contracts.contract.functions.submitGrievances(args)._encode_transaction_data()
+    assert Web3.to_hex(contracts.encode("submitGrievances", args)) == expected
+
+
+def test_batch_results_only_counts_events_from_the_registry(registry):
+    first = receipt_of(registry, registry.submit("GRV-A"))
+    second = receipt_of(registry, registry.submit("GRV-B"))
+    # GRV-C's event, as if some other contract had emitted it, must not confirm GRV-C
+    third = receipt_of(registry, registry.submit("GRV-C"))
+    foreign = dict(third["logs"][0], address=Web3.to_checksum_address("0x" + "22" * 20))
+    receipt = {"transactionHash": first["transactionHash"], "logs": [*first["logs"], *second["logs"], foreign]}
+    batch = [grievance("GRV-A"), grievance("GRV-B"), grievance("GRV-C")]
+
+    results = batch_results(batch, receipt, registry.contract.address, EventDecoder(registry.contract.abi))
+
+    assert [results[g["trackingId"]]["success"] for g in batch] == [True, True, False]
+    assert results["GRV-A"]["tx_hash"] == first["transactionHash"].hex()
+    assert "No GrievanceSubmitted event" in results["GRV-C"]["error"]
+
+
+@needs_batch_artifact
+def test_backend_abi_matches_the_compiled_artifact():
+    assert load_abi(BACKEND_ABI) == load_abi(ARTIFACT)
+
+
+@needs_batch_artifact
+def test_submits_a_batch_in_one_transaction(registry):
+    batch = [grievance(tracking_id) for tracking_id in ("GRV-A", "GRV-B", "GRV-C")]
+    tx_hash = registry.contract.functions.submitGrievances([grievance_args(g) for g in batch]).transact(
+        {"from": registry.account}
+    )
+
+    results = batch_results(batch, receipt_of(registry, tx_hash), registry.contract.address,
+                            EventDecoder(registry.contract.abi))
+
+    assert all(result["success"] for result in results.values())
+    assert registry.contract.functions.getAllTrackingIds().call() == ["GRV-A", "GRV-B", "GRV-C"]
+
+
+def test_batcher_fails_items_the_batch_did_not_report():
+    batcher = SubmissionBatcher(lambda batch, fee: {"GRV-A": {"success": True}}, max_batch=2, max_wait=0.5)
+    try:
+        futures = [batcher.submit(grievance(tracking_id)) for tracking_id in ("GRV-A", "GRV-B")]
+        results = [future.result(timeout=5) for future in futures]
+    finally:
+        batcher.stop()
+    assert results == [{"success": True}, {"success": False, "error": "no result for grievance in batch"}]
+
+
+def test_batcher_fails_the_whole_batch_when_sending_raises():
+    def submit_batch(batch, fee):
+        raise ValueError("nonce too low")
+
+    batcher = SubmissionBatcher(submit_batch, max_batch=2, max_wait=0.5)
+    try:
+        futures = [batcher.submit(grievance(tracking_id)) for tracking_id in ("GRV-A", "GRV-B")]
+        results = [future.result(timeout=5) for future in futures]
+    finally:
+        batcher.stop()
+    assert results == [{"success": False, "error": "nonce too low"}] * 2
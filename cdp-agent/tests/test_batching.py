@@ -0,0 +1,113 @@
+import asyncio
+import queue
+import threading
+
+import pytest
+
+from batching import AsyncMicroBatcher, MicroBatcher
+
+
+def test_groups_concurrent_submissions_into_batches():
+    batches = []
+
+    def process(items):
+        batches.append(list(items))
+        return [item * 2 for item in items]
+
+    batcher = MicroBatcher(process, max_batch=4, max_wait=0.5, workers=1)
+    try:
+        futures = [batcher.submit(i) for i in range(8)]
+        assert [future.result(timeout=5) for future in futures] == [i * 2 for i in range(8)]
+    finally:
+        batcher.stop()
+    assert batches == [[0, 1, 2, 3], [4, 5, 6, 7]]
+    assert batcher.metrics.snapshot()["batches"] == 2
+
+
+def test_sends_a_partial_batch_after_max_wait():
+    batcher = MicroBatcher(lambda items: items, max_batch=100, max_wait=0.01)
+    try:
+        assert batcher.submit("only").result(timeout=5) == "only"
+    finally:
+        batcher.stop()
+
+
+def test_an_exception_fails_only_its_item_or_its_batch():
+    def process(items):
+        if "boom" in items:
+            raise RuntimeError("batch failed")
+        return [ValueError(item) if item == "bad" else item for item in items]
+
+    batcher = MicroBatcher(process, max_batch=2, max_wait=0.01, workers=1)
+    try:
+        good, bad = batcher.submit("good"), batcher.submit("bad")
+        assert good.result(timeout=5) == "good"
+        with pytest.raises(ValueError):
+            bad.result(timeout=5)
+        with pytest.raises(RuntimeError):
+            batcher.submit("boom").result(timeout=5)
+    finally:
+        batcher.stop()
+
+
+def test_max_pending_bounds_queued_and_running_items():
+    release = threading.Event()
+
+    def process(items):
+        release.wait(5)
+        return items
+
+    batcher = MicroBatcher(process, max_batch=1, max_wait=0, workers=1, max_pending=2)
+    try:
+        futures = [batcher.submit(1), batcher.submit(2)]
+        with pytest.raises(queue.Full):
+            batcher.submit(3, timeout=0.05)
+        release.set()
+        assert [future.result(timeout=5) for future in futures] == [1, 2]
+        # Resolved items give their room back
+        assert batcher.submit(4, timeout=1).result(timeout=5) == 4
+    finally:
+        batcher.stop()
+
+
+def test_async_batches_and_returns_each_result():
+    batches = []
+
+    async def process(items):
+        batches.append(list(items))
+        return [ValueError(item) if item == "bad" else item.upper() for item in items]
+
+    async def main():
+        batcher = AsyncMicroBatcher(process, max_batch=3, max_wait=0.5)
+        return await asyncio.gather(*(batcher.submit(item) for item in ("a", "b", "bad")), return_exceptions=True)
+
+    results = asyncio.run(main())
+    assert results[:2] == ["A", "B"]
+    assert isinstance(results[2], ValueError)
+    assert batches == [["a", "b", "bad"]]
+
+
+def test_async_max_pending_and_timeouts():
+    async def main():
+        release = asyncio.Event()
+
+        async def process(items):
+            await release.wait()
+            return items
+
+        batcher = AsyncMicroBatcher(process, max_batch=1, max_wait=0, concurrency=1, max_pending=1)
+        first = asyncio.ensure_future(batcher.submit("first"))
+        await asyncio.sleep(0.01)
+        with pytest.raises(queue.Full):
+            await batcher.submit("second", timeout=0.05)
+        release.set()
+        assert await first == "first"
+
+        release.clear()
+        with pytest.raises(TimeoutError):
+            await batcher.submit("slow", timeout=0.05)
+        release.set()
+        # The timed-out item still finishes and frees its room
+        assert await batcher.submit("after", timeout=1) == "after"
+
+    asyncio.run(main())
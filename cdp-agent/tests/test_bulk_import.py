@@ -0,0 +1,116 @@
+import io
+import json
+import tarfile
+import zipfile
+
+import pytest
+
+from bulk_import import ImageSource, ImportJobs, iter_items, save_upload
+from image_ingest import ImageRejected
+
+IMAGES = {"a.jpg": b"A" * 10, "b.jpg": b"B" * 50}
+
+
+def zip_archive():
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w") as archive:
+        for name, data in IMAGES.items():
+            archive.writestr(name, data)
+        archive.writestr("dir/", b"")
+    return buffer
+
+
+def tar_archive():
+    buffer = io.BytesIO()
+    with tarfile.open(fileobj=buffer, mode="w:gz") as archive:
+        for name, data in IMAGES.items():
+            info = tarfile.TarInfo(name)
+            info.size = len(data)
+            archive.addfile(info, io.BytesIO(data))
+        directory = tarfile.TarInfo("dir")
+        directory.type = tarfile.DIRTYPE
+        archive.addfile(directory)
+    return buffer
+
+
+def saved(tmp_path, layout, manifest=""):
+    if layout == "zip":
+        save_upload(str(tmp_path), manifest, archive=io.BytesIO(zip_archive().getvalue()))
+    elif layout == "tar":
+        save_upload(str(tmp_path), manifest, archive=io.BytesIO(tar_archive().getvalue()))
+    else:
+        # Client-side paths are cut down to the file name
+        images = [(f"C:\\photos\\{name}", io.BytesIO(data)) for name, data in IMAGES.items()]
+        save_upload(str(tmp_path), manifest, images=images)
+    return str(tmp_path)
+
+
+@pytest.mark.parametrize("layout", ["zip", "tar", "parts"])
+def test_reads_images_by_manifest_name(tmp_path, layout):
+    source = ImageSource(saved(tmp_path, layout))
+    try:
+        assert source.read("a.jpg", 100) == IMAGES["a.jpg"]
+        assert source.read("b.jpg", 100) == IMAGES["b.jpg"]
+    finally:
+        source.close()
+
+
+@pytest.mark.parametrize("layout", ["zip", "tar", "parts"])
+def test_rejects_missing_and_oversized_images(tmp_path, layout):
+    source = ImageSource(saved(tmp_path, layout))
+    try:
+        with pytest.raises(ImageRejected) as missing:
+            source.read("c.jpg", 100)
+        assert missing.value.status_code == 404
+        with pytest.raises(ImageRejected) as too_large:
+            source.read("b.jpg", 20)
+        assert too_large.value.status_code == 413
+        if layout != "parts":
+            with pytest.raises(ImageRejected):
+                source.read("dir", 100)
+    finally:
+        source.close()
+
+
+def test_refuses_an_archive_that_is_neither_zip_nor_tar(tmp_path):
+    save_upload(str(tmp_path), "", archive=io.BytesIO(b"not an archive"))
+    with pytest.raises(ValueError):
+        ImageSource(str(tmp_path))
+
+
+def test_iter_items_reports_each_line(tmp_path):
+    lines = [
+        json.dumps({"title": "one", "image": "a.jpg"}),
+        "",
+        "not json",
+        json.dumps({"title": "no image"}),
+        json.dumps({"title": "missing", "image": "c.jpg"}),
+        json.dumps({"title": "too many", "image": "b.jpg"}),
+    ]
+    directory = saved(tmp_path, "zip", "\n".join(lines))
+    items = list(iter_items(directory, max_bytes=100, max_items=4))
+    assert [(index, image, error is None) for index, _, image, error in items] == [
+        (0, IMAGES["a.jpg"], True), (1, None, False), (2, None, False), (3, None, False), (4, None, False),
+    ]
+    assert items[0][1]["title"] == "one"
+    assert "invalid manifest line" in items[1][3]
+    assert "not in the upload" in items[3][3]
+    assert "limited to 4 items" in items[4][3]
+
+
+def test_import_jobs_record_progress_and_drop_old_jobs(tmp_path):
+    jobs = ImportJobs(path=str(tmp_path / "jobs.db"), max_jobs=2)
+    try:
+        first = jobs.create()
+        jobs.record(first, [(0, "queued", "GRV-1", None), (1, "rejected", None, "bad image")])
+        jobs.record(first, [(0, "duplicate", "GRV-0", None)])
+        jobs.finish(first, 2)
+        job = jobs.get(first)
+        assert job["total"] == 2 and job["finishedAt"] is not None
+        assert [(i["index"], i["status"]) for i in job["items"]] == [(0, "duplicate"), (1, "rejected")]
+
+        jobs.create()
+        jobs.create()
+        assert jobs.get(first) is None
+    finally:
+        jobs.close()
@@ -0,0 +1,100 @@
+from types import SimpleNamespace
+
+import pytest
+
+import classification_cache
+from classification_cache import ClassificationCache, classification_key
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Replaces the cache's clock; advance it by setting ``clock.now``."""
+    clock = SimpleNamespace(now=1_000_000.0)
+    monkeypatch.setattr(classification_cache, "time", SimpleNamespace(time=lambda: clock.now))
+    return clock
+
+
+def result(category):
+    return {"category": category, "priorityLevel": "high", "all_results": [{"label": category, "score": 0.9}]}
+
+
+def open_cache(tmp_path, **kwargs):
+    return ClassificationCache(path=str(tmp_path / "classifications.db"), **kwargs)
+
+
+def test_key_ignores_label_order_but_not_the_model():
+    key = classification_key(b"image", ["pothole", "garbage"], model="a")
+    assert key == classification_key(b"image", ["garbage", "pothole", "pothole"], model="a")
+    assert key != classification_key(b"image", ["garbage", "pothole"], model="b")
+    assert key != classification_key(b"other", ["garbage", "pothole"], model="a")
+
+
+def test_memory_tier_evicts_the_least_recently_used():
+    cache = ClassificationCache(max_entries=2)
+    cache.put("a", result("a"))
+    cache.put("b", result("b"))
+    assert cache.get("a")["category"] == "a"
+    cache.put("c", result("c"))
+
+    assert cache.get("b") is None
+    assert cache.get("a") and cache.get("c")
+    assert cache.stats()["entries"] == 2
+    # Callers get copies
+    cache.get("a")["category"] = "changed"
+    assert cache.get("a")["category"] == "a"
+
+
+def test_disk_tier_serves_results_after_a_reopen(tmp_path, clock):
+    cache = open_cache(tmp_path)
+    cache.put("a", result("a"))
+    cache.close()
+
+    reopened = open_cache(tmp_path, max_entries=1)
+    assert reopened.get("a") == result("a")
+    assert reopened.get("b") is None
+    # The disk hit was promoted to memory
+    assert reopened.get("a") == result("a")
+    stats = reopened.stats()
+    assert (stats["hits"], stats["diskHits"], stats["misses"], stats["diskEntries"]) == (1, 1, 1, 1)
+    reopened.close()
+
+
+def test_disk_entries_expire_after_the_ttl(tmp_path, clock):
+    cache = open_cache(tmp_path, ttl=60)
+    cache.put("a", result("a"))
+    cache.close()
+
+    clock.now += 59
+    assert open_cache(tmp_path, ttl=60).get("a") == result("a")
+    clock.now += 2
+    reopened = open_cache(tmp_path, ttl=60)
+    assert reopened.get("a") is None
+    # Expired rows are deleted when the cache opens
+    assert reopened.stats()["diskEntries"] == 0
+
+
+def test_evict_trims_the_table_to_its_newest_rows(tmp_path, clock):
+    cache = open_cache(tmp_path, max_entries=1, max_disk_entries=10)
+    for i in range(11):
+        clock.now += 1
+        cache.put(f"k{i}", result(str(i)))
+    # 10% slack before trimming
+    assert cache.stats()["diskEntries"] == 11
+
+    clock.now += 1
+    cache.put("k11", result("11"))
+    assert cache.stats()["diskEntries"] == 10
+    assert cache.get("k0") is None and cache.get("k1") is None
+    assert cache.get("k2")["category"] == "2"
+
+
+def test_evict_drops_expired_rows_first(tmp_path, clock):
+    cache = open_cache(tmp_path, max_entries=1, ttl=60, max_disk_entries=10)
+    for i in range(5):
+        cache.put(f"old{i}", result("old"))
+    clock.now += 61
+    for i in range(7):
+        cache.put(f"new{i}", result("new"))
+
+    assert cache.stats()["diskEntries"] == 7
+    assert cache.get("new0")["category"] == "new"
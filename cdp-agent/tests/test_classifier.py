@@ -0,0 +1,109 @@
+import io
+from types import SimpleNamespace
+
+import pytest
+from PIL import Image
+
+from classifier import ClassifierError, LocalClipClassifier, _parse_response, open_classifier
+
+# Only the local backend needs numpy, so it is an optional dependency
+np = pytest.importorskip("numpy")
+
+COLOURS = {"red": (255, 0, 0), "green": (0, 255, 0), "blue": (0, 0, 255)}
+
+
+class ColourEncoder:
+    """Stand-in for ClipEncoder: an image embeds as its mean colour, a colour name as its RGB value."""
+
+    name = "colour"
+    logit_scale = 100.0
+
+    def __init__(self):
+        self.image_calls = []
+        self.text_calls = []
+
+    def encode_images(self, images):
+        self.image_calls.append(len(images))
+        return np.array([np.asarray(image, dtype=np.float32).mean(axis=(0, 1)) for image in images])
+
+    def encode_texts(self, texts):
+        self.text_calls.append(list(texts))
+        return np.array([COLOURS[text] for text in texts], dtype=np.float32)
+
+
+def png(colour):
+    buffer = io.BytesIO()
+    Image.new("RGB", (8, 8), COLOURS[colour]).save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+def test_scores_a_batch_in_one_forward_pass():
+    encoder = ColourEncoder()
+    classifier = LocalClipClassifier(encoder, label_sets=[tuple(COLOURS)])
+
+    results = classifier.classify_batch([png("green"), png("red"), png("blue")], list(COLOURS))
+
+    assert [result[0]["label"] for result in results] == ["green", "red", "blue"]
+    assert all(abs(sum(r["score"] for r in result) - 1) < 1e-5 for result in results)
+    assert encoder.image_calls == [3]
+    assert classifier.name == "local:colour"
+
+
+def test_embeds_each_label_set_once():
+    encoder = ColourEncoder()
+    classifier = LocalClipClassifier(encoder, label_sets=[("red", "blue")])
+    for _ in range(3):
+        classifier.classify(png("red"), ["red", "blue"])
+    assert encoder.text_calls == [["red", "blue"]]
+
+
+def test_ad_hoc_labels_reuse_prepared_rows_and_are_not_kept():
+    encoder = ColourEncoder()
+    classifier = LocalClipClassifier(encoder, label_sets=[("red", "blue")])
+    for _ in range(2):
+        # An ad-hoc query scored next to a prepared set, as main.py's clip_image_analysis does
+        assert classifier.classify(png("green"), ["green", "red", "blue"])[0]["label"] == "green"
+    assert classifier.classify(png("blue"), ["blue", "red"])[0]["label"] == "blue"
+
+    # Only the query is encoded, on every call; the prepared rows are reused
+    assert encoder.text_calls == [["red", "blue"], ["green"], ["green"]]
+    assert list(classifier._label_matrices) == [("red", "blue")]
+
+
+def test_an_undecodable_image_fails_alone():
+    encoder = ColourEncoder()
+    classifier = LocalClipClassifier(encoder)
+
+    results = classifier.classify_batch([b"not an image", png("blue")], list(COLOURS))
+
+    assert isinstance(results[0], ClassifierError)
+    assert results[1][0]["label"] == "blue"
+    assert encoder.image_calls == [1]
+    with pytest.raises(ClassifierError):
+        classifier.classify(b"not an image", list(COLOURS))
+
+
+def test_local_backend_needs_a_model_path(monkeypatch):
+    monkeypatch.delenv("CLIP_MODEL_PATH", raising=False)
+    with pytest.raises(ValueError, match="CLIP_MODEL_PATH"):
+        open_classifier("local")
+    with pytest.raises(ValueError, match="Unknown classifier backend"):
+        open_classifier("onnx")
+
+
+def response(body, status_code=200):
+    return SimpleNamespace(status_code=status_code, text=str(body), json=lambda: body)
+
+
+def test_batched_responses_are_sorted_per_image():
+    low, high = {"label": "red", "score": 0.2}, {"label": "blue", "score": 0.8}
+    assert _parse_response(response([[low, high], [high, low]]), batched=True) == [[high, low], [high, low]]
+    with pytest.raises(ClassifierError) as failed:
+        _parse_response(response({"error": "loading"}, 503), batched=True)
+    assert failed.value.unavailable
+
+
+@pytest.mark.parametrize("body", [[], [[{"label": "red", "score": 1.0}], []], [{"label": "red", "score": 1.0}]])
+def test_batched_responses_without_scores_for_every_image_fail(body):
+    with pytest.raises(ClassifierError, match="CLIP analysis failed"):
+        _parse_response(response(body), batched=True)
@@ -0,0 +1,123 @@
+import pytest
+from eth_abi import decode as abi_decode
+from eth_abi import encode as abi_encode
+from web3 import Web3
+
+from contract_reader import AGGREGATE3_SELECTOR, MULTICALL3_ADDRESS, BulkGrievanceReader
+
+
+class ChainEth:
+    """``web3.eth`` of the test chain, plus a Multicall3 that runs each aggregated call on it."""
+
+    def __init__(self, eth):
+        self._eth = eth
+        self.calls = []
+
+    def __getattr__(self, name):
+        return getattr(self._eth, name)
+
+    def get_code(self, address):
+        return b"\x01" if address == MULTICALL3_ADDRESS else self._eth.get_code(address)
+
+    def call(self, tx):
+        self.calls.append(tx["to"])
+        if tx["to"] != MULTICALL3_ADDRESS:
+            return self._eth.call(tx)
+        data = bytes(tx["data"])
+        assert data[:4] == AGGREGATE3_SELECTOR
+        results = []
+        for target, allow_failure, calldata in abi_decode(["(address,bool,bytes)[]"], data[4:])[0]:
+            assert allow_failure
+            try:
+                call = {"to": Web3.to_checksum_address(target), "data": calldata}
+                results.append((True, bytes(self._eth.call(call))))
+            except Exception:
+                results.append((False, b""))
+        return abi_encode(["(bool,bytes)[]"], [results])
+
+    def get_storage_at(self, address, slot):
+        self.calls.append("storage")
+        return self._eth.get_storage_at(address, slot)
+
+
+class ChainWeb3:
+    def __init__(self, web3):
+        self._web3 = web3
+        self.eth = ChainEth(web3.eth)
+
+    def __getattr__(self, name):
+        return getattr(self._web3, name)
+
+
+@pytest.fixture
+def chain(registry):
+    web3 = ChainWeb3(registry.web3)
+    for tracking_id, title in (("GRV-A", "Pothole"), ("GRV-B", "Broken light"), ("GRV-C", "Flooding")):
+        registry.submit(tracking_id, title=title)
+    return registry, web3
+
+
+@pytest.mark.parametrize("mode", ["multicall", "batch", "serial"])
+def test_every_mode_reads_the_same_records(chain, mode):
+    registry, web3 = chain
+    reader = BulkGrievanceReader(web3, registry.contract.address, chunk_size=4, parallelism=2, mode=mode)
+
+    records = reader.fetch_grievances(["GRV-C", "GRV-A", "GRV-B", "GRV-A"])
+
+    assert sorted(records) == ["GRV-A", "GRV-B", "GRV-C"]
+    assert records["GRV-B"]["title"] == "Broken light"
+    assert records["GRV-C"]["blockchainStatus"] == "success"
+    assert records["GRV-A"]["submitter"] == registry.account
+    if mode == "multicall":
+        # Two ids per chunk of four calls: one aggregate3 call per chunk
+        assert web3.eth.calls.count(MULTICALL3_ADDRESS) == 2
+
+
+def test_auto_mode_prefers_multicall(chain):
+    registry, web3 = chain
+    reader = BulkGrievanceReader(web3, registry.contract.address)
+    assert reader.fetch_grievance("GRV-A")["title"] == "Pothole"
+    assert reader.mode == "multicall"
+    assert BulkGrievanceReader(registry.web3, registry.contract.address)._resolve_mode() in ("batch", "serial")
+
+
+@pytest.mark.parametrize("mode", ["multicall", "serial"])
+def test_unknown_ids_are_not_read_as_the_first_grievance(chain, mode):
+    registry, web3 = chain
+    reader = BulkGrievanceReader(web3, registry.contract.address, mode=mode)
+
+    # The registry answers an unknown id with index 0's grievance instead of reverting
+    assert registry.contract.functions.getGrievanceBasic("GRV-NONE").call()[0] == "Pothole"
+    assert sorted(reader.fetch_grievances(["GRV-NONE", "GRV-A", "GRV-B"])) == ["GRV-A", "GRV-B"]
+    assert reader.fetch_grievance("GRV-NONE") is None
+    assert reader.fetch_grievance("GRV-A")["title"] == "Pothole"
+
+
+def test_index_zero_is_read_from_storage_once(chain):
+    registry, web3 = chain
+    reader = BulkGrievanceReader(web3, registry.contract.address, mode="serial")
+    assert reader.fetch_first_tracking_id() == "GRV-A"
+    # The array length, then the id itself
+    assert web3.eth.calls.count("storage") == 2
+
+    web3.eth.calls.clear()
+    reader.fetch_grievances(["GRV-B"])
+    reader.fetch_grievances(["GRV-C"])
+    assert web3.eth.calls.count("storage") == 2
+
+
+def test_reads_a_long_first_tracking_id(registry):
+    tracking_id = "GRV-" + "X" * 60
+    registry.submit(tracking_id)
+    reader = BulkGrievanceReader(registry.web3, registry.contract.address, mode="serial")
+    assert reader.fetch_first_tracking_id() == tracking_id
+    assert list(reader.fetch_grievances([tracking_id])) == [tracking_id]
+
+
+def test_an_empty_registry_has_no_grievances(registry):
+    reader = BulkGrievanceReader(ChainWeb3(registry.web3), registry.contract.address, mode="serial")
+    assert reader.fetch_first_tracking_id() is None
+    assert reader.fetch_grievances(["GRV-A"]) == {}
+    # Not remembered: the first submission is found
+    registry.submit("GRV-A")
+    assert list(reader.fetch_grievances(["GRV-A"])) == ["GRV-A"]
@@ -0,0 +1,62 @@
+import json
+import os
+
+import pytest
+from eth_account import Account
+from eth_utils import function_abi_to_4byte_selector
+from web3 import Web3
+
+from contract_registry import TRANSACT_FUNCTIONS, ContractRegistry
+from grievances import grievance_args, new_grievance
+
+ABI_PATH = os.path.join(os.path.dirname(__file__), "..", "src", "abi", "GrievanceRegistry.json")
+ADDRESS = "0x" + "11" * 20
+JUSTIFICATION = json.dumps([{"label": "road pothole", "score": 0.9}, {"label": "flooding", "score": 0.1}])
+
+
+@pytest.fixture(scope="module")
+def contracts():
+    with open(ABI_PATH) as f:
+        abi = json.load(f)
+    return ContractRegistry(Web3(), ADDRESS, abi, Account.create().key)
+
+
+def grievance(tracking_id, **fields):
+    return dict(new_grievance(tracking_id, "Pothole ünïcode", "Deep " * 50, "Main St"), **fields)
+
+
+def test_selectors_match_web3(contracts):
+    for item in contracts.abi:
+        if item.get("type") == "function":
+            assert contracts.selectors[item["name"]] == function_abi_to_4byte_selector(item)
+    assert set(TRANSACT_FUNCTIONS) <= set(contracts._encoders)
+
+
+@pytest.mark.parametrize("function_name, args", [
+    ("submitGrievance", grievance_args(grievance("GRV-A", estimatedDays=3, aiJustification=JUSTIFICATION))),
+    ("submitGrievances", [[grievance_args(grievance(f"GRV-{i}")) for i in range(3)]]),
+    ("submitGrievances", [[]]),
+    ("markResolved", ["GRV-A"]),
+])
+def test_calldata_matches_web3_encoding(contracts, function_name, args):
+    expected = contracts.contract.get_function_by_name(function_name)(*args)._encode_transaction_data()
+    assert Web3.to_hex(contracts.encode(function_name, *args)) == expected
+
+
+def test_unprepared_functions_fall_back_to_web3(contracts):
+    expected = contracts.contract.functions.getGrievanceBasic("GRV-A")._encode_transaction_data()
+    assert Web3.to_hex(contracts.encode("getGrievanceBasic", "GRV-A")) == expected
+
+
+def test_transaction_fields(contracts):
+    contracts.chain_id = "43113"
+    tx = contracts.transaction("markResolved", "GRV-A", gas=50000, nonce=7)
+    assert tx == {
+        "from": contracts.account.address,
+        "to": Web3.to_checksum_address(ADDRESS),
+        "value": 0,
+        "data": contracts.encode("markResolved", "GRV-A"),
+        "chainId": 43113,
+        "gas": 50000,
+        "nonce": 7,
+    }
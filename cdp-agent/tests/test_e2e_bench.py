@@ -0,0 +1,74 @@
+import socket
+
+import pytest
+
+from e2e_bench import compare, percentiles
+
+
+def stats(p95, p99=None, count=100, req_per_sec=50.0):
+    return {"count": count, "p50Ms": p95 / 2, "p95Ms": p95, "p99Ms": p99 or p95, "reqPerSec": req_per_sec}
+
+
+def results(**routes):
+    return {"profiles": {"mixed": {"routes": routes, "stages": {}}}}
+
+
+def test_percentiles_in_milliseconds():
+    summary = percentiles([i / 1000 for i in range(1, 101)])
+    assert summary == {"count": 100, "p50Ms": 50.5, "p95Ms": 95.0, "p99Ms": 99.0}
+    assert percentiles([])["p95Ms"] is None
+
+
+def test_compare_flags_slower_tails_and_lower_throughput():
+    baseline = results(get_grievance=stats(100), submit_grievance=stats(100))
+    current = results(get_grievance=stats(130), submit_grievance=stats(100, req_per_sec=30.0))
+    assert compare(baseline, current, tolerance=0.2, min_delta_ms=5, min_samples=20) == [
+        ("mixed", "get_grievance", "p95Ms", 100, 130),
+        ("mixed", "get_grievance", "p99Ms", 100, 130),
+        ("mixed", "submit_grievance", "reqPerSec", 50.0, 30.0),
+    ]
+
+
+def test_compare_ignores_noise():
+    baseline = results(get_grievance=stats(2), mark_resolved=stats(100, count=5))
+    current = results(get_grievance=stats(4), mark_resolved=stats(400, count=5), get_all_grievances=stats(900))
+    # A 2 ms change, too few samples, and a route the baseline never ran
+    assert compare(baseline, current, tolerance=0.2, min_delta_ms=5, min_samples=20) == []
+    assert compare({"profiles": {}}, current, tolerance=0.2, min_delta_ms=5, min_samples=20) == []
+
+
+@pytest.fixture
+def local_chain():
+    pytest.importorskip("eth_tester")
+    from local_chain import start_chain
+
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        port = s.getsockname()[1]
+    chain = start_chain(port, backend="eth-tester")
+    yield chain
+    chain.stop()
+
+
+def test_eth_tester_chain_deploys_and_orders_nonce_gaps(local_chain):
+    from eth_account import Account
+    from web3 import Web3
+    from web3.exceptions import Web3RPCError
+
+    web3 = Web3(Web3.HTTPProvider(local_chain.url))
+    assert web3.eth.get_code(local_chain.contract_address)
+    account = Account.from_key(local_chain.private_key)
+    nonce = web3.eth.get_transaction_count(account.address)
+
+    def send(n):
+        tx = {"to": account.address, "value": 0, "gas": 21000, "gasPrice": web3.eth.gas_price, "nonce": n,
+              "chainId": web3.eth.chain_id}
+        return web3.eth.send_raw_transaction(account.sign_transaction(tx).raw_transaction)
+
+    # The later nonce waits until the gap before it is filled, as on a real node
+    send(nonce + 1)
+    assert web3.eth.get_transaction_count(account.address) == nonce
+    send(nonce)
+    assert web3.eth.get_transaction_count(account.address) == nonce + 2
+    with pytest.raises(Web3RPCError, match="nonce too low"):
+        send(nonce)
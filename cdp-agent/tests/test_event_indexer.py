@@ -0,0 +1,121 @@
+import pytest
+
+from contract_reader import BulkGrievanceReader
+from event_indexer import EventIndexer, indexer_start_block
+from grievance_store import GrievanceStore
+
+
+def make_indexer(registry, store, tmp_path, **kwargs):
+    return EventIndexer(
+        registry.web3,
+        registry.contract,
+        store,
+        checkpoint_path=str(tmp_path / "checkpoint.json"),
+        fetch=BulkGrievanceReader(registry.web3, registry.contract.address).fetch_grievances,
+        **kwargs,
+    )
+
+
+def test_indexes_grievances_submitted_by_other_clients(registry, tmp_path):
+    registry.submit("GRV-A", category="flooding")
+    registry.submit("GRV-B")
+    store = GrievanceStore()
+    indexer = make_indexer(registry, store, tmp_path, confirmations=0)
+
+    assert indexer.sync_once() == 2
+
+    record = store.get("GRV-A")
+    assert record["category"] == "flooding"
+    assert record["blockchainStatus"] == "success"
+    assert record["tx_hash"].startswith("0x")
+    assert "GRV-B" in store
+
+
+def test_confirms_own_submission_and_applies_resolution(registry, tmp_path):
+    store = GrievanceStore()
+    store.add({"trackingId": "GRV-A", "blockchainStatus": "pending", "blockchainError": "timeout", "resolved": False})
+    tx_hash = registry.submit("GRV-A")
+    indexer = make_indexer(registry, store, tmp_path, confirmations=0)
+    indexer.sync_once()
+
+    record = store.get("GRV-A")
+    assert record["blockchainStatus"] == "success"
+    assert record["tx_hash"] == tx_hash.to_0x_hex()
+    assert record["blockchainError"] is None
+
+    registry.resolve("GRV-A")
+    assert indexer.sync_once() == 1
+    assert store.get("GRV-A")["resolved"] is True
+    assert store.get("GRV-A")["status"] == "resolved"
+
+
+def test_resumes_from_checkpoint_and_waits_for_confirmations(registry, tmp_path):
+    store = GrievanceStore()
+    registry.submit("GRV-A")
+    registry.tester.mine_blocks(2)
+    make_indexer(registry, store, tmp_path, confirmations=2).sync_once()
+    assert "GRV-A" in store
+
+    # A new indexer on the same checkpoint only sees what came after it
+    registry.submit("GRV-B")
+    indexer = make_indexer(registry, store, tmp_path, confirmations=2)
+    assert indexer.sync_once() == 0
+    assert "GRV-B" not in store
+    registry.tester.mine_blocks(2)
+    assert indexer.sync_once() == 1
+    assert "GRV-B" in store
+
+
+def test_reindexes_after_a_reorg_past_the_checkpoint(registry, tmp_path, caplog):
+    store = GrievanceStore()
+    # The reader remembers grievance 0 to tell phantoms apart, so that one stays put
+    registry.submit("GRV-FIRST")
+    start = registry.web3.eth.block_number + 1
+    snapshot = registry.tester.take_snapshot()
+    registry.submit("GRV-X")
+    registry.tester.mine_blocks(2)
+    indexer = make_indexer(registry, store, tmp_path, start_block=start, confirmations=2)
+    indexer.sync_once()
+    assert "GRV-X" in store
+
+    # The checkpointed block is replaced by one carrying a different submission
+    registry.tester.revert_to_snapshot(snapshot)
+    registry.submit("GRV-Y")
+    registry.tester.mine_blocks(2)
+    assert indexer.sync_once() == 1
+    assert "GRV-Y" in store
+    assert "Reorg detected" in caplog.text
+
+
+def test_shrinks_the_block_range_when_the_provider_refuses_it(registry, tmp_path):
+    registry.submit("GRV-A")
+    store = GrievanceStore()
+    indexer = make_indexer(registry, store, tmp_path, confirmations=0, min_chunk=1, max_chunk=64)
+    get_logs = registry.web3.eth.get_logs
+    ranges = []
+
+    def limited_get_logs(params):
+        ranges.append(params["toBlock"] - params["fromBlock"] + 1)
+        if ranges[-1] > 1:
+            raise ValueError("block range is too large")
+        return get_logs(params)
+
+    registry.web3.eth.get_logs = limited_get_logs
+    try:
+        assert indexer.sync_once() == 1
+    finally:
+        registry.web3.eth.get_logs = get_logs
+    assert "GRV-A" in store
+    assert ranges[0] > 1 and ranges[-1] == 1
+
+
+@pytest.mark.parametrize("value", [None, "", "latest", "-1"])
+def test_start_block_must_be_set(monkeypatch, value):
+    if value is None:
+        monkeypatch.delenv("INDEXER_START_BLOCK", raising=False)
+    else:
+        monkeypatch.setenv("INDEXER_START_BLOCK", value)
+    with pytest.raises(ValueError, match="INDEXER_START_BLOCK"):
+        indexer_start_block()
+    monkeypatch.setenv("INDEXER_START_BLOCK", " 1234 ")
+    assert indexer_start_block() == 1234
@@ -0,0 +1,200 @@
+from concurrent.futures import Future
+from types import SimpleNamespace
+
+import pytest
+
+from fee_oracle import DEFAULT_PRIORITY_FEE, FeeOracle, GasEstimateCache, gas_call, is_out_of_gas
+from signer import TransactionSender
+
+GWEI = 10 ** 9
+SUBMIT = "0x" + "aa" * 4
+
+
+class FakeEth:
+    """The parts of ``web3.eth`` the fee oracle and gas cache use, answering from fields the test sets."""
+
+    def __init__(self, base_fee=30 * GWEI, priority_fee=2 * GWEI, gas_price=25 * GWEI, gas=100_000):
+        self.base_fee = base_fee
+        self.priority_fee = priority_fee
+        self.gas_price = gas_price
+        self.gas = gas
+        self.block_number = 100
+        self.block_reads = 0
+        self.estimates = []
+
+    def get_block(self, block):
+        self.block_reads += 1
+        block = {"number": self.block_number}
+        if self.base_fee is not None:
+            block["baseFeePerGas"] = self.base_fee
+        return block
+
+    @property
+    def max_priority_fee(self):
+        if self.priority_fee is None:
+            raise ValueError("the method eth_maxPriorityFeePerGas does not exist")
+        return self.priority_fee
+
+    def estimate_gas(self, tx):
+        self.estimates.append(tx)
+        return self.gas
+
+
+def oracle(eth, **kwargs):
+    # The polling thread sleeps through the test; refreshes come from fees() alone
+    return FeeOracle(SimpleNamespace(eth=eth), poll_interval=3600, **kwargs)
+
+
+def calldata(size):
+    return SUBMIT + "00" * (size - 4)
+
+
+def test_type_2_fees_from_the_base_fee_and_tip():
+    fees = oracle(FakeEth()).fees(1.5)
+    assert fees == {"type": 2, "maxPriorityFeePerGas": 3 * GWEI, "maxFeePerGas": 2 * 30 * GWEI + 3 * GWEI}
+
+
+def test_default_tip_without_eth_max_priority_fee():
+    fees = oracle(FakeEth(priority_fee=None)).fees()
+    assert fees["maxPriorityFeePerGas"] == DEFAULT_PRIORITY_FEE
+    assert fees["maxFeePerGas"] == 60 * GWEI + DEFAULT_PRIORITY_FEE
+
+
+def test_legacy_gas_price_without_a_base_fee():
+    assert oracle(FakeEth(base_fee=None)).fees(1.2) == {"gasPrice": 30 * GWEI}
+
+
+def test_fees_are_served_from_the_cache_until_the_ttl():
+    eth = FakeEth()
+    fees = oracle(eth, ttl=60)
+    fees.fees()
+    eth.base_fee = 40 * GWEI
+    assert fees.fees()["maxFeePerGas"] == 62 * GWEI
+    assert eth.block_reads == 1
+
+    fees._updated -= 61
+    assert fees.fees()["maxFeePerGas"] == 82 * GWEI
+    assert eth.block_reads == 2
+
+
+def test_gas_estimates_are_reused_per_selector_and_size_bucket():
+    eth = FakeEth(gas=100_000)
+    cache = GasEstimateCache(SimpleNamespace(eth=eth), buffer=1.2)
+    tx = {"data": calldata(100), "nonce": 3, "gas": 1}
+
+    assert cache.estimate(tx) == (120_000, False)
+    assert eth.estimates == [{"data": calldata(100)}]
+    # Same function, calldata within the same 32-byte bucket
+    assert cache.estimate({"data": calldata(110)}) == (120_000, True)
+    assert len(eth.estimates) == 1
+    # A longer call is estimated on its own
+    eth.gas = 150_000
+    assert cache.estimate({"data": calldata(200)}) == (180_000, False)
+    # The largest estimate seen for a bucket is kept
+    cache.record({"data": calldata(100)}, 90_000)
+    assert cache.cached({"data": calldata(100)}) == 120_000
+
+
+def test_invalidated_estimates_are_taken_live_again():
+    eth = FakeEth(gas=100_000)
+    cache = GasEstimateCache(SimpleNamespace(eth=eth))
+    tx = {"data": calldata(100)}
+    cache.estimate(tx)
+    cache.invalidate(tx)
+    eth.gas = 130_000
+    assert cache.estimate(tx) == (156_000, False)
+    assert len(eth.estimates) == 2
+
+
+def test_out_of_gas_detection():
+    assert is_out_of_gas(error=ValueError("intrinsic gas too low"))
+    assert not is_out_of_gas(error=ValueError("nonce too low"))
+    assert is_out_of_gas(receipt={"status": 0, "gasUsed": 50_000}, gas_limit=50_000)
+    assert not is_out_of_gas(receipt={"status": 0, "gasUsed": 30_000}, gas_limit=50_000)
+    assert not is_out_of_gas(receipt={"status": 1, "gasUsed": 50_000}, gas_limit=50_000)
+    assert gas_call({"to": "0x1", "nonce": 1, "gas": 2}) == {"to": "0x1"}
+
+
+class FakeNonces:
+    """Signs nothing: hands out nonces and records the gas limit of each send, failing with queued errors."""
+
+    def __init__(self):
+        self.sent = []
+        self.errors = []
+        self.confirmed = []
+
+    def sign_and_send(self, account, tx):
+        if self.errors:
+            raise self.errors.pop(0)
+        self.sent.append(tx["gas"])
+        return bytes([len(self.sent)]), len(self.sent) - 1
+
+    def confirm(self, nonce):
+        self.confirmed.append(nonce)
+
+
+class FakeReceipts:
+    def __init__(self):
+        self.receipts = []
+
+    def wait(self, tx_hash):
+        return self.receipts.pop(0)
+
+    def watch(self, tx_hash):
+        future = Future()
+        future.set_result(self.receipts.pop(0))
+        return future
+
+
+@pytest.fixture
+def sender():
+    eth = FakeEth(gas=100_000)
+    cache = GasEstimateCache(SimpleNamespace(eth=eth), buffer=1.0)
+    # Learnt earlier from a shorter call in the same bucket; too low for this one
+    cache.record({"data": calldata(100)}, 60_000)
+    sender = TransactionSender(SimpleNamespace(address="0x1"), FakeNonces(), cache, FakeReceipts())
+    return sender, eth
+
+
+def test_send_retries_a_cached_gas_limit_with_a_live_estimate(sender):
+    sender, eth = sender
+    sender.nonces.errors.append(ValueError("intrinsic gas too low"))
+    sender.receipts.receipts.append({"status": 1, "gasUsed": 90_000})
+
+    tx = {"data": calldata(100)}
+    assert sender.send(tx) == b"\x01"
+    assert sender.nonces.sent == [100_000]
+    assert tx["gas"] == 100_000
+    assert len(eth.estimates) == 1
+    assert sender.nonces.confirmed == [0]
+    # The live estimate replaced the cached one
+    assert sender.gas_estimates.cached(tx) == 100_000
+
+
+def test_send_does_not_retry_a_live_estimate(sender):
+    sender, eth = sender
+    sender.gas_estimates.invalidate({"data": calldata(100)})
+    sender.nonces.errors.append(ValueError("gas required exceeds allowance"))
+    with pytest.raises(ValueError, match="gas required exceeds"):
+        sender.send({"data": calldata(100)})
+    assert len(eth.estimates) == 1
+
+
+def test_send_and_wait_resends_after_running_out_of_gas_on_chain(sender):
+    sender, eth = sender
+    sender.receipts.receipts += [{"status": 0, "gasUsed": 60_000}, {"status": 1, "gasUsed": 95_000}]
+
+    tx_hash, receipt = sender.send_and_wait({"data": calldata(100)})
+
+    assert sender.nonces.sent == [60_000, 100_000]
+    assert (tx_hash, receipt["status"]) == (b"\x02", 1)
+    assert sender.nonces.confirmed == [0, 1]
+
+
+def test_send_and_wait_keeps_a_revert_that_was_not_out_of_gas(sender):
+    sender, eth = sender
+    sender.receipts.receipts.append({"status": 0, "gasUsed": 30_000})
+    tx_hash, receipt = sender.send_and_wait({"data": calldata(100)})
+    assert receipt["status"] == 0
+    assert sender.nonces.sent == [60_000]
+    assert eth.estimates == []
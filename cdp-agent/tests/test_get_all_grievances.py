@@ -0,0 +1,77 @@
+import json
+
+import pytest
+
+from grievance_store import GrievanceStore
+from grievances import new_grievance
+
+
+@pytest.fixture(params=["flask", "asgi"])
+def client(request, app_env, monkeypatch):
+    """A test client of either app, listing a store of five grievances (GRV-1 and GRV-3 are high priority)."""
+    store = GrievanceStore()
+    for i in range(5):
+        store.add(dict(new_grievance(f"GRV-{i}", "t", "d", "l"), priorityLevel="high" if i % 2 else "medium"))
+    if request.param == "flask":
+        import app
+
+        monkeypatch.setattr(app, "GRIEVANCE_STORE", store)
+        return app.app.test_client()
+    from starlette.testclient import TestClient
+
+    import asgi_app
+
+    monkeypatch.setattr(asgi_app, "GRIEVANCE_STORE", store)
+    return TestClient(asgi_app.app)
+
+
+def page(client, query, **headers):
+    response = client.get(f"/get_all_grievances?{query}", headers=headers)
+    assert response.status_code == 200
+    return json.loads(response.text)
+
+
+def test_cursor_pages_cover_every_grievance_once(client):
+    seen, query = [], "limit=2"
+    while True:
+        body = page(client, query)
+        seen += [record["trackingId"] for record in body["data"]]
+        if body["nextCursor"] is None:
+            break
+        query = f"limit=2&cursor={body['nextCursor']}"
+    assert seen == [f"GRV-{i}" for i in range(5)]
+
+    body = page(client, "priority=high&limit=1")
+    assert [r["trackingId"] for r in body["data"]] == ["GRV-1"]
+    assert [r["trackingId"] for r in page(client, f"priority=high&cursor={body['nextCursor']}")["data"]] == ["GRV-3"]
+    assert client.get("/get_all_grievances?limit=many").status_code == 400
+
+
+def test_projection(client):
+    record = page(client, "limit=1&fields=trackingId,category")["data"][0]
+    assert record == {"trackingId": "GRV-0", "category": "unclassified"}
+    assert "aiJustification" not in page(client, "limit=1&exclude=aiJustification")["data"][0]
+
+
+def test_an_unchanged_page_answers_304(client):
+    etag = client.get("/get_all_grievances?limit=2").headers["ETag"]
+
+    assert client.get("/get_all_grievances?limit=2", headers={"If-None-Match": etag}).status_code == 304
+    assert client.get(
+        "/get_all_grievances?limit=2", headers={"If-None-Match": f'"other", W/{etag}'}
+    ).status_code == 304
+    assert client.get("/get_all_grievances?limit=2", headers={"If-None-Match": "*"}).status_code == 304
+    # A tag that merely contains this one (or is contained in it) is a different tag
+    for other in (f'"x{etag[1:]}', f'{etag[:-2]}"', f'"{etag}"'):
+        assert client.get("/get_all_grievances?limit=2", headers={"If-None-Match": other}).status_code == 200
+    # Another page has another tag
+    assert client.get("/get_all_grievances?limit=3", headers={"If-None-Match": etag}).status_code == 200
+
+
+def test_ndjson_streams_one_record_per_line(client):
+    response = client.get("/get_all_grievances?format=ndjson&fields=trackingId")
+    assert response.headers["Content-Type"].startswith("application/x-ndjson")
+    assert [json.loads(line) for line in response.text.splitlines()] == [{"trackingId": f"GRV-{i}"} for i in range(5)]
+
+    response = client.get("/get_all_grievances?limit=2&fields=trackingId", headers={"Accept": "application/x-ndjson"})
+    assert response.text == '{"trackingId": "GRV-0"}\n{"trackingId": "GRV-1"}\n'
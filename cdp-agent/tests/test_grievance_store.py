@@ -0,0 +1,75 @@
+import pytest
+
+from grievance_store import INDEXED_FIELDS, GrievanceStore
+from grievances import new_grievance
+
+
+def grievance(tracking_id, **fields):
+    return dict(new_grievance(tracking_id, "t", "d", "l"), **fields)
+
+
+def ids(records):
+    return [record["trackingId"] for record in records]
+
+
+def assert_indexes_match_records(store):
+    """Every index holds exactly the ids whose record has that value, and no empty sets."""
+    for field in INDEXED_FIELDS:
+        expected = {}
+        for record in store.all():
+            expected.setdefault(record.get(field), set()).add(record["trackingId"])
+        assert dict(store._indexes[field]) == expected, field
+
+
+@pytest.fixture
+def store():
+    store = GrievanceStore()
+    store.add(grievance("GRV-A", category="pothole", priorityLevel="high"))
+    store.add(grievance("GRV-B", category="pothole"))
+    store.add(grievance("GRV-C", category="garbage", priorityLevel="low"))
+    return store
+
+
+def test_update_moves_a_record_between_index_values(store):
+    store.update("GRV-A", category="garbage", blockchainStatus="success")
+    store.update("GRV-C", resolved=True)
+
+    assert ids(store.find(category="pothole")) == ["GRV-B"]
+    assert ids(store.find(category="garbage")) == ["GRV-A", "GRV-C"]
+    assert ids(store.find(blockchainStatus="pending")) == ["GRV-B", "GRV-C"]
+    assert ids(store.find(category="garbage", resolved=False)) == ["GRV-A"]
+    assert_indexes_match_records(store)
+
+
+def test_re_adding_a_record_replaces_its_index_entries(store):
+    store.add(grievance("GRV-B", category="flooding", priorityLevel="low"))
+
+    assert ids(store.find(category="pothole")) == ["GRV-A"]
+    assert ids(store.find(priorityLevel="low")) == ["GRV-B", "GRV-C"]
+    # Re-adding keeps the record's place in submission order
+    assert ids(store.find()) == ["GRV-A", "GRV-B", "GRV-C"]
+    assert [cursor for cursor, _ in store.scan(priorityLevel="low")] == [1, 2]
+    assert len(store) == 3
+    assert_indexes_match_records(store)
+
+
+def test_emptied_values_leave_the_index(store):
+    store.update("GRV-C", category="pothole")
+    assert "garbage" not in store._indexes["category"]
+    assert store.find(category="garbage") == []
+    assert_indexes_match_records(store)
+
+
+def test_unindexed_updates_keep_the_indexes(store):
+    store.update("GRV-A", title="Deep pothole", tx_hash="0xabc")
+    assert ids(store.find(category="pothole", tx_hash="0xabc")) == ["GRV-A"]
+    assert store.update("GRV-NONE", category="pothole") is None
+    assert_indexes_match_records(store)
+
+
+def test_scan_filters_by_updated_index_values(store):
+    store.update("GRV-B", priorityLevel="high")
+    assert [(cursor, record["trackingId"]) for cursor, record in store.scan(after=0, priorityLevel="high")] == [
+        (1, "GRV-B")
+    ]
+    assert ids(record for _, record in store.scan(priorityLevel="medium")) == []
@@ -0,0 +1,59 @@
+import json
+
+import pytest
+
+from grievances import (
+    JUSTIFICATION_LABELS,
+    JUSTIFICATION_VERSION,
+    decode_justification,
+    encode_justification,
+    readable_justification,
+)
+
+RESULTS = [
+    {"label": "water leak", "score": 0.171},
+    {"label": "flooding", "score": 0.5624},
+    {"label": "fallen tree", "score": 0.161},
+    {"label": "road pothole", "score": 0.05},
+]
+
+
+def test_encodes_the_top_labels_as_indices_and_thousandths():
+    labels = JUSTIFICATION_LABELS[JUSTIFICATION_VERSION]
+    encoded = encode_justification(RESULTS)
+    assert encoded == (
+        f"{JUSTIFICATION_VERSION};{labels.index('flooding')}:562,"
+        f"{labels.index('water leak')}:171,{labels.index('fallen tree')}:161"
+    )
+
+
+def test_round_trips_to_the_top_labels_by_score():
+    assert decode_justification(encode_justification(RESULTS)) == [
+        {"label": "flooding", "score": 0.562},
+        {"label": "water leak", "score": 0.171},
+        {"label": "fallen tree", "score": 0.161},
+    ]
+
+
+def test_keeps_json_for_labels_outside_the_table():
+    results = [{"label": "abandoned car", "score": 0.9}]
+    assert encode_justification(results) == json.dumps(results)
+    assert decode_justification(encode_justification(results)) == results
+
+
+def test_decodes_the_older_json_form_and_empty_text():
+    assert decode_justification(json.dumps(RESULTS)) == RESULTS
+    assert decode_justification("") == []
+    assert encode_justification([]) == f"{JUSTIFICATION_VERSION};"
+    assert decode_justification(f"{JUSTIFICATION_VERSION};") == []
+
+
+@pytest.mark.parametrize("text", ["Looks like a pothole", "99;1:500", "1:500"])
+def test_rejects_unknown_encodings(text):
+    with pytest.raises(ValueError):
+        decode_justification(text)
+    assert readable_justification(text) == text
+
+
+def test_readable_justification_serves_json():
+    assert json.loads(readable_justification(encode_justification(RESULTS)))[0]["label"] == "flooding"
@@ -0,0 +1,111 @@
+import asyncio
+import os
+import time
+
+import pytest
+import requests
+
+from classifier import ClassifierError, RemoteClipClassifier
+from fake_inference_server import serve
+from grievances import unclassified
+from http_client import AsyncResilientClient, CircuitBreaker, CircuitOpenError, ResilientClient
+from reclassify_queue import ReclassifyQueue
+
+LABELS = ["pothole", "garbage"]
+
+
+@pytest.fixture
+def inference():
+    """Start a fake inference server with the given behaviour; returns its URL and request counter."""
+    servers = []
+
+    def start(**config):
+        server = serve(port=0, latency=0, **config)
+        servers.append(server)
+        url = f"http://127.0.0.1:{server.server_address[1]}/"
+        return url, lambda: server.RequestHandlerClass.requests_served
+
+    yield start
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+
+def client(**kwargs):
+    kwargs.setdefault("backoff", 0.01)
+    return ResilientClient(connect_timeout=1, read_timeout=2, **kwargs)
+
+
+def test_retries_unavailable_answers_then_gives_up(inference):
+    url, served = inference(fail_rate=1.0, fail_status=503)
+    http = client(retries=2, breaker=CircuitBreaker(failure_threshold=10))
+    assert http.post(url, json={}).status_code == 503
+    assert served() == 3
+    assert http.breaker.state == "closed"
+
+
+def test_does_not_retry_client_errors(inference):
+    url, served = inference(fail_rate=1.0, fail_status=400)
+    assert client(retries=2).post(url, json={}).status_code == 400
+    assert served() == 1
+
+
+def test_breaker_fails_fast_while_open_and_probes_after_the_reset(inference):
+    url, served = inference(down_after=0, down_for=0.5)
+    http = client(retries=0, breaker=CircuitBreaker(failure_threshold=2, reset_timeout=0.6))
+    for _ in range(2):
+        assert http.post(url, json={}).status_code == 503
+    assert http.breaker.state == "open"
+    with pytest.raises(CircuitOpenError):
+        http.post(url, json={})
+    assert served() == 2
+
+    time.sleep(0.6)
+    assert http.breaker.state == "half-open"
+    classifier = RemoteClipClassifier("key", url=url, client=http)
+    assert classifier.classify(b"image", LABELS)[0]["label"] in LABELS
+    assert http.breaker.state == "closed"
+
+
+def test_a_hung_service_times_out_as_unavailable(inference):
+    url, _ = inference(hang=True)
+    http = ResilientClient(connect_timeout=1, read_timeout=0.2, retries=0)
+    with pytest.raises(requests.Timeout):
+        http.post(url, json={})
+    with pytest.raises(ClassifierError) as error:
+        RemoteClipClassifier("key", url=url, client=http).classify(b"image", LABELS)
+    assert error.value.unavailable
+
+
+def test_async_client_shares_the_breaker_semantics(inference):
+    url, served = inference(fail_rate=1.0, fail_status=429)
+
+    async def run():
+        http = AsyncResilientClient(retries=1, backoff=0.01, breaker=CircuitBreaker(failure_threshold=1))
+        try:
+            assert (await http.post(url, json={})).status_code == 429
+            with pytest.raises(CircuitOpenError):
+                await http.post(url, json={})
+        finally:
+            await http.aclose()
+
+    asyncio.run(run())
+    assert served() == 2
+
+
+def test_reclassify_queue_waits_out_the_outage(tmp_path):
+    applied = []
+    results = iter([unclassified("down", retry=True), {"category": "pothole"}, {"category": "garbage"}])
+    queue = ReclassifyQueue(
+        str(tmp_path), lambda image: next(results), lambda *args: applied.append(args), interval=3600
+    )
+    queue.add("GRV-A", b"a")
+    queue.add("GRV-B", b"b")
+    os.utime(tmp_path / "GRV-A.jpg", (1, 1))
+
+    # The service is still down: the pass stops at the oldest entry and keeps both
+    assert queue.run_once() == 0
+    assert queue.pending() == ["GRV-A", "GRV-B"]
+    assert queue.run_once() == 2
+    assert applied == [("GRV-A", {"category": "pothole"}), ("GRV-B", {"category": "garbage"})]
+    assert queue.pending() == []
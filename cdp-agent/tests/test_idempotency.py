@@ -0,0 +1,95 @@
+import io
+import threading
+import time
+
+import pytest
+
+from idempotency import IdempotencyTable, request_fingerprint, submission_keys
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def table(request, tmp_path):
+    table = IdempotencyTable(path=str(tmp_path / "keys.db") if request.param == "sqlite" else None)
+    yield table
+    table.close()
+
+
+def test_first_claim_wins_and_later_ones_get_its_tracking_id(table):
+    keys = [("key:abc", 60)]
+    assert table.claim(keys, "GRV-1", "fp") is None
+    assert table.claim(keys, "GRV-2", "fp") == ("key:abc", "GRV-1", "fp")
+
+
+def test_any_taken_key_answers_and_nothing_new_is_recorded(table):
+    table.claim([("content:fp", 60)], "GRV-1", "fp")
+    assert table.claim([("key:new", 60), ("content:fp", 60)], "GRV-2", "fp") == ("content:fp", "GRV-1", "fp")
+    assert table.claim([("key:new", 60)], "GRV-3", "fp") is None
+
+
+def test_release_frees_only_keys_still_held_by_that_request(table):
+    keys = [("key:abc", 60)]
+    table.claim(keys, "GRV-1", "fp")
+    table.release(keys, "GRV-OTHER")
+    assert table.claim(keys, "GRV-2", "fp")[1] == "GRV-1"
+    table.release(keys, "GRV-1")
+    assert table.claim(keys, "GRV-2", "fp") is None
+
+
+def test_keys_expire_after_their_own_ttl(table):
+    table.claim([("key:short", 0.05), ("key:long", 60)], "GRV-1", "fp")
+    time.sleep(0.1)
+    assert table.claim([("key:short", 60)], "GRV-2", "fp") is None
+    assert table.claim([("key:long", 60)], "GRV-3", "fp")[1] == "GRV-1"
+
+
+def test_concurrent_claims_of_one_key_have_a_single_winner(table):
+    results = []
+    barrier = threading.Barrier(8)
+
+    def claim(i):
+        barrier.wait()
+        results.append(table.claim([("key:race", 60)], f"GRV-{i}", "fp"))
+
+    threads = [threading.Thread(target=claim, args=(i,)) for i in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    winners = [r for r in results if r is None]
+    assert len(winners) == 1
+    assert len({r[1] for r in results if r is not None}) == 1
+
+
+def test_memory_table_is_bounded():
+    table = IdempotencyTable(max_entries=3)
+    for i in range(10):
+        table.claim([(f"key:{i}", 60)], f"GRV-{i}", "fp")
+    assert len(table) == 3
+    assert table.claim([("key:9", 60)], "GRV-X", "fp")[1] == "GRV-9"
+
+
+def test_sqlite_table_is_shared_between_processes_by_file(tmp_path):
+    path = str(tmp_path / "keys.db")
+    first, second = IdempotencyTable(path=path), IdempotencyTable(path=path)
+    try:
+        first.claim([("key:abc", 60)], "GRV-1", "fp")
+        assert second.claim([("key:abc", 60)], "GRV-2", "fp")[1] == "GRV-1"
+    finally:
+        first.close()
+        second.close()
+
+
+def test_fingerprint_covers_the_image_title_and_location_and_keeps_the_position():
+    upload = io.BytesIO(b"image bytes")
+    fingerprint = request_fingerprint(upload, "Pothole", "Main St")
+    assert upload.tell() == 0
+    assert fingerprint == request_fingerprint(io.BytesIO(b"image bytes"), "Pothole", "Main St")
+    assert fingerprint != request_fingerprint(io.BytesIO(b"image bytes"), "Pothole", "Side St")
+    assert fingerprint != request_fingerprint(io.BytesIO(b"other bytes"), "Pothole", "Main St")
+
+
+def test_submission_keys():
+    assert submission_keys("abc", "fp", 3600, 0) == [("key:abc", 3600)]
+    assert submission_keys("", "fp", 3600, 60) == [("content:fp", 60)]
+    assert submission_keys("abc", "fp", 3600, 60) == [("key:abc", 3600), ("content:fp", 60)]
+    assert submission_keys("", "fp", 3600, 0) == []
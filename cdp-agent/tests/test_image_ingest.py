@@ -0,0 +1,98 @@
+import io
+
+import pytest
+from PIL import Image
+
+from image_ingest import CHUNK_SIZE, MODEL_INPUT_SIZE, ImageRejected, open_upload, prepare_image
+
+
+class Stream:
+    """A non-seekable upload body, like a chunked request stream; counts the bytes read."""
+
+    def __init__(self, data):
+        self._data = io.BytesIO(data)
+        self.read_bytes = 0
+
+    def read(self, n=-1):
+        chunk = self._data.read(n)
+        self.read_bytes += len(chunk)
+        return chunk
+
+
+def jpeg(size, orientation=None):
+    """A JPEG whose left half is red and right half is blue, optionally tagged with an EXIF orientation."""
+    img = Image.new("RGB", size, "blue")
+    img.paste("red", (0, 0, size[0] // 2, size[1]))
+    out = io.BytesIO()
+    exif = img.getexif()
+    if orientation is not None:
+        exif[0x0112] = orientation
+    img.save(out, format="JPEG", exif=exif.tobytes())
+    return out.getvalue()
+
+
+def decode(data):
+    img = Image.open(io.BytesIO(data))
+    assert img.format == "JPEG" and img.mode == "RGB"
+    return img
+
+
+def test_a_stream_is_rejected_once_it_passes_the_limit():
+    stream = Stream(b"\0" * (10 * CHUNK_SIZE))
+    with pytest.raises(ImageRejected) as rejected:
+        open_upload(stream, max_bytes=CHUNK_SIZE + 1)
+    assert rejected.value.status_code == 413
+    # Reading stopped at the chunk that crossed the limit
+    assert stream.read_bytes == 2 * CHUNK_SIZE
+
+
+def test_a_stream_within_the_limit_is_buffered():
+    data = jpeg((64, 48))
+    upload = open_upload(Stream(data), max_bytes=len(data))
+    assert upload.read() == data
+
+
+def test_a_seekable_upload_is_measured_without_reading_it():
+    upload = io.BytesIO(b"xx" + b"\0" * 100)
+    upload.seek(2)
+    assert open_upload(upload, max_bytes=100) is upload
+    assert upload.tell() == 2
+    with pytest.raises(ImageRejected) as rejected:
+        open_upload(upload, max_bytes=99)
+    assert rejected.value.status_code == 413
+
+
+@pytest.mark.parametrize("data", [b"", b"not an image", jpeg((64, 48))[:100]])
+def test_non_images_are_rejected(data):
+    with pytest.raises(ImageRejected) as rejected:
+        prepare_image(data)
+    assert rejected.value.status_code == 400
+
+
+@pytest.mark.parametrize("size, expected", [
+    ((1600, 1200), (299, MODEL_INPUT_SIZE)),
+    ((900, 2400), (MODEL_INPUT_SIZE, 597)),
+    # Smaller images are not enlarged
+    ((120, 80), (120, 80)),
+])
+def test_the_short_side_is_shrunk_to_the_model_input(size, expected):
+    assert decode(prepare_image(jpeg(size))).size == expected
+
+
+def test_png_uploads_become_jpegs():
+    out = io.BytesIO()
+    Image.new("RGBA", (400, 300), (0, 255, 0, 128)).save(out, format="PNG")
+    assert decode(prepare_image(memoryview(out.getvalue()))).size == (299, MODEL_INPUT_SIZE)
+
+
+def test_exif_orientation_is_applied():
+    # Orientation 6: stored sideways, displayed after a quarter turn clockwise
+    img = decode(prepare_image(jpeg((800, 400), orientation=6)))
+    assert img.size == (MODEL_INPUT_SIZE, 448)
+    # The stored left (red) half ends up on top
+    top, bottom = img.getpixel((112, 50)), img.getpixel((112, 400))
+    assert top[0] > 200 > top[2]
+    assert bottom[2] > 200 > bottom[0]
+
+    unrotated = decode(prepare_image(jpeg((800, 400), orientation=1)))
+    assert unrotated.size == (448, MODEL_INPUT_SIZE)
@@ -0,0 +1,106 @@
+import os
+import subprocess
+import sys
+import threading
+import time
+
+import pytest
+
+from bulk_import import ImportJobs
+from grievance_service import INTERRUPTED_CHAIN, INTERRUPTED_QUEUE, GrievanceService
+from grievance_store import GrievanceStore
+from grievances import new_grievance
+from idempotency import IdempotencyTable
+from jobs import JobQueue, JobSpool
+
+
+def exited_pid():
+    """The pid of a process that has already exited."""
+    return int(subprocess.run([sys.executable, "-c", "import os; print(os.getpid())"],
+                              capture_output=True, text=True, check=True).stdout)
+
+
+def test_queue_runs_every_job_and_survives_a_failing_one():
+    done, finished = [], threading.Event()
+
+    def handler(job):
+        if job == "bad":
+            raise ValueError("bad job")
+        done.append(job)
+        if len(done) == 3:
+            finished.set()
+
+    jobs = JobQueue("test", handler, workers=1)
+    try:
+        for job in ("a", "bad", "b", "c"):
+            jobs.submit(job)
+        assert finished.wait(5)
+    finally:
+        jobs.stop()
+    assert done == ["a", "b", "c"]
+    assert jobs.pending() == 0
+
+
+def test_queue_starts_no_threads_until_the_first_job():
+    jobs = JobQueue("test", lambda job: None)
+    assert jobs._threads == []
+    jobs.submit("a")
+    assert len(jobs._threads) == 2
+    jobs.stop()
+
+
+@pytest.fixture
+def spool(tmp_path):
+    return JobSpool(str(tmp_path / "spool"))
+
+
+def test_spool_keeps_the_image_until_the_chain_stage(spool):
+    spool.add("GRV-A", b"image")
+    assert spool.entries() == [("GRV-A", os.getpid(), "queued")]
+    spool.advance("GRV-A")
+    assert spool.entries() == [("GRV-A", os.getpid(), "chain")]
+    spool.remove("GRV-A")
+    assert spool.entries() == []
+
+
+def test_orphans_are_jobs_of_exited_processes(spool, tmp_path):
+    dead, alive = exited_pid(), os.getppid()
+    for tracking_id, pid in (("GRV-DEAD", dead), ("GRV-LIVE", alive)):
+        (tmp_path / "spool" / f"{tracking_id}.{pid}.queued").write_bytes(b"image")
+
+    assert spool.orphans() == [("GRV-DEAD", dead, "queued")]
+    assert spool.claim("GRV-DEAD", dead, "queued") == b"image"
+    assert sorted(spool.entries()) == [("GRV-DEAD", os.getpid(), "queued"), ("GRV-LIVE", alive, "queued")]
+    # Another process got there first
+    assert spool.claim("GRV-DEAD", dead, "queued") is None
+
+
+def service(store):
+    return GrievanceService(store, IdempotencyTable(max_entries=10), ImportJobs(path=":memory:"),
+                            max_upload_bytes=1024, key_ttl=60, dedup_window=0, max_import_items=10)
+
+
+def test_resume_requeues_unsent_jobs_and_fails_possibly_sent_ones(spool):
+    store = GrievanceStore()
+    for tracking_id in ("GRV-QUEUED", "GRV-SENDING", "GRV-DONE", "GRV-LOST", "GRV-NEW"):
+        store.add(new_grievance(tracking_id, "Pothole", "Deep pothole", "Main St"))
+    store.update("GRV-DONE", blockchainStatus="success")
+    store.update("GRV-LOST", createdAt=int(time.time()) - 3600)
+    spool.add("GRV-QUEUED", b"queued image")
+    spool.add("GRV-SENDING", b"sending image")
+    spool.advance("GRV-SENDING")
+    spool.add("GRV-DONE", b"done image")
+    started = []
+
+    resumed, failed = service(store).resume_interrupted(spool, lambda *job: started.append(job), grace=60)
+
+    assert (resumed, failed) == (1, 2)
+    assert started == [("GRV-QUEUED", b"queued image")]
+    # The resumed job stays spooled until its outcome is recorded
+    assert spool.tracked() == {"GRV-QUEUED"}
+    assert store.get("GRV-SENDING")["blockchainStatus"] == "failed"
+    assert store.get("GRV-SENDING")["blockchainError"] == INTERRUPTED_CHAIN
+    assert store.get("GRV-LOST")["blockchainError"] == INTERRUPTED_QUEUE
+    assert store.get("GRV-DONE")["blockchainStatus"] == "success"
+    # Too recent to tell from a job another worker is still queueing
+    assert store.get("GRV-NEW")["blockchainStatus"] == "pending"
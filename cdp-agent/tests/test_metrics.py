@@ -0,0 +1,124 @@
+import io
+import urllib.error
+import urllib.request
+
+import pytest
+from PIL import Image
+
+from metrics import (
+    CONTENT_TYPE,
+    RPC_ERRORS,
+    RPC_SECONDS,
+    STAGE_SECONDS,
+    Counter,
+    Gauge,
+    Histogram,
+    instrument_web3,
+    render,
+    serve,
+)
+
+
+def test_counters_and_gauges_keep_a_value_per_label_set():
+    counter = Counter("test_requests_total", "Requests.", ["route"])
+    counter.inc(route="/a")
+    counter.inc(2, route="/a")
+    assert (counter.value(route="/a"), counter.value(route="/b")) == (3, 0)
+
+    gauge = Gauge("test_depth", "Depth.", ["lane"])
+    gauge.set(5, lane="submit")
+    gauge.dec(2, lane="submit")
+    assert gauge.value(lane="submit") == 3
+
+    with pytest.raises(ValueError, match="takes labels"):
+        counter.inc(method="eth_call")
+    with pytest.raises(ValueError, match="takes labels"):
+        counter.inc()
+
+
+def test_histogram_buckets_are_cumulative():
+    histogram = Histogram("test_seconds", "Durations.", ["stage"], buckets=(1, 0.1))
+    for seconds in (0.05, 0.1, 0.5, 5):
+        histogram.observe(seconds, stage="read")
+    with histogram.time(stage="read"):
+        pass
+
+    assert histogram.count(stage="read") == 5
+    assert histogram.render() == [
+        "# HELP test_seconds Durations.",
+        "# TYPE test_seconds histogram",
+        'test_seconds_bucket{stage="read",le="0.1"} 3',
+        'test_seconds_bucket{stage="read",le="1.0"} 4',
+        'test_seconds_bucket{stage="read",le="+Inf"} 5',
+        f'test_seconds_sum{{stage="read"}} {histogram._values[("read",)][1]}',
+        'test_seconds_count{stage="read"} 5',
+    ]
+    assert 5.65 <= histogram._values[("read",)][1] < 5.7
+
+
+def test_label_values_are_escaped():
+    counter = Counter("test_escaped_total", "Escaping.", ["route"])
+    counter.inc(route='a"b\\c\nd')
+    assert counter.render()[-1] == 'test_escaped_total{route="a\\"b\\\\c\\nd"} 1'
+
+
+def test_render_and_serve_every_metric():
+    counter = Counter("test_served_total", "Served.")
+    counter.inc()
+    assert "test_served_total 1\n" in render()
+    assert "# TYPE grievance_stage_seconds histogram" in render()
+
+    server = serve(0, host="127.0.0.1")
+    try:
+        url = f"http://127.0.0.1:{server.server_address[1]}"
+        with urllib.request.urlopen(f"{url}/metrics") as response:
+            assert response.headers["Content-Type"] == CONTENT_TYPE
+            assert "test_served_total 1" in response.read().decode("utf-8")
+        with pytest.raises(urllib.error.HTTPError) as missing:
+            urllib.request.urlopen(f"{url}/other")
+        assert missing.value.code == 404
+        missing.value.close()
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def test_instrumented_web3_records_each_rpc_call():
+    from web3 import EthereumTesterProvider, Web3
+
+    w3 = instrument_web3(Web3(EthereumTesterProvider()))
+    calls = RPC_SECONDS.count(method="eth_blockNumber")
+    errors = RPC_ERRORS.value(method="eth_blockNumber")
+    w3.eth.block_number
+    assert RPC_SECONDS.count(method="eth_blockNumber") == calls + 1
+    assert RPC_ERRORS.value(method="eth_blockNumber") == errors
+
+    failures = RPC_ERRORS.value(method="eth_notAMethod")
+    with pytest.raises(Exception):
+        w3.manager.request_blocking("eth_notAMethod", [])
+    assert RPC_ERRORS.value(method="eth_notAMethod") == failures + 1
+
+
+def test_submit_times_reading_and_decoding_separately():
+    from bulk_import import ImportJobs
+    from grievance_service import GrievanceService
+    from grievance_store import GrievanceStore
+    from idempotency import IdempotencyTable
+
+    service = GrievanceService(
+        GrievanceStore(), IdempotencyTable(), ImportJobs(":memory:"), max_upload_bytes=1024 ** 2, key_ttl=60,
+        dedup_window=0, max_import_items=10,
+    )
+    image = io.BytesIO()
+    Image.new("RGB", (64, 48)).save(image, format="PNG")
+    reads, decodes = STAGE_SECONDS.count(stage="upload_read"), STAGE_SECONDS.count(stage="decode")
+
+    status, _, _ = service.submit(io.BytesIO(image.getvalue()), "t", "d", "l", "", lambda *args: None)
+    assert status == 202
+    assert STAGE_SECONDS.count(stage="upload_read") == reads + 1
+    assert STAGE_SECONDS.count(stage="decode") == decodes + 1
+
+    # An upload over the limit is never decoded
+    status, _, _ = service.submit(io.BytesIO(b"\0" * (1024 ** 2 + 1)), "t", "d", "l", "", lambda *args: None)
+    assert status == 413
+    assert STAGE_SECONDS.count(stage="decode") == decodes + 1
@@ -0,0 +1,131 @@
+from types import SimpleNamespace
+
+import pytest
+from eth_account import Account
+
+from nonce_manager import REPLACEMENT_BUMP, NonceManager
+
+GAS_PRICE = 10 ** 9
+
+
+class FakeEth:
+    """The parts of ``web3.eth`` NonceManager uses, over a node whose counts the test sets."""
+
+    def __init__(self, mined=0, pending=None):
+        self.mined = mined
+        self.pending = mined if pending is None else pending
+        self.gas_price = GAS_PRICE
+        self.chain_id = 1337
+        self.sent = []
+        self.errors = []
+
+    def get_transaction_count(self, address, block):
+        return self.pending if block == "pending" else self.mined
+
+    def send_raw_transaction(self, raw):
+        if self.errors:
+            raise self.errors.pop(0)
+        self.sent.append(raw)
+        return bytes.fromhex(f"{len(self.sent):064x}")
+
+    def get_transaction_by_nonce(self, address, nonce):
+        raise ValueError("not supported")
+
+
+@pytest.fixture
+def account():
+    return Account.create()
+
+
+def make(account, **kwargs):
+    eth = FakeEth(**kwargs)
+    return NonceManager(SimpleNamespace(eth=eth), account.address), eth
+
+
+def transfer(account):
+    return {"to": account.address, "value": 0, "gas": 21000, "gasPrice": GAS_PRICE, "chainId": 1337}
+
+
+def test_hands_out_consecutive_nonces_after_one_read(account):
+    nonces, _ = make(account, mined=5, pending=7)
+    assert [nonces.allocate() for _ in range(3)] == [7, 8, 9]
+
+
+def test_reuses_released_nonces_first(account):
+    nonces, _ = make(account)
+    _, second, third = nonces.allocate(), nonces.allocate(), nonces.allocate()
+    nonces.release(second)
+    assert nonces.allocate() == second
+    assert nonces.allocate() == third + 1
+
+
+def test_sync_never_moves_backwards_and_drops_mined_state(account):
+    nonces, eth = make(account, mined=0, pending=0)
+    for _ in range(4):
+        nonces.allocate()
+    nonces.release(1)
+    nonces.mark_sent(0, b"\x01", transfer(account))
+    # The node has mined 0-1 and knows nothing of 2-3 yet
+    eth.mined = eth.pending = 2
+    assert nonces.sync() == 4
+    assert nonces._free == set()
+    assert 0 not in nonces._in_flight
+
+
+def test_resyncs_and_retries_on_nonce_too_low(account):
+    nonces, eth = make(account, mined=3)
+    nonces.allocate()
+    # Another sender used nonces 3-5 behind the manager's back
+    eth.mined = eth.pending = 6
+    eth.errors.append(ValueError("nonce too low"))
+    tx_hash, nonce = nonces.sign_and_send(account, transfer(account))
+    assert nonce == 6
+    assert nonces._in_flight[6]["tx_hash"] == tx_hash
+
+
+def test_releases_the_nonce_when_a_send_fails(account):
+    nonces, eth = make(account)
+    eth.errors.append(ValueError("insufficient funds"))
+    with pytest.raises(ValueError):
+        nonces.sign_and_send(account, transfer(account))
+    assert nonces.allocate() == 0
+
+
+def test_repair_fills_gaps_with_a_noop_transfer(account):
+    nonces, eth = make(account, mined=0)
+    for _ in range(3):
+        nonces.allocate()
+    nonces.release(1)
+    nonces.repair(account)
+    assert len(eth.sent) == 1
+    assert Account.recover_transaction(eth.sent[0]) == account.address
+    assert 1 in nonces._in_flight and nonces._in_flight[1]["tx"]["to"] == account.address
+    assert 1 not in nonces._free
+
+
+def test_repair_rebroadcasts_a_stuck_transaction_with_a_bumped_fee(account):
+    nonces, eth = make(account, mined=0)
+    nonces.stuck_after = 0
+    replaced = []
+    nonces.on_replace = lambda old, new: replaced.append((old, new))
+    old_hash, nonce = nonces.sign_and_send(account, transfer(account))
+    nonces.repair(account)
+    new_hash = nonces._in_flight[nonce]["tx_hash"]
+    assert replaced == [(old_hash, new_hash)]
+    assert nonces._in_flight[nonce]["tx"]["gasPrice"] == int(GAS_PRICE * REPLACEMENT_BUMP) + 1
+
+
+def test_repair_leaves_recent_transactions_alone(account):
+    nonces, eth = make(account, mined=0)
+    nonces.sign_and_send(account, transfer(account))
+    nonces.repair(account)
+    assert len(eth.sent) == 1
+
+
+def test_repair_confirms_when_the_original_was_mined_meanwhile(account):
+    nonces, eth = make(account, mined=0)
+    nonces.stuck_after = 0
+    nonces.sign_and_send(account, transfer(account))
+    eth.errors.append(ValueError("nonce too low"))
+    nonces.repair(account)
+    assert nonces._in_flight == {}
@@ -0,0 +1,57 @@
+import pytest
+
+from receipt_tracker import ReceiptTracker
+
+
+@pytest.fixture
+def chain(registry):
+    # Mine only when the test says so, so transactions stay pending in between
+    registry.tester.disable_auto_mine_transactions()
+    return registry
+
+
+def transfer(chain, sender=0):
+    # eth-tester keeps one pending transaction per sender, so concurrent ones come from different accounts
+    accounts = chain.web3.eth.accounts
+    return chain.web3.eth.send_transaction({"from": accounts[sender], "to": accounts[9], "value": 1})
+
+
+def test_resolves_every_watched_hash_from_the_blocks_that_include_them(chain):
+    tracker = ReceiptTracker(chain.web3, poll_interval=0.01)
+    hashes = [transfer(chain, sender) for sender in range(3)]
+    futures = [tracker.watch(tx_hash) for tx_hash in hashes]
+    assert tracker.pending() == 3
+    chain.tester.mine_blocks(1)
+    receipts = [future.result(timeout=10) for future in futures]
+    assert [r["transactionHash"] for r in receipts] == hashes
+    assert tracker.pending() == 0
+
+
+def test_finds_a_transaction_mined_before_it_was_watched(chain):
+    tx_hash = transfer(chain)
+    chain.tester.mine_blocks(1)
+    receipt = ReceiptTracker(chain.web3, poll_interval=0.01).wait(tx_hash, timeout=10)
+    assert receipt["status"] == 1
+
+
+def test_shares_one_watch_per_hash(chain):
+    tracker = ReceiptTracker(chain.web3, poll_interval=0.01)
+    tx_hash = transfer(chain)
+    assert tracker.watch(tx_hash) is tracker.watch(tx_hash)
+
+
+def test_wait_returns_none_when_not_mined_in_time(chain):
+    tracker = ReceiptTracker(chain.web3, poll_interval=0.01)
+    assert tracker.wait(transfer(chain), timeout=0.2) is None
+    assert tracker.pending() == 0
+
+
+def test_a_replacement_resolves_the_original_watch(chain):
+    tracker = ReceiptTracker(chain.web3, poll_interval=0.01)
+    original = bytes.fromhex("ab" * 32)
+    future = tracker.watch(original)
+    replacement = transfer(chain)
+    tracker.replace(original, replacement)
+    chain.tester.mine_blocks(1)
+    assert future.result(timeout=10)["transactionHash"] == replacement
+    assert tracker.pending() == 0
@@ -0,0 +1,109 @@
+import os
+import socket
+import threading
+import time
+from multiprocessing import AuthenticationError
+from types import SimpleNamespace
+
+import pytest
+
+from signer import SignerClient, SignerError, SignerServer, signer_authkey
+
+AUTHKEY = signer_authkey("0x" + "11" * 32)
+
+
+class FakeSender:
+    """A TransactionSender that answers from the tx itself: ``fail`` raises, ``hold`` waits for ``release``."""
+
+    def __init__(self):
+        self.account = SimpleNamespace(address="0x" + "33" * 20)
+        self.release = threading.Event()
+        self.calls = []
+
+    def send(self, tx):
+        self.calls.append(("send", tx))
+        if "fail" in tx:
+            raise ValueError(tx["fail"])
+        if tx.get("hold"):
+            self.release.wait(10)
+        return bytes([tx["nonce"]])
+
+    def send_and_wait(self, tx):
+        tx_hash = self.send(tx)
+        return tx_hash, {"status": 1, "transactionHash": tx_hash}
+
+
+@pytest.fixture
+def address(tmp_path_factory):
+    # AF_UNIX paths are limited to ~100 bytes, which a test-named tmp_path can exceed
+    return str(tmp_path_factory.mktemp("signer") / "signer.sock")
+
+
+def serve(address, sender=None):
+    sender = sender or FakeSender()
+    server = SignerServer(sender, address, AUTHKEY, threads=4)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    deadline = time.monotonic() + 5
+    # The socket is chmodded once it is listening
+    while not (os.path.exists(address) and os.stat(address).st_mode & 0o777 == 0o600):
+        assert time.monotonic() < deadline
+        time.sleep(0.01)
+    return sender
+
+
+def test_send_and_send_and_wait_round_trip(address):
+    sender = serve(address)
+    client = SignerClient(address, AUTHKEY)
+
+    assert client.send({"nonce": 1}) == b"\x01"
+    tx_hash, receipt = client.send_and_wait({"nonce": 2})
+    assert (tx_hash, receipt["status"]) == (b"\x02", 1)
+    assert [method for method, _ in sender.calls] == ["send", "send"]
+
+
+def test_requests_on_one_connection_complete_out_of_order(address):
+    sender = serve(address)
+    client = SignerClient(address, AUTHKEY)
+
+    held = client.submit("send_and_wait", {"nonce": 1, "hold": True})
+    assert client.send({"nonce": 2}) == b"\x02"
+    assert not held.done()
+    sender.release.set()
+    assert held.result(timeout=5)[0] == b"\x01"
+
+
+def test_errors_come_back_as_signer_errors(address):
+    serve(address)
+    client = SignerClient(address, AUTHKEY)
+
+    with pytest.raises(SignerError, match="nonce too low"):
+        client.send({"nonce": 1, "fail": "nonce too low"})
+    with pytest.raises(SignerError, match="Unknown signer method: sign"):
+        client.submit("sign", {"nonce": 1}).result(timeout=5)
+    # The connection is still usable
+    assert client.send({"nonce": 3}) == b"\x03"
+
+
+def test_a_client_with_the_wrong_key_is_refused(address):
+    serve(address)
+    with pytest.raises(AuthenticationError):
+        SignerClient(address, signer_authkey("0x" + "22" * 32)).send({"nonce": 1})
+    assert SignerClient(address, AUTHKEY).send({"nonce": 1}) == b"\x01"
+
+
+def test_the_client_reconnects_once_the_signer_is_back(address):
+    client = SignerClient(address, AUTHKEY)
+    with pytest.raises(ConnectionError, match="unavailable"):
+        client.send({"nonce": 1})
+
+    sender = serve(address)
+    held = client.submit("send_and_wait", {"nonce": 1, "hold": True})
+    # The connection drops with a request in flight: it fails, and the next one opens a new connection
+    first = client._conn
+    with socket.socket(fileno=os.dup(first.fileno())) as sock:
+        sock.shutdown(socket.SHUT_RDWR)
+    with pytest.raises(ConnectionError, match="closed the connection"):
+        held.result(timeout=5)
+    sender.release.set()
+    assert client.send({"nonce": 2}) == b"\x02"
+    assert client._conn is not first
@@ -0,0 +1,133 @@
+import sqlite3
+
+import pytest
+
+from grievances import new_grievance
+from sqlite_store import SQLiteGrievanceStore
+
+
+@pytest.fixture
+def store(tmp_path):
+    # A flush interval longer than any test, so writes stay buffered until flush() is called
+    store = SQLiteGrievanceStore(str(tmp_path / "grievances.db"), flush_interval=3600)
+    yield store
+    store.close()
+
+
+def grievance(tracking_id, **fields):
+    return dict(new_grievance(tracking_id, "t", "d", "l"), **fields)
+
+
+def ids(rows):
+    return [record["trackingId"] for _, record in rows]
+
+
+def test_scan_merges_buffered_writes_with_the_table_without_flushing(store):
+    for i in range(3):
+        store.add(grievance(f"GRV-{i}"))
+    store.flush()
+    store.add(grievance("GRV-3"))
+    store.update("GRV-1", category="flooding")
+
+    rows = list(store.scan())
+    assert [cursor for cursor, _ in rows] == [0, 1, 2, 3]
+    assert ids(rows) == ["GRV-0", "GRV-1", "GRV-2", "GRV-3"]
+    assert rows[1][1]["category"] == "flooding"
+    assert ids(store.scan(category="flooding")) == ["GRV-1"]
+    assert len(store) == 4
+    # Nothing was committed by the reads
+    assert store._dirty
+
+
+def test_scan_resumes_after_a_cursor_across_pages(store):
+    for i in range(7):
+        store.add(grievance(f"GRV-{i}"))
+    store.flush()
+    store.add(grievance("GRV-7"))
+    first = list(store.scan(chunk_size=2))[:4]
+    rest = list(store.scan(after=first[-1][0], chunk_size=2))
+    assert ids(first + rest) == [f"GRV-{i}" for i in range(8)]
+
+
+def test_filters_on_creation_time(store):
+    store.add(grievance("GRV-OLD", createdAt=100))
+    store.flush()
+    store.add(grievance("GRV-NEW", createdAt=200))
+    assert ids(store.scan(since=150)) == ["GRV-NEW"]
+    assert ids(store.scan(until=150)) == ["GRV-OLD"]
+
+
+def test_updates_and_re_adds_keep_the_insertion_position(store):
+    store.add(grievance("GRV-A"))
+    store.add(grievance("GRV-B"))
+    store.flush()
+    store.add(grievance("GRV-A", title="edited"))
+    store.update("GRV-B", resolved=True)
+    store.flush()
+    rows = list(store.scan())
+    assert [(cursor, record["trackingId"]) for cursor, record in rows] == [(0, "GRV-A"), (1, "GRV-B")]
+    assert rows[0][1]["title"] == "edited"
+    assert ids(store.scan(resolved=True)) == ["GRV-B"]
+
+
+def test_flush_commits_the_buffer_for_a_new_reader(store):
+    store.add(grievance("GRV-A"))
+    store.update("GRV-A", blockchainStatus="success")
+    assert store.flush() == 1
+    assert store.flush() == 0
+    other = SQLiteGrievanceStore(store.path, flush_interval=3600)
+    try:
+        assert other.get("GRV-A")["blockchainStatus"] == "success"
+        assert len(other) == 1
+        other.add(grievance("GRV-B"))
+        assert list(other.scan())[-1][0] == 1
+    finally:
+        other.close()
+
+
+def test_update_of_an_unknown_id_returns_none(store):
+    assert store.update("GRV-NONE", resolved=True) is None
+    assert "GRV-NONE" not in store
+
+
+def test_migrates_a_rowid_keyed_file_in_insertion_order(tmp_path):
+    path = str(tmp_path / "old.db")
+    db = sqlite3.connect(path)
+    db.execute(
+        "CREATE TABLE grievances (tracking_id TEXT PRIMARY KEY, blockchain_status TEXT, category TEXT, "
+        "priority_level TEXT, resolved INTEGER, created_at INTEGER, updated_at INTEGER, data TEXT NOT NULL)"
+    )
+    db.execute("CREATE INDEX idx_grievances_category ON grievances (category)")
+    for tracking_id in ("GRV-B", "GRV-A", "GRV-C"):
+        db.execute(
+            "INSERT INTO grievances (tracking_id, category, data) VALUES (?, ?, ?)",
+            (tracking_id, "unclassified", f'{{"trackingId": "{tracking_id}"}}'),
+        )
+    db.commit()
+    db.close()
+
+    store = SQLiteGrievanceStore(path, flush_interval=3600)
+    try:
+        assert [(cursor, record["trackingId"]) for cursor, record in store.scan()] == [
+            (0, "GRV-B"), (1, "GRV-A"), (2, "GRV-C")
+        ]
+        store.add(grievance("GRV-D"))
+        assert list(store.scan(after=2)) == [(3, store.get("GRV-D"))]
+    finally:
+        store.close()
+
+
+def test_shared_stores_see_each_others_writes(tmp_path):
+    path = str(tmp_path / "shared.db")
+    first = SQLiteGrievanceStore(path, shared=True)
+    second = SQLiteGrievanceStore(path, shared=True)
+    try:
+        first.add(grievance("GRV-A"))
+        second.update("GRV-A", blockchainStatus="success")
+        first.update("GRV-A", category="flooding")
+        record = second.get("GRV-A")
+        assert (record["blockchainStatus"], record["category"]) == ("success", "flooding")
+        assert first.wait_for("GRV-A", lambda r: r["blockchainStatus"] == "success", 1)["category"] == "flooding"
+    finally:
+        first.close()
+        second.close()
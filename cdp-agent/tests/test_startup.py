@@ -0,0 +1,51 @@
+import json
+import subprocess
+import sys
+
+import pytest
+
+from startup_profile import DEFERRED_MODULES, SRC, app_env
+
+# Generous, so only a real regression fails it: web3 or the agent stack alone take over a second to import
+IMPORT_BUDGET = 2.0
+CHECK_IMPORT = """
+import json, sys, time
+started = time.perf_counter()
+import {module} as app
+print(json.dumps({{
+    "seconds": time.perf_counter() - started,
+    "deferred": [m for m in {deferred!r} if m in sys.modules],
+    "built": [name for name in {lazy!r} if getattr(app, name).loaded],
+}}))
+"""
+
+
+def cold_import(module, lazy, tmp_path):
+    """Import ``module`` in a new interpreter, as a cold start does."""
+    code = CHECK_IMPORT.format(module=module, deferred=DEFERRED_MODULES, lazy=lazy)
+    output = subprocess.run(
+        [sys.executable, "-c", code], cwd=SRC, env=app_env(str(tmp_path)), capture_output=True, text=True,
+    )
+    assert output.returncode == 0, output.stderr
+    return json.loads(output.stdout.splitlines()[-1])
+
+
+def test_app_import_builds_nothing_heavy(tmp_path):
+    result = cold_import(
+        "app", ("web3", "CONTRACTS", "NONCES", "RECEIPTS", "SENDER", "CLASSIFIER", "CONTRACT_READER", "EVENT_INDEXER"),
+        tmp_path,
+    )
+    assert result["deferred"] == []
+    assert result["built"] == []
+    assert result["seconds"] < IMPORT_BUDGET
+
+
+def test_asgi_app_import_builds_nothing_heavy(tmp_path):
+    pytest.importorskip("fastapi")
+    result = cold_import(
+        "asgi_app", ("web3", "ASYNC_WEB3", "CONTRACTS", "CHAIN", "CLASSIFIER", "CONTRACT_READER", "EVENT_INDEXER"),
+        tmp_path,
+    )
+    assert result["deferred"] == []
+    assert result["built"] == []
+    assert result["seconds"] < IMPORT_BUDGET
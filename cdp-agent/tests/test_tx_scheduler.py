@@ -0,0 +1,181 @@
+import asyncio
+import threading
+from types import SimpleNamespace
+
+import pytest
+
+from tx_scheduler import AsyncTransactionScheduler, TierQueue, TransactionScheduler, parse_multipliers
+
+
+@pytest.fixture
+def clock():
+    """A clock for TierQueue that moves only when the test sets ``clock.now``."""
+    clock = SimpleNamespace(now=1000.0)
+    clock.time = lambda: clock.now
+    return clock
+
+
+def queue(clock, aging=60.0):
+    return TierQueue("test", aging=aging, clock=clock.time)
+
+
+def take_all(tiers, **kwargs):
+    taken = []
+    while (batch := tiers.take(1, 0, **kwargs)) is not None:
+        taken.append(batch[1][0][0])
+    return taken
+
+
+def test_parse_multipliers():
+    assert parse_multipliers(" high=2, low = 0.9,", {"high": 1.5, "medium": 1.2, "low": 1.0}) == {
+        "high": 2.0, "medium": 1.2, "low": 0.9,
+    }
+
+
+def test_most_urgent_tier_first_and_fifo_within_a_tier(clock):
+    tiers = queue(clock)
+    for tier, item in [("low", "l1"), ("medium", "m1"), ("high", "h1"), ("low", "l2"), ("high", "h2")]:
+        tiers.push(tier, item, None)
+        clock.now += 1
+    assert tiers.depth() == {"high": 2, "medium": 1, "low": 2}
+    assert take_all(tiers) == ["h1", "h2", "m1", "l1", "l2"]
+    assert len(tiers) == 0
+
+
+def test_an_item_overtakes_the_tier_above_once_it_has_waited_aging_longer(clock):
+    tiers = queue(clock, aging=60)
+    tiers.push("low", "low", None)
+    # The low item's head start is under twice the aging: high still goes first
+    clock.now += 119
+    tiers.push("high", "high", None)
+    assert take_all(tiers) == ["high", "low"]
+
+    tiers.push("medium", "medium", None)
+    # Over one aging period ahead of the high item
+    clock.now += 61
+    tiers.push("high", "high", None)
+    assert take_all(tiers) == ["medium", "high"]
+
+
+def test_a_batch_is_due_when_full_or_once_its_oldest_waited_max_wait(clock):
+    tiers = queue(clock)
+    assert tiers.wait_time(2) is None
+    tiers.push("low", "a", None)
+    clock.now += 1
+    tiers.push("low", "b", None)
+
+    assert tiers.take(3, 2) is None
+    assert tiers.wait_time(2) == 1
+    tiers.push("low", "c", None)
+    tier, batch = tiers.take(3, 2)
+    assert (tier, [item for item, _, _ in batch]) == ("low", ["a", "b", "c"])
+
+    tiers.push("medium", "d", None)
+    assert tiers.take(3, 2) is None
+    # Draining on stop takes it anyway
+    assert tiers.take(3, 2, force=True)[1][0][0] == "d"
+    clock.now += 2
+    tiers.push("high", "e", None)
+    clock.now += 2
+    assert tiers.take(3, 2)[1][0][0] == "e"
+
+
+class Lane:
+    """A ``process`` that records each batch and blocks until released; fails items named ``fail``."""
+
+    def __init__(self):
+        self.release = threading.Event()
+        self.started = threading.Semaphore(0)
+        self.batches = []
+        self.lock = threading.Lock()
+        self.busy = self.most_busy = 0
+
+    def __call__(self, items, fee_multiplier):
+        with self.lock:
+            self.batches.append((items, fee_multiplier))
+            self.busy += 1
+            self.most_busy = max(self.most_busy, self.busy)
+        self.started.release()
+        self.release.wait(10)
+        with self.lock:
+            self.busy -= 1
+        if items == ["crash"]:
+            raise RuntimeError("node unreachable")
+        return [ValueError(item) if item == "fail" else f"sent {item}" for item in items]
+
+
+def test_queued_items_go_out_by_priority_once_a_slot_frees():
+    lane = Lane()
+    scheduler = TransactionScheduler(lane, "test", max_batch=1, max_wait=0, max_in_flight=1)
+    first = scheduler.submit("first", "low")
+    assert lane.started.acquire(timeout=5)
+    # The only slot is busy: these wait and are reordered
+    futures = [scheduler.submit(item, tier) for item, tier in [("low", "low"), ("high", "high"), ("mid", "mid")]]
+    assert scheduler.pending() == {"high": 1, "medium": 1, "low": 1}
+
+    lane.release.set()
+    assert [f.result(timeout=5) for f in [first] + futures] == ["sent first", "sent low", "sent high", "sent mid"]
+    # Unknown tiers are queued as the middle one, and each tier has its fee multiplier
+    assert lane.batches == [(["first"], 1.0), (["high"], 1.5), (["mid"], 1.2), (["low"], 1.0)]
+    scheduler.stop()
+
+
+def test_at_most_max_in_flight_batches_are_processed_at_once():
+    lane = Lane()
+    scheduler = TransactionScheduler(lane, "test", max_batch=1, max_wait=0, max_in_flight=2)
+    futures = [scheduler.submit(str(i), "high") for i in range(5)]
+    assert lane.started.acquire(timeout=5) and lane.started.acquire(timeout=5)
+    assert not lane.started.acquire(timeout=0.2)
+    assert scheduler.pending()["high"] == 3
+
+    lane.release.set()
+    assert [f.result(timeout=5) for f in futures] == [f"sent {i}" for i in range(5)]
+    assert lane.most_busy == 2
+    scheduler.stop()
+
+
+def test_a_failed_item_or_batch_fails_only_its_own_futures():
+    lane = Lane()
+    lane.release.set()
+    scheduler = TransactionScheduler(lane, "test", max_batch=2, max_wait=0, max_in_flight=1)
+    ok, failed = scheduler.submit("ok", "high"), scheduler.submit("fail", "high")
+    assert ok.result(timeout=5) == "sent ok"
+    with pytest.raises(ValueError):
+        failed.result(timeout=5)
+    with pytest.raises(RuntimeError, match="node unreachable"):
+        scheduler.submit("crash", "low").result(timeout=5)
+    scheduler.stop()
+
+
+def test_stop_sends_what_is_still_queued():
+    lane = Lane()
+    lane.release.set()
+    scheduler = TransactionScheduler(lane, "test", max_batch=10, max_wait=3600, max_in_flight=1)
+    futures = [scheduler.submit(str(i), "low") for i in range(3)]
+    scheduler.stop()
+    assert [f.result(timeout=0) for f in futures] == ["sent 0", "sent 1", "sent 2"]
+    assert lane.batches == [(["0", "1", "2"], 1.0)]
+
+
+def test_async_scheduler_orders_by_priority_within_max_in_flight():
+    batches, release = [], None
+
+    async def process(items, fee_multiplier):
+        batches.append(items[0])
+        await release.wait()
+        return [f"sent {item}" for item in items]
+
+    async def run():
+        nonlocal release
+        release = asyncio.Event()
+        scheduler = AsyncTransactionScheduler(process, "test", max_batch=1, max_wait=0, max_in_flight=1)
+        first = asyncio.create_task(scheduler.submit("first", "low"))
+        await asyncio.sleep(0.01)
+        rest = [asyncio.create_task(scheduler.submit(item, tier)) for item, tier in [("low", "low"), ("high", "high")]]
+        await asyncio.sleep(0.01)
+        assert batches == ["first"]
+        release.set()
+        return await asyncio.gather(first, *rest)
+
+    assert asyncio.run(run()) == ["sent first", "sent low", "sent high"]
+    assert batches == ["first", "high", "low"]
@@ -27,6 +27,21 @@ contract GrievanceRegistry {
     event GrievanceDetailsAdded(string trackingId);
     event GrievanceResolved(string trackingId);
 
+    // Input record for batch submission (same fields as submitGrievance)
+    struct GrievanceInput {
+        string title;
+        string description;
+        string category;
+        string location;
+        uint256 mediaCount;
+        string priorityLevel;
+        string trackingId;
+        uint256 estimatedDays;
+        uint256 fundAmount;
+        string currency;
+        string aiJustification;
+    }
+
     // Single-step grievance submission
     function submitGrievance(
         string memory title,
@@ -41,7 +56,7 @@ contract GrievanceRegistry {
         string memory currency,
         string memory aiJustification
     ) public {
-        grievances.push(Grievance({
+        _submit(GrievanceInput({
             title: title,
             description: description,
             category: category,
@@ -49,16 +64,39 @@ contract GrievanceRegistry {
             mediaCount: mediaCount,
             priorityLevel: priorityLevel,
             trackingId: trackingId,
-            timestamp: block.timestamp,
-            submitter: msg.sender,
-            resolved: false,
             estimatedDays: estimatedDays,
             fundAmount: fundAmount,
             currency: currency,
             aiJustification: aiJustification
         }));
-        grievanceIndex[trackingId] = grievances.length - 1;
-        emit GrievanceSubmitted(trackingId, msg.sender);
+    }
+
+    // Batch submission: one transaction, one GrievanceSubmitted event per item
+    function submitGrievances(GrievanceInput[] calldata items) external {
+        for (uint256 i = 0; i < items.length; i++) {
+            _submit(items[i]);
+        }
+    }
+
+    function _submit(GrievanceInput memory g) internal {
+        grievances.push(Grievance({
+            title: g.title,
+            description: g.description,
+            category: g.category,
+            location: g.location,
+            mediaCount: g.mediaCount,
+            priorityLevel: g.priorityLevel,
+            trackingId: g.trackingId,
+            timestamp: block.timestamp,
+            submitter: msg.sender,
+            resolved: false,
+            estimatedDays: g.estimatedDays,
+            fundAmount: g.fundAmount,
+            currency: g.currency,
+            aiJustification: g.aiJustification
+        }));
+        grievanceIndex[g.trackingId] = grievances.length - 1;
+        emit GrievanceSubmitted(g.trackingId, msg.sender);
     }
 
     // Split getter: basic fields
@@ -1,4 +1,5 @@
 require("@nomiclabs/hardhat-ethers");
+require("@nomicfoundation/hardhat-chai-matchers");
 require("dotenv").config();
 
 const PRIVATE_KEY = process.env.PRIVATE_KEY;
@@ -0,0 +1,78 @@
+const { loadFixture } = require("@nomicfoundation/hardhat-network-helpers");
+const { anyValue } = require("@nomicfoundation/hardhat-chai-matchers/withArgs");
+const { expect } = require("chai");
+
+describe("GrievanceRegistry", function () {
+  async function deployRegistryFixture() {
+    const [owner] = await ethers.getSigners();
+
+    const GrievanceRegistry = await ethers.getContractFactory("GrievanceRegistry");
+    const registry = await GrievanceRegistry.deploy();
+
+    return { registry, owner };
+  }
+
+  function grievance(trackingId) {
+    return {
+      title: `Title ${trackingId}`,
+      description: "Pothole on main road",
+      category: "road pothole",
+      location: "Ward 7",
+      mediaCount: 1,
+      priorityLevel: "medium",
+      trackingId,
+      estimatedDays: 7,
+      fundAmount: 0,
+      currency: "INR",
+      aiJustification: "[]",
+    };
+  }
+
+  describe("submitGrievances", function () {
+    it("Should store every item in the batch", async function () {
+      const { registry, owner } = await loadFixture(deployRegistryFixture);
+
+      await registry.submitGrievances([grievance("GRV-A"), grievance("GRV-B"), grievance("GRV-C")]);
+
+      expect(await registry.getAllTrackingIds()).to.deep.equal(["GRV-A", "GRV-B", "GRV-C"]);
+      const basic = await registry.getGrievanceBasic("GRV-B");
+      expect(basic.title).to.equal("Title GRV-B");
+      expect(basic.submitter).to.equal(owner.address);
+    });
+
+    it("Should emit GrievanceSubmitted once per item", async function () {
+      const { registry, owner } = await loadFixture(deployRegistryFixture);
+
+      const tx = await registry.submitGrievances([grievance("GRV-A"), grievance("GRV-B")]);
+      const receipt = await tx.wait();
+
+      const submitted = receipt.events.filter((e) => e.event === "GrievanceSubmitted");
+      expect(submitted.map((e) => e.args.trackingId)).to.deep.equal(["GRV-A", "GRV-B"]);
+      await expect(tx).to.emit(registry, "GrievanceSubmitted").withArgs("GRV-A", owner.address);
+    });
+
+    it("Should match submitGrievance for a single item", async function () {
+      const { registry } = await loadFixture(deployRegistryFixture);
+      const g = grievance("GRV-ONE");
+
+      await expect(
+        registry.submitGrievance(
+          g.title, g.description, g.category, g.location, g.mediaCount, g.priorityLevel,
+          g.trackingId, g.estimatedDays, g.fundAmount, g.currency, g.aiJustification
+        )
+      ).to.emit(registry, "GrievanceSubmitted").withArgs("GRV-ONE", anyValue);
+      await registry.submitGrievances([grievance("GRV-TWO")]);
+
+      const details = await registry.getGrievanceDetails("GRV-TWO");
+      expect(details.currency).to.equal("INR");
+      expect(await registry.getAllTrackingIds()).to.deep.equal(["GRV-ONE", "GRV-TWO"]);
+    });
+
+    it("Should accept an empty batch", async function () {
+      const { registry } = await loadFixture(deployRegistryFixture);
+
+      await expect(registry.submitGrievances([])).not.to.be.reverted;
+      expect(await registry.getAllTrackingIds()).to.deep.equal([]);
+    });
+  });
+});